@@ -0,0 +1,143 @@
+"""
+Timing and baseline comparison of the benchmark suite.
+
+A benchmark is a setup function returning the run function of one batch; the
+run function times each of its operations and returns their durations. The
+harness runs a few warmup batches, then the measured ones, and reports the
+latency percentiles of the operations and the throughput of the batches.
+
+The results are compared with a committed baseline: a benchmark regresses when
+the mean operation time of its fastest batch, the one least disturbed by the
+other load of the machine, grows by more than its tolerance. Both runs also time a fixed calibration workload, and the baseline is scaled by
+the ratio of the two, so that a slower or busier machine is not reported as a
+regression of every stage.
+"""
+import json
+import platform
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_TOLERANCE = 0.30
+
+
+@dataclass
+class Benchmark:
+    """A named workload and the tolerance of its regression check."""
+
+    name: str
+    description: str
+    # called once with the workspace, returns the function running one batch
+    setup: Callable[[object], Callable[[], List[float]]]
+    warmup: int = 1
+    repeat: int = 5
+    tolerance: Optional[float] = None
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Return a percentile of the values, interpolating between the closest ranks.
+
+    :param values: The values, in any order.
+    :param fraction: The percentile, between 0 and 1.
+    """
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def measure(benchmark: Benchmark, workspace, repeat: Optional[int] = None) -> dict:
+    """
+    Run a benchmark and summarize its timings.
+
+    :param benchmark: The benchmark.
+    :param workspace: Passed to the setup function of the benchmark.
+    :param repeat: Number of measured batches, the one of the benchmark if None.
+    :return: The operations, the p50/p95/max latency and the mean operation time of the fastest batch
+             in milliseconds, and the throughput in operations per second.
+    """
+    run = benchmark.setup(workspace)
+    for _ in range(benchmark.warmup):
+        run()
+
+    latencies, batch_seconds, best = [], [], float("inf")
+    for _ in range(repeat or benchmark.repeat):
+        start = time.perf_counter()
+        batch = run()
+        batch_seconds.append(time.perf_counter() - start)
+        latencies.extend(batch)
+        best = min(best, batch_seconds[-1] / len(batch))
+
+    return {
+        "operations": len(latencies),
+        "best_ms": round(best * 1000, 4),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 4),
+        "max_ms": round(max(latencies) * 1000, 4),
+        "throughput": round(len(latencies) / sum(batch_seconds), 2),
+    }
+
+
+def calibrate(rounds: int = 7) -> float:
+    """
+    Time a fixed CPU and memory bound workload, the speed reference of the machine.
+
+    :param rounds: Number of timings, the median is returned.
+    :return: The median duration of the workload, in milliseconds.
+    """
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        values = [(i * 7919) % 10007 for i in range(200000)]
+        values.sort()
+        json.loads(json.dumps({str(i): values[i] for i in range(0, len(values), 10)}))
+        timings.append(time.perf_counter() - start)
+    return round(percentile(timings, 0.5) * 1000, 4)
+
+
+def environment() -> dict:
+    """Describe the interpreter and the machine, the baselines are only comparable on the same ones."""
+    return {"python": sys.version.split()[0], "platform": platform.platform(), "machine": platform.machine()}
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerances: Dict[str, float],
+            speed_ratio: float = 1.0) -> List[str]:
+    """
+    Compare the results with the baseline.
+
+    :param results: The results of each benchmark.
+    :param baseline: The baseline results of each benchmark.
+    :param tolerances: The tolerance of each benchmark, DEFAULT_TOLERANCE if missing.
+    :param speed_ratio: Calibration time of this run over the one of the baseline, > 1 on a slower machine.
+    :return: A description of each regression, empty if none.
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        tolerance = tolerances.get(name, DEFAULT_TOLERANCE)
+        expected_ms = reference["best_ms"] * speed_ratio
+        if result["best_ms"] > expected_ms * (1 + tolerance):
+            regressions.append(f"{name}: {result['best_ms']:.3f} ms per operation, expected {expected_ms:.3f} ms "
+                               f"(+{result['best_ms'] / expected_ms - 1:.0%}, tolerance {tolerance:.0%})")
+    return regressions
+
+
+def load_baseline(path: str) -> dict:
+    """Read a baseline file, an empty baseline if it does not exist."""
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {"environment": None, "benchmarks": {}}
+
+
+def write_json(data: dict, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=4)
+        file.write("\n")
+
@@ -0,0 +1,98 @@
+"""
+Cold start benchmark for the subsystem entry points.
+
+Every orchestrator module is imported in a fresh interpreter started with
+``python -X importtime``; the cumulative import time of the entry module and
+the slowest imported modules are reported.
+
+Usage (from the repository root):
+    python benchmarks/startup_importtime.py [--repeat N] [--top K] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = {
+    "ingestion": "ingestion_system.orchestrator",
+    "preparation": "preparation_system.orchestrator",
+    "segregation": "segregation_system.segregation_orchestrator",
+    "development": "development_system.development_system_orchestrator",
+    "production": "production_system.production_orchestrator",
+    "evaluation": "evaluation_system.evaluationSystemOrchestrator",
+    "service_class": "service_class.service_class_orchestrator",
+}
+
+
+def parse_importtime(stderr: str) -> list:
+    """
+    Parses the output of ``-X importtime``.
+
+    :param stderr: The standard error of the interpreter.
+    :return: A list of (module, self_us, cumulative_us) tuples, in output order.
+             Nested imports keep the indentation of the report in the module name.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append((name[1:].rstrip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def measure(module: str) -> dict:
+    """
+    Imports a module in a fresh interpreter and measures its import time.
+
+    :param module: The dotted name of the module to import.
+    :return: The cumulative import time in milliseconds and the per-module entries.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Cannot import {module}:\n{result.stderr.strip().splitlines()[-1]}")
+
+    entries = parse_importtime(result.stderr)
+    total_us = next(cumulative for name, _, cumulative in reversed(entries) if name == module)
+    return {"total_ms": total_us / 1000, "entries": entries}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cold start import time of each subsystem.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per subsystem, the median is reported.")
+    parser.add_argument("--top", type=int, default=5, help="Number of slowest modules to list.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    parser.add_argument("subsystems", nargs="*", default=list(ENTRY_POINTS), help="Subsystems to measure.")
+    args = parser.parse_args()
+
+    results = {}
+    for subsystem in args.subsystems:
+        runs = [measure(ENTRY_POINTS[subsystem]) for _ in range(args.repeat)]
+        median = sorted(runs, key=lambda run: run["total_ms"])[len(runs) // 2]
+        slowest = sorted(median["entries"], key=lambda entry: entry[1], reverse=True)[:args.top]
+        results[subsystem] = {
+            "module": ENTRY_POINTS[subsystem],
+            "median_ms": round(statistics.median(run["total_ms"] for run in runs), 1),
+            "slowest": [{"module": name.strip(), "self_ms": round(self_us / 1000, 1)}
+                        for name, self_us, _ in slowest],
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+        return
+
+    for subsystem, result in results.items():
+        print(f"{subsystem:<14} {result['median_ms']:>9.1f} ms  ({result['module']})")
+        for entry in result["slowest"]:
+            print(f"{'':<16}{entry['self_ms']:>8.1f} ms  {entry['module']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+"""
+Throughput and latency benchmarks of the pipeline stages, checked against a committed baseline.
+
+The micro-benchmarks time the hot functions of each subsystem on synthetic
+workloads built from the Service Class data; the end-to-end benchmark runs
+records through the Ingestion, Preparation and Production stages connected by
+in-process stand-ins of their channels, and times each session from its first
+record to its label. Everything runs in a temporary working directory, so the
+repository data is never touched.
+
+The results are written as JSON and compared with benchmarks/baseline.json:
+the run fails when a stage is slower than its baseline by more than the
+tolerance (see harness.compare). The baseline is only meaningful on the machine that recorded it,
+record it again with --update-baseline after a deliberate change or on a new
+reference machine.
+
+Usage (from the repository root):
+    python benchmarks/suite.py [BENCHMARK ...] [--repeat N] [--output PATH] [--update-baseline]
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import tempfile
+import time
+
+import harness
+from synthetic import ROOT_DIR, SyntheticData
+
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, "baseline.json")
+RESULTS_PATH = os.path.join(BENCHMARKS_DIR, "results.json")
+# tolerance of the operations of tens of microseconds, whose timing varies by half with the load of the machine;
+# the regressions they guard against (a schema or a model loaded per call) are of orders of magnitude
+MICRO_TOLERANCE = 1.0
+
+
+class Workspace:
+    """Temporary working directory and synthetic data shared by the benchmarks of a run."""
+
+    def __init__(self, directory: str, seed: int = 42):
+        self.directory = directory
+        self.data = SyntheticData(directory, seed=seed)
+        self._classifier_path = None
+        self._cleanups = []
+
+    def path(self, *parts: str) -> str:
+        return os.path.join(self.directory, *parts)
+
+    def on_close(self, cleanup) -> None:
+        """Register a function releasing a resource outside the working directory, e.g. a shared memory ring."""
+        self._cleanups.append(cleanup)
+
+    def close(self) -> None:
+        while self._cleanups:
+            self._cleanups.pop()()
+
+    def classifier(self) -> str:
+        """
+        Train a small classifier on synthetic prepared sessions and export it as the Development System does.
+
+        :return: The path of the exported .npz artefact.
+        """
+        if self._classifier_path is None:
+            import pandas as pd
+            from sklearn.neural_network import MLPClassifier
+            from development_system.testing.classifier_exporter import ClassifierExporter
+            from production_system.classification import Classification
+
+            sessions = self.data.prepared_sessions(400)
+            keys = Classification.session_keys()
+            features = pd.DataFrame([[session[key] for key in keys] for session in sessions],
+                                    columns=Classification.FEATURE_NAMES)
+            labels = [session["label"] == "cyberbullying" for session in sessions]
+            classifier = MLPClassifier(hidden_layer_sizes=(100, 100, 100), max_iter=50, random_state=0)
+            classifier.fit(features, labels)
+            self._classifier_path = self.path("cyberbullying_classifier.npz")
+            ClassifierExporter.export(classifier, self._classifier_path)
+        return self._classifier_path
+
+
+def timed(operation, items) -> list:
+    """Apply an operation to each item and return the duration of each call, in seconds."""
+    latencies = []
+    for item in items:
+        start = time.perf_counter()
+        operation(item)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+# --------------------------------------------------------------------------- micro-benchmarks
+
+def store_record(workspace):
+    from ingestion_system.record_buffer import RecordBufferController
+
+    buffer = RecordBufferController(database_path=workspace.path("record_buffer.db"))
+    records = workspace.data.records(200)
+
+    def run():
+        latencies = timed(buffer.store_record, records)
+        # the next batch inserts the sessions again
+        buffer._drop_table()  # pylint: disable=protected-access
+        buffer._create_table()  # pylint: disable=protected-access
+        return latencies
+    return run
+
+
+def validate_record(workspace):
+    from ingestion_system import RECORD_SCHEMA_FILE_PATH
+    from ingestion_system.json_handler import JsonHandler
+
+    handler = JsonHandler()
+    records = workspace.data.records(200)
+    return lambda: timed(lambda record: handler.validate_json(record, RECORD_SCHEMA_FILE_PATH), records)
+
+
+def validate_prepared_session(workspace):
+    from common.lexicon import load_lexicon
+    from production_system.json_validation import JsonHandler
+
+    with open(os.path.join(ROOT_DIR, "production_system", "production_schema", "PreparedSessionSchema.json"),
+              "r", encoding="utf-8") as file:
+        schema = load_lexicon().extend_schema(json.load(file))
+    handler = JsonHandler()
+    sessions = workspace.data.prepared_sessions(500)
+    return lambda: timed(lambda session: handler.validate_json(session, schema), sessions)
+
+
+def create_prepared_session(workspace):
+    from preparation_system.preparation_configuration import PreparationSystemParameters
+    from preparation_system.prepared_session_creator import PreparedSessionCreator
+
+    creator = PreparedSessionCreator(PreparationSystemParameters())
+    # the audio is left out, extract_audio_features measures it
+    raw_sessions = workspace.data.raw_sessions(500, with_audio=False)
+    return lambda: timed(creator.create_prepared_session, raw_sessions)
+
+
+def extract_audio_features(workspace):
+    from preparation_system.preparation_configuration import PreparationSystemParameters
+    from preparation_system.prepared_session_creator import PreparedSessionCreator
+
+    creator = PreparedSessionCreator(PreparationSystemParameters())
+    clips = workspace.data.audio_clips()
+    return lambda: timed(creator._extract_audio_features, clips)  # pylint: disable=protected-access
+
+
+def generate_coverage_report(workspace):
+    from segregation_system.coverage_report.coverage_report_model import CoverageReportModel
+
+    sessions = workspace.data.prepared_sessions(1000)
+    # batches of ten reports, so that the fastest one is not a few lucky calls
+    return lambda: timed(CoverageReportModel.generate_coverage_report, [sessions] * 10)
+
+
+class _ProductionIOStandIn:
+    """Stand-in of the Production System channel: the labels are not sent."""
+
+    def send_label(self, target_ip, target_port, label, rule):
+        return True
+
+
+def handle_classification(workspace):
+    from pathlib import Path
+    from common.metrics import MetricsRegistry
+    from common.shared_ring import SharedSessionRing
+    from common.tracing import Tracer
+    from production_system.classification import Classification
+    from production_system.production_orchestrator import ProductionOrchestrator
+    from production_system.production_phase_manager import ClassificationPhaseManager
+
+    # the orchestrator without its server and configuration files, holding its classifier across sessions
+    orchestrator = ProductionOrchestrator.__new__(ProductionOrchestrator)
+    classification = Classification()
+    classification._model_path = Path(workspace.classifier())  # pylint: disable=protected-access
+    orchestrator.__dict__.update(
+        _service=False, _deployed=True, _classification=classification, _drift_monitor=None,
+        _metrics=MetricsRegistry(), _tracer=Tracer("Benchmark"), _prod_sys_io=_ProductionIOStandIn(),
+        _configuration=type("Configuration", (), {"global_netconf": {
+            "Service Class": {"ip": "127.0.0.1", "port": 5000},
+            "Evaluation System": {"ip": "127.0.0.1", "port": 5001}}})(),
+        _phase_manager=ClassificationPhaseManager(evaluation_phase=True, prod_threshold=10 ** 9,
+                                                  eval_threshold=10 ** 9))
+
+    # the sessions of the co-located Preparation System, read in place from the shared memory ring
+    sessions = workspace.data.prepared_sessions(500)
+    ring = SharedSessionRing.create(f"cbd_benchmark_{os.getpid()}", Classification.session_keys(),
+                                    slots=len(sessions))
+    sender = SharedSessionRing.attach(ring.name)
+    workspace.on_close(ring.close)
+    workspace.on_close(sender.close)
+
+    def handle(_):
+        orchestrator._handle_classification(ring.read())  # pylint: disable=protected-access
+        ring.release()
+
+    def run():
+        for session in sessions:
+            sender.write(session["uuid"], session["label"], session)
+        return timed(handle, sessions)
+    return run
+
+
+def validation(workspace):
+    from development_system.configuration_parameters import ConfigurationParameters
+    from development_system.training.classifier import Classifier
+    from development_system.training.learning_sets import LearningSets
+    from development_system.validation_orchestrator import ValidationOrchestrator
+    import joblib
+
+    # the validation reads the learning sets and writes the report under the working directory
+    basedir = workspace.path("development_system")
+    for folder in ("data", "results"):
+        os.makedirs(os.path.join(basedir, folder), exist_ok=True)
+    sessions = workspace.data.prepared_sessions(400)
+    joblib.dump(sessions[:300], os.path.join(basedir, "data", "training_set.sav"))
+    joblib.dump(sessions[300:], os.path.join(basedir, "data", "validation_set.sav"))
+    # in service mode the number of iterations comes from the classifier with the average hyperparameters
+    average = Classifier()
+    average.set_num_iterations(50)
+    joblib.dump(average, os.path.join(basedir, "data", "classifier_avg_hyperparams.sav"))
+    LearningSets.basedir = basedir
+
+    # a grid of five networks, the fewest the validation report accepts, trained from scratch every time
+    ConfigurationParameters.load_configuration()
+    ConfigurationParameters.params = dict(copy.deepcopy(ConfigurationParameters.params),
+                                          min_layers=1, max_layers=1, step_layers=1,
+                                          min_neurons=10, max_neurons=50, step_neurons=10,
+                                          service_flag=True, training_cache=False, random_state=0)
+
+    def run():
+        orchestrator = ValidationOrchestrator(basedir=basedir)
+        return timed(lambda _: orchestrator.validation(), [None])
+    return run
+
+
+# --------------------------------------------------------------------------- end-to-end
+
+class _ChannelStandIn:
+    """
+    Stand-in of a channel: the messages go through JSON, as on the wire, and are handed to the next stage.
+    """
+
+    def __init__(self, deliver):
+        self.deliver = deliver
+
+    def send_label(self, target_ip, target_port, label_data):
+        return True
+
+    def send_raw_session(self, target_ip, target_port, session_data):
+        self.deliver(json.loads(json.dumps(session_data)))
+        return True
+
+
+def end_to_end(workspace):
+    from common.lexicon import load_lexicon
+    from common.metrics import MetricsRegistry
+    from common.tracing import Tracer
+    from ingestion_system.ingestion_configuration import Parameters
+    from ingestion_system.ingestion_worker import IngestionWorker
+    from ingestion_system.phase_counter import PhaseCounter
+    from preparation_system.preparation_configuration import PreparationSystemParameters
+    from preparation_system.prepared_session_creator import PreparedSessionCreator
+    from preparation_system.session_corrector import SessionCorrector
+    from production_system.classification import Classification
+    from production_system.json_validation import JsonHandler
+    from pathlib import Path
+
+    # production phase: the labels are not needed to complete the sessions
+    parameters = Parameters()
+    parameters.configuration = dict(parameters.configuration, current_phase="production", service=False)
+    preparation = PreparationSystemParameters()
+    corrector, creator = SessionCorrector(preparation), PreparedSessionCreator(preparation)
+    with open(os.path.join(ROOT_DIR, "production_system", "production_schema", "PreparedSessionSchema.json"),
+              "r", encoding="utf-8") as file:
+        schema = load_lexicon().extend_schema(json.load(file))
+    handler = JsonHandler()
+    classification = Classification()
+    classification._model_path = Path(workspace.classifier())  # pylint: disable=protected-access
+
+    started, latencies = {}, []
+
+    def prepare_and_classify(raw_session):
+        session = corrector.correct_absolute_outliers(
+            creator.create_prepared_session(corrector.correct_missing_samples(raw_session, None)))
+        prepared_session = json.loads(json.dumps(session.to_dict()))
+        if not handler.validate_json(prepared_session, schema):
+            raise RuntimeError(f"Prepared session {prepared_session['uuid']} rejected by the Production System")
+        classification.classify(prepared_session, True)
+        latencies.append(time.perf_counter() - started.pop(raw_session["uuid"]))
+
+    metrics = MetricsRegistry()
+    worker = IngestionWorker(0, parameters, _ChannelStandIn(prepare_and_classify),
+                             PhaseCounter(parameters.configuration), Tracer("Benchmark", metrics=metrics), metrics,
+                             database_path=workspace.path("end_to_end.db"))
+    records = workspace.data.records(40, include_labels=False)
+
+    def run():
+        latencies.clear()
+        for record in copy.deepcopy(records):
+            started.setdefault(record["value"]["uuid"], time.perf_counter())
+            worker.process(record)
+        if started:
+            raise RuntimeError(f"{len(started)} sessions did not reach the Production System")
+        return list(latencies)
+    return run
+
+
+BENCHMARKS = [
+    harness.Benchmark("ingestion.store_record", "RecordBufferController.store_record, per record", store_record),
+    harness.Benchmark("ingestion.validate_json", "JsonHandler.validate_json of a record", validate_record,
+                      tolerance=MICRO_TOLERANCE),
+    harness.Benchmark("preparation.create_prepared_session",
+                      "PreparedSessionCreator.create_prepared_session, text and events features",
+                      create_prepared_session, tolerance=MICRO_TOLERANCE),
+    harness.Benchmark("preparation.extract_audio_features",
+                      "PreparedSessionCreator._extract_audio_features of a 20 s clip", extract_audio_features,
+                      repeat=3),
+    harness.Benchmark("segregation.generate_coverage_report",
+                      "CoverageReportModel.generate_coverage_report of 1000 sessions", generate_coverage_report),
+    harness.Benchmark("production.validate_json", "JsonHandler.validate_json of a prepared session",
+                      validate_prepared_session),
+    harness.Benchmark("production.handle_classification",
+                      "ProductionOrchestrator._handle_classification of a shared memory row", handle_classification,
+                      tolerance=MICRO_TOLERANCE),
+    harness.Benchmark("development.validation", "ValidationOrchestrator.validation, grid of 5 networks",
+                      validation, warmup=0, repeat=2, tolerance=0.5),
+    harness.Benchmark("pipeline.end_to_end",
+                      "records to label through ingestion, preparation and production, per session",
+                      end_to_end, repeat=3, tolerance=0.5),
+]
+
+
+def main():
+    names = [benchmark.name for benchmark in BENCHMARKS]
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages against the committed baseline.")
+    parser.add_argument("benchmarks", nargs="*", metavar="BENCHMARK",
+                        help=f"Benchmarks to run, all of them by default: {', '.join(names)}.")
+    parser.add_argument("--repeat", type=int, help="Measured batches per benchmark, overriding their default.")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the synthetic workloads.")
+    parser.add_argument("--output", default=RESULTS_PATH, help="Path of the JSON results.")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Path of the baseline to compare with.")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Write the results of the benchmarks run into the baseline instead of comparing.")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.benchmarks if name not in names]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+    selected = [benchmark for benchmark in BENCHMARKS if not args.benchmarks or benchmark.name in args.benchmarks]
+
+    results = {}
+    calibration_ms = harness.calibrate()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="cbd_benchmarks_") as directory:
+        os.chdir(directory)
+        try:
+            workspace = Workspace(directory, seed=args.seed)
+            try:
+                for benchmark in selected:
+                    print(f"{benchmark.name} ...", file=sys.stderr)
+                    results[benchmark.name] = harness.measure(benchmark, workspace, repeat=args.repeat)
+            finally:
+                workspace.close()
+        finally:
+            os.chdir(cwd)
+
+    baseline = harness.load_baseline(args.baseline)
+    tolerances = {benchmark.name: benchmark.tolerance for benchmark in selected if benchmark.tolerance is not None}
+    # measured again at the end, the load of the machine may have changed during the run
+    calibration_ms = min(calibration_ms, harness.calibrate())
+    report = {"environment": harness.environment(), "seed": args.seed, "calibration_ms": calibration_ms,
+              "benchmarks": results}
+
+    print(f"\n{'benchmark':<40}{'p50 ms':>12}{'p95 ms':>12}{'ops/s':>12}{'best ms':>12}{'baseline':>12}")
+    for name, result in results.items():
+        reference = baseline["benchmarks"].get(name, {}).get("best_ms")
+        print(f"{name:<40}{result['p50_ms']:>12.3f}{result['p95_ms']:>12.3f}{result['throughput']:>12.1f}"
+              f"{result['best_ms']:>12.3f}{'' if reference is None else f'{reference:.3f}':>12}")
+
+    if args.update_baseline:
+        baseline["environment"] = report["environment"]
+        baseline["seed"] = args.seed
+        baseline["calibration_ms"] = calibration_ms
+        baseline["benchmarks"].update(results)
+        harness.write_json(baseline, args.baseline)
+        print(f"\nBaseline updated: {args.baseline}")
+        return 0
+
+    speed_ratio = calibration_ms / baseline["calibration_ms"] if baseline.get("calibration_ms") else 1.0
+    print(f"\nCalibration {calibration_ms:.1f} ms, {speed_ratio:.2f}x the baseline machine")
+    regressions = harness.compare(results, baseline["benchmarks"], tolerances, speed_ratio)
+    report["regressions"] = regressions
+    harness.write_json(report, args.output)
+    if baseline["environment"] is not None and baseline["environment"] != report["environment"]:
+        print("\nWarning: the baseline was recorded on another environment", baseline["environment"])
+    if regressions:
+        print("\nRegressions:\n  " + "\n  ".join(regressions))
+        return 1
+    print("\nNo regression")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Synthetic workloads for the benchmarks, built on the Service Class data.
+
+The tweets, events and labels are sampled from the CSV files the Record Sender
+uses, and the audio clips are cut from its MP3 file, so the benchmarks see the
+same records as the real pipeline. Sampling is seeded: two runs with the same
+seed measure the same workload.
+"""
+import base64
+import csv
+import os
+import random
+from typing import Dict, List
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT_DIR, "service_class", "data")
+
+EVENT_TYPES = ["score", "sending-off", "caution", "substitution", "foul"]
+AUDIO_SAMPLES = 20
+CLIP_DURATION_MS = 20 * 1000
+
+
+def _read_csv(name: str) -> List[Dict[str, str]]:
+    with open(os.path.join(DATA_DIR, name), "r", encoding="utf-8", newline="") as file:
+        return list(csv.DictReader(file))
+
+
+class SyntheticData:
+    """
+    Records, raw sessions and prepared sessions of a seeded sample of the Service Class sessions.
+    """
+
+    def __init__(self, workdir: str, seed: int = 42):
+        """
+        Load the Service Class data.
+
+        :param workdir: Directory where the audio clips are written.
+        :param seed: Seed of the sampling.
+        """
+        self.workdir = workdir
+        self.seed = seed
+        self._random = random.Random(seed)
+        tweets = _read_csv("tweets.csv")
+        events = {row["uuid"]: row["events"] for row in _read_csv("events.csv")}
+        labels = {row["uuid"]: row["label"] for row in _read_csv("labels.csv")}
+        # the sessions with all their sources, in file order
+        self.sessions = [{"uuid": row["uuid"], "tweet": row["tweet"], "events": events[row["uuid"]],
+                          "label": labels[row["uuid"]]}
+                         for row in tweets if row["uuid"] in events and row["uuid"] in labels]
+        self._clips = None
+
+    def sample(self, count: int) -> List[Dict[str, str]]:
+        """Return count sessions drawn without replacement, or with it when count exceeds the data."""
+        if count <= len(self.sessions):
+            return self._random.sample(self.sessions, count)
+        return [self._random.choice(self.sessions) for _ in range(count)]
+
+    def audio_clips(self, count: int = 4) -> List[str]:
+        """
+        Cut 20 seconds clips out of the Service Class MP3 file, as the Record Sender does, and write them as WAV.
+
+        :param count: Number of distinct clips.
+        :return: The paths of the WAV files.
+        """
+        if self._clips is None:
+            # rendered like the clips of the Record Sender, decoded with librosa (no ffmpeg needed)
+            import librosa
+            from service_class.audio_clip_pool import AudioClipPool
+
+            audio, frame_rate = librosa.load(os.path.join(DATA_DIR, "audio.mp3"), sr=None, mono=False)
+            samples = (np.atleast_2d(audio).T * 32767).astype(np.int16)
+            state = random.getstate()
+            random.seed(self.seed)
+            try:
+                clips = AudioClipPool.render_clips(samples, frame_rate, 2, CLIP_DURATION_MS, count)
+            finally:
+                random.setstate(state)
+
+            os.makedirs(os.path.join(self.workdir, "audio"), exist_ok=True)
+            self._clips = []
+            for index, clip in enumerate(clips):
+                path = os.path.join(self.workdir, "audio", f"clip_{index}.wav")
+                with open(path, "wb") as file:
+                    file.write(base64.b64decode(clip))
+                self._clips.append(path)
+        return self._clips[:count]
+
+    def records(self, count: int, include_labels: bool = True, with_audio: bool = True) -> List[dict]:
+        """
+        Return the records of count sessions, grouped by session, in the format received by the Ingestion System.
+        The audio records carry the path of a clip instead of its base64 content.
+        """
+        clips = self.audio_clips() if with_audio else []
+        records = []
+        for index, session in enumerate(self.sample(count)):
+            uuid = session["uuid"]
+            records.append({"source": "tweet", "value": {"uuid": uuid, "tweet": session["tweet"]}})
+            records.append({"source": "events", "value": {"uuid": uuid, "events": session["events"]}})
+            if with_audio:
+                records.append({"source": "audio", "value": {"uuid": uuid, "file_path": clips[index % len(clips)]}})
+            if include_labels:
+                records.append({"source": "label", "value": {"uuid": uuid, "label": session["label"]}})
+        return records
+
+    def raw_sessions(self, count: int, with_audio: bool = False) -> List[dict]:
+        """Return count raw sessions, as sent by the Ingestion System to the Preparation System."""
+        clips = self.audio_clips() if with_audio else []
+        return [{"uuid": session["uuid"], "tweet": session["tweet"],
+                 "audio": clips[index % len(clips)] if with_audio else None,
+                 "events": session["events"], "label": session["label"]}
+                for index, session in enumerate(self.sample(count))]
+
+    def prepared_sessions(self, count: int) -> List[dict]:
+        """
+        Return count prepared sessions with random features, in the format of the Preparation System.
+        The features follow the distributions of the real ones: short tweets, rare words and events, dB levels.
+        """
+        from common.lexicon import load_lexicon
+
+        rng = np.random.default_rng(self.seed)
+        word_features = load_lexicon().feature_names
+        sessions = []
+        for session in self.sample(count):
+            prepared = {"uuid": session["uuid"], "label": session["label"],
+                        "tweet_length": int(rng.integers(3, 40))}
+            bullying = session["label"] == "cyberbullying"
+            for name in word_features:
+                prepared[name] = int(rng.poisson(0.4 if bullying else 0.1))
+            for event in EVENT_TYPES:
+                prepared[f"event_{event}"] = int(rng.poisson(0.8))
+            for i in range(AUDIO_SAMPLES):
+                prepared[f"audio_{i}"] = float(rng.normal(65.0 if bullying else 60.0, 8.0))
+            sessions.append(prepared)
+        return sessions
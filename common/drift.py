@@ -0,0 +1,97 @@
+"""
+Sketches of the feature distributions, compared to detect feature drift.
+
+The Development System summarizes the training features with a quantile sketch
+and the proportions of a fixed binning derived from it; both are exported with
+the classifier. The Production System bins the incoming sessions in the same
+way and compares them with the reference without storing every session:
+
+- PSI (Population Stability Index) of the running histogram against the
+  reference proportions;
+- KS (two-sample Kolmogorov-Smirnov statistic) of a reservoir sample against
+  the reference quantiles.
+"""
+from typing import Tuple
+
+import numpy as np
+
+# quantiles of the reference sketch, every 1%
+NUM_QUANTILES = 101
+# bins of the histograms: the deciles, plus one for the values above the reference maximum
+NUM_BINS = 11
+# proportion given to the empty bins, so that the PSI stays finite
+PSI_EPSILON = 1e-4
+
+
+def reference_statistics(features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Summarize the reference distribution of each feature.
+
+    :param features: The reference samples, one row per session and one column per feature.
+    :return: The quantiles (features x NUM_QUANTILES) and the bin proportions (features x NUM_BINS).
+    """
+    features = np.asarray(features, dtype=float)
+    if features.ndim != 2 or not len(features):
+        raise ValueError("The reference features must be a non empty 2D matrix")
+    quantiles = np.quantile(features, np.linspace(0.0, 1.0, NUM_QUANTILES), axis=0).T
+    proportions = np.stack([
+        np.bincount(bin_indices(quantiles[i], features[:, i]), minlength=NUM_BINS) / len(features)
+        for i in range(features.shape[1])])
+    return quantiles, proportions
+
+
+def bin_cuts(quantiles: np.ndarray) -> np.ndarray:
+    """
+    Return the upper bounds of the bins of a feature: its deciles and its maximum.
+
+    Bin i holds the values in (cut[i-1], cut[i]], the last bin the values above the maximum.
+    Discrete features have repeated cuts, whose bins are always empty.
+
+    :param quantiles: The NUM_QUANTILES quantiles of the feature.
+    """
+    return np.asarray(quantiles, dtype=float)[10::10]
+
+
+def bin_indices(quantiles: np.ndarray, values) -> np.ndarray:
+    """
+    Return the bin of each value of a feature.
+
+    :param quantiles: The NUM_QUANTILES quantiles of the feature.
+    :param values: The values, a scalar or an array.
+    """
+    return np.searchsorted(bin_cuts(quantiles), values, side="left")
+
+
+def psi(expected: np.ndarray, actual: np.ndarray) -> float:
+    """
+    Population Stability Index between two distributions over the same bins.
+    Below 0.1 the distributions are usually considered equal, above 0.25 shifted.
+
+    :param expected: The reference proportions.
+    :param actual: The observed proportions, or counts.
+    """
+    expected = np.maximum(np.asarray(expected, dtype=float), PSI_EPSILON)
+    actual = np.asarray(actual, dtype=float)
+    total = actual.sum()
+    if total <= 0:
+        return 0.0
+    actual = np.maximum(actual / total, PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def ks_statistic(quantiles: np.ndarray, sample: np.ndarray) -> float:
+    """
+    Two-sample Kolmogorov-Smirnov statistic between the reference quantiles and a sample.
+
+    :param quantiles: The NUM_QUANTILES quantiles of the feature, a sample of the reference.
+    :param sample: The observed values.
+    :return: The largest distance between the two empirical distribution functions, in [0, 1].
+    """
+    reference = np.sort(np.asarray(quantiles, dtype=float))
+    sample = np.sort(np.asarray(sample, dtype=float))
+    if not len(sample):
+        return 0.0
+    points = np.concatenate([reference, sample])
+    reference_cdf = np.searchsorted(reference, points, side="right") / len(reference)
+    sample_cdf = np.searchsorted(sample, points, side="right") / len(sample)
+    return float(np.max(np.abs(reference_cdf - sample_cdf)))
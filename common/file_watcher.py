@@ -0,0 +1,145 @@
+"""
+Change notifications for the files edited by the human operator.
+
+The orchestrators waiting for a verdict block on a FileWatcher instead of
+re-reading the file at fixed intervals. On Linux the directory of the file is
+watched with inotify, so a change is seen as soon as the file is written,
+renamed into place or removed; elsewhere, or when inotify is not available,
+the watcher falls back to comparing the file status at a polling interval.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from typing import Optional
+
+# inotify events of a file in the watched directory (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCHED_EVENTS = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# struct inotify_event: wd, mask, cookie, len, followed by the name
+_EVENT = struct.Struct("iIII")
+
+
+class FileWatcher:
+    """
+    Waits for the changes of a single file, which may not exist yet.
+    """
+
+    def __init__(self, path: str, mode: str = "auto", poll_interval: float = 1.0):
+        """
+        Start watching the file. The changes made from now on are reported by wait().
+
+        :param path: The watched file; its directory must exist for inotify to be used.
+        :param mode: "inotify", "polling", or "auto" to use inotify when available.
+        :param poll_interval: Seconds between two checks of the file status when polling.
+        """
+        if mode not in ("auto", "inotify", "polling"):
+            raise ValueError(f"Unknown watcher mode: {mode}")
+        self.path = os.path.abspath(path)
+        self.poll_interval = poll_interval
+        self._name = os.fsencode(os.path.basename(self.path))
+        self._fd = None
+        self._signature = self._stat()
+
+        if mode != "polling":
+            self._fd = _inotify_watch(os.path.dirname(self.path))
+            if self._fd is None and mode == "inotify":
+                raise OSError(f"inotify is not available for {self.path}")
+
+    @property
+    def mode(self) -> str:
+        """The mechanism in use, "inotify" or "polling"."""
+        return "inotify" if self._fd is not None else "polling"
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the file changes.
+
+        :param timeout: Maximum seconds to wait, 0 to only check, None to wait forever.
+        :return: True if the file changed since the previous call (or the creation of the watcher).
+        """
+        if self._fd is not None:
+            return self._wait_inotify(timeout)
+        return self._wait_polling(timeout)
+
+    def close(self) -> None:
+        """Stop watching the file."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _wait_inotify(self, timeout: Optional[float]) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ready, _, _ = select.select([self._fd], [], [], remaining)
+            if not ready:
+                return False
+            if self._read_events():
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def _read_events(self) -> bool:
+        # True if one of the pending events concerns the watched file
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        changed = False
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            _, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+            offset += _EVENT.size + length
+            if name == self._name and mask & WATCHED_EVENTS:
+                changed = True
+        return changed
+
+    def _wait_polling(self, timeout: Optional[float]) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            signature = self._stat()
+            if signature != self._signature:
+                self._signature = signature
+                return True
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            time.sleep(self.poll_interval if remaining is None else min(self.poll_interval, remaining))
+
+    def _stat(self):
+        # the file status compared when polling, None if the file does not exist
+        try:
+            status = os.stat(self.path)
+        except OSError:
+            return None
+        return status.st_ino, status.st_size, status.st_mtime_ns
+
+
+def _inotify_watch(directory: str) -> Optional[int]:
+    # Non blocking inotify descriptor watching a directory, None if inotify is not available
+    if not sys.platform.startswith("linux") or not os.path.isdir(directory):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(directory), WATCHED_EVENTS) < 0:
+        os.close(fd)
+        return None
+    return fd
@@ -0,0 +1,182 @@
+"""
+Configurable bag-of-words vocabulary.
+
+The words counted by the Preparation System are read from a vocabulary file
+shared by the subsystems, so that the prepared session schema, the segregation
+database columns and the coverage report follow the same vocabulary.
+Each term of the vocabulary is either:
+
+- a word, counted when a token is equal to it ("gay");
+- a stem ending with "*", counted when a token starts with it ("bulli*");
+- a phrase of words, counted when consecutive tokens are equal to them ("kill yourself").
+
+The words and phrases are matched with an Aho-Corasick automaton over the tokens
+and the stems with a character trie, so the cost per tweet depends on the number
+and the length of its tokens, not on the size of the vocabulary.
+
+The counts stay sparse from the prepared session to the segregation database:
+a "word_<term>" feature is only present when the term was found, and an absent
+one counts 0. They are made dense, one column per term, only when a feature
+matrix is built: the learning sets and the input of the classifier.
+"""
+import json
+import os
+import re
+from collections import deque
+from typing import Dict, Iterable, List
+
+DEFAULT_VOCABULARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bow_vocabulary.json")
+FEATURE_PREFIX = "word_"
+STEM_SUFFIX = "*"
+
+# the feature names are also column names in the segregation database
+_FEATURE_NAME = re.compile(r"\w+")
+
+
+def feature_name(term: str) -> str:
+    """
+    Return the name of the feature counting a term, e.g. "word_kill_yourself".
+
+    :param term: The term, a word, a stem or a phrase.
+    :return: The feature name.
+    """
+    return FEATURE_PREFIX + "_".join(term.rstrip(STEM_SUFFIX).split())
+
+
+class Lexicon:
+    """
+    Counts the occurrences of the vocabulary terms in lists of tokens.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        """
+        Build the matchers of the terms.
+
+        :param terms: The terms, in the order of the features.
+        :raises ValueError: If a term is empty or two terms have the same feature name.
+        """
+        self.terms = []
+        self.feature_names = []
+        # Aho-Corasick automaton over the tokens: goto transitions, failure links and outputs of each state
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        # character trie of the stems: children and feature of each node
+        self._stems = {}
+
+        seen = set()
+        for term in terms:
+            name = feature_name(term)
+            words = term.rstrip(STEM_SUFFIX).split()
+            # a stem is a single word
+            if not words or (term.endswith(STEM_SUFFIX) and len(words) > 1) or not _FEATURE_NAME.fullmatch(name):
+                raise ValueError(f"Invalid vocabulary term: {term!r}")
+            if name in seen:
+                raise ValueError(f"Duplicate vocabulary feature: {name}")
+            seen.add(name)
+            self.terms.append(term)
+            self.feature_names.append(name)
+
+            if term.endswith(STEM_SUFFIX):
+                node = self._stems
+                for char in words[0]:
+                    node = node.setdefault(char, {})
+                node.setdefault(None, []).append(name)
+            else:
+                state = 0
+                for word in words:
+                    if word not in self._goto[state]:
+                        self._goto.append({})
+                        self._fail.append(0)
+                        self._output.append([])
+                        self._goto[state][word] = len(self._goto) - 1
+                    state = self._goto[state][word]
+                self._output[state].append(name)
+
+        self._build_failure_links()
+
+    def count(self, tokens: List[str]) -> Dict[str, int]:
+        """
+        Count the terms found in a list of tokens.
+
+        :param tokens: The clean tokens of a tweet.
+        :return: The sparse counts, only the features found at least once.
+        """
+        counts = {}
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for token in tokens:
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for name in output[state]:
+                counts[name] = counts.get(name, 0) + 1
+
+            if self._stems:
+                node = self._stems
+                for char in token:
+                    node = node.get(char)
+                    if node is None:
+                        break
+                    for name in node.get(None, ()):
+                        counts[name] = counts.get(name, 0) + 1
+        return counts
+
+    def dense(self, tokens: List[str]) -> Dict[str, int]:
+        """
+        Count every term in a list of tokens, for a feature matrix; O(vocabulary) per call.
+
+        :param tokens: The clean tokens of a tweet.
+        :return: The count of each feature, 0 if absent, in vocabulary order.
+        """
+        features = dict.fromkeys(self.feature_names, 0)
+        features.update(self.count(tokens))
+        return features
+
+    def extend_schema(self, schema: dict) -> dict:
+        """
+        Add the vocabulary features to a prepared session JSON schema.
+
+        :param schema: The schema without the "word_" properties.
+        :return: A copy of the schema allowing a non negative integer for each feature, absent when 0.
+        """
+        schema = dict(schema)
+        properties = {key: value for key, value in schema.get("properties", {}).items()
+                      if not key.startswith(FEATURE_PREFIX)}
+        required = [key for key in schema.get("required", []) if not key.startswith(FEATURE_PREFIX)]
+        for name in self.feature_names:
+            properties[name] = {"type": "integer", "minimum": 0}
+        schema["properties"] = properties
+        schema["required"] = required
+        return schema
+
+    def _build_failure_links(self):
+        # breadth first: the failure of a state is the longest proper suffix of its phrase that is a prefix
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for word, child in self._goto[state].items():
+                pending.append(child)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(word, 0)
+                # a phrase ending here also ends every suffix phrase
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+
+_lexicons = {}
+
+
+def load_lexicon(path: str = None) -> Lexicon:
+    """
+    Load a vocabulary file, once per path.
+
+    :param path: The JSON file, with the list of "terms". The shared vocabulary if None.
+    :return: The lexicon of the vocabulary.
+    """
+    path = os.path.abspath(path or DEFAULT_VOCABULARY_PATH)
+    if path not in _lexicons:
+        with open(path, "r", encoding="utf-8") as file:
+            _lexicons[path] = Lexicon(json.load(file)["terms"])
+    return _lexicons[path]
@@ -0,0 +1,225 @@
+"""
+Structured, asynchronous logging shared by the subsystems.
+
+Each module logs through the standard library, on a logger named after it
+(logging.getLogger(__name__)); configure_logging() installs, once per process,
+a single handler on the root logger that only puts the records on a bounded
+queue. A QueueListener thread formats them, as JSON lines or as text, and
+writes them to stdout: a slow or blocked pipe stalls the listener, never the
+loop that logged, and the records that do not fit in the queue are dropped and
+counted instead of blocking.
+
+Messages are rate limited per call site: beyond a number of records of the
+same logging call in an interval, the records are suppressed until the
+interval ends, and the next one carries the number of suppressed records.
+Errors are never rate limited.
+
+The "logging" section of a subsystem configuration sets its level, the output
+format, the rate limit and whether the Werkzeug access log is kept. In
+pipeline mode the subsystems share the process handler: the first
+configuration sets the format, the rate limit and the queue size, each
+subsystem keeps its own level.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+DEFAULT_LEVEL = "INFO"
+DEFAULT_FORMAT = "json"
+# records of the same call site allowed per interval, then suppressed until the interval ends
+DEFAULT_RATE_LIMIT = {"messages": 10, "interval": 1.0}
+# records waiting to be written, the next ones are dropped when full
+DEFAULT_QUEUE_SIZE = 10000
+# call sites tracked by the rate limiter, their windows are forgotten beyond it
+MAX_RATE_LIMITED_SITES = 10000
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+# the attributes of every record, the others are the extra fields of the call
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", logging.INFO, "", 0, "", None, None))) | {"message", "asctime"}
+
+_lock = threading.Lock()
+_handler: Optional["AsyncQueueHandler"] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class StdoutHandler(logging.StreamHandler):
+    """Writes to the current sys.stdout, which may be replaced after the handler is created."""
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the extra fields of the call."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The records as text lines, with the number of records suppressed or dropped before them."""
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        for key in ("suppressed", "dropped"):
+            if getattr(record, key, 0):
+                text += f" [{getattr(record, key)} {key}]"
+        return text
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most a number of records of each call site per interval.
+    The first record of the next interval gets a "suppressed" attribute with the number of dropped ones.
+    """
+
+    def __init__(self, messages: int, interval: float):
+        """
+        :param messages: Records of the same call site allowed in an interval.
+        :param interval: Length of an interval, in seconds.
+        """
+        super().__init__()
+        self.messages = messages
+        self.interval = interval
+        # call site -> [start of its interval, records in it, records suppressed]
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                if window is None and len(self._windows) >= MAX_RATE_LIMITED_SITES:
+                    self._windows.clear()
+                suppressed = window[2] if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            window[1] += 1
+            if window[1] > self.messages:
+                window[2] += 1
+                return False
+            return True
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts the records on a bounded queue without ever waiting: the ones that do not fit are counted and dropped.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._exception_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the message is built here, the arguments may change once the call returns; the rest is left to the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        if self.dropped:
+            record.dropped, self.dropped = self.dropped, 0
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # the count carried by the record is not lost with it
+            self.dropped += 1 + getattr(record, "dropped", 0)
+
+
+def configure_logging(system: str, configuration: Optional[dict] = None) -> logging.Logger:
+    """
+    Send the records of a subsystem to the shared asynchronous handler, started on the first call.
+
+    :param system: Top-level package of the subsystem, the parent logger of its modules.
+    :param configuration: The "logging" section of the subsystem configuration, the defaults if None.
+    :return: The logger of the subsystem.
+    :raises ValueError: If the level or the format is unknown.
+    """
+    global _handler, _listener
+    configuration = configuration if isinstance(configuration, dict) else {}
+    level = logging.getLevelName(str(configuration.get("level", DEFAULT_LEVEL)).upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown logging level: {configuration.get('level')}")
+    output = configuration.get("format", DEFAULT_FORMAT)
+    if output not in ("json", "text"):
+        raise ValueError(f"Unknown logging format: {output}")
+
+    with _lock:
+        if _handler is None:
+            log_queue = queue.Queue(int(configuration.get("queue_size", DEFAULT_QUEUE_SIZE)))
+            _handler = AsyncQueueHandler(log_queue)
+            rate_limit = configuration.get("rate_limit", DEFAULT_RATE_LIMIT)
+            if rate_limit:
+                _handler.addFilter(RateLimitFilter(int(rate_limit.get("messages", DEFAULT_RATE_LIMIT["messages"])),
+                                                   float(rate_limit.get("interval", DEFAULT_RATE_LIMIT["interval"]))))
+            stream = StdoutHandler()
+            stream.setFormatter(JsonFormatter() if output == "json" else TextFormatter())
+            _listener = logging.handlers.QueueListener(log_queue, stream)
+            _listener.start()
+            logging.getLogger().addHandler(_handler)
+            # the shared modules log at the level of the first subsystem of the process
+            logging.getLogger("common").setLevel(level)
+            atexit.register(shutdown_logging)
+
+    logger = logging.getLogger(system)
+    logger.setLevel(level)
+    # the orchestrator module, when run as a script
+    logging.getLogger("__main__").setLevel(level)
+    # one line per HTTP request: off unless asked for
+    logging.getLogger("werkzeug").setLevel(logging.INFO if configuration.get("access_log", False) else logging.WARNING)
+    return logger
+
+
+def shutdown_logging() -> None:
+    """Write the queued records and stop the listener; the next configure_logging() starts a new one."""
+    global _handler, _listener
+    with _lock:
+        if _handler is None:
+            return
+        logging.getLogger().removeHandler(_handler)
+        _listener.stop()
+        _handler, _listener = None, None
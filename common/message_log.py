@@ -0,0 +1,335 @@
+"""
+Durable inbound message log.
+
+Every message accepted by a receiving channel is appended to a segmented,
+append-only log on disk before it is queued, and the consumer offsets are
+checkpointed periodically. After a restart the channel queues again the
+messages after the last checkpoint, so the queued and partially processed
+work survives a crash without the Service Class sending everything again.
+Delivery is at-least-once: the messages processed after the last checkpoint
+are processed a second time.
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from common.metrics import MeteredQueue, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# length and crc32 of the payload, before each message
+HEADER = struct.Struct(">II")
+SEGMENT_SUFFIX = ".log"
+CHECKPOINT_FILE = "checkpoints.json"
+
+
+class MessageLog:
+    """
+    Append-only log split in segments of bounded size.
+
+    Each segment is named after the offset of its first message and holds
+    length-prefixed, checksummed JSON messages, so that it can be read with mmap
+    and a torn write at the end is detected and truncated on recovery. Segments
+    entirely before every checkpointed offset are deleted.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 16 * 1024 * 1024, checkpoint_interval: float = 1.0,
+                 fsync: bool = False):
+        """
+        Open the log, recovering the last segment.
+
+        :param directory: Directory of the segments and of the checkpoints.
+        :param segment_bytes: Size after which a new segment is started.
+        :param checkpoint_interval: Minimum seconds between two checkpoints, 0 to checkpoint every commit.
+        :param fsync: If True every append is forced to disk, surviving a crash of the host and not only of the process.
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.checkpoint_interval = checkpoint_interval
+        self.fsync = fsync
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._segments = sorted(int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(directory)
+                                if name.endswith(SEGMENT_SUFFIX))
+        if not self._segments:
+            self._segments = [0]
+
+        # the last segment may end with a torn write
+        count, valid_bytes = self._scan(self._segment_path(self._segments[-1]))
+        self._next_offset = self._segments[-1] + count
+        self._active = open(self._segment_path(self._segments[-1]), "ab")
+        self._active.truncate(valid_bytes)
+        self._active_bytes = valid_bytes
+
+        self._committed = self._load_checkpoints()
+        self._last_checkpoint = time.monotonic()
+
+    @property
+    def next_offset(self) -> int:
+        return self._next_offset
+
+    def append(self, message) -> int:
+        """
+        Append a message.
+
+        :param message: A JSON serializable message.
+        :return: The offset of the message.
+        """
+        payload = json.dumps(message).encode("utf-8")
+        with self._lock:
+            if self._active_bytes > 0 and self._active_bytes + HEADER.size + len(payload) > self.segment_bytes:
+                self._roll()
+            self._active.write(HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+            self._active.flush()
+            if self.fsync:
+                os.fsync(self._active.fileno())
+            self._active_bytes += HEADER.size + len(payload)
+            offset = self._next_offset
+            self._next_offset += 1
+        return offset
+
+    def read(self, start: int = 0):
+        """
+        Iterate over the messages from an offset to the current end of the log.
+
+        :param start: The offset of the first message.
+        :return: An iterator of (offset, message) tuples.
+        """
+        with self._lock:
+            segments = list(self._segments)
+            end = self._next_offset
+
+        for index, base in enumerate(segments):
+            next_base = segments[index + 1] if index + 1 < len(segments) else end
+            if next_base <= start:
+                continue
+            offset = base
+            for payload in self._payloads(self._segment_path(base)):
+                if offset >= end:
+                    return
+                if offset >= start:
+                    yield offset, json.loads(payload)
+                offset += 1
+
+    def committed(self, consumer: str) -> int:
+        """
+        Return the offset from which a consumer resumes.
+
+        :param consumer: The name of the consumer.
+        :return: The offset of the first message not yet committed.
+        """
+        with self._lock:
+            return self._committed.get(consumer, self._segments[0])
+
+    def commit(self, consumer: str, offset: int):
+        """
+        Mark a message and all the previous ones as processed by a consumer.
+        The offsets are written to disk at most every checkpoint_interval seconds.
+
+        :param consumer: The name of the consumer.
+        :param offset: The offset of the last processed message.
+        """
+        with self._lock:
+            self._committed[consumer] = max(self._committed.get(consumer, 0), offset + 1)
+            due = time.monotonic() - self._last_checkpoint >= self.checkpoint_interval
+        if due:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """
+        Write the committed offsets to disk and delete the segments no longer needed.
+        """
+        with self._lock:
+            committed = dict(self._committed)
+            self._last_checkpoint = time.monotonic()
+            path = os.path.join(self.directory, CHECKPOINT_FILE)
+            with open(path + ".tmp", "w") as file:
+                json.dump(committed, file)
+            os.replace(path + ".tmp", path)
+
+            if committed:
+                low_watermark = min(committed.values())
+                # a segment can go when the next one starts before every consumer position
+                while len(self._segments) > 1 and self._segments[1] <= low_watermark:
+                    os.remove(self._segment_path(self._segments.pop(0)))
+
+    def close(self):
+        """
+        Checkpoint the offsets and close the active segment.
+        """
+        self.checkpoint()
+        with self._lock:
+            self._active.close()
+
+    def _roll(self):
+        self._active.close()
+        self._segments.append(self._next_offset)
+        self._active = open(self._segment_path(self._next_offset), "ab")
+        self._active_bytes = 0
+
+    def _segment_path(self, base: int) -> str:
+        return os.path.join(self.directory, f"{base:020d}{SEGMENT_SUFFIX}")
+
+    def _load_checkpoints(self) -> dict:
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, "r") as file:
+                return {consumer: int(offset) for consumer, offset in json.load(file).items()}
+        except (OSError, ValueError, AttributeError) as e:
+            # without checkpoints every message still in the log is delivered again
+            logger.warning("Unreadable message log checkpoints, replaying the whole log: %s", e)
+            return {}
+
+    @staticmethod
+    def _payloads(path: str):
+        # yields the payloads of the valid messages of a segment, stopping at the first torn one
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+        with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position = 0
+            while position + HEADER.size <= len(data):
+                length, checksum = HEADER.unpack_from(data, position)
+                start = position + HEADER.size
+                payload = data[start:start + length]
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    return
+                yield payload
+                position = start + length
+
+    @classmethod
+    def _scan(cls, path: str) -> tuple:
+        # number of valid messages and size of the valid prefix of a segment
+        count, size = 0, 0
+        for payload in cls._payloads(path):
+            count += 1
+            size += HEADER.size + len(payload)
+        return count, size
+
+
+class DurableQueue(MeteredQueue):
+    """
+    MeteredQueue whose items are written to a MessageLog before being queued.
+
+    On creation the messages not yet committed are queued again. A message is
+    committed when the consumer asks for the next one, i.e. after the sequential
+    consumer loop has completely processed it. With manual_ack the consumer hands
+    the messages to parallel workers instead, and acknowledges each offset when
+    processed: the log is committed up to the first message not acknowledged yet.
+    """
+
+    def __init__(self, metrics: MetricsRegistry, name: str, maxsize: int, log: MessageLog, consumer: str = None):
+        """
+        Initialize the queue and restore the uncommitted messages.
+
+        :param metrics: The registry of the subsystem.
+        :param name: The value of the "queue" label of the metrics.
+        :param maxsize: Maximum number of items, 0 for unbounded.
+        :param log: The message log of the channel.
+        :param consumer: Name of the consumer in the checkpoints, the queue name by default.
+        """
+        super().__init__(metrics, name, maxsize)
+        self.log = log
+        self.consumer = consumer or name
+        self._delivered = None
+        self._offer_lock = threading.Lock()
+        self.manual_ack = False
+        # offset of the last returned item
+        self.last_offset = None
+        # delivered offsets, in delivery order, and whether they are acknowledged
+        self._pending = OrderedDict()
+        self._ack_lock = threading.Lock()
+        self._replayed = metrics.counter("queue_replayed_total", queue=name)
+
+        for offset, item in log.read(log.committed(self.consumer)):
+            # restored items may exceed maxsize: they were accepted before the restart
+            with self.mutex:
+                self._put((offset, item))
+                self.unfinished_tasks += 1
+                self.not_empty.notify()
+            self._replayed.inc()
+
+    def offer(self, item) -> bool:
+        """
+        Log and put an item without waiting.
+
+        :param item: The JSON serializable item.
+        :return: False if the queue is full, the item is neither logged nor put.
+        """
+        # the only producers are the offers, so a queue not full here stays not full until the put
+        with self._offer_lock:
+            if self.full():
+                self._rejected.inc()
+                return False
+            self.put_nowait((self.log.append(item), item))
+        return True
+
+    def get(self, block: bool = True, timeout: float = None):
+        """
+        Commit the previously returned item, unless acknowledged manually, and return the next one.
+        """
+        if not self.manual_ack:
+            self.commit()
+        offset, item = super().get(block, timeout)
+        self.last_offset = offset
+        if self.manual_ack:
+            with self._ack_lock:
+                self._pending[offset] = False
+        else:
+            self._delivered = offset
+        return item
+
+    def ack(self, offset: int):
+        """
+        Acknowledge a returned item as processed, in any order (manual_ack only).
+
+        :param offset: The offset of the item, last_offset after its get.
+        """
+        committed = None
+        with self._ack_lock:
+            if offset in self._pending:
+                self._pending[offset] = True
+            # the items are returned in offset order, so the acknowledged prefix can be committed
+            while self._pending and next(iter(self._pending.values())):
+                committed, _ = self._pending.popitem(last=False)
+        if committed is not None:
+            self.log.commit(self.consumer, committed)
+
+    def commit(self):
+        """
+        Commit the last returned item, if not committed yet.
+        """
+        if self._delivered is not None:
+            self.log.commit(self.consumer, self._delivered)
+            self._delivered = None
+
+
+def open_channel_queue(metrics: MetricsRegistry, name: str, maxsize: int = 0, configuration: dict = None,
+                       basedir: str = ".") -> MeteredQueue:
+    """
+    Build the queue of a receiving channel, durable if the "message_log" configuration enables it.
+
+    :param metrics: The registry of the subsystem.
+    :param name: The name of the queue, used for the metrics and the checkpoints.
+    :param maxsize: Maximum number of items, 0 for unbounded.
+    :param configuration: The "message_log" section, with "enabled", "directory", "segment_bytes",
+        "checkpoint_interval" and "fsync".
+    :param basedir: Directory against which a relative log directory is resolved.
+    :return: A DurableQueue, or a MeteredQueue if the log is disabled.
+    """
+    if not isinstance(configuration, dict) or not configuration.get("enabled", False):
+        return MeteredQueue(metrics, name, maxsize)
+
+    log = MessageLog(os.path.join(basedir, configuration.get("directory", "data/message_log"), name),
+                     segment_bytes=configuration.get("segment_bytes", 16 * 1024 * 1024),
+                     checkpoint_interval=configuration.get("checkpoint_interval", 1.0),
+                     fsync=configuration.get("fsync", False))
+    return DurableQueue(metrics, name, maxsize, log)
@@ -0,0 +1,281 @@
+"""
+Runtime metrics of the subsystems.
+
+Each subsystem keeps a MetricsRegistry with counters, gauges and latency
+histograms, and exposes it on the /metrics route of its Flask app: queue depth,
+enqueue/dequeue rates, validation and send failures, per-stage processing time.
+The route answers in the Prometheus text format, or in JSON with ?format=json.
+"""
+import math
+import queue
+import threading
+import time
+
+# seconds of history kept by the counters to compute their rate
+RATE_WINDOW = 60
+
+
+class Counter:
+    """
+    Monotonic counter, with the rate over the last seconds.
+    """
+
+    def __init__(self):
+        self.value = 0
+        # one slot per second, overwritten after RATE_WINDOW seconds
+        self._slots = [0] * RATE_WINDOW
+        self._slot_seconds = [-1] * RATE_WINDOW
+        self._created = time.monotonic()
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        """
+        Increment the counter.
+
+        :param amount: The increment.
+        """
+        second = int(time.monotonic())
+        slot = second % RATE_WINDOW
+        with self._lock:
+            if self._slot_seconds[slot] != second:
+                self._slot_seconds[slot] = second
+                self._slots[slot] = 0
+            self._slots[slot] += amount
+            self.value += amount
+
+    def rate(self, window: int = 10) -> float:
+        """
+        Return the average increments per second over the last complete seconds.
+
+        :param window: Number of seconds considered, at most RATE_WINDOW - 1.
+        :return: The rate per second.
+        """
+        now = time.monotonic()
+        second = int(now)
+        # a younger counter is averaged over its lifetime, not over the whole window
+        window = max(1, min(window, RATE_WINDOW - 1, int(now - self._created)))
+        with self._lock:
+            total = sum(count for count, slot_second in zip(self._slots, self._slot_seconds)
+                        if second - window <= slot_second < second)
+        return total / window
+
+
+class Gauge:
+    """
+    Value that can go up and down, set explicitly or read from a function.
+    """
+
+    def __init__(self, function=None):
+        self._value = 0.0
+        self._function = function
+
+    def set(self, value: float):
+        self._value = value
+
+    @property
+    def value(self) -> float:
+        return self._function() if self._function is not None else self._value
+
+
+class Histogram:
+    """
+    HDR-style latency histogram.
+
+    Values are recorded in microseconds into log-linear buckets: each power of two
+    is split into 2^(SIGNIFICANT_BITS - 1) buckets, so any percentile is reported
+    with a relative error below 1% while the memory stays bounded.
+    """
+
+    SIGNIFICANT_BITS = 7
+    UNIT = 1e-6
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        """
+        Record a duration.
+
+        :param seconds: The duration in seconds.
+        """
+        index = self._bucket_index(max(0, int(seconds / self.UNIT)))
+        with self._lock:
+            self._buckets[index] = self._buckets.get(index, 0) + 1
+            self.count += 1
+            self.sum += seconds
+            self.max = max(self.max, seconds)
+
+    def percentile(self, percentile: float) -> float:
+        """
+        Return a percentile of the recorded durations.
+
+        :param percentile: The percentile, between 0 and 100.
+        :return: The duration in seconds, 0 if nothing was recorded.
+        """
+        with self._lock:
+            if self.count == 0:
+                return 0.0
+            buckets = sorted(self._buckets.items())
+            rank = max(1, math.ceil(self.count * percentile / 100))
+
+        seen = 0
+        for index, count in buckets:
+            seen += count
+            if seen >= rank:
+                return min(self._bucket_value(index) * self.UNIT, self.max)
+        return self.max
+
+    @classmethod
+    def _bucket_index(cls, value: int) -> int:
+        half = 1 << (cls.SIGNIFICANT_BITS - 1)
+        if value < 2 * half:
+            return value
+        shift = value.bit_length() - cls.SIGNIFICANT_BITS
+        return (shift + 1) * half + (value >> shift) - half
+
+    @classmethod
+    def _bucket_value(cls, index: int) -> float:
+        # middle of the bucket
+        half = 1 << (cls.SIGNIFICANT_BITS - 1)
+        if index < 2 * half:
+            return index
+        shift = index // half - 1
+        mantissa = index - shift * half
+        return (mantissa << shift) + ((1 << shift) - 1) / 2
+
+
+class MetricsRegistry:
+    """
+    Named metrics of a subsystem, with optional labels.
+    """
+
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, **labels) -> Counter:
+        return self._get_or_create(name, labels, Counter)
+
+    def gauge(self, name: str, function=None, **labels) -> Gauge:
+        return self._get_or_create(name, labels, lambda: Gauge(function))
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        return self._get_or_create(name, labels, Histogram)
+
+    def snapshot(self) -> dict:
+        """
+        Return the current value of every metric.
+
+        :return: A dictionary "name{labels}" -> values, with rates and percentiles.
+        """
+        snapshot = {}
+        for (name, labels), metric in self._items():
+            if isinstance(metric, Counter):
+                values = {"value": metric.value, "rate": metric.rate()}
+            elif isinstance(metric, Gauge):
+                values = {"value": metric.value}
+            else:
+                values = {"count": metric.count, "sum": metric.sum, "max": metric.max}
+                values.update({f"p{percentile}": metric.percentile(percentile) for percentile in self.PERCENTILES})
+            snapshot[self._series(name, labels)] = values
+        return snapshot
+
+    def render_text(self) -> str:
+        """
+        Render the metrics in the Prometheus text format.
+        Histograms are exported as summaries, with their percentiles as quantiles.
+        """
+        lines = []
+        for (name, labels), metric in self._items():
+            if isinstance(metric, (Counter, Gauge)):
+                lines.append(f"{self._series(name, labels)} {metric.value}")
+            else:
+                for percentile in self.PERCENTILES:
+                    quantile = labels + (("quantile", str(percentile / 100)),)
+                    lines.append(f"{self._series(name, quantile)} {metric.percentile(percentile)}")
+                lines.append(f"{self._series(name + '_count', labels)} {metric.count}")
+                lines.append(f"{self._series(name + '_sum', labels)} {metric.sum}")
+        return "\n".join(lines) + "\n"
+
+    def mount(self, app):
+        """
+        Expose the metrics on the /metrics route of a Flask app.
+
+        :param app: The Flask app of the subsystem.
+        """
+        from flask import Response, jsonify, request
+
+        def metrics():
+            if request.args.get("format") == "json":
+                return jsonify(self.snapshot()), 200
+            return Response(self.render_text(), mimetype="text/plain; version=0.0.4")
+
+        app.add_url_rule("/metrics", "metrics", metrics, methods=["GET"])
+
+    def _get_or_create(self, name: str, labels: dict, factory):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = factory()
+        return metric
+
+    def _items(self) -> list:
+        with self._lock:
+            return sorted(self._metrics.items(), key=lambda item: item[0])
+
+    @staticmethod
+    def _series(name: str, labels: tuple) -> str:
+        if not labels:
+            return name
+        return name + "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class MeteredQueue(queue.Queue):
+    """
+    queue.Queue reporting its depth and its enqueue/dequeue/reject counters to a registry.
+    """
+
+    def __init__(self, metrics: MetricsRegistry, name: str = "messages", maxsize: int = 0):
+        """
+        Initialize the queue.
+
+        :param metrics: The registry of the subsystem.
+        :param name: The value of the "queue" label of the metrics.
+        :param maxsize: Maximum number of items, 0 for unbounded.
+        """
+        super().__init__(maxsize)
+        self._enqueued = metrics.counter("queue_enqueued_total", queue=name)
+        self._dequeued = metrics.counter("queue_dequeued_total", queue=name)
+        self._rejected = metrics.counter("queue_rejected_total", queue=name)
+        metrics.gauge("queue_depth", self.qsize, queue=name)
+        metrics.gauge("queue_capacity", queue=name).set(maxsize)
+
+    def offer(self, item) -> bool:
+        """
+        Put an item without waiting.
+
+        :param item: The item to put.
+        :return: False if the queue is full, the item is not put and the rejection is counted.
+        """
+        try:
+            self.put_nowait(item)
+            return True
+        except queue.Full:
+            self._rejected.inc()
+            return False
+
+    def _put(self, item):
+        super()._put(item)
+        self._enqueued.inc()
+
+    def _get(self):
+        item = super()._get()
+        self._dequeued.inc()
+        return item
@@ -0,0 +1,285 @@
+"""
+On-demand profiling of the main loop of a subsystem.
+
+Each orchestrator calls LoopProfiler.tick() once per iteration of its main
+loop. Nothing is profiled until a session is requested, either by enabling the
+"profiling" section of the subsystem configuration (the file is watched, no
+restart needed) or with a POST on the /profile route of the subsystem's Flask
+app; the session starts at the next iteration and lasts for a number of
+iterations or seconds, whichever comes first.
+
+Two profilers are available:
+
+- "cprofile": deterministic, every call of the loop thread; the stats are
+  written as a .pstats file (for pstats, snakeviz, gprof2dot) with a .txt
+  summary sorted by cumulative time. It stops at the first iteration after
+  the limit.
+- "sampling": a background thread samples the stack of the loop thread at a
+  fixed interval, with almost no overhead on the loop; the stacks are written
+  in the collapsed format of flamegraph.pl and speedscope (.folded). It stops
+  when the limit is reached even if the loop is blocked.
+
+The files are written in the data/profiles folder of the subsystem.
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+from common.file_watcher import FileWatcher
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENDPOINT = "profile"
+MODES = ("cprofile", "sampling")
+# seconds between two checks of the configuration file
+CONFIG_CHECK_INTERVAL = 1.0
+# length of a session without limits, in seconds
+DEFAULT_SECONDS = 30.0
+# number of output files listed by the status
+MAX_LISTED_OUTPUTS = 10
+
+
+@dataclass
+class ProfileSettings:
+    """What to profile and for how long."""
+
+    mode: str = "cprofile"
+    # the session ends after this many iterations or seconds, whichever comes first
+    iterations: Optional[int] = None
+    seconds: Optional[float] = None
+    # seconds between two samples of the sampling profiler
+    interval: float = 0.005
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProfileSettings":
+        """
+        Read the settings of a request or of the "profiling" configuration.
+
+        :raises ValueError: If a setting is invalid.
+        """
+        if not isinstance(data, dict):
+            raise ValueError("The profiling settings must be an object")
+        settings = cls(mode=data.get("mode", "cprofile"), iterations=data.get("iterations"),
+                       seconds=data.get("seconds"), interval=data.get("interval", 0.005))
+        if settings.mode not in MODES:
+            raise ValueError(f"Unknown profiling mode: {settings.mode}")
+        if settings.iterations is not None and (not isinstance(settings.iterations, int) or settings.iterations < 1):
+            raise ValueError("iterations must be a positive integer")
+        for name in ("seconds", "interval"):
+            value = getattr(settings, name)
+            if value is not None and (not isinstance(value, (int, float)) or value <= 0):
+                raise ValueError(f"{name} must be a positive number")
+        if settings.iterations is None and settings.seconds is None:
+            settings.seconds = DEFAULT_SECONDS
+        return settings
+
+
+class _Session:
+    """A running profile of the loop thread."""
+
+    def __init__(self, settings: ProfileSettings, thread_id: int):
+        self.settings = settings
+        self.thread_id = thread_id
+        self.iterations = 0
+        self.started = time.monotonic()
+        self.deadline = None if settings.seconds is None else self.started + settings.seconds
+        self.profile = None
+        self.stacks = Counter()
+        self.stop_sampling = threading.Event()
+        self.sampler = None
+
+    def expired(self, now: float) -> bool:
+        if self.settings.iterations is not None and self.iterations >= self.settings.iterations:
+            return True
+        return self.deadline is not None and now >= self.deadline
+
+
+class LoopProfiler:
+    """
+    Profiles the main loop of a subsystem when asked to, from its configuration or over HTTP.
+    """
+
+    def __init__(self, system: str, output_dir: str, configuration_path: Optional[str] = None):
+        """
+        :param system: Name of the subsystem, in the names of the output files.
+        :param output_dir: Folder of the output files, created when the first session ends.
+        :param configuration_path: JSON configuration of the subsystem, whose "profiling" section is applied
+                                   at startup and whenever the file changes. None to only accept HTTP requests.
+        """
+        self.system = system
+        self.output_dir = output_dir
+        self.configuration_path = configuration_path
+        self.outputs: List[str] = []
+        self._pending: Optional[ProfileSettings] = None
+        self._session: Optional[_Session] = None
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._watcher = None
+        if configuration_path is not None:
+            self._watcher = FileWatcher(configuration_path)
+            self._apply_configuration()
+
+    @property
+    def active(self) -> bool:
+        return self._session is not None
+
+    def request(self, settings: ProfileSettings) -> bool:
+        """
+        Profile the loop from its next iteration.
+
+        :return: False if a session is already running or scheduled.
+        """
+        with self._lock:
+            if self._session is not None or self._pending is not None:
+                return False
+            self._pending = settings
+            return True
+
+    def tick(self) -> None:
+        """Mark an iteration of the main loop: starts, counts and ends the sessions."""
+        now = time.monotonic()
+        if self._watcher is not None and now >= self._next_check:
+            self._next_check = now + CONFIG_CHECK_INTERVAL
+            if self._watcher.wait(0):
+                self._apply_configuration()
+
+        session = self._session
+        if session is not None:
+            # the other threads of the subsystem are not the profiled loop
+            if session.thread_id == threading.get_ident():
+                session.iterations += 1
+                if session.expired(now):
+                    self._finish(session)
+            return
+
+        if self._pending is not None:
+            with self._lock:
+                settings, self._pending = self._pending, None
+                if settings is not None:
+                    self._session = self._start(settings)
+
+    def status(self) -> dict:
+        """The current or scheduled session and the last files written."""
+        session = self._session
+        status = {"system": self.system, "active": session is not None, "scheduled": self._pending is not None,
+                  "outputs": self.outputs[-MAX_LISTED_OUTPUTS:]}
+        if session is not None:
+            status.update(settings=asdict(session.settings), iterations=session.iterations,
+                          elapsed=round(time.monotonic() - session.started, 3))
+        return status
+
+    def mount(self, app) -> None:
+        """
+        Expose the profiler on the /profile route of a Flask app.
+        GET returns the status, POST schedules a session with the settings of the JSON body.
+
+        :param app: The Flask app of the subsystem.
+        """
+        from flask import jsonify, request
+
+        def profile():
+            if request.method == "GET":
+                return jsonify(self.status()), 200
+            try:
+                settings = ProfileSettings.from_dict(request.get_json(silent=True) or {})
+            except ValueError as exc:
+                return jsonify({"error": str(exc)}), 400
+            if not self.request(settings):
+                return jsonify({"error": "A profiling session is already running", **self.status()}), 409
+            return jsonify({"status": "scheduled", "settings": asdict(settings)}), 202
+
+        app.add_url_rule(f"/{PROFILE_ENDPOINT}", PROFILE_ENDPOINT, profile, methods=["GET", "POST"])
+
+    def close(self) -> None:
+        """Stop watching the configuration file."""
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
+
+    def _apply_configuration(self) -> None:
+        try:
+            with open(self.configuration_path, "r", encoding="utf-8") as file:
+                configuration = json.load(file).get("profiling")
+            if not isinstance(configuration, dict) or not configuration.get("enabled", False):
+                return
+            settings = ProfileSettings.from_dict(configuration)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, AttributeError) as exc:
+            # a file being edited may not be valid JSON yet, it is read again at its next change
+            logger.warning("[%s] profiling configuration not applied: %s", self.system, exc)
+            return
+        if self.request(settings):
+            logger.info("[%s] profiling scheduled from the configuration: %s", self.system, asdict(settings))
+
+    def _start(self, settings: ProfileSettings) -> _Session:
+        session = _Session(settings, threading.get_ident())
+        if settings.mode == "cprofile":
+            session.profile = cProfile.Profile()
+            session.profile.enable()
+        else:
+            session.sampler = threading.Thread(target=self._sample, args=(session,),
+                                               name=f"{self.system}-sampler", daemon=True)
+            session.sampler.start()
+        logger.info("[%s] profiling started: %s", self.system, asdict(settings))
+        return session
+
+    def _sample(self, session: _Session) -> None:
+        interval = session.settings.interval
+        while not session.stop_sampling.wait(interval):
+            frame = sys._current_frames().get(session.thread_id)  # pylint: disable=protected-access
+            if frame is not None:
+                session.stacks[_collapse(frame)] += 1
+            del frame
+            if session.expired(time.monotonic()):
+                # the loop may be blocked: the session is written from here
+                self._finish(session)
+                return
+
+    def _finish(self, session: _Session) -> None:
+        with self._lock:
+            if self._session is not session:
+                return
+            self._session = None
+        if session.profile is not None:
+            session.profile.disable()
+        session.stop_sampling.set()
+        if session.sampler is not None and session.sampler is not threading.current_thread():
+            session.sampler.join()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        base = os.path.join(self.output_dir, f"{self.system.lower().replace(' ', '_')}_{stamp}_{os.getpid()}")
+        if session.profile is not None:
+            paths = [base + ".pstats", base + ".txt"]
+            session.profile.dump_stats(paths[0])
+            summary = io.StringIO()
+            pstats.Stats(session.profile, stream=summary).sort_stats("cumulative").print_stats(50)
+            with open(paths[1], "w", encoding="utf-8") as file:
+                file.write(summary.getvalue())
+        else:
+            paths = [base + ".folded"]
+            with open(paths[0], "w", encoding="utf-8") as file:
+                for stack, count in sorted(session.stacks.items()):
+                    file.write(f"{stack} {count}\n")
+        self.outputs.extend(paths)
+        logger.info("[%s] profiling done after %d iterations: %s", self.system, session.iterations, paths[0])
+
+
+def _collapse(frame) -> str:
+    # the stack of a frame, outermost first, in the collapsed format of flamegraph.pl
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
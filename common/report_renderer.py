@@ -0,0 +1,98 @@
+"""
+Background rendering of the human operator reports.
+
+The orchestrators hand the report data to a ReportRenderer, which draws the
+figures and writes the files on a dedicated worker thread, so that plotting
+never blocks the message handling loop.
+"""
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ReportRenderer:
+    """
+    Queue-based renderer running the report views on a single worker thread.
+
+    Views rendered through it must not use the pyplot global state: they draw on
+    their own matplotlib Figure, which is released as soon as the file is saved.
+    """
+
+    def __init__(self, enabled: bool = True, asynchronous: bool = True):
+        """
+        Initialize the renderer.
+
+        :param enabled: If False every submitted report is dropped (e.g. in service mode).
+        :param asynchronous: If False the reports are rendered in the caller thread.
+        """
+        self.enabled = enabled
+        self.asynchronous = asynchronous
+        self._jobs = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, render, *args, **kwargs) -> bool:
+        """
+        Schedule the rendering of a report.
+
+        :param render: The view function drawing the report.
+        :param args: Positional arguments of the view function, usually the report data.
+        :param kwargs: Keyword arguments of the view function.
+        :return: False if the report was skipped because rendering is disabled.
+        """
+        if not self.enabled:
+            return False
+
+        if not self.asynchronous:
+            self._render(render, args, kwargs)
+            return True
+
+        self._ensure_worker()
+        self._jobs.put((render, args, kwargs))
+        return True
+
+    def flush(self):
+        """
+        Wait until every submitted report has been written.
+        Used before handing the reports to the human operator.
+        """
+        if self._worker is not None:
+            self._jobs.join()
+
+    def close(self):
+        """
+        Render the pending reports and stop the worker thread.
+        """
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            self._jobs.put(None)
+            worker.join()
+
+    def _ensure_worker(self):
+        # the worker is started on the first submission
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="report-renderer", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            try:
+                if job is None:
+                    return
+                render, args, kwargs = job
+                self._render(render, args, kwargs)
+            finally:
+                self._jobs.task_done()
+
+    @staticmethod
+    def _render(render, args, kwargs):
+        # a failing report must not stop the following ones (nor the orchestrator)
+        try:
+            render(*args, **kwargs)
+        except Exception:
+            logger.exception("Error rendering report with %s", getattr(render, '__qualname__', render))
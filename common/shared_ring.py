@@ -0,0 +1,298 @@
+"""
+Shared-memory ring buffer of prepared sessions, for co-located subsystems.
+
+When the Preparation and the Production System run on the same host, the
+prepared sessions can be handed over through a ring of fixed-width rows in a
+multiprocessing.shared_memory segment instead of HTTP: no JSON encoding and
+decoding, and the receiver reads the features in place.
+
+The receiver creates the ring and writes in its header the names of the
+features of a row, so the sender knows the layout; each row holds the uuid,
+the label, the send time and one float64 per feature. The ring has a single
+sender and a single receiver: the sender writes a row and then advances the
+write sequence, the receiver reads the row in place and then advances the read
+sequence, so no lock is needed.
+
+A receiver that restarts creates a new segment with the same name; the sender
+would keep writing into the old, unlinked one. The header therefore holds a
+generation, increased by each new ring, and a retired flag, set on the old
+segment when it is closed or replaced: write() raises RingClosedError once the
+ring is retired, and is_current() tells whether the name still refers to it.
+"""
+import json
+import struct
+from collections.abc import Mapping
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from common.lexicon import FEATURE_PREFIX
+
+# name of the ring of the prepared sessions, when not configured
+DEFAULT_RING_NAME = "cbd_prepared_sessions"
+
+MAGIC = b"CBDRING2"
+# magic, write sequence, read sequence, slots, features, layout bytes, retired flag, generation
+_HEADER = struct.Struct("<8sQQIIIIQ")
+_RETIRED = struct.Struct("<I")
+_RETIRED_OFFSET = 36
+_GENERATION = struct.Struct("<Q")
+_GENERATION_OFFSET = 40
+HEADER_SIZE = 64
+UUID_SIZE = 64
+LABEL_SIZE = 32
+# uuid, label and send time before the features
+_ROW_PREFIX = UUID_SIZE + LABEL_SIZE + 8
+
+
+# rings created by this process, whose segments this process must remove
+_created = set()
+
+
+class RingFullError(Exception):
+    """Raised when the receiver did not release any slot."""
+
+
+class RingClosedError(Exception):
+    """Raised when the receiver closed the ring, or replaced it with a new one."""
+
+
+class SharedSessionRing:
+    """
+    A ring of prepared session rows in a named shared memory segment.
+    """
+
+    def __init__(self, memory: shared_memory.SharedMemory, owner: bool):
+        """
+        Map an existing segment; use create() or attach().
+
+        :param memory: The shared memory segment.
+        :param owner: True for the receiver, which removes the segment when closed.
+        """
+        self._memory = memory
+        self._owner = owner
+        magic, _, _, self.slots, num_features, layout_size, _, self.generation = _HEADER.unpack_from(memory.buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{memory.name} is not a prepared session ring")
+        layout = bytes(memory.buf[HEADER_SIZE:HEADER_SIZE + layout_size])
+        self.feature_names: List[str] = json.loads(layout.decode("utf-8"))
+        if len(self.feature_names) != num_features:
+            raise ValueError(f"Corrupted layout in {memory.name}")
+        self._index = {name: i for i, name in enumerate(self.feature_names)}
+
+        self.row_size = _ROW_PREFIX + 8 * num_features
+        self._rows_offset = _align(HEADER_SIZE + layout_size)
+        # the sequences are read and written as aligned 8 bytes words
+        self._sequences = np.ndarray((2,), dtype="<u8", buffer=memory.buf, offset=8)
+
+    @classmethod
+    def create(cls, name: str, feature_names: Iterable[str], slots: int = 1024) -> "SharedSessionRing":
+        """
+        Create the ring, replacing a segment left by a previous receiver.
+
+        :param name: Name of the shared memory segment.
+        :param feature_names: The prepared session keys of the features of a row, in order.
+        :param slots: Number of rows of the ring.
+        """
+        feature_names = list(feature_names)
+        layout = json.dumps(feature_names).encode("utf-8")
+        size = _align(HEADER_SIZE + len(layout)) + slots * (_ROW_PREFIX + 8 * len(feature_names))
+        generation = 1
+        try:
+            stale = shared_memory.SharedMemory(name=name)
+            # a sender still attached to the previous ring must attach again
+            if stale.size >= HEADER_SIZE and bytes(stale.buf[:len(MAGIC)]) == MAGIC:
+                generation = _GENERATION.unpack_from(stale.buf, _GENERATION_OFFSET)[0] + 1
+                _RETIRED.pack_into(stale.buf, _RETIRED_OFFSET, 1)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _HEADER.pack_into(memory.buf, 0, MAGIC, 0, 0, slots, len(feature_names), len(layout), 0, generation)
+        memory.buf[HEADER_SIZE:HEADER_SIZE + len(layout)] = layout
+        _created.add(memory.name)
+        return cls(memory, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedSessionRing":
+        """
+        Attach to the ring created by the receiver.
+
+        :raises FileNotFoundError: If the receiver did not create it yet.
+        """
+        return cls(_open(name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    @property
+    def retired(self) -> bool:
+        """True once the receiver closed the ring or replaced it with a new one."""
+        return bool(_RETIRED.unpack_from(self._memory.buf, _RETIRED_OFFSET)[0])
+
+    def is_current(self) -> bool:
+        """
+        Tell whether the name of the ring still refers to this ring.
+
+        It opens the segment by name, so it is meant for the slow paths, e.g. a ring staying full.
+        """
+        if self.retired:
+            return False
+        try:
+            memory = _open(self.name)
+        except FileNotFoundError:
+            return False
+        try:
+            return (bytes(memory.buf[:len(MAGIC)]) == MAGIC
+                    and _GENERATION.unpack_from(memory.buf, _GENERATION_OFFSET)[0] == self.generation)
+        finally:
+            memory.close()
+
+    def __len__(self) -> int:
+        """Number of rows written and not yet released."""
+        write_sequence, read_sequence = self._sequences
+        return int(write_sequence - read_sequence)
+
+    def write(self, uuid: str, label: Optional[str], features: Mapping, sent_at: float = 0.0) -> None:
+        """
+        Write a prepared session in the next free slot.
+
+        :param uuid: The session uuid, at most 64 bytes.
+        :param label: The session label, at most 32 bytes.
+        :param features: The prepared session, with a number for each feature of the layout.
+        :param sent_at: The send time, in seconds since the epoch.
+        :raises RingClosedError: If the receiver closed or replaced the ring.
+        :raises RingFullError: If every slot is still in use.
+        :raises KeyError: If a feature of the layout is missing, but the sparse "word_<term>" counts.
+        """
+        if self.retired:
+            raise RingClosedError(self.name)
+        write_sequence, read_sequence = (int(value) for value in self._sequences)
+        if write_sequence - read_sequence >= self.slots:
+            raise RingFullError(self.name)
+        # the bag of words is sparse: an absent term counts 0
+        values = [features.get(name, 0) if name.startswith(FEATURE_PREFIX) else features[name]
+                  for name in self.feature_names]
+
+        offset = self._offset(write_sequence)
+        buf = self._memory.buf
+        buf[offset:offset + UUID_SIZE] = _fixed(uuid, UUID_SIZE)
+        buf[offset + UUID_SIZE:offset + UUID_SIZE + LABEL_SIZE] = _fixed(label, LABEL_SIZE)
+        row = np.ndarray((len(values) + 1,), dtype="<f8", buffer=buf, offset=offset + UUID_SIZE + LABEL_SIZE)
+        row[0] = sent_at
+        row[1:] = values
+        # published only once the row is complete
+        self._sequences[0] = write_sequence + 1
+
+    def read(self) -> Optional["SessionRow"]:
+        """
+        Return the oldest row not yet released, without copying it.
+
+        :return: The row, valid until release() is called; None if the ring is empty.
+        """
+        write_sequence, read_sequence = (int(value) for value in self._sequences)
+        if read_sequence == write_sequence:
+            return None
+        return SessionRow(self, self._offset(read_sequence))
+
+    def release(self) -> None:
+        """Give the slot of the oldest row back to the sender."""
+        if len(self):
+            self._sequences[1] = self._sequences[1] + 1
+
+    def close(self) -> None:
+        """Unmap the ring; the receiver also removes the segment."""
+        if self._sequences is None:
+            return  # already closed
+        self._sequences = None
+        # a ring already replaced must not remove the segment of the new one
+        owner = self._owner and self.is_current()
+        if owner:
+            # a sender still attached stops writing rows nobody reads
+            _RETIRED.pack_into(self._memory.buf, _RETIRED_OFFSET, 1)
+        self._memory.close()
+        if owner:
+            _created.discard(self._memory.name)
+            try:
+                self._memory.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _offset(self, sequence: int) -> int:
+        return self._rows_offset + (sequence % self.slots) * self.row_size
+
+
+class SessionRow(Mapping):
+    """
+    Read-only view of a prepared session stored in a ring slot.
+
+    It behaves like the prepared session dict: the uuid, the label and the
+    features are read from the shared memory when accessed.
+    """
+
+    def __init__(self, ring: SharedSessionRing, offset: int):
+        buf = ring._memory.buf  # pylint: disable=protected-access
+        self._index = ring._index  # pylint: disable=protected-access
+        self.feature_names = ring.feature_names
+        self.uuid = _text(buf[offset:offset + UUID_SIZE])
+        self.label = _text(buf[offset + UUID_SIZE:offset + UUID_SIZE + LABEL_SIZE])
+        row = np.ndarray((len(ring.feature_names) + 1,), dtype="<f8", buffer=buf,
+                         offset=offset + UUID_SIZE + LABEL_SIZE)
+        self.sent_at = float(row[0])
+        # the features, in layout order, still in the shared memory
+        self.values = row[1:]
+
+    def vector(self, feature_names: List[str]) -> np.ndarray:
+        """
+        Return the features in the given order, as a view when it is the layout order.
+
+        :param feature_names: The prepared session keys of the features.
+        """
+        if feature_names == self.feature_names:
+            return self.values
+        return self.values[[self._index[name] for name in feature_names]]
+
+    def __getitem__(self, key: str):
+        if key == "uuid":
+            return self.uuid
+        if key == "label":
+            return self.label
+        return float(self.values[self._index[key]])
+
+    def __iter__(self):
+        yield "uuid"
+        yield "label"
+        yield from self.feature_names
+
+    def __len__(self) -> int:
+        return len(self.feature_names) + 2
+
+    def to_dict(self) -> Dict:
+        """Copy the row into a prepared session dict."""
+        return dict(self.items())
+
+
+def _open(name: str) -> shared_memory.SharedMemory:
+    memory = shared_memory.SharedMemory(name=name)
+    # the segment belongs to the receiver: the sender exiting must not remove it
+    if memory.name not in _created:
+        resource_tracker.unregister(memory._name, "shared_memory")  # pylint: disable=protected-access
+    return memory
+
+
+def _align(size: int) -> int:
+    return (size + 7) // 8 * 8
+
+
+def _fixed(text: Optional[str], size: int) -> bytes:
+    data = (text or "").encode("utf-8")
+    if len(data) > size:
+        raise ValueError(f"{text!r} is longer than {size} bytes")
+    return data.ljust(size, b"\0")
+
+
+def _text(data) -> str:
+    return bytes(data).rstrip(b"\0").decode("utf-8")
@@ -0,0 +1,144 @@
+"""
+Non-blocking reporting of the timestamps to the Service Class.
+
+The subsystems hand their timestamps to a TimestampEmitter, which buffers them
+in a bounded queue and posts them in batches from a background thread, so that
+a slow or unreachable Service Class never delays the message handling loop.
+"""
+import json
+import logging
+import queue
+import threading
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class TimestampEmitter:
+    """
+    Buffers the timestamps of a subsystem and sends them in batches.
+    """
+
+    def __init__(self, system: str, url: str, port: int, capacity: int = 1000, batch_size: int = 50,
+                 flush_interval: float = 0.5, timeout: float = 10.0):
+        """
+        Initialize the emitter.
+
+        :param system: Name of the subsystem written in each timestamp.
+        :param url: Url of the Service Class timestamp endpoint.
+        :param port: The port written in each packet.
+        :param capacity: Maximum number of buffered timestamps, the new ones are dropped when full.
+        :param batch_size: Maximum number of timestamps sent in one request.
+        :param flush_interval: Seconds the worker waits for a timestamp before checking whether it must stop.
+        :param timeout: Timeout of each request, in seconds.
+        """
+        self.system = system
+        self.url = url
+        self.port = port
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+
+        # counters, read by the metrics and the tests
+        self.emitted = 0
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+
+        self._timestamps = queue.Queue(maxsize=capacity)
+        self._lock = threading.Lock()
+        self._worker = None
+        self._stop = threading.Event()
+
+    def emit(self, timestamp: float, status: str) -> bool:
+        """
+        Queue a timestamp, without waiting for it to be sent.
+
+        :param timestamp: The timestamp, in seconds since the epoch.
+        :param status: The status of the timestamp (e.g. "start", "end").
+        :return: False if the timestamp was dropped because the buffer is full.
+        """
+        try:
+            self._timestamps.put_nowait({"timestamp": timestamp, "system": self.system, "status": status})
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+        with self._lock:
+            self.emitted += 1
+        self._ensure_worker()
+        return True
+
+    def flush(self) -> int:
+        """
+        Send all the buffered timestamps.
+
+        :return: The number of timestamps sent.
+        """
+        sent = 0
+        while True:
+            batch = self._next_batch(block=False)
+            if not batch:
+                return sent
+            if self._send(batch):
+                sent += len(batch)
+
+    def close(self):
+        """
+        Stop the background worker and send the remaining timestamps.
+        """
+        self._stop.set()
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            worker.join()
+        self.flush()
+
+    def _ensure_worker(self):
+        # the worker is started on the first timestamp
+        with self._lock:
+            if self._worker is None and not self._stop.is_set():
+                self._worker = threading.Thread(target=self._run, name=f"{self.system}-timestamps", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch(block=True)
+            if batch:
+                self._send(batch)
+
+    def _next_batch(self, block: bool) -> list:
+        # wait for the first timestamp, then take the ones queued meanwhile up to the batch size:
+        # batches grow only while the Service Class is slower than the subsystem
+        batch = []
+        try:
+            batch.append(self._timestamps.get(block=block, timeout=self.flush_interval if block else None))
+            while len(batch) < self.batch_size:
+                batch.append(self._timestamps.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _send(self, batch: list) -> bool:
+        packet = {
+            "port": self.port,
+            "message": json.dumps(batch)
+        }
+        try:
+            response = requests.post(self.url, json=packet, timeout=self.timeout)
+            success = response.status_code == 200
+            if not success:
+                logger.error("Error sending %d timestamps: status %s", len(batch), response.status_code)
+        except requests.RequestException as e:
+            logger.error("Error sending %d timestamps: %s", len(batch), e)
+            success = False
+
+        with self._lock:
+            if success:
+                self.sent += len(batch)
+            else:
+                # timestamps are best effort: a failed batch is not retried
+                self.failed += len(batch)
+        return success
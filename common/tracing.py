@@ -0,0 +1,154 @@
+"""
+Per-session latency tracing.
+
+Every subsystem records the start and the end of its stages (receive, validate,
+buffer, feature extraction, classify, send) for each session, using the session
+uuid as trace id. Spans are kept in a bounded in-memory ring buffer and sent in
+batches to the Service Class, which assembles the per-session waterfalls.
+The span durations also feed the "stage_seconds" histograms of the subsystem
+metrics, whether or not the spans are sent.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+
+from common.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+TRACE_ENDPOINT = "Spans"
+
+
+class Tracer:
+    """
+    Records spans and flushes them in batches from a background thread.
+    """
+
+    def __init__(self, system: str, url: str = None, capacity: int = 10000, batch_size: int = 100,
+                 flush_interval: float = 1.0, metrics: MetricsRegistry = None):
+        """
+        Initialize the tracer.
+
+        :param system: Name of the subsystem recording the spans.
+        :param url: Url of the Service Class span endpoint, None to disable tracing.
+        :param capacity: Maximum number of buffered spans, the oldest are dropped when full.
+        :param batch_size: Maximum number of spans sent in one request.
+        :param flush_interval: Seconds between two flushes.
+        :param metrics: Registry receiving the stage durations, None to skip them.
+        """
+        self.system = system
+        self.metrics = metrics
+        self.url = url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._spans = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_configuration(cls, system: str, configuration: dict = None,
+                           metrics: MetricsRegistry = None) -> "Tracer":
+        """
+        Build the tracer described by the "tracing" section of a subsystem configuration.
+
+        :param system: Name of the subsystem recording the spans.
+        :param configuration: The tracing configuration, with "enabled", "ip" and "port".
+        :param metrics: Registry receiving the stage durations, None to skip them.
+        :return: The tracer, disabled if the configuration is missing or not enabled.
+        """
+        if not isinstance(configuration, dict) or not configuration.get("enabled", False):
+            return cls(system, metrics=metrics)
+        return cls(system,
+                   url=f"http://{configuration['ip']}:{configuration['port']}/{TRACE_ENDPOINT}",
+                   capacity=configuration.get("capacity", 10000),
+                   batch_size=configuration.get("batch_size", 100),
+                   flush_interval=configuration.get("flush_interval", 1.0),
+                   metrics=metrics)
+
+    @property
+    def enabled(self) -> bool:
+        return self.url is not None
+
+    def record(self, trace_id: str, stage: str, start: float, end: float):
+        """
+        Record a span.
+
+        :param trace_id: The trace id, i.e. the session uuid. Spans without trace id are ignored.
+        :param stage: The name of the stage.
+        :param start: The start time, in seconds since the epoch.
+        :param end: The end time, in seconds since the epoch.
+        """
+        if self.metrics is not None:
+            self.metrics.histogram("stage_seconds", stage=stage).observe(end - start)
+        if not self.enabled or trace_id is None:
+            return
+        with self._lock:
+            if len(self._spans) == self._spans.maxlen:
+                self.dropped += 1
+            self._spans.append({"trace_id": str(trace_id), "system": self.system, "stage": stage,
+                                "start": start, "end": end})
+        self._ensure_flusher()
+
+    @contextmanager
+    def span(self, trace_id: str, stage: str):
+        """
+        Context manager recording a span around a block of code.
+
+        :param trace_id: The trace id, i.e. the session uuid.
+        :param stage: The name of the stage.
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.record(trace_id, stage, start, time.time())
+
+    def flush(self) -> int:
+        """
+        Send the buffered spans to the Service Class.
+
+        :return: The number of spans sent.
+        """
+        sent = 0
+        while True:
+            with self._lock:
+                batch = [self._spans.popleft() for _ in range(min(self.batch_size, len(self._spans)))]
+            if not batch:
+                return sent
+            try:
+                response = requests.post(self.url, json={"system": self.system, "spans": batch}, timeout=5)
+                if response.status_code != 200:
+                    raise requests.RequestException(f"status {response.status_code}")
+            except requests.RequestException as e:
+                # spans are best effort: a failed batch is dropped, not retried
+                self.dropped += len(batch)
+                logger.error("Error sending %d spans: %s", len(batch), e)
+                return sent
+            sent += len(batch)
+
+    def close(self):
+        """
+        Stop the background flusher and send the remaining spans.
+        """
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        if self.enabled:
+            self.flush()
+
+    def _ensure_flusher(self):
+        if self._flusher is None:
+            with self._lock:
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._run, name=f"{self.system}-tracer", daemon=True)
+                    self._flusher.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
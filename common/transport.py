@@ -0,0 +1,170 @@
+"""
+Backpressure between the subsystems.
+
+A receiving channel whose queue is full answers 503 with a Retry-After header
+(busy_response) instead of buffering without bounds; the senders post through
+post(), which waits the advertised time and tries again, so that a slow
+subsystem slows down its producers instead of running out of memory.
+
+In pipeline mode every subsystem runs in the same interpreter: the channels
+register their Flask application on a LocalNetwork instead of starting a
+server (serve_locally), and post() hands the messages to the application of
+the target port directly, without sockets; the targets not registered are
+still reached over HTTP.
+"""
+import math
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+# status codes meaning "try again later"
+BUSY_STATUS_CODES = (429, 503)
+DEFAULT_RETRY_AFTER = 1.0
+
+
+def queue_limits(configuration: dict = None) -> tuple:
+    """
+    Read the "receive_queue" section of a subsystem configuration.
+
+    :param configuration: The section, with "max_size" (0 for unbounded) and "retry_after" in seconds.
+    :return: The tuple (max_size, retry_after), unbounded if the section is missing.
+    """
+    if not isinstance(configuration, dict):
+        return 0, DEFAULT_RETRY_AFTER
+    return int(configuration.get("max_size", 0)), float(configuration.get("retry_after", DEFAULT_RETRY_AFTER))
+
+
+def busy_response(retry_after: float = DEFAULT_RETRY_AFTER):
+    """
+    Build the Flask response of a channel whose queue is full.
+
+    :param retry_after: Seconds the sender should wait before trying again.
+    :return: The tuple (response, 503) returned by the route.
+    """
+    from flask import jsonify
+
+    response = jsonify({"status": "busy", "message": "Queue full, retry later"})
+    # Retry-After is expressed in whole seconds
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response, 503
+
+
+def post(url: str, json=None, timeout: float = None, max_wait: float = 30.0, session: requests.Session = None):
+    """
+    POST a message, waiting and trying again while the receiver is busy.
+
+    :param url: The url of the receiver.
+    :param json: The message.
+    :param timeout: Timeout of each request in seconds, None to wait indefinitely.
+    :param max_wait: Maximum total seconds spent waiting for a busy receiver.
+    :param session: Session used for the requests, None for a new connection each time.
+    :return: The last response; still busy if the receiver did not recover within max_wait.
+    :raises requests.RequestException: If the receiver cannot be reached.
+    """
+    sender = session if session is not None else requests
+    options = {"timeout": timeout} if timeout is not None else {}
+    waited = 0.0
+    while True:
+        response = _local_network.deliver(url, json) if _local_network is not None else None
+        if response is None:
+            response = sender.post(url, json=json, **options)
+        if response.status_code not in BUSY_STATUS_CODES or waited >= max_wait:
+            return response
+        delay = min(_retry_after(response), max_wait - waited)
+        time.sleep(delay)
+        waited += delay
+
+
+def _retry_after(response) -> float:
+    try:
+        return max(0.0, float(response.headers.get("Retry-After", DEFAULT_RETRY_AFTER)))
+    except (TypeError, ValueError):
+        # an HTTP date is not worth parsing here
+        return DEFAULT_RETRY_AFTER
+
+
+class LocalResponse:
+    """The response of a message delivered in-process, with the attributes of a requests.Response used here."""
+
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self._body = response.get_json(silent=True)
+
+    def json(self):
+        return self._body
+
+
+class LocalNetwork:
+    """
+    Routes the messages to the Flask applications registered in this interpreter, by port.
+    """
+
+    def __init__(self, addresses: Dict[int, str] = None, serve_http: bool = False):
+        """
+        :param addresses: The ip of the subsystem listening on each port, seen by the receivers as the sender ip
+                          (the Production System recognizes its senders by ip and port). 127.0.0.1 if missing.
+        :param serve_http: If True the channels also start their HTTP server, for the subsystems
+                           running in other processes.
+        """
+        self.addresses = dict(addresses or {})
+        self.serve_http = serve_http
+        self._applications = {}
+        self._lock = threading.Lock()
+
+    def register(self, port: int, application) -> None:
+        """
+        Deliver the messages posted to a port to a Flask application.
+
+        :raises ValueError: If another application already listens on the port.
+        """
+        with self._lock:
+            if port in self._applications and self._applications[port] is not application:
+                raise ValueError(f"Port {port} is already registered")
+            self._applications[port] = application
+
+    def deliver(self, url: str, message) -> Optional[LocalResponse]:
+        """
+        Hand a message to the application listening on the port of the url.
+
+        :param url: The url of the receiver.
+        :param message: The message, posted as the JSON body.
+        :return: The response, None if no application of this interpreter listens on the port.
+        """
+        target = urlsplit(url)
+        application = self._applications.get(target.port)
+        if application is None:
+            return None
+        sender_port = message.get("port") if isinstance(message, dict) else None
+        environ = {"REMOTE_ADDR": self.addresses.get(sender_port, "127.0.0.1")}
+        # a client per message: the senders run on different threads
+        with application.test_client() as client:
+            return LocalResponse(client.post(target.path or "/", json=message, environ_base=environ))
+
+
+_local_network: Optional[LocalNetwork] = None
+
+
+def use_local_network(network: Optional[LocalNetwork]) -> None:
+    """
+    Deliver the messages in-process from now on, or over HTTP again if network is None.
+    """
+    global _local_network  # pylint: disable=global-statement
+    _local_network = network
+
+
+def serve_locally(application, port: int) -> bool:
+    """
+    Register the application of a channel on the local network, if pipeline mode is active.
+
+    :param application: The Flask application of the channel.
+    :param port: The port the channel listens on.
+    :return: True if the channel must not start its HTTP server.
+    """
+    if _local_network is None:
+        return False
+    _local_network.register(port, application)
+    return not _local_network.serve_http
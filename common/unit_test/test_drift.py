@@ -0,0 +1,34 @@
+import numpy as np
+
+from common import drift
+
+
+def test_reference_bins_keep_discrete_values_apart():
+    # a bad word count, almost always 0
+    counts = np.array([[0.0]] * 95 + [[1.0]] * 5)
+    quantiles, proportions = drift.reference_statistics(counts)
+
+    assert quantiles.shape == (1, drift.NUM_QUANTILES)
+    assert proportions.shape == (1, drift.NUM_BINS)
+    assert proportions.sum() == 1.0
+    # the zeros and the ones fall in different bins, the values above the maximum in the last one
+    bins = drift.bin_indices(quantiles[0], [0.0, 1.0, 3.0])
+    assert bins[0] != bins[1]
+    assert bins[2] == drift.NUM_BINS - 1
+    assert proportions[0, bins[0]] == 0.95
+
+
+def test_psi_and_ks_grow_with_the_shift():
+    rng = np.random.default_rng(0)
+    quantiles, proportions = drift.reference_statistics(rng.normal(0, 1, (5000, 1)))
+
+    same = rng.normal(0, 1, 1000)
+    shifted = rng.normal(1, 1, 1000)
+    same_counts = np.bincount(drift.bin_indices(quantiles[0], same), minlength=drift.NUM_BINS)
+    shifted_counts = np.bincount(drift.bin_indices(quantiles[0], shifted), minlength=drift.NUM_BINS)
+
+    assert drift.psi(proportions[0], same_counts) < 0.05
+    assert drift.psi(proportions[0], shifted_counts) > 0.25
+    assert drift.ks_statistic(quantiles[0], same) < 0.1
+    assert 0.3 < drift.ks_statistic(quantiles[0], shifted) < 0.5
+    assert drift.psi(proportions[0], np.zeros(drift.NUM_BINS)) == 0.0
@@ -0,0 +1,67 @@
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from common.file_watcher import FileWatcher
+
+
+def write_verdict(path, verdict):
+    # written like the human operator editors do: a new file renamed into place
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump({"classifier_evaluation": verdict}, file)
+    os.replace(path + ".tmp", path)
+
+
+@pytest.mark.parametrize("mode", ["polling", "auto"])
+def test_changes_are_reported_once(tmp_path, mode):
+    path = str(tmp_path / "classifier_evaluation.json")
+    watcher = FileWatcher(path, mode=mode, poll_interval=0.01)
+
+    assert watcher.wait(0) is False
+    write_verdict(path, "waiting_for_evaluation")
+    assert watcher.wait(1) is True
+    # the change was consumed
+    assert watcher.wait(0.05) is False
+
+    os.remove(path)
+    assert watcher.wait(1) is True
+    watcher.close()
+
+
+def test_other_files_are_ignored(tmp_path):
+    path = str(tmp_path / "classifier_evaluation.json")
+    watcher = FileWatcher(path, poll_interval=0.01)
+
+    (tmp_path / "notes.txt").write_text("not a verdict")
+    assert watcher.wait(0.05) is False
+    watcher.close()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is only available on Linux")
+def test_inotify_wakes_up_on_the_verdict(tmp_path):
+    path = str(tmp_path / "classifier_evaluation.json")
+    watcher = FileWatcher(path, mode="inotify")
+    assert watcher.mode == "inotify"
+
+    timer = threading.Timer(0.1, write_verdict, args=(path, "good"))
+    timer.start()
+    started = time.monotonic()
+    assert watcher.wait(5) is True
+    # woken up by the change, not by the timeout
+    assert time.monotonic() - started < 2
+    timer.join()
+    watcher.close()
+
+
+def test_missing_directory_falls_back_to_polling(tmp_path):
+    path = str(tmp_path / "missing" / "classifier_evaluation.json")
+    watcher = FileWatcher(path, poll_interval=0.01)
+    assert watcher.mode == "polling"
+
+    os.makedirs(os.path.dirname(path))
+    write_verdict(path, "bad")
+    assert watcher.wait(1) is True
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from common.lexicon import Lexicon, load_lexicon
+
+
+def test_words_stems_and_overlapping_phrases():
+    lexicon = Lexicon(["gay", "bulli*", "kill yourself", "go kill yourself", "yourself"])
+    tokens = "go kill yourself you bullied gay bullies gay".split()
+
+    assert lexicon.count(tokens) == {"word_go_kill_yourself": 1, "word_kill_yourself": 1, "word_yourself": 1,
+                                     "word_bulli": 2, "word_gay": 2}
+
+
+def test_counts_are_sparse_and_dense_keeps_vocabulary_order():
+    lexicon = Lexicon(["fuck", "bulli", "muslim"])
+
+    assert lexicon.count(["hello", "bulli"]) == {"word_bulli": 1}
+    assert list(lexicon.dense(["hello"]).items()) == [("word_fuck", 0), ("word_bulli", 0), ("word_muslim", 0)]
+
+
+def test_phrase_restarts_after_a_partial_match():
+    lexicon = Lexicon(["a a b"])
+
+    assert lexicon.count("a a a b".split()) == {"word_a_a_b": 1}
+
+
+@pytest.mark.parametrize("terms", [["gay", "gay"], ["kill you*"], ["*"], ["a-b"]])
+def test_invalid_vocabularies_are_rejected(terms):
+    with pytest.raises(ValueError):
+        Lexicon(terms)
+
+
+def test_schema_allows_the_vocabulary_features(tmp_path):
+    path = tmp_path / "vocabulary.json"
+    path.write_text(json.dumps({"terms": ["gay", "kill yourself"]}))
+    lexicon = load_lexicon(str(path))
+    schema = {"type": "object", "properties": {"uuid": {"type": "string"}, "word_old": {"type": "integer"}},
+              "required": ["uuid", "word_old"]}
+
+    extended = lexicon.extend_schema(schema)
+
+    # the counts are sparse: the features are allowed, not required
+    assert extended["required"] == ["uuid"]
+    assert extended["properties"]["word_kill_yourself"] == {"type": "integer", "minimum": 0}
+    assert "word_old" not in extended["properties"]
+    assert load_lexicon(str(path)) is lexicon
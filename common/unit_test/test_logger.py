@@ -0,0 +1,99 @@
+import json
+import logging
+import queue
+import time
+
+import pytest
+
+from common.logger import AsyncQueueHandler, configure_logging, shutdown_logging
+
+
+@pytest.fixture(autouse=True)
+def fresh_logging():
+    # another test may have started the shared handler with its own configuration
+    shutdown_logging()
+    yield
+    shutdown_logging()
+
+
+def read_records(capsys):
+    shutdown_logging()
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_json_records_with_extra_fields(capsys):
+    logger = configure_logging("test_system", {"level": "DEBUG"})
+    logger.debug("Received %d records", 3, extra={"uuid": "abc"})
+    try:
+        raise RuntimeError("broken")
+    except RuntimeError:
+        logger.exception("Session failed")
+
+    debug, error = read_records(capsys)
+    assert debug["level"] == "DEBUG" and debug["logger"] == "test_system"
+    assert debug["message"] == "Received 3 records"
+    assert debug["uuid"] == "abc"
+    assert error["level"] == "ERROR"
+    assert "RuntimeError: broken" in error["exception"]
+
+
+def test_level_filters_records(capsys):
+    logger = configure_logging("test_system", {"level": "WARNING"})
+    logger.info("hidden")
+    logger.warning("shown")
+    assert [record["message"] for record in read_records(capsys)] == ["shown"]
+
+
+def test_rate_limit_per_call_site(capsys):
+    logger = configure_logging("test_system", {"rate_limit": {"messages": 3, "interval": 0.2}})
+    for i in range(10):
+        logger.info("record %d", i)
+    for i in range(2):
+        logger.error("error %d", i)
+
+    records = read_records(capsys)
+    assert [record["message"] for record in records] == ["record 0", "record 1", "record 2", "error 0", "error 1"]
+
+    logger = configure_logging("test_system", {"rate_limit": {"messages": 1, "interval": 0.01}})
+    for i in range(3):
+        if i == 2:
+            # the next interval starts with the count of the suppressed record
+            time.sleep(0.02)
+        logger.info("record %d", i)
+    records = read_records(capsys)
+    assert records[-1]["message"] == "record 2"
+    assert records[-1]["suppressed"] == 1
+
+
+def test_full_queue_drops_and_counts():
+    log_queue = queue.Queue(2)
+    handler = AsyncQueueHandler(log_queue)
+    logger = logging.getLogger("test_system.queue")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        for i in range(5):
+            logger.warning("record %d", i)
+        assert log_queue.qsize() == 2
+        assert handler.dropped == 3
+
+        log_queue.get_nowait()
+        logger.warning("after")
+        assert handler.dropped == 0
+        log_queue.get_nowait()
+        assert log_queue.get_nowait().dropped == 3
+    finally:
+        logger.removeHandler(handler)
+
+
+@pytest.mark.parametrize("configuration", [{"level": "LOUD"}, {"format": "xml"}])
+def test_invalid_configuration(configuration):
+    with pytest.raises(ValueError):
+        configure_logging("test_system", configuration)
+
+
+def test_access_log_sets_the_werkzeug_level():
+    configure_logging("test_system", {"access_log": True})
+    assert logging.getLogger("werkzeug").level == logging.INFO
+    configure_logging("test_system", {})
+    assert logging.getLogger("werkzeug").level == logging.WARNING
@@ -0,0 +1,103 @@
+import os
+
+from common.message_log import DurableQueue, MessageLog, open_channel_queue
+from common.metrics import MeteredQueue, MetricsRegistry
+
+
+def test_messages_survive_a_reopen(tmp_path):
+    log = MessageLog(str(tmp_path))
+    assert [log.append({"n": n}) for n in range(3)] == [0, 1, 2]
+    log.close()
+
+    log = MessageLog(str(tmp_path))
+    assert log.next_offset == 3
+    assert list(log.read(1)) == [(1, {"n": 1}), (2, {"n": 2})]
+    assert log.append({"n": 3}) == 3
+
+
+def test_torn_write_is_truncated_on_recovery(tmp_path):
+    log = MessageLog(str(tmp_path))
+    log.append({"n": 0})
+    log.append({"n": 1})
+    log.close()
+
+    segment = os.path.join(str(tmp_path), sorted(name for name in os.listdir(str(tmp_path)) if name.endswith(".log"))[0])
+    # crash in the middle of the last append
+    with open(segment, "r+b") as file:
+        file.truncate(os.path.getsize(segment) - 3)
+
+    log = MessageLog(str(tmp_path))
+    assert list(log.read()) == [(0, {"n": 0})]
+    assert log.append({"n": 2}) == 1
+    assert list(log.read()) == [(0, {"n": 0}), (1, {"n": 2})]
+
+
+def test_committed_segments_are_deleted(tmp_path):
+    log = MessageLog(str(tmp_path), segment_bytes=1024, checkpoint_interval=0)
+    for n in range(100):
+        log.append({"n": n, "padding": "x" * 50})
+    segments = lambda: sorted(name for name in os.listdir(str(tmp_path)) if name.endswith(".log"))
+    assert len(segments()) > 3
+
+    log.commit("records", 79)
+
+    # only the segments still holding offsets >= 80 are kept
+    assert int(segments()[0][:-4]) <= 80
+    assert int(segments()[1][:-4]) > 80
+    assert [offset for offset, _ in log.read(log.committed("records"))] == list(range(80, 100))
+
+
+def test_durable_queue_resumes_from_the_last_commit(tmp_path):
+    log = MessageLog(str(tmp_path), checkpoint_interval=0)
+    messages = DurableQueue(MetricsRegistry(), "records", 0, log)
+    for n in range(3):
+        assert messages.offer({"n": n})
+
+    assert messages.get() == {"n": 0}
+    # the first message is committed when the second one is requested
+    assert messages.get() == {"n": 1}
+    log.close()
+
+    # restart: the message being processed and the queued one are delivered again
+    registry = MetricsRegistry()
+    restored = DurableQueue(registry, "records", 0, MessageLog(str(tmp_path)))
+    assert [restored.get(), restored.get()] == [{"n": 1}, {"n": 2}]
+    assert restored.empty()
+    assert registry.snapshot()['queue_replayed_total{queue="records"}']["value"] == 2
+
+
+def test_full_durable_queue_rejects_without_logging(tmp_path):
+    log = MessageLog(str(tmp_path))
+    messages = DurableQueue(MetricsRegistry(), "records", 1, log)
+
+    assert messages.offer({"n": 0}) is True
+    assert messages.offer({"n": 1}) is False
+    assert log.next_offset == 1
+
+
+def test_channel_queue_is_durable_only_if_enabled(tmp_path):
+    registry = MetricsRegistry()
+    assert type(open_channel_queue(registry, "a", configuration=None)) is MeteredQueue
+    durable = open_channel_queue(registry, "b", configuration={"enabled": True, "directory": "log"},
+                                 basedir=str(tmp_path))
+    assert isinstance(durable, DurableQueue)
+    assert os.path.isdir(os.path.join(str(tmp_path), "log", "b"))
+
+
+def test_manual_ack_commits_the_acknowledged_prefix(tmp_path):
+    log = MessageLog(str(tmp_path), checkpoint_interval=0)
+    messages = DurableQueue(MetricsRegistry(), "records", 0, log)
+    messages.manual_ack = True
+    for n in range(3):
+        messages.offer({"n": n})
+    offsets = []
+    for _ in range(3):
+        messages.get()
+        offsets.append(messages.last_offset)
+
+    # the workers finish out of order: nothing is committed until the first one is done
+    messages.ack(offsets[2])
+    messages.ack(offsets[1])
+    assert log.committed("records") == 0
+    messages.ack(offsets[0])
+    assert log.committed("records") == 3
@@ -0,0 +1,61 @@
+import random
+
+from flask import Flask
+
+from common import metrics as metrics_module
+from common.metrics import Histogram, MeteredQueue, MetricsRegistry
+
+
+def test_histogram_percentiles_are_within_one_percent():
+    histogram = Histogram()
+    random.seed(3)
+    values = [random.uniform(0.0001, 2.0) for _ in range(5000)]
+    for value in values:
+        histogram.observe(value)
+
+    ordered = sorted(values)
+    for percentile in (50, 90, 99):
+        exact = ordered[int(len(ordered) * percentile / 100) - 1]
+        assert abs(histogram.percentile(percentile) - exact) / exact < 0.01
+    assert histogram.count == 5000
+    assert histogram.max == max(values)
+    assert Histogram().percentile(99) == 0.0
+
+
+def test_counter_rate_uses_the_completed_seconds(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(metrics_module.time, "monotonic", lambda: clock[0])
+
+    counter = metrics_module.Counter()
+    for second in range(10):
+        clock[0] = 1000.0 + second
+        counter.inc(5)
+    clock[0] = 1010.5
+
+    assert counter.value == 50
+    assert counter.rate(window=10) == 5.0
+
+
+def test_metered_queue_and_metrics_route():
+    registry = MetricsRegistry()
+    messages = MeteredQueue(registry, "records")
+    messages.put("a")
+    messages.put("b")
+    messages.get()
+    registry.histogram("stage_seconds", stage="validate").observe(0.002)
+    registry.counter("validation_failures_total", type="record").inc()
+
+    app = Flask(__name__)
+    registry.mount(app)
+    client = app.test_client()
+
+    snapshot = client.get("/metrics?format=json").get_json()
+    assert snapshot['queue_depth{queue="records"}'] == {"value": 1}
+    assert snapshot['queue_enqueued_total{queue="records"}']["value"] == 2
+    assert snapshot['stage_seconds{stage="validate"}']["count"] == 1
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'queue_dequeued_total{queue="records"} 1' in text
+    assert 'validation_failures_total{type="record"} 1' in text
+    assert 'stage_seconds{stage="validate",quantile="0.99"}' in text
+    assert 'stage_seconds_count{stage="validate"} 1' in text
@@ -0,0 +1,110 @@
+import json
+import os
+import pstats
+import time
+
+import pytest
+from flask import Flask
+
+from common.profiler import LoopProfiler, ProfileSettings
+
+
+def busy_iteration():
+    return sum(i * i for i in range(2000))
+
+
+def run_loop(profiler, iterations):
+    for _ in range(iterations):
+        profiler.tick()
+        busy_iteration()
+
+
+def write_configuration(path, profiling):
+    # written like an editor does: a new file renamed into place
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump({"current_phase": "development", "profiling": profiling}, file)
+    os.replace(path + ".tmp", path)
+
+
+def test_cprofile_session_ends_after_the_iterations(tmp_path):
+    profiler = LoopProfiler("Test System", str(tmp_path / "profiles"))
+    assert profiler.request(ProfileSettings(mode="cprofile", iterations=5))
+    # a second request waits for the first session to end
+    assert not profiler.request(ProfileSettings(mode="cprofile", iterations=5))
+
+    run_loop(profiler, 3)
+    assert profiler.active
+    run_loop(profiler, 10)
+    assert not profiler.active
+
+    pstats_path, summary_path = profiler.outputs
+    assert pstats_path.endswith(".pstats") and summary_path.endswith(".txt")
+    functions = {name for _, _, name in pstats.Stats(pstats_path).stats}
+    assert "busy_iteration" in functions
+    with open(summary_path, "r", encoding="utf-8") as file:
+        assert "cumulative" in file.read()
+
+
+def test_sampling_session_writes_collapsed_stacks(tmp_path):
+    profiler = LoopProfiler("Test System", str(tmp_path / "profiles"))
+    profiler.request(ProfileSettings(mode="sampling", seconds=0.3, interval=0.001))
+
+    deadline = time.monotonic() + 5
+    profiler.tick()
+    while profiler.active and time.monotonic() < deadline:
+        run_loop(profiler, 1)
+    assert not profiler.active
+
+    (folded_path,) = profiler.outputs
+    with open(folded_path, "r", encoding="utf-8") as file:
+        lines = file.read().splitlines()
+    assert lines
+    _, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any("busy_iteration" in line for line in lines)
+
+
+@pytest.mark.parametrize("settings", [{"mode": "perf"}, {"iterations": 0}, {"seconds": -1}, {"iterations": "10"}])
+def test_invalid_settings_are_rejected(settings):
+    with pytest.raises(ValueError):
+        ProfileSettings.from_dict(settings)
+
+
+def test_default_length_without_limits():
+    settings = ProfileSettings.from_dict({"mode": "sampling"})
+    assert settings.iterations is None and settings.seconds > 0
+
+
+def test_profile_route(tmp_path):
+    profiler = LoopProfiler("Test System", str(tmp_path / "profiles"))
+    app = Flask(__name__)
+    profiler.mount(app)
+    client = app.test_client()
+
+    assert client.post("/profile", json={"mode": "perf"}).status_code == 400
+    response = client.post("/profile", json={"mode": "cprofile", "iterations": 2})
+    assert response.status_code == 202
+    assert client.post("/profile", json={"iterations": 2}).status_code == 409
+    assert client.get("/profile").get_json()["scheduled"] is True
+
+    run_loop(profiler, 4)
+    status = client.get("/profile").get_json()
+    assert status["active"] is False
+    assert len(status["outputs"]) == 2
+
+
+def test_configuration_enables_profiling_without_restart(tmp_path):
+    path = str(tmp_path / "configuration.json")
+    write_configuration(path, {"enabled": False, "iterations": 2})
+    profiler = LoopProfiler("Test System", str(tmp_path / "profiles"), path)
+    run_loop(profiler, 3)
+    assert not profiler.outputs
+
+    write_configuration(path, {"enabled": True, "mode": "cprofile", "iterations": 2})
+    # the file is checked at most once per second
+    deadline = time.monotonic() + 5
+    while not profiler.outputs and time.monotonic() < deadline:
+        run_loop(profiler, 1)
+        time.sleep(0.05)
+    assert len(profiler.outputs) == 2
+    profiler.close()
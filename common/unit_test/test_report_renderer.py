@@ -0,0 +1,57 @@
+import threading
+
+from common.report_renderer import ReportRenderer
+
+
+def test_reports_are_rendered_on_the_worker_thread():
+    renderer = ReportRenderer()
+    rendered = []
+    release = threading.Event()
+
+    def slow_view(report):
+        release.wait(timeout=5)
+        rendered.append((report, threading.current_thread().name))
+
+    assert renderer.submit(slow_view, "first") is True
+    # submit does not wait for the view
+    assert rendered == []
+
+    release.set()
+    renderer.flush()
+    assert rendered == [("first", "report-renderer")]
+    renderer.close()
+
+
+def test_failing_report_does_not_stop_the_following_ones(caplog):
+    renderer = ReportRenderer()
+    rendered = []
+
+    def broken_view(report):
+        raise RuntimeError("broken")
+
+    renderer.submit(broken_view, "a")
+    renderer.submit(rendered.append, "b")
+    renderer.close()
+
+    assert rendered == ["b"]
+    failure, = [record for record in caplog.records if record.name == "common.report_renderer"]
+    assert "broken_view" in failure.getMessage()
+    assert failure.exc_info[0] is RuntimeError
+
+
+def test_disabled_renderer_skips_reports():
+    renderer = ReportRenderer(enabled=False)
+    rendered = []
+
+    assert renderer.submit(rendered.append, "report") is False
+    renderer.flush()
+    renderer.close()
+    assert rendered == []
+
+
+def test_synchronous_renderer_draws_in_the_caller_thread():
+    renderer = ReportRenderer(asynchronous=False)
+    rendered = []
+
+    renderer.submit(lambda report: rendered.append((report, threading.current_thread().name)), "report")
+    assert rendered == [("report", threading.current_thread().name)]
@@ -0,0 +1,98 @@
+import os
+import uuid
+
+import numpy as np
+import pytest
+
+from common.shared_ring import RingClosedError, RingFullError, SessionRow, SharedSessionRing
+
+FEATURES = ["tweet_length", "word_gay", "event_sending-off", "audio_0"]
+
+
+@pytest.fixture
+def ring():
+    # a unique name, the segments are shared by the whole host
+    receiver = SharedSessionRing.create(f"test_ring_{os.getpid()}_{uuid.uuid4().hex[:8]}", FEATURES, slots=2)
+    yield receiver
+    receiver.close()
+
+
+def session(index):
+    return {"uuid": f"u{index}", "label": "cyberbullying", "tweet_length": index, "word_gay": 1,
+            "event_sending-off": 0, "audio_0": -12.5}
+
+
+def test_rows_are_read_in_place_in_order(ring):
+    sender = SharedSessionRing.attach(ring.name)
+    assert sender.feature_names == FEATURES
+
+    # three rows through two slots
+    for index in range(3):
+        sender.write(f"u{index}", "cyberbullying", session(index), sent_at=100.0 + index)
+        row = ring.read()
+        assert isinstance(row, SessionRow)
+        assert (row["uuid"], row["tweet_length"], row.sent_at) == (f"u{index}", float(index), 100.0 + index)
+        assert row.to_dict() == {**session(index), "tweet_length": float(index), "word_gay": 1.0,
+                                 "event_sending-off": 0.0}
+        # the features are a view of the shared memory, not a copy
+        assert not row.values.flags.owndata
+        assert np.shares_memory(row.vector(FEATURES), row.values)
+        assert list(row.vector(["audio_0", "tweet_length"])) == [-12.5, float(index)]
+        del row
+        ring.release()
+
+    assert ring.read() is None
+    sender.close()
+
+
+def test_full_ring_rejects_rows_until_released(ring):
+    sender = SharedSessionRing.attach(ring.name)
+    sender.write("u0", "", session(0))
+    sender.write("u1", "", session(1))
+    with pytest.raises(RingFullError):
+        sender.write("u2", "", session(2))
+
+    ring.release()
+    sender.write("u2", "", session(2))
+    assert len(ring) == 2
+    sender.close()
+
+
+def test_missing_feature_is_not_written(ring):
+    sender = SharedSessionRing.attach(ring.name)
+    incomplete = session(0)
+    del incomplete["audio_0"]
+    with pytest.raises(KeyError):
+        sender.write("u0", "", incomplete)
+    assert ring.read() is None
+    sender.close()
+
+
+def test_sender_notices_a_restarted_receiver(ring):
+    sender = SharedSessionRing.attach(ring.name)
+    sender.write("u0", "", session(0))
+    assert sender.is_current()
+
+    # the receiver restarts: the new ring replaces the segment the sender is attached to
+    restarted = SharedSessionRing.create(ring.name, FEATURES, slots=2)
+    try:
+        assert restarted.generation == ring.generation + 1
+        assert not sender.is_current()
+        with pytest.raises(RingClosedError):
+            sender.write("u1", "", session(1))
+        sender.close()
+
+        sender = SharedSessionRing.attach(ring.name)
+        sender.write("u1", "", session(1))
+        assert restarted.read()["uuid"] == "u1"
+        # closing the replaced ring leaves the new one in place
+        ring.close()
+        assert sender.is_current()
+        sender.close()
+    finally:
+        restarted.close()
+
+
+def test_attach_before_the_receiver_fails():
+    with pytest.raises(FileNotFoundError):
+        SharedSessionRing.attach(f"test_ring_missing_{uuid.uuid4().hex[:8]}")
@@ -0,0 +1,68 @@
+import json
+import threading
+
+import requests
+
+from common.timestamp_emitter import TimestampEmitter
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def test_emit_does_not_wait_for_the_service_class(monkeypatch):
+    release = threading.Event()
+    posted = []
+
+    def slow_post(url, json, timeout):
+        release.wait(timeout=5)
+        posted.append(json)
+        return FakeResponse(200)
+
+    monkeypatch.setattr(requests, "post", slow_post)
+
+    emitter = TimestampEmitter("Production System", "http://service/Timestamp", 5005)
+    assert emitter.emit(1.0, "start") is True
+    assert emitter.emit(2.0, "end") is True
+    # emit returns while the first request is still pending
+    assert posted == []
+
+    release.set()
+    emitter.close()
+
+    timestamps = [timestamp for packet in posted for timestamp in json.loads(packet["message"])]
+    assert timestamps == [{"timestamp": 1.0, "system": "Production System", "status": "start"},
+                          {"timestamp": 2.0, "system": "Production System", "status": "end"}]
+    assert emitter.sent == 2
+
+
+def test_timestamps_are_dropped_when_the_buffer_is_full(monkeypatch):
+    posted = []
+    monkeypatch.setattr(requests, "post", lambda url, json, timeout: posted.append(json) or FakeResponse(200))
+
+    emitter = TimestampEmitter("Production System", "http://service/Timestamp", 5005, capacity=2, batch_size=10)
+    # no worker: the buffer is only drained by flush
+    monkeypatch.setattr(emitter, "_ensure_worker", lambda: None)
+
+    results = [emitter.emit(float(i), "Session Classified") for i in range(3)]
+
+    assert results == [True, True, False]
+    assert (emitter.emitted, emitter.dropped) == (2, 1)
+    assert emitter.flush() == 2
+    # the two timestamps are sent in one batch
+    assert len(posted) == 1
+
+
+def test_failed_batches_are_counted(monkeypatch):
+    def unreachable(url, json, timeout):
+        raise requests.ConnectionError("unreachable")
+
+    monkeypatch.setattr(requests, "post", unreachable)
+
+    emitter = TimestampEmitter("Development System", "http://service/Timestamp", 5004)
+    monkeypatch.setattr(emitter, "_ensure_worker", lambda: None)
+    emitter.emit(1.0, "start")
+
+    assert emitter.flush() == 0
+    assert emitter.failed == 1
@@ -0,0 +1,74 @@
+import requests
+
+from common.metrics import MetricsRegistry
+from common.tracing import Tracer
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer.from_configuration("Ingestion System", {"enabled": False, "ip": "127.0.0.1", "port": 5010})
+
+    with tracer.span("uuid-1", "validate"):
+        pass
+
+    assert tracer.enabled is False
+    assert tracer.flush() == 0
+    assert tracer._flusher is None
+
+
+def test_from_configuration_builds_the_span_endpoint():
+    tracer = Tracer.from_configuration("Ingestion System",
+                                       {"enabled": True, "ip": "10.0.0.1", "port": 5010, "batch_size": 2})
+
+    assert tracer.url == "http://10.0.0.1:5010/Spans"
+    assert tracer.batch_size == 2
+    # a missing or malformed section disables tracing
+    assert Tracer.from_configuration("Ingestion System", None).enabled is False
+
+
+def test_spans_are_flushed_in_batches(monkeypatch):
+    posted = []
+    monkeypatch.setattr(requests, "post",
+                        lambda url, json, timeout: posted.append(json) or FakeResponse(200))
+
+    # long interval: the background flusher never fires during the test
+    tracer = Tracer("Production System", url="http://collector/Spans", batch_size=2, flush_interval=60)
+    for stage in ("receive", "validate", "classify"):
+        tracer.record("uuid-1", stage, 1.0, 2.0)
+    tracer.record(None, "classify", 1.0, 2.0)
+
+    assert tracer.flush() == 3
+    assert [len(batch["spans"]) for batch in posted] == [2, 1]
+    assert posted[0]["system"] == "Production System"
+    assert posted[0]["spans"][0] == {"trace_id": "uuid-1", "system": "Production System",
+                                     "stage": "receive", "start": 1.0, "end": 2.0}
+    tracer.close()
+
+
+def test_failed_batches_are_dropped(monkeypatch):
+    monkeypatch.setattr(requests, "post", lambda url, json, timeout: FakeResponse(503))
+
+    tracer = Tracer("Production System", url="http://collector/Spans", capacity=2, flush_interval=60)
+    for stage in ("receive", "validate", "classify"):
+        tracer.record("uuid-1", stage, 1.0, 2.0)
+
+    # the oldest span is overwritten, the failed batch is not retried
+    assert tracer.flush() == 0
+    assert tracer.dropped == 3
+    assert tracer.flush() == 0
+    tracer.close()
+
+
+def test_stage_durations_feed_the_metrics_even_when_disabled():
+    registry = MetricsRegistry()
+    tracer = Tracer("Preparation System", metrics=registry)
+
+    tracer.record(None, "feature_extract", 1.0, 1.25)
+
+    histogram = registry.histogram("stage_seconds", stage="feature_extract")
+    assert histogram.count == 1
+    assert abs(histogram.percentile(50) - 0.25) < 0.0025
@@ -0,0 +1,100 @@
+import pytest
+import requests
+from flask import Flask
+
+from common import transport
+
+
+class FakeResponse:
+    def __init__(self, status_code, retry_after=None):
+        self.status_code = status_code
+        self.headers = {} if retry_after is None else {"Retry-After": retry_after}
+
+
+def test_post_waits_while_the_receiver_is_busy(monkeypatch):
+    responses = [FakeResponse(503, "2"), FakeResponse(429, "1"), FakeResponse(200)]
+    sleeps = []
+    monkeypatch.setattr(requests, "post", lambda url, json, timeout: responses.pop(0))
+    monkeypatch.setattr(transport.time, "sleep", sleeps.append)
+
+    response = transport.post("http://preparation/send", json={"payload": "x"}, timeout=5)
+
+    assert response.status_code == 200
+    assert sleeps == [2.0, 1.0]
+
+
+def test_post_gives_up_after_max_wait(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(requests, "post", lambda url, json: FakeResponse(503, "not-a-number"))
+    monkeypatch.setattr(transport.time, "sleep", sleeps.append)
+
+    response = transport.post("http://preparation/send", json={}, max_wait=2.5)
+
+    assert response.status_code == 503
+    assert sleeps == [1.0, 1.0, 0.5]
+
+
+def test_busy_response_and_queue_limits():
+    app = Flask(__name__)
+    with app.test_request_context():
+        response, status = transport.busy_response(0.2)
+
+    assert status == 503
+    assert response.headers["Retry-After"] == "1"
+    assert transport.queue_limits({"max_size": 10, "retry_after": 3}) == (10, 3.0)
+    assert transport.queue_limits(None) == (0, transport.DEFAULT_RETRY_AFTER)
+
+
+def local_app():
+    app = Flask(__name__)
+    received = []
+
+    @app.route("/send", methods=["POST"])
+    def receive():
+        from flask import request
+        if len(received) == 0 and request.get_json().get("busy"):
+            received.append(None)
+            return transport.busy_response(1)
+        received.append((request.get_json(), request.remote_addr))
+        return {"status": "received"}, 200
+
+    return app, received
+
+
+def test_local_network_delivers_without_sockets(monkeypatch):
+    app, received = local_app()
+    network = transport.LocalNetwork({5002: "10.0.0.2"})
+    monkeypatch.setattr(requests, "post", lambda *args, **kwargs: pytest.fail("sent over HTTP"))
+    transport.use_local_network(network)
+    try:
+        assert transport.serve_locally(app, 5003)
+        response = transport.post("http://10.0.0.3:5003/send", json={"port": 5002, "message": "x"})
+    finally:
+        transport.use_local_network(None)
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "received"}
+    # the receiver sees the ip of the sending subsystem
+    assert received == [({"port": 5002, "message": "x"}, "10.0.0.2")]
+
+
+def test_local_network_retries_busy_receivers_and_falls_back_to_http(monkeypatch):
+    app, received = local_app()
+    sleeps = []
+    monkeypatch.setattr(transport.time, "sleep", sleeps.append)
+    monkeypatch.setattr(requests, "post", lambda url, json: FakeResponse(200))
+    transport.use_local_network(transport.LocalNetwork(serve_http=True))
+    try:
+        # the channels still start their server for the subsystems in other processes
+        assert not transport.serve_locally(app, 5003)
+        busy = transport.post("http://127.0.0.1:5003/send", json={"busy": True})
+        remote = transport.post("http://127.0.0.1:5004/send", json={})
+        with pytest.raises(ValueError):
+            transport.serve_locally(Flask(__name__), 5003)
+    finally:
+        transport.use_local_network(None)
+
+    assert busy.status_code == 200 and sleeps == [1.0]
+    assert received[1] == ({"busy": True}, "127.0.0.1")
+    assert remote.status_code == 200
+    assert not transport.serve_locally(app, 5003)
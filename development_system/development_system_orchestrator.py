@@ -1,3 +1,4 @@
+import logging
 import time
 import os
 
@@ -5,9 +6,11 @@ from development_system.configuration_parameters import ConfigurationParameters
 from development_system.json_handler_validator import JsonHandlerValidator
 from development_system.training.learning_sets import LearningSets
 from development_system.learning_sets_receiver_and_classifier_sender import LearningSetsReceiverAndClassifierSender
-from development_system.testing_orchestrator import TestingOrchestrator
-from development_system.training_orchestrator import TrainingOrchestrator
-from development_system.validation_orchestrator import ValidationOrchestrator
+from common.logger import configure_logging
+from common.profiler import LoopProfiler
+from common.report_renderer import ReportRenderer
+
+logger = logging.getLogger(__name__)
 
 
 class DevelopmentSystemOrchestrator:
@@ -17,11 +20,49 @@ class DevelopmentSystemOrchestrator:
         """Initialize the orchestrator."""
         self.basedir = os.path.dirname(os.path.abspath(__file__))
         ConfigurationParameters.load_configuration()
+        # structured logging, written in background
+        configure_logging("development_system", ConfigurationParameters.params.get("logging"))
         self.service_flag = ConfigurationParameters.params['service_flag']
         self.message_manager = LearningSetsReceiverAndClassifierSender(host='0.0.0.0', port=5004)
-        self.training_orchestrator = TrainingOrchestrator(basedir=self.basedir)
-        self.validation_orchestrator = ValidationOrchestrator(basedir=self.basedir)
-        self.testing_orchestrator = TestingOrchestrator(basedir=self.basedir)
+        # on-demand profiling of the development loop, from the parameters or on /profile
+        self.profiler = LoopProfiler("Development System", os.path.join(self.basedir, "data", "profiles"),
+                                     os.path.join(self.basedir, "configuration", "dev_parameters.json"))
+        self.profiler.mount(self.message_manager.app)
+        # reports are written in background; in service mode nobody reads them, so they can be skipped
+        self.report_renderer = ReportRenderer(
+            enabled=not (self.service_flag and ConfigurationParameters.params['skip_reports_in_service_mode']))
+        self._training_orchestrator = None
+        self._validation_orchestrator = None
+        self._testing_orchestrator = None
+
+
+    # The phase orchestrators import scikit-learn, so they are created on first use:
+    # the server starts receiving learning sets without waiting for those imports.
+    @property
+    def training_orchestrator(self):
+        """Returns the training orchestrator, creating it on first use."""
+        if self._training_orchestrator is None:
+            from development_system.training_orchestrator import TrainingOrchestrator
+            self._training_orchestrator = TrainingOrchestrator(basedir=self.basedir, report_renderer=self.report_renderer)
+        return self._training_orchestrator
+
+
+    @property
+    def validation_orchestrator(self):
+        """Returns the validation orchestrator, creating it on first use."""
+        if self._validation_orchestrator is None:
+            from development_system.validation_orchestrator import ValidationOrchestrator
+            self._validation_orchestrator = ValidationOrchestrator(basedir=self.basedir, report_renderer=self.report_renderer)
+        return self._validation_orchestrator
+
+
+    @property
+    def testing_orchestrator(self):
+        """Returns the testing orchestrator, creating it on first use."""
+        if self._testing_orchestrator is None:
+            from development_system.testing_orchestrator import TestingOrchestrator
+            self._testing_orchestrator = TestingOrchestrator(basedir=self.basedir, report_renderer=self.report_renderer)
+        return self._testing_orchestrator
 
 
     def develop(self):
@@ -30,13 +71,14 @@ class DevelopmentSystemOrchestrator:
         JsonHandlerValidator.validate_json(os.path.join(self.basedir, "responses", "user_responses.json"), os.path.join(self.basedir, "schemas", "user_responses_schema.json"))
         user_responses = JsonHandlerValidator.read_json_file(os.path.join(self.basedir, "responses", "user_responses.json"))
 
-        print("Service Flag: ", self.service_flag)
+        logger.info("Service Flag: %s", self.service_flag)
 
         # Start the server to receive learning sets if service_flag is True
         if self.service_flag:
             self.message_manager.start_server()
 
         while True:
+            self.profiler.tick()
             # ================================ Stop&Go interaction ================================
             # In user_responses.json there must be only one value equal to 1, the others must be 0
 
@@ -44,14 +86,14 @@ class DevelopmentSystemOrchestrator:
             if user_responses["Start"] == 1 or user_responses["ClassifierCheck"] == 1:
 
                 if user_responses["Start"] == 1:
-                    print("Start")
+                    logger.info("Start")
 
                     if self.service_flag:
-                        print("waiting for learning set...")
+                        logger.info("waiting for learning set...")
                         message = self.message_manager.get_learning_set()
-                        print("learning set received")
+                        logger.info("learning set received")
                         response = self.message_manager.send_timestamp(time.time(), "start")
-                        print("start timestamp sent")
+                        logger.info("start timestamp sent")
                         # convert the received string into a dictionary and the dictionary to a learning set object
                         learning_sets = LearningSets.from_dict(JsonHandlerValidator.string_to_dict(message['message']))
                     else:
@@ -61,7 +103,7 @@ class DevelopmentSystemOrchestrator:
 
                 set_average_hyperparams = True
                 self.training_orchestrator.train_classifier(set_average_hyperparams)
-                print("Average hyperparameters set")
+                logger.info("Average hyperparameters set")
                 # if service flag is true, automate next step 
                 if self.service_flag:
                     for key in user_responses.keys():
@@ -70,10 +112,10 @@ class DevelopmentSystemOrchestrator:
 
             # Find right number of iterations
             elif user_responses["IterationCheck"] == 1:
-                print("Iteration Check Phase")
+                logger.info("Iteration Check Phase")
                 set_average_hyperparams = False
                 self.training_orchestrator.train_classifier(set_average_hyperparams)
-                print("Number of iterations set")
+                logger.info("Number of iterations set")
                 # if service flag is true, automate next step 
                 if self.service_flag:
                     for key in user_responses.keys():
@@ -82,9 +124,9 @@ class DevelopmentSystemOrchestrator:
 
             # Validate the classifier with grid search
             elif user_responses["Validation"] == 1:
-                print("Validation phase")
+                logger.info("Validation phase")
                 result = self.validation_orchestrator.validation()
-                print("Validation phase done")
+                logger.info("Validation phase done")
                 # if service flag is true, automate next step 
                 if self.service_flag:
                     for key in user_responses.keys():
@@ -98,9 +140,9 @@ class DevelopmentSystemOrchestrator:
 
             # Test the classifier
             elif user_responses["GenerateTest"] == 1:
-                print("Test phase")
+                logger.info("Test phase")
                 result = self.testing_orchestrator.test()
-                print("Test phase done")
+                logger.info("Test phase done")
                 # if service flag is true, automate next step 
                 if self.service_flag:
                     for key in user_responses.keys():
@@ -114,32 +156,34 @@ class DevelopmentSystemOrchestrator:
             
             # Test resulst is ok
             elif user_responses["TestOK"] == 1:
-                print("TestOK")
+                logger.info("TestOK")
                 # SEND CLASSIFIER
                 if self.service_flag:
-                    print("Send classifier:")
+                    logger.info("Send classifier:")
                     response = self.message_manager.send_classifier()
-                    print("Response from Module Production System:", response)
+                    logger.info("Response from Module Production System: %s", response)
                     user_responses["TestOK"] = 2    # 2 for sending timestamp
 
             # Test results is not ok
             elif user_responses["TestOK"] == 0:
-                print("TestNotOK")
+                logger.info("TestNotOK")
                 # SEND CONFIGURATION
                 if self.service_flag:
-                    print("Send configuration")
+                    logger.info("Send configuration")
                     response = self.message_manager.send_configuration()
-                    print("Response from Module Messaging System:", response)
+                    logger.info("Response from Module Messaging System: %s", response)
                     user_responses["TestOK"] = 2    # 2 for sending timestamp
 
             # if service is false, the loop must end
             if not self.service_flag:
+                # the human operator reads the reports once the process ends
+                self.report_renderer.close()
                 break
 
             if user_responses["TestOK"] == 2:
-                print("End timestamp sent")
+                logger.info("End timestamp sent")
                 response = self.message_manager.send_timestamp(time.time(), "end")
-                print("Response from Module Service System:", response)
+                logger.info("Response from Module Service System: %s", response)
                 # restart from the beginning
                 for key in user_responses.keys():
                     user_responses[key] = 0
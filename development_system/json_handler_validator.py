@@ -1,8 +1,11 @@
 import json
+import logging
 from typing import Any
 
 from jsonschema import validate, ValidationError, SchemaError
 
+logger = logging.getLogger(__name__)
+
 
 class JsonHandlerValidator:
     """
@@ -60,7 +63,7 @@ class JsonHandlerValidator:
             return file_content
 
         except Exception as e:
-            print("Error to read file at path " + filepath + ": " + str(e))
+            logger.error("Error to read file at path %s: %s", filepath, e)
             return None
         
 
@@ -90,11 +93,16 @@ class JsonHandlerValidator:
             params["validation_tolerance"] = tolerance.get('validation_tolerance')
             params["test_tolerance"] = tolerance.get('test_tolerance')
             params["service_flag"] = file_content.get('service_flag')
+            params["random_state"] = file_content.get('random_state')
+            params["training_cache"] = file_content.get('training_cache', False)
+            params["training_backend"] = file_content.get('training_backend', {})
+            params["skip_reports_in_service_mode"] = file_content.get('skip_reports_in_service_mode', False)
+            params["logging"] = file_content.get('logging', {})
 
             return params
 
         except Exception as ex:
-            print("Error to read config file at path " + filepath + str(ex))
+            logger.error("Error to read config file at path %s: %s", filepath, ex)
             return None
 
 
@@ -119,14 +127,14 @@ class JsonHandlerValidator:
             if system_info:
                 return system_info
             else:
-                print(f"System '{system_name}' not found in the configuration file.")
+                logger.error("System '%s' not found in the configuration file.", system_name)
                 return None
 
         except FileNotFoundError:
-            print(f"Error: File '{filepath}' not found.")
+            logger.error("File '%s' not found.", filepath)
             return None
         except json.JSONDecodeError:
-            print("Error: Failed to parse JSON file.")
+            logger.error("Failed to parse JSON file.")
             return None
 
 
@@ -143,7 +151,7 @@ class JsonHandlerValidator:
                 json.dump(data, f, ensure_ascii=False, indent=4)
                 return True
         except Exception as e:
-            print("Error to save file at path " + filepath + ": " + str(e))
+            logger.error("Error to save file at path %s: %s", filepath, e)
             return False
         
         
@@ -1,5 +1,5 @@
-import json
 
+import logging
 from flask import Flask, request, jsonify
 import threading
 import requests
@@ -8,6 +8,10 @@ from typing import Optional, Dict
 import os
 
 from development_system.json_handler_validator import JsonHandlerValidator
+from common import transport
+from common.timestamp_emitter import TimestampEmitter
+
+logger = logging.getLogger(__name__)
 
 
 class LearningSetsReceiverAndClassifierSender:
@@ -29,6 +33,8 @@ class LearningSetsReceiverAndClassifierSender:
         self.port = port
         self.message_queue = Queue()
         self.basedir = os.path.dirname(os.path.abspath(__file__))
+        # Background sender of the timestamps, created on the first timestamp
+        self.timestamp_emitter = None
         # Define a route to receive messages
         @self.app.route('/send', methods=['POST'])
         def rcv_learning_sets():
@@ -56,7 +62,10 @@ class LearningSetsReceiverAndClassifierSender:
     def start_server(self):
         """
         Start the Flask server in a separate daemon thread.
+        In pipeline mode the messages are delivered in-process instead.
         """
+        if transport.serve_locally(self.app, self.port):
+            return
         thread = threading.Thread(target=self.app.run, kwargs={'host': self.host, 'port': self.port}, daemon=True)
         thread.start()
 
@@ -85,7 +94,8 @@ class LearningSetsReceiverAndClassifierSender:
         target_ip = endpoint["ip"]
         target_port = endpoint["port"]
 
-        with open(os.path.join(self.basedir, "data/classifier.sav"), "rb") as f:
+        # only the exported weights are sent, production never unpickles the classifier
+        with open(os.path.join(self.basedir, "data/classifier.npz"), "rb") as f:
             file_content = f.read()
             message = file_content.decode('latin1')
 
@@ -96,13 +106,14 @@ class LearningSetsReceiverAndClassifierSender:
         }
 
         try:
-            response = requests.post(url, json=payload)
+            # wait while the Production System is busy
+            response = transport.post(url, json=payload)
             if response.status_code == 200:
                 return response.json()
         except requests.RequestException as e:
-            print(f"Error sending message: {e}")
+            logger.error("Error sending message to %s: %s", url, e)
         except (UnicodeDecodeError, IOError) as e:
-            print(f"Error processing file: {e}")
+            logger.error("Error processing file: %s", e)
         return None
 
 
@@ -132,42 +143,26 @@ class LearningSetsReceiverAndClassifierSender:
             if response.status_code == 200:
                 return response.json()
         except requests.RequestException as e:
-            print(f"Error sending message: {e}")
+            logger.error("Error sending message to %s: %s", url, e)
 
         return None
     
 
     def send_timestamp(self, timestamp: float, status: str) -> bool:
         """
-        Send the timestamp to the Service Class.
+        Queue the timestamp for the Service Class, it is sent in background.
 
         :param timestamp: The timestamp to send
         :param status: The status of the timestamp
-        :return: True if the timestamp was sent successfully, False otherwise
+        :return: True if the timestamp was queued, False if it was dropped
         """
-        # Retrieve ip address and port of the service class
-        JsonHandlerValidator.validate_json(os.path.join(self.basedir, "configuration/netconf.json"), os.path.join(self.basedir, "schemas/netconf_schema.json"))
-        endpoint = JsonHandlerValidator.get_system_ip_address(os.path.join(self.basedir, "configuration/netconf.json"), "Service Class")
-        target_ip = endpoint["ip"]
-        target_port = endpoint["port"]
-
-        url = f"http://{target_ip}:{target_port}/Timestamp"
+        if self.timestamp_emitter is None:
+            # Retrieve ip address and port of the service class, only once
+            JsonHandlerValidator.validate_json(os.path.join(self.basedir, "configuration/netconf.json"), os.path.join(self.basedir, "schemas/netconf_schema.json"))
+            endpoint = JsonHandlerValidator.get_system_ip_address(os.path.join(self.basedir, "configuration/netconf.json"), "Service Class")
+            target_ip = endpoint["ip"]
+            target_port = endpoint["port"]
 
-        timestamp_message = {
-            "timestamp": timestamp,
-            "system": "Development System",
-            "status": status
-        }
-
-        packet = {
-            "port": 5004,
-            "message": json.dumps(timestamp_message)
-        }
+            self.timestamp_emitter = TimestampEmitter("Development System", f"http://{target_ip}:{target_port}/Timestamp", 5004)
 
-        try:
-            response = requests.post(url, json=packet)
-            if response.status_code == 200:
-                return True
-        except requests.RequestException as e:
-            print(f"Error sending timestamp: {e}")
-        return False
\ No newline at end of file
+        return self.timestamp_emitter.emit(timestamp, status)
\ No newline at end of file
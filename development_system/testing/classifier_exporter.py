@@ -0,0 +1,44 @@
+import numpy as np
+
+from common.drift import reference_statistics
+from development_system.training.classifier import Classifier
+
+
+class ClassifierExporter:
+    """Exports the deployable part of a trained classifier."""
+
+    @staticmethod
+    def export(classifier: Classifier, path: str, reference_features=None):
+        """
+            Writes the weight matrices, biases, activations, class list and feature names
+            of the classifier to a compact .npz file.
+            The file contains only plain arrays, so it can be loaded without unpickling code.
+            When reference features are given, the sketch of their distribution is exported too,
+            so that the production system can detect feature drift.
+
+            Args:
+                classifier (Classifier): The trained classifier to export.
+                path (str): The path of the .npz file.
+                reference_features (pd.DataFrame): The training features, one column per feature.
+        """
+        arrays = {
+            'activation': np.array(classifier.activation),
+            'out_activation': np.array(classifier.out_activation_),
+            'classes': np.asarray(classifier.classes_),
+        }
+        if hasattr(classifier, 'feature_names_in_'):
+            arrays['feature_names'] = np.asarray(classifier.feature_names_in_, dtype=str)
+
+        if reference_features is not None:
+            quantiles, proportions = reference_statistics(reference_features.to_numpy(dtype=float))
+            arrays['drift_features'] = np.asarray(reference_features.columns, dtype=str)
+            arrays['drift_quantiles'] = quantiles
+            arrays['drift_proportions'] = proportions
+
+        for i, (coef, intercept) in enumerate(zip(classifier.coefs_, classifier.intercepts_)):
+            arrays[f'coef_{i}'] = coef
+            arrays[f'intercept_{i}'] = intercept
+
+        # np.savez_compressed appends the .npz extension only when it is missing
+        with open(path, "wb") as f:
+            np.savez_compressed(f, **arrays)
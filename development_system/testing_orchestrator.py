@@ -1,4 +1,5 @@
 import glob
+import logging
 import os
 import random
 import shutil
@@ -8,17 +9,27 @@ from sklearn.metrics import log_loss
 from development_system.training.classifier import Classifier
 from development_system.configuration_parameters import ConfigurationParameters
 from development_system.json_handler_validator import JsonHandlerValidator
+from development_system.testing.classifier_exporter import ClassifierExporter
 from development_system.testing.testing_report_model import TestReportModel
 from development_system.testing.testing_report_view import TestReportView
 from development_system.training.learning_sets import LearningSets
+from common.report_renderer import ReportRenderer
+
+logger = logging.getLogger(__name__)
 
 
 class TestingOrchestrator:
     """Orchestrator of the testing"""
 
-    def __init__(self, basedir):
-        """Initialize the orchestrator."""
+    def __init__(self, basedir, report_renderer: ReportRenderer = None):
+        """
+            Initialize the orchestrator.
+            Args:
+                basedir (str): The base directory of the development system.
+                report_renderer (ReportRenderer): Renderer of the test report, by default it writes in the caller thread.
+        """
         self.basedir = basedir
+        self.report_renderer = report_renderer or ReportRenderer(asynchronous=False)
         self.winner_network = Classifier()
         self.test_report = None
         self.test_report_model = TestReportModel()
@@ -57,11 +68,16 @@ class TestingOrchestrator:
                 shutil.rmtree(file_path)
 
         joblib.dump(self.winner_network, os.path.join(self.basedir, "data", "classifier.sav"))
+        # Export the lightweight artefact deployed to the production system
+        # with the sketch of the training features, the reference of the drift monitor
+        training_features = LearningSets.extract_features_and_labels(LearningSets.get_training_set())[0]
+        ClassifierExporter.export(self.winner_network, os.path.join(self.basedir, "data", "classifier.npz"),
+                                  reference_features=training_features)
 
         # Generate test report
         model = self.test_report_model.generate_test_report(self.winner_network)
-        self.test_report_view.show_test_report(model)
-        print("Test report generated")
+        self.report_renderer.submit(self.test_report_view.show_test_report, model)
+        logger.info("Test report generated")
 
         # In service mode, randomize the test outcome
         if self.service_flag:
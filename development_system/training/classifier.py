@@ -1,6 +1,9 @@
 import numpy as np
 from sklearn.neural_network import MLPClassifier
 
+from development_system.configuration_parameters import ConfigurationParameters
+from development_system.training.training_backend import get_training_backend
+
 class Classifier(MLPClassifier):
     """Class representing a classifier."""
 
@@ -42,7 +45,8 @@ class Classifier(MLPClassifier):
 
     def fit(self, x, y):
         """
-           Configures the hidden layer sizes and trains the model.
+           Configures the hidden layer sizes and trains the model
+           with the configured training backend.
 
            Args:
                x: Features for training.
@@ -52,7 +56,8 @@ class Classifier(MLPClassifier):
                None
         """
         self.hidden_layer_sizes = np.full((self.num_layers,), self.num_neurons, dtype=int)
-        super().fit(x, y)
+        backend = get_training_backend(ConfigurationParameters.params.get('training_backend'))
+        backend.fit(self, x, y)
 
 
     def get_loss_curve(self):
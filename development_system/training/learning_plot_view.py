@@ -1,6 +1,3 @@
-import matplotlib
-import matplotlib.pyplot as plt
-matplotlib.use('Agg')
 import os
 
 class LearningPlotView:
@@ -13,11 +10,16 @@ class LearningPlotView:
             Parameters:
                 error_curve: MSE values for each iteration
         """
-        plt.plot(range(1, len(error_curve) + 1), error_curve, label="Training error")
-        plt.xlabel('# Iterations')
-        plt.ylabel('Mean Squared Error (MSE)')
+        # a standalone Figure (not pyplot) can be drawn by the report renderer thread and
+        # needs no backend; matplotlib is imported here so the orchestrator starts without it
+        from matplotlib.figure import Figure
+
+        fig = Figure()
+        ax = fig.add_subplot()
+        ax.plot(range(1, len(error_curve) + 1), error_curve, label="Training error")
+        ax.set_xlabel('# Iterations')
+        ax.set_ylabel('Mean Squared Error (MSE)')
 
         if not os.path.exists(os.path.join(os.getcwd(), "development_system", "results")):
             os.makedirs(os.path.join(os.getcwd(), "development_system", "results"))
-        plt.savefig(os.path.join(os.getcwd(), "development_system", "results", "learning_plot.png"))
-        plt.close()
\ No newline at end of file
+        fig.savefig(os.path.join(os.getcwd(), "development_system", "results", "learning_plot.png"))
\ No newline at end of file
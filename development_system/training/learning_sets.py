@@ -1,8 +1,12 @@
 import json
+import logging
 from typing import List
 import os
 import joblib
-import pandas as pd
+
+from common.lexicon import FEATURE_PREFIX, load_lexicon
+
+logger = logging.getLogger(__name__)
 
 class LearningSets:
     """
@@ -87,7 +91,17 @@ class LearningSets:
                   - features (pd.DataFrame): A DataFrame with the characteristics.
                   - labels (pd.Series): Series with the labels.
         """
+        import pandas as pd  # imported lazily, only needed once training starts
+
         df = pd.DataFrame(dataset)
+        if "tweet_length" in df.columns:
+            # the word_<term> counts are sparse: one column per vocabulary term, after tweet_length,
+            # with 0 for the terms absent from a session, so that every set has the same columns
+            columns = [column for column in df.columns if not column.startswith(FEATURE_PREFIX)]
+            position = columns.index("tweet_length") + 1
+            words = load_lexicon().feature_names
+            df = df.reindex(columns=columns[:position] + words + columns[position:])
+            df[words] = df[words].fillna(0).astype(int)
         # converts string labels in integers using map
         df["label"] = df["label"].map({
             "cyberbullying": 1,
@@ -109,7 +123,8 @@ class LearningSets:
         if not isinstance(data, dict):
             raise ValueError("Input data must be a dictionary.")
 
-        print(data["training_set"])
+        logger.debug("Learning sets received: %d training, %d validation, %d test sessions",
+                     len(data["training_set"]), len(data["validation_set"]), len(data["test_set"]))
         return cls(
             training_set=data["training_set"],
             validation_set=data["validation_set"],
@@ -8,6 +8,7 @@ from development_system.json_handler_validator import JsonHandlerValidator
 from development_system.training.learning_plot_model import LearningPlotModel
 from development_system.training.learning_sets import LearningSets
 from development_system.training.classifier import Classifier
+from development_system.training.training_cache import TrainingCache
 
 class Trainer:
     """Class responsible for training a classifier."""
@@ -15,6 +16,7 @@ class Trainer:
         """Initialize trainer parameters."""
         self.basedir = basedir
         self.classifier = Classifier()
+        self.cache = TrainingCache(os.path.join(basedir, "data", "training_cache"))
 
     
     def save_classifier(self, path: str):
@@ -88,8 +90,30 @@ class Trainer:
         training_labels = result[1]
 
         self.classifier.set_num_iterations(iterations)
-        # Train the classifier
-        self.classifier.fit(x=training_features, y=training_labels)
+        random_state = ConfigurationParameters.params.get('random_state')
+        if random_state is not None:
+            self.classifier.random_state = random_state
+
+        # A fit is reusable only if it is deterministic, i.e. the random state is fixed
+        cache_key = None
+        if ConfigurationParameters.params.get('training_cache') and self.classifier.random_state is not None:
+            cache_key = TrainingCache.make_key(TrainingCache.dataset_hash(training_set), {
+                'num_layers': self.classifier.get_num_layers(),
+                'num_neurons': self.classifier.get_num_neurons(),
+                'max_iter': self.classifier.get_num_iterations(),
+                'random_state': self.classifier.random_state,
+                'training_backend': ConfigurationParameters.params.get('training_backend')
+            })
+
+        cached_classifier = self.cache.load(cache_key) if cache_key is not None else None
+        if cached_classifier is not None:
+            # Restore the fitted state in place, as if the classifier had been trained
+            self.classifier.__dict__.update(cached_classifier.__dict__)
+        else:
+            # Train the classifier
+            self.classifier.fit(x=training_features, y=training_labels)
+            if cache_key is not None:
+                self.cache.store(cache_key, self.classifier)
 
         LearningPlotModel.set_loss_curve(self.classifier.get_loss_curve())
         return self.classifier
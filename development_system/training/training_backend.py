@@ -0,0 +1,89 @@
+import numpy as np
+from sklearn.neural_network import MLPClassifier
+from threadpoolctl import threadpool_limits
+
+
+class SklearnTrainingBackend:
+    """
+    Trains a classifier with the scikit-learn MLP implementation.
+
+    Compared to the plain MLPClassifier defaults it allows to choose the solver,
+    the floating point precision, the mini-batch size, early stopping and the
+    number of BLAS threads used by each fit.
+    """
+
+    def __init__(self, solver: str = "adam", dtype: str = "float64", num_threads: int = None,
+                 batch_size="auto", early_stopping: bool = False, n_iter_no_change: int = 10):
+        """
+        Initialize the backend.
+
+        Args:
+            solver (str): The weight optimization solver ("adam", "sgd" or "lbfgs").
+            dtype (str): The floating point precision of the training data ("float32" or "float64").
+            num_threads (int): Maximum number of BLAS threads, None to leave the default.
+            batch_size: The mini-batch size, or "auto".
+            early_stopping (bool): Whether to stop when the validation score stops improving.
+            n_iter_no_change (int): Number of iterations with no improvement before stopping.
+        """
+        self.solver = solver
+        self.dtype = np.dtype(dtype)
+        self.num_threads = num_threads
+        self.batch_size = batch_size
+        self.early_stopping = early_stopping
+        self.n_iter_no_change = n_iter_no_change
+
+
+    def fit(self, classifier: MLPClassifier, x, y):
+        """
+           Trains the classifier on the given data.
+
+           Args:
+               classifier (MLPClassifier): The classifier to train.
+               x: Features for training.
+               y: Target values for training.
+
+           Returns:
+               None
+        """
+        classifier.solver = self.solver
+        classifier.batch_size = self.batch_size
+        classifier.early_stopping = self.early_stopping
+        classifier.n_iter_no_change = self.n_iter_no_change
+
+        # keep the DataFrame (and so the feature names) when casting the features
+        x = x.astype(self.dtype) if hasattr(x, "astype") else np.asarray(x, dtype=self.dtype)
+
+        if self.num_threads is None:
+            MLPClassifier.fit(classifier, x, y)
+        else:
+            # pin the BLAS threads, so that parallel fits do not oversubscribe the cores
+            with threadpool_limits(limits=self.num_threads, user_api="blas"):
+                MLPClassifier.fit(classifier, x, y)
+
+        # lbfgs reports only the final loss: the learning curve is that single point
+        if not hasattr(classifier, "loss_curve_"):
+            classifier.loss_curve_ = [classifier.loss_]
+
+
+TRAINING_BACKENDS = {
+    "sklearn": SklearnTrainingBackend,
+}
+
+
+def get_training_backend(configuration: dict = None):
+    """
+        Build the training backend described by the configuration.
+
+        Args:
+            configuration (dict): The "training_backend" section of the configuration parameters.
+
+        Returns:
+            The training backend instance.
+        Raises:
+            ValueError: If the backend name is unknown.
+    """
+    configuration = dict(configuration or {})
+    name = configuration.pop("name", "sklearn")
+    if name not in TRAINING_BACKENDS:
+        raise ValueError(f"Unknown training backend: {name}")
+    return TRAINING_BACKENDS[name](**configuration)
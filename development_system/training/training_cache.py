@@ -0,0 +1,101 @@
+import hashlib
+import json
+import logging
+import os
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+
+class TrainingCache:
+    """
+    Content-addressed on-disk cache of fitted classifiers.
+
+    A fit is fully determined by the training data and the fit parameters
+    (layers, neurons, iterations, random state), so the fitted classifier
+    and its loss curve are stored under the hash of exactly that tuple.
+    """
+
+    def __init__(self, cache_dir: str):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir (str): The folder where the cached fits are stored.
+        """
+        self.cache_dir = cache_dir
+
+
+    @staticmethod
+    def dataset_hash(dataset: list) -> str:
+        """
+            Compute the content hash of a dataset.
+
+            Args:
+                dataset (list): A list of dictionaries representing the dataset.
+
+            Returns:
+                str: The hex digest identifying the dataset.
+        """
+        content = json.dumps(dataset, sort_keys=True, default=str)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+    @staticmethod
+    def make_key(dataset_hash: str, fit_params: dict) -> str:
+        """
+            Compute the cache key of a fit.
+
+            Args:
+                dataset_hash (str): The hash of the training set.
+                fit_params (dict): The parameters which determine the fit.
+
+            Returns:
+                str: The hex digest used as cache key.
+        """
+        content = json.dumps({"dataset": dataset_hash, "fit_params": fit_params}, sort_keys=True, default=str)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".sav")
+
+
+    def load(self, key: str):
+        """
+            Load a fitted classifier from the cache.
+
+            Args:
+                key (str): The cache key of the fit.
+
+            Returns:
+                The cached classifier, or None if the fit is not cached.
+        """
+        path = self._path(key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            entry = joblib.load(path)
+        except Exception as e:
+            logger.warning("Error to read cached fit at path %s: %s", path, e)
+            return None
+        classifier = entry["classifier"]
+        classifier.loss_curve_ = entry["loss_curve"]
+        return classifier
+
+
+    def store(self, key: str, classifier):
+        """
+            Store a fitted classifier and its loss curve in the cache.
+
+            Args:
+                key (str): The cache key of the fit.
+                classifier (Classifier): The fitted classifier.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        # write to a temporary file first, so that a crash never leaves a truncated entry
+        tmp_path = path + ".tmp"
+        joblib.dump({"classifier": classifier, "loss_curve": list(classifier.get_loss_curve())}, tmp_path)
+        os.replace(tmp_path, path)
@@ -1,3 +1,4 @@
+import logging
 import math
 import os
 import random
@@ -9,16 +10,25 @@ from development_system.json_handler_validator import JsonHandlerValidator
 from development_system.training.learning_plot_model import LearningPlotModel
 from development_system.training.learning_plot_view import LearningPlotView
 from development_system.training.trainer import Trainer
+from common.report_renderer import ReportRenderer
+
+logger = logging.getLogger(__name__)
 
 
 class TrainingOrchestrator:
     """Orchestrator of the training"""
 
-    def __init__(self, basedir):
-        """Initialize the orchestrator."""
+    def __init__(self, basedir, report_renderer: ReportRenderer = None):
+        """
+            Initialize the orchestrator.
+            Args:
+                basedir (str): The base directory of the development system.
+                report_renderer (ReportRenderer): Renderer of the learning plot, by default it draws in the caller thread.
+        """
         self.trainer = Trainer(basedir=basedir)
         self.service_flag = ConfigurationParameters.params['service_flag']
         self.basedir = basedir
+        self.report_renderer = report_renderer or ReportRenderer(asynchronous=False)
 
 
     def train_classifier(self, set_avg_hyperparams):
@@ -43,17 +53,17 @@ class TrainingOrchestrator:
                     classifier = self.trainer.train(iterations)
                     # Generate learning report
                     loss_curve = LearningPlotModel.get_loss_curve()
-                    LearningPlotView.show_learning_plot(loss_curve)
+                    self.report_renderer.submit(LearningPlotView.show_learning_plot, loss_curve)
                     # Simulate user decision on learning plot
                     choice = random.randint(0, 4)
                     if choice == 0:  # 20%
-                        print("ITERATIONS OK")
+                        logger.info("ITERATIONS OK")
                         break
                     if choice <= 2:  # 40%
-                        print("INCREASE ITERATIONS BY 1/3")
+                        logger.info("INCREASE ITERATIONS BY 1/3")
                         iterations = math.ceil(iterations * (1 + 1 / 3))
                     else:  # 40%
-                        print("DECREASE ITERATIONS BY 1/3")
+                        logger.info("DECREASE ITERATIONS BY 1/3")
                         iterations = math.ceil(iterations * (1 - 1 / 3))
             
             else:
@@ -61,8 +71,8 @@ class TrainingOrchestrator:
                 classifier = self.trainer.train(iterations)
                 # Generate learning report
                 loss_curve = LearningPlotModel.get_loss_curve()
-                LearningPlotView.show_learning_plot(loss_curve)
+                self.report_renderer.submit(LearningPlotView.show_learning_plot, loss_curve)
 
-            print("Learning report generated")
-            print("number of iterations = ", iterations)
-            print("training error =", classifier.get_training_error())
\ No newline at end of file
+            logger.info("Learning report generated")
+            logger.info("number of iterations = %d", iterations)
+            logger.info("training error = %s", classifier.get_training_error())
\ No newline at end of file
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from development_system.configuration_parameters import ConfigurationParameters
+from development_system.testing.classifier_exporter import ClassifierExporter
+from development_system.training.classifier import Classifier
+from production_system.mlp_predictor import MlpPredictor
+
+
+def test_exported_classifier_predicts_like_the_original(tmp_path: Path):
+    ConfigurationParameters.params = {"training_backend": {}}
+    x = pd.DataFrame({"f1": [float(i % 2) for i in range(30)], "f2": [float(i % 5) for i in range(30)]})
+    y = pd.Series([(i % 2) ^ (i % 5 == 0) for i in range(30)])
+
+    classifier = Classifier()
+    classifier.set_num_layers(2)
+    classifier.set_num_neurons(4)
+    classifier.set_num_iterations(50)
+    classifier.random_state = 0
+    classifier.fit(x, y)
+
+    path = tmp_path / "classifier.npz"
+    ClassifierExporter.export(classifier, str(path))
+
+    # the artefact holds plain arrays only
+    with np.load(path, allow_pickle=False) as artefact:
+        assert "coef_2" in artefact.files
+        assert artefact["feature_names"].tolist() == ["f1", "f2"]
+
+    predictor = MlpPredictor.load(path)
+    assert predictor.feature_names == ["f1", "f2"]
+    assert list(predictor.predict(x.to_numpy())) == list(classifier.predict(x))
+
+
+def test_drift_reference_is_exported_with_the_classifier(tmp_path: Path):
+    ConfigurationParameters.params = {"training_backend": {}}
+    x = pd.DataFrame({"f1": [float(i % 2) for i in range(30)], "f2": [float(i) for i in range(30)]})
+    y = pd.Series([i % 2 for i in range(30)])
+
+    classifier = Classifier()
+    classifier.set_num_layers(1)
+    classifier.set_num_neurons(2)
+    classifier.set_num_iterations(10)
+    classifier.fit(x, y)
+
+    path = tmp_path / "classifier.npz"
+    ClassifierExporter.export(classifier, str(path), reference_features=x)
+
+    with np.load(path, allow_pickle=False) as artefact:
+        assert artefact["drift_features"].tolist() == ["f1", "f2"]
+        assert artefact["drift_quantiles"].shape == (2, 101)
+        assert artefact["drift_quantiles"][1, -1] == 29.0
+        assert np.allclose(artefact["drift_proportions"].sum(axis=1), 1.0)
@@ -20,6 +20,21 @@ def test_extract_features_and_labels_maps_labels():
     assert list(y.values) == [1, 0]
 
 
+def test_extract_features_makes_the_sparse_word_counts_dense():
+    from common.lexicon import load_lexicon
+
+    words = load_lexicon().feature_names
+    dataset = [
+        {"uuid": "1", "label": "cyberbullying", "tweet_length": 4, words[1]: 2, "event_foul": 1},
+        {"uuid": "2", "label": "not_cyberbullying", "tweet_length": 3, "event_foul": 0},
+    ]
+    X, _ = LearningSets.extract_features_and_labels(dataset)
+    # every term has its column, in vocabulary order after tweet_length, 0 when absent
+    assert list(X.columns) == ["tweet_length"] + words + ["event_foul"]
+    assert list(X[words[1]]) == [2, 0]
+    assert list(X[words[0]]) == [0, 0]
+
+
 def test_from_dict_rejects_non_dict():
     with pytest.raises(ValueError):
         LearningSets.from_dict([1, 2, 3])  # type: ignore
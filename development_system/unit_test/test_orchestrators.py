@@ -186,10 +186,16 @@ def test_testing_orchestrator_uses_winner_network_index(monkeypatch, tmp_path: P
         {"uuid": "2", "f1": 1.0, "label": "not_cyberbullying"},
     ]
     monkeypatch.setattr(to.LearningSets, "get_test_set", lambda: test_set)
+    monkeypatch.setattr(to.LearningSets, "get_training_set", lambda: test_set)
 
     # Avoid report UI
     monkeypatch.setattr(to.TestReportView, "show_test_report", lambda self, model: None)
 
+    # Capture the exported deployment artefact
+    exports = []
+    monkeypatch.setattr(to.ClassifierExporter, "export",
+                        lambda obj, path, reference_features=None: exports.append((obj, path, reference_features)))
+
     # Avoid filesystem cleanup complexity: return a couple of paths and stub out os.remove
     monkeypatch.setattr(to.glob, "glob", lambda pattern: [str(basedir / "data" / "classifier7.sav"), str(basedir / "data" / "classifier5.sav")])
     monkeypatch.setattr(to.os.path, "isfile", lambda p: True)
@@ -206,4 +212,7 @@ def test_testing_orchestrator_uses_winner_network_index(monkeypatch, tmp_path: P
     assert any(p.endswith("classifier7.sav") for p in loads)
     assert removed  # some cleanup attempted
     assert any(path.endswith(os.path.join("data", "classifier.sav")) for _, path in dumps)
+    assert [(obj, path) for obj, path, _ in exports] == [(dummy, os.path.join(str(basedir), "data", "classifier.npz"))]
+    # the training features are exported as the drift reference
+    assert list(exports[0][2].columns) == ["f1"]
     assert dummy.test_error is not None
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import development_system.training.training_backend as tb
+from development_system.configuration_parameters import ConfigurationParameters
+from development_system.training.classifier import Classifier
+from development_system.training.training_backend import SklearnTrainingBackend, get_training_backend
+
+
+def _data():
+    x = pd.DataFrame({"f1": [float(i % 2) for i in range(20)], "f2": [float(i % 3) for i in range(20)]})
+    y = pd.Series([i % 2 for i in range(20)])
+    return x, y
+
+
+def test_get_training_backend_from_configuration():
+    backend = get_training_backend({"name": "sklearn", "dtype": "float32", "num_threads": 1, "batch_size": 8})
+    assert isinstance(backend, SklearnTrainingBackend)
+    assert backend.dtype == np.float32
+    assert backend.num_threads == 1
+    assert backend.batch_size == 8
+
+    # no configuration means the plain scikit-learn defaults
+    assert get_training_backend(None).solver == "adam"
+
+    with pytest.raises(ValueError):
+        get_training_backend({"name": "unknown"})
+
+
+def test_float32_fit_preserves_loss_contract(monkeypatch):
+    ConfigurationParameters.params = {"training_backend": {"dtype": "float32", "num_threads": 1,
+                                                           "early_stopping": True, "n_iter_no_change": 2}}
+    calls = []
+    real_limits = tb.threadpool_limits
+
+    def recording_limits(limits, user_api):
+        calls.append((limits, user_api))
+        return real_limits(limits=limits, user_api=user_api)
+
+    monkeypatch.setattr(tb, "threadpool_limits", recording_limits)
+
+    classifier = Classifier()
+    classifier.set_num_layers(1)
+    classifier.set_num_neurons(3)
+    classifier.set_num_iterations(5)
+    classifier.random_state = 0
+    x, y = _data()
+    classifier.fit(x, y)
+
+    assert calls == [(1, "blas")]
+    assert classifier.coefs_[0].dtype == np.float32
+    assert classifier.early_stopping is True
+    assert len(classifier.get_loss_curve()) == classifier.n_iter_
+    assert classifier.get_training_error() == classifier.loss_
+    assert list(classifier.feature_names_in_) == ["f1", "f2"]
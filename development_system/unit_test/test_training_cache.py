@@ -0,0 +1,93 @@
+from pathlib import Path
+
+import pytest
+
+from development_system.configuration_parameters import ConfigurationParameters
+from development_system.training.learning_sets import LearningSets
+from development_system.training.trainer import Trainer
+from development_system.training.training_cache import TrainingCache
+
+
+TRAINING_SET = [
+    {"uuid": str(i), "f1": float(i % 2), "f2": float(i % 3), "label": "cyberbullying" if i % 2 else "not_cyberbullying"}
+    for i in range(20)
+]
+
+
+def _params(training_cache=True, random_state=0):
+    return {
+        "service_flag": False,
+        "min_layers": 1,
+        "max_layers": 1,
+        "step_layers": 1,
+        "min_neurons": 2,
+        "max_neurons": 2,
+        "step_neurons": 1,
+        "validation_tolerance": 0.1,
+        "test_tolerance": 0.1,
+        "random_state": random_state,
+        "training_cache": training_cache,
+    }
+
+
+def test_key_depends_on_dataset_and_fit_params():
+    h1 = TrainingCache.dataset_hash(TRAINING_SET)
+    h2 = TrainingCache.dataset_hash(TRAINING_SET[:-1])
+    params = {"num_layers": 1, "num_neurons": 2, "max_iter": 5, "random_state": 0}
+
+    assert h1 == TrainingCache.dataset_hash(list(TRAINING_SET))
+    assert h1 != h2
+    assert TrainingCache.make_key(h1, params) == TrainingCache.make_key(h1, dict(params))
+    assert TrainingCache.make_key(h1, params) != TrainingCache.make_key(h2, params)
+    assert TrainingCache.make_key(h1, params) != TrainingCache.make_key(h1, {**params, "max_iter": 6})
+
+
+def test_load_missing_key_returns_none(tmp_path: Path):
+    assert TrainingCache(str(tmp_path)).load("missing") is None
+
+
+def test_trainer_reuses_cached_fit(monkeypatch, tmp_path: Path):
+    ConfigurationParameters.params = _params()
+    monkeypatch.setattr(LearningSets, "get_training_set", lambda: TRAINING_SET)
+
+    first = Trainer(basedir=str(tmp_path))
+    first.set_hyperparameters(1, 2)
+    first.train(5)
+    assert len(list((tmp_path / "data" / "training_cache").glob("*.sav"))) == 1
+
+    second = Trainer(basedir=str(tmp_path))
+    second.set_hyperparameters(1, 2)
+    fits = []
+    monkeypatch.setattr(second.classifier, "fit", lambda x, y: fits.append((x, y)))
+    classifier = second.train(5)
+
+    assert fits == []
+    assert classifier is second.classifier
+    assert classifier.get_loss_curve() == first.classifier.get_loss_curve()
+    assert classifier.get_training_error() == first.classifier.get_training_error()
+
+
+@pytest.mark.parametrize("solver", ["adam", "sgd", "lbfgs"])
+def test_trainer_trains_with_every_solver(monkeypatch, tmp_path: Path, solver):
+    ConfigurationParameters.params = {**_params(), "training_backend": {"solver": solver}}
+    monkeypatch.setattr(LearningSets, "get_training_set", lambda: TRAINING_SET)
+
+    trainer = Trainer(basedir=str(tmp_path))
+    trainer.set_hyperparameters(1, 2)
+    classifier = trainer.train(5)
+
+    # the learning plot and the cache need the loss curve, lbfgs included
+    loss_curve = list(classifier.get_loss_curve())
+    assert loss_curve and loss_curve[-1] == classifier.get_training_error()
+    assert len(list((tmp_path / "data" / "training_cache").glob("*.sav"))) == 1
+
+
+def test_trainer_skips_cache_without_random_state(monkeypatch, tmp_path: Path):
+    ConfigurationParameters.params = _params(random_state=None)
+    monkeypatch.setattr(LearningSets, "get_training_set", lambda: TRAINING_SET)
+
+    trainer = Trainer(basedir=str(tmp_path))
+    trainer.set_hyperparameters(1, 2)
+    trainer.train(5)
+
+    assert not (tmp_path / "data" / "training_cache").exists()
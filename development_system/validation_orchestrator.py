@@ -1,5 +1,6 @@
 import copy
 import itertools
+import logging
 import os
 import random
 
@@ -9,16 +10,25 @@ from development_system.configuration_parameters import ConfigurationParameters
 from development_system.training.trainer import Trainer
 from development_system.validation.validation_report_model import ValidationReportModel
 from development_system.validation.validation_report_view import ValidationReportView
+from common.report_renderer import ReportRenderer
+
+logger = logging.getLogger(__name__)
 
 
 class ValidationOrchestrator:
     """Orchestrator of the validation"""
 
-    def __init__(self, basedir):
-        """Initialize the orchestrator."""
+    def __init__(self, basedir, report_renderer: ReportRenderer = None):
+        """
+            Initialize the orchestrator.
+            Args:
+                basedir (str): The base directory of the development system.
+                report_renderer (ReportRenderer): Renderer of the validation report, by default it writes in the caller thread.
+        """
         self.basedir = basedir
         self.service_flag = ConfigurationParameters.params['service_flag']
         self.validation_report_model = ValidationReportModel()
+        self.report_renderer = report_renderer or ReportRenderer(asynchronous=False)
 
     def validation(self):
         """
@@ -55,8 +65,8 @@ class ValidationOrchestrator:
 
         # Generate validation report
         model = self.validation_report_model.get_model()
-        ValidationReportView.show_validation_report(model)
-        print("Validation report generated")
+        self.report_renderer.submit(ValidationReportView.show_validation_report, model)
+        logger.info("Validation report generated")
 
         # In service mode, randomize the validation outcome
         if self.service_flag:
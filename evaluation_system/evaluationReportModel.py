@@ -2,6 +2,7 @@
 Author: Rossana Antonella Sacco
 """
 
+import logging
 import os
 import json
 from typing import List, Optional, Tuple
@@ -9,6 +10,8 @@ from typing import List, Optional, Tuple
 from evaluation_system.label import Label
 from evaluation_system.evaluationReport import EvaluationReport
 
+logger = logging.getLogger(__name__)
+
 class EvaluationReportModel:
     """
     Creates and saves to a JSON file the evaluation report of the Evaluation System.
@@ -55,17 +58,23 @@ class EvaluationReportModel:
             return 0
 
     def create_evaluation_report(self, classifier_labels: List[Label], expert_labels: List[Label],
-                                 total_errors: int, max_consecutive_errors: int) -> Tuple[bool,Optional[EvaluationReport]]:
+                                 total_errors: int, max_consecutive_errors: int,
+                                 actual_total_errors: Optional[int] = None,
+                                 actual_max_consecutive_errors: Optional[int] = None) -> Tuple[bool,Optional[EvaluationReport]]:
         """
         Create an evaluation report with the given classifier and expert labels, calculate metrics,
         and save it to a JSON file.
 
+        :param actual_total_errors: Errors already computed (e.g. by the SlidingWindowEvaluator), computed if None.
+        :param actual_max_consecutive_errors: Consecutive errors already computed, computed if None.
         :return: True if the evaluation report was successfully saved, False otherwise.
         """
         
         # Compute actual errors
-        actual_total_errors = self.compute_actual_total_errors(classifier_labels, expert_labels)
-        actual_max_consecutive_errors = self.compute_actual_max_consecutive_errors(classifier_labels, expert_labels)
+        if actual_total_errors is None:
+            actual_total_errors = self.compute_actual_total_errors(classifier_labels, expert_labels)
+        if actual_max_consecutive_errors is None:
+            actual_max_consecutive_errors = self.compute_actual_max_consecutive_errors(classifier_labels, expert_labels)
 
         # DTO Creation
         evaluation_report = EvaluationReport(
@@ -93,7 +102,7 @@ class EvaluationReportModel:
 
             return True, evaluation_report           
         except Exception as e:
-            print(f"Error saving evaluation report: {e}")
+            logger.error("Error saving evaluation report: %s", e)
             return False
 
     def compute_actual_total_errors(self, classifier_labels: List[Label], expert_labels: List[Label]) -> int:
@@ -5,8 +5,10 @@ Author: Rossana Antonella Sacco
 import os
 import time
 import json
+import logging
 import jsonschema
 import random
+from collections import deque
 
 
 from evaluation_system.evaluationSystemParameters import EvaluationSystemParameters
@@ -14,6 +16,26 @@ from evaluation_system.labelReceiverAndConfigurationSender import LabelReceiverA
 from evaluation_system.labelBuffer import LabelBuffer
 from evaluation_system.evaluationReportModel import EvaluationReportModel
 from evaluation_system.evaluationReportView import EvaluationReportView
+from evaluation_system.slidingWindowEvaluator import SlidingWindowEvaluator
+from common.report_renderer import ReportRenderer
+from common import transport
+from common.logger import configure_logging
+from common.metrics import MetricsRegistry
+from common.profiler import LoopProfiler
+from common.tracing import Tracer
+from common.file_watcher import FileWatcher
+
+# Maximum number of received labels stored in a single transaction
+LABEL_BATCH_SIZE = 100
+# Seconds the label intake waits before checking the verdict again, while a verdict is pending
+VERDICT_CHECK_INTERVAL = 0.1
+# Seconds after which the verdict file is read again even if no change was notified
+VERDICT_RECHECK_INTERVAL = 60
+# Complete windows kept while a verdict is pending, when "max_pending_windows" is not configured;
+# beyond them the oldest is skipped, so the memory stays bounded if the human operator never answers
+DEFAULT_MAX_PENDING_WINDOWS = 100
+
+logger = logging.getLogger(__name__)
 
 class EvaluationSystemOrchestrator:
     """
@@ -31,13 +53,57 @@ class EvaluationSystemOrchestrator:
         self.report_view = EvaluationReportView()
 
         EvaluationSystemParameters.loadParameters(self.basedir)
+        # Structured logging, written in background
+        configure_logging("evaluation_system", EvaluationSystemParameters.LOCAL_PARAMETERS.get("logging"))
         # Check if service mode is enabled
         self.service = EvaluationSystemParameters.LOCAL_PARAMETERS.get("service", False)
+        # The report is shown in background, and not at all in service mode if so configured
+        skip_reports = EvaluationSystemParameters.LOCAL_PARAMETERS.get("skip_reports_in_service_mode", False)
+        self.report_renderer = ReportRenderer(enabled=not (self.service and skip_reports))
+
+        # Runtime metrics, exposed on /metrics, and per-session spans
+        self.metrics = MetricsRegistry()
+        self.tracer = Tracer.from_configuration("Evaluation System",
+                                                EvaluationSystemParameters.LOCAL_PARAMETERS.get("tracing"),
+                                                metrics=self.metrics)
 
         self.labels_buffer = LabelBuffer()
-        self.communication_manager = LabelReceiverAndConfigurationSender(basedir=self.basedir)
+        max_queue_size, retry_after = transport.queue_limits(
+            EvaluationSystemParameters.LOCAL_PARAMETERS.get("receive_queue"))
+        self.communication_manager = LabelReceiverAndConfigurationSender(basedir=self.basedir, tracer=self.tracer,
+                                                                         metrics=self.metrics,
+                                                                         max_queue_size=max_queue_size,
+                                                                         retry_after=retry_after)
+        # On-demand profiling of the label intake, from the parameters or on /profile
+        self.profiler = LoopProfiler("Evaluation System", os.path.join(self.basedir, "data", "profiles"),
+                                     os.path.join(self.basedir, EvaluationSystemParameters.LOCAL_PARAMETERS_PATH))
+        self.profiler.mount(self.communication_manager.app)
         self.report_model = EvaluationReportModel(self.basedir)
 
+        # The verdict of the human operator is read as soon as the evaluation file changes
+        self.verdict_watcher = FileWatcher(
+            os.path.join(self.basedir, "human_operator_workspace", "classifier_evaluation.json"),
+            mode=EvaluationSystemParameters.LOCAL_PARAMETERS.get("verdict_watcher", "auto"),
+            poll_interval=EvaluationSystemParameters.LOCAL_PARAMETERS.get("verdict_poll_interval", 1.0))
+        # Labels for the next window are stored while the human operator decides
+        self.collect_while_waiting = EvaluationSystemParameters.LOCAL_PARAMETERS.get(
+            "collect_labels_while_waiting", True)
+
+        # Labels are paired by uuid and evaluated incrementally, over windows of min_number_labels pairs
+        self.evaluator = SlidingWindowEvaluator(
+            EvaluationSystemParameters.min_number_labels,
+            step=EvaluationSystemParameters.LOCAL_PARAMETERS.get("window_step"))
+        # Windows completed while the human operator decides wait for their report, up to a bound
+        self.max_pending_windows = EvaluationSystemParameters.LOCAL_PARAMETERS.get(
+            "max_pending_windows", DEFAULT_MAX_PENDING_WINDOWS)
+        # The labels buffered before a restart enter the window again, in arrival order
+        self.pending_windows = deque()
+        for label in self.labels_buffer.get_all_labels():
+            window = self.evaluator.add(label)
+            if window is not None:
+                self._queue_window(window)
+        self._delete_dropped_labels()
+
     def _get_classifier_evaluation(self) -> tuple[bool, dict | None]:
         """
         Retrieve and validate the classifier evaluation status from the workspace file.
@@ -59,22 +125,22 @@ class EvaluationSystemOrchestrator:
                     schema = json.load(schema_file)
                     jsonschema.validate(data, schema)
             else:
-                print(f"Warning: Schema file not found at {schema_path}")
+                logger.warning("Schema file not found at %s", schema_path)
 
             return True, data
             
         except jsonschema.ValidationError as e:
-            print(f"Invalid evaluation file format: {e.message}")
+            logger.warning("Invalid evaluation file format: %s", e.message)
             return False, None
         except Exception as e:
-            print(f"Error reading evaluation file: {e}")
+            logger.error("Error reading evaluation file: %s", e)
             return False, None
 
     def evaluate(self):
         """
         Main loop of the Evaluation System.
         """
-        print("Evaluation System Orchestrator started.")
+        logger.info("Evaluation System Orchestrator started.")
         
         self.communication_manager.start_server()
 
@@ -86,60 +152,49 @@ class EvaluationSystemOrchestrator:
                     # =================================================================
                     # STATE 1: LABEL COLLECTION (File does not exist)
                     # =================================================================
-                    print("\n[State] Collecting Labels...")
+                    logger.info("[State] Collecting Labels...")
 
-                    while True:
-                        
-                        label = self.communication_manager.get_label()
-                        
-                        self.labels_buffer.save_label(label)
-                        print(f" -> Label stored: {label.uuid} (Expert={label.expert})")
+                    while not self.pending_windows:
+                        self._collect_labels()
 
-                            # Check if we have enough labels to create a report 
-                        num_clf = self.labels_buffer.get_num_classifier_labels()
-                        num_exp = self.labels_buffer.get_num_expert_labels()
-                        min_req = EvaluationSystemParameters.min_number_labels
+                    window = self.pending_windows.popleft()
 
-                        if num_clf >= min_req and num_exp >= min_req:
-                            print("[State] Sufficient number of labels reached.")
-                            break
-                    
-                    # Retrieve labels for report
-                    c_labels = self.labels_buffer.get_classifier_labels(min_req)
-                    e_labels = self.labels_buffer.get_expert_labels(min_req)
+                    logger.info("[State] Sufficient number of labels reached.")
 
                     # Create the Report
                     # This method also saves the "classifier_evaluation.json" file with status "waiting_for_evaluation"
                     success, report_obj = self.report_model.create_evaluation_report(
-                        c_labels, e_labels,
+                        window.classifier_labels, window.expert_labels,
                         EvaluationSystemParameters.total_errors,
-                        EvaluationSystemParameters.max_consecutive_errors
+                        EvaluationSystemParameters.max_consecutive_errors,
+                        actual_total_errors=window.total_errors,
+                        actual_max_consecutive_errors=window.max_consecutive_errors
                     )
                     
                     if success and report_obj is not None:
-                        print("[Info] Evaluation Report created.")
-                        self.report_view.show_evaluation_report(report_obj)
-                        # Clear buffer for next cycle
-                        self.labels_buffer.delete_labels(min_req)
-                        print("[Info] Buffer cleared.")
+                        logger.info("Evaluation Report created.")
+                        self.report_renderer.submit(self.report_view.show_evaluation_report, report_obj)
+                        # Clear the labels leaving the window
+                        self.labels_buffer.delete_labels_by_uuid(window.evicted_uuids)
+                        logger.info("Buffer cleared.")
 
                         # --- SERVICE MODE HANDLING (AUTOMATIC TEST) ---
                         if self.service:
-                            print("[Auto-Test] Simulating Human Evaluation...")
+                            logger.info("[Auto-Test] Simulating Human Evaluation...")
                             
                             is_good = random.random() > 0.14
                             
                             verdict = "good" if is_good else "bad"
-                            print(f"[Auto-Test] Verdict: {verdict}")
+                            logger.info("[Auto-Test] Verdict: %s", verdict)
 
                             if verdict == "bad":
                                 self.communication_manager.send_configuration()
-                                print("[Auto-Test] Configuration sent.")
+                                logger.info("[Auto-Test] Configuration sent.")
                             
                             
                             self._remove_evaluation_file()
                             
-                        print("[Info] Waiting for Human Operator action...")
+                        logger.info("Waiting for Human Operator action...")
 
                 else:
                     # =================================================================
@@ -149,48 +204,96 @@ class EvaluationSystemOrchestrator:
 
                     if status == "waiting_for_evaluation":
                         
-                        print("Status: Waiting for Human Operator...", end="\r")
-                        time.sleep(5) # Wait 5 seconds before checking again
+                        logger.info("Status: Waiting for Human Operator...")
+                        # Wait for the file to change, storing the labels of the next window meanwhile
+                        if self.collect_while_waiting:
+                            while not self.verdict_watcher.wait(0):
+                                self._collect_labels(timeout=VERDICT_CHECK_INTERVAL)
+                        else:
+                            self.verdict_watcher.wait(VERDICT_RECHECK_INTERVAL)
                     
                     elif status == "good":
                         # Human operator approved
-                        print("\n[Verdict] Human Operator: GOOD")
+                        logger.info("[Verdict] Human Operator: GOOD")
                         
                         # Remove the file to return to STATE 1 (Collection)
                         self._remove_evaluation_file()
                     
                     elif status == "bad":
                         # Human operator rejected the classifier
-                        print("\n[Verdict] Human Operator: BAD")
+                        logger.info("[Verdict] Human Operator: BAD")
                         # Send retrain command
-                        print("[Action] Sending Configuration/Retrain request...")
+                        logger.info("[Action] Sending Configuration/Retrain request...")
                         self.communication_manager.send_configuration()
                         
                         # Remove the file to return to STATE 1
                         self._remove_evaluation_file()
             
             except KeyboardInterrupt:
-                print("\nStopping Orchestrator...")
+                logger.info("Stopping Orchestrator...")
                 break
             except Exception as e:
-                print(f"Unexpected error: {e}")
+                logger.exception("Unexpected error: %s", e)
                 time.sleep(2)
 
+    def _collect_labels(self, timeout: float = None):
+        """
+        Store the labels received, in a single transaction, and queue the windows they complete.
+
+        :param timeout: Maximum seconds to wait for a label, None to wait forever.
+        """
+        self.profiler.tick()
+        # The labels already received are stored together
+        labels = self.communication_manager.get_labels(LABEL_BATCH_SIZE, timeout=timeout)
+        if not labels:
+            return
+        started = time.time()
+        self.labels_buffer.save_labels(labels)
+        stored = time.time()
+        for label in labels:
+            # A report is due as soon as a label completes a window
+            window = self.evaluator.add(label)
+            if window is not None:
+                self._queue_window(window)
+            self.tracer.record(label.uuid, "buffer", started, stored)
+            logger.debug(" -> Label stored: %s (Expert=%s)", label.uuid, label.expert)
+        self._delete_dropped_labels()
+
+    def _queue_window(self, window):
+        """
+        Queue a complete window for the report, skipping the oldest one if too many are waiting.
+
+        The labels leaving a skipped window are deleted from the buffer, as if it had been reported.
+        """
+        if len(self.pending_windows) >= self.max_pending_windows:
+            skipped = self.pending_windows.popleft()
+            self.labels_buffer.delete_labels_by_uuid(skipped.evicted_uuids)
+            self.metrics.counter("windows_skipped_total").inc()
+            logger.warning("%d windows waiting for the report, the oldest is skipped without evaluation",
+                           self.max_pending_windows)
+        self.pending_windows.append(window)
+
+    def _delete_dropped_labels(self):
+        """Remove from the buffer the labels the evaluator dropped while waiting for their pair."""
+        dropped = self.evaluator.take_dropped()
+        if dropped:
+            self.labels_buffer.delete_labels_by_uuid(dropped)
+            self.metrics.counter("unpaired_labels_dropped_total").inc(len(dropped))
+            logger.debug("Dropped %d unpaired labels", len(dropped))
+
     def _remove_evaluation_file(self):
         """Helper to remove the evaluation file safely."""
         file_path = os.path.join(self.basedir, "human_operator_workspace", "classifier_evaluation.json")
         try:
             if os.path.exists(file_path):
                 os.remove(file_path)
-                print("[Info] Evaluation file removed. Ready for new cycle.")
+                logger.info("Evaluation file removed. Ready for new cycle.")
         except OSError as e:
-            print(f"Error removing file: {e}")
+            logger.error("Error removing file: %s", e)
 
 if __name__ == "__main__":
     
     current_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    print(f"Working directory set to: {current_dir}")
 
     orchestrator = EvaluationSystemOrchestrator(basedir=current_dir)
     orchestrator.evaluate()
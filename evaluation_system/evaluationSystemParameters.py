@@ -4,8 +4,11 @@ Author: Rossana Antonella Sacco
 
 import json
 import jsonschema
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 class EvaluationSystemParameters:
     """
     This class is used to store and manage the parameters of the Evaluation System.
@@ -44,7 +47,7 @@ class EvaluationSystemParameters:
                 EvaluationSystemParameters.LOCAL_PARAMETERS = json.load(local_params)
 
                 if not EvaluationSystemParameters._validate_json(EvaluationSystemParameters.LOCAL_PARAMETERS, "local", basedir):
-                    print("Error: Invalid local parameters.")
+                    logger.error("Invalid local parameters.")
                     return
 
                 # Map dictionary values to class attributes for easy access in Orchestrator
@@ -58,15 +61,15 @@ class EvaluationSystemParameters:
                 EvaluationSystemParameters.GLOBAL_PARAMETERS = json.load(global_params)
 
                 if not EvaluationSystemParameters._validate_json(EvaluationSystemParameters.GLOBAL_PARAMETERS, "global", basedir):
-                    print("Error: Invalid global parameters.")
+                    logger.error("Invalid global parameters.")
                     return
             
-            print("Parameters loaded successfully.")
+            logger.info("Parameters loaded successfully.")
 
         except FileNotFoundError as e:
-            print(f"Configuration file not found: {e}")
+            logger.error("Configuration file not found: %s", e)
         except Exception as e:
-            print(f"Error loading parameters: {e}")
+            logger.error("Error loading parameters: %s", e)
 
     @staticmethod
     def _validate_json(json_parameters: dict, param_type: str, basedir: str = ".") -> bool:
@@ -88,8 +91,8 @@ class EvaluationSystemParameters:
             jsonschema.validate(json_parameters, schema)
             return True
         except FileNotFoundError:
-            print(f"Schema file not found: {schema_path}")
+            logger.error("Schema file not found: %s", schema_path)
             return False
         except jsonschema.ValidationError as e:
-            print(f"Schema validation error ({param_type}): {e.message}")
+            logger.error("Schema validation error (%s): %s", param_type, e.message)
             return False
\ No newline at end of file
@@ -2,15 +2,24 @@
 Author: Rossana Antonella Sacco
 """
 
+import logging
 import os
 import sqlite3
-from typing import List, Tuple
+import threading
+from typing import Iterable, List, Tuple
 from evaluation_system.label import Label
 
+logger = logging.getLogger(__name__)
+
 class LabelBuffer:
     """
     A specialized SQLite database manager class for storing Label instances
     for the Cyberbullying evaluation system.
+
+    A single connection in WAL mode is kept open for the lifetime of the buffer,
+    labels can be inserted in batches within one transaction, and the number of
+    classifier and expert labels is kept in memory, so that storing a label does
+    not cost more as the buffer grows.
     """
 
     def __init__(self, db_name: str = "labels.db"):
@@ -21,15 +30,32 @@ class LabelBuffer:
         """
         self.db_name = db_name
         current_dir = os.path.dirname(os.path.abspath(__file__))
-        
+
         self.db_path = os.path.join(current_dir, db_name)
-    
+
+        # The connection is shared by the receiver and orchestrator threads, one statement at a time
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode NORMAL is still consistent after a crash, only the last commits may be lost
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
         self.create_table()
-        
+
+        # uuids of the stored classifier (False) and expert (True) labels, to count them without queries
+        self._uuids = {False: set(), True: set()}
+        for uuid, expert in self.fetch_query("SELECT uuid, expert FROM labels"):
+            self._uuids[bool(expert)].add(uuid)
+
 
     def _connect(self):
-        """Establish a connection to the database."""
-        return sqlite3.connect(self.db_path)
+        """Return the connection to the database."""
+        return self._conn
+
+    def close(self) -> None:
+        """Close the connection to the database."""
+        with self._lock:
+            self._conn.close()
 
     def create_table(self) -> None:
         """
@@ -39,7 +65,7 @@ class LabelBuffer:
         - label (TEXT): String indicating the status.
         - expert (INTEGER): Integer indicating if the label was assigned by an expert (0 or 1).
         The primary key is a composite key of (uuid, expert) to allow both classifier and expert labels
-        for the same UUID.
+        for the same UUID. The rowid gives the arrival order, the (expert, uuid) index the per-kind queries.
         """
         query = """
         CREATE TABLE IF NOT EXISTS labels (
@@ -50,48 +76,62 @@ class LabelBuffer:
         )
         """
         self.execute_query(query)
+        self.execute_query("CREATE INDEX IF NOT EXISTS labels_expert_uuid ON labels (expert, uuid)")
 
     def execute_query(self, query: str, params: Tuple = ()) -> None:
         """
         Execute a single query that does not return results (INSERT, UPDATE, DELETE).
-        
+
         :param query: The SQL query to execute.
         :param params: Tuple of parameters to use with the query.
         """
         try:
-            with self._connect() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                conn.commit()
+            with self._lock, self._conn:
+                self._conn.execute(query, params)
         except sqlite3.Error as e:
-            print(f"Database error: {e}")
+            logger.error("Database error: %s", e)
 
     def fetch_query(self, query: str, params: Tuple = ()) -> List[Tuple]:
         """
         Execute a query and return the results (SELECT).
-        
+
         :return: List of tuples representing the query results.
         """
         try:
-            with self._connect() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                return cursor.fetchall()
+            with self._lock:
+                return self._conn.execute(query, params).fetchall()
         except sqlite3.Error as e:
-            print(f"Database error: {e}")
+            logger.error("Database error: %s", e)
             return []
 
     def save_label(self, label: 'Label') -> None:
         """
         Save a Label instance to the database.
-        
+
         :param label: The Label instance to save.
         """
+        self.save_labels([label])
+
+    def save_labels(self, labels: Iterable['Label']) -> None:
+        """
+        Save a batch of Label instances in a single transaction.
+
+        :param labels: The Label instances to save, in arrival order.
+        """
+        rows = [(label.uuid, label.label, label.expert) for label in labels]
+        if not rows:
+            return
         query = """
         INSERT OR REPLACE INTO labels (uuid, label, expert)
         VALUES (?, ?, ?)
         """
-        self.execute_query(query, (label.uuid, label.label, label.expert))
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany(query, rows)
+                for uuid, _, expert in rows:
+                    self._uuids[bool(expert)].add(uuid)
+        except sqlite3.Error as e:
+            logger.error("Database error: %s", e)
 
     def get_classifier_labels(self, limit: int = 100) -> List[Label]:
         """
@@ -116,34 +156,49 @@ class LabelBuffer:
         Delete the first 'limit' labels from the database for BOTH classifier and expert.
         This is used to clear processed labels from the buffer (sliding window).
         """
-        # Delete the first limit classifier labels
-        query_classifier = """
-        DELETE FROM labels WHERE rowid IN (
-            SELECT rowid FROM labels WHERE expert = 0 ORDER BY uuid LIMIT ?
-        )
+        with self._lock:
+            for expert in (False, True):
+                # the (expert, uuid) index returns the first uuids without sorting the table
+                rows = self.fetch_query("SELECT uuid FROM labels WHERE expert = ? ORDER BY uuid LIMIT ?",
+                                        (int(expert), limit))
+                self._delete([(row[0], int(expert)) for row in rows])
+
+    def get_all_labels(self) -> List[Label]:
+        """
+        Get all the labels in the database, in the order they were saved.
+        Used to restore the evaluation window after a restart.
         """
-        self.execute_query(query_classifier, (limit,))
+        query = "SELECT uuid, label, expert FROM labels ORDER BY rowid"
+        rows = self.fetch_query(query)
+        return [Label(uuid=row[0], label=row[1], expert=bool(row[2])) for row in rows]
 
-        # Delete the first limit expert labels
-        query_expert = """
-        DELETE FROM labels WHERE rowid IN (
-            SELECT rowid FROM labels WHERE expert = 1 ORDER BY uuid LIMIT ?
-        )
+    def delete_labels_by_uuid(self, uuids: List[str]) -> None:
+        """
+        Delete the classifier and expert labels of the given uuids.
+        This is used to clear the labels leaving the evaluation window.
         """
-        self.execute_query(query_expert, (limit,))
+        self._delete([(uuid, expert) for uuid in uuids for expert in (0, 1)])
 
     def get_num_classifier_labels(self) -> int:
         """
         Get the total number of classifier labels in the database.
         """
-        query = "SELECT COUNT(*) FROM labels WHERE expert = 0"
-        result = self.fetch_query(query)
-        return result[0][0] if result else 0
+        return len(self._uuids[False])
 
     def get_num_expert_labels(self) -> int:
         """
         Get the total number of expert labels in the database.
         """
-        query = "SELECT COUNT(*) FROM labels WHERE expert = 1"
-        result = self.fetch_query(query)
-        return result[0][0] if result else 0
\ No newline at end of file
+        return len(self._uuids[True])
+
+    def _delete(self, keys: List[Tuple[str, int]]) -> None:
+        # deletes the labels with the given (uuid, expert) primary keys
+        if not keys:
+            return
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany("DELETE FROM labels WHERE uuid = ? AND expert = ?", keys)
+                for uuid, expert in keys:
+                    self._uuids[bool(expert)].discard(uuid)
+        except sqlite3.Error as e:
+            logger.error("Database error: %s", e)
@@ -2,16 +2,23 @@
 Author: Rossana Antonella Sacco
 """
 
-from typing import Optional, Dict
-import json
+import logging
+from typing import Optional, Dict, List
 import queue
+import json
 import threading
+import time
 import requests
 import jsonschema
 from flask import Flask, request, jsonify
 
 from evaluation_system.evaluationSystemParameters import EvaluationSystemParameters
 from evaluation_system.label import Label
+from common import transport
+from common.metrics import MetricsRegistry, MeteredQueue
+from common.tracing import Tracer
+
+logger = logging.getLogger(__name__)
 
 class LabelReceiverAndConfigurationSender:
     """
@@ -19,9 +26,16 @@ class LabelReceiverAndConfigurationSender:
     Acts as the boundary between the Evaluation System and external systems (Ingestion/Production).
     """
 
-    def __init__(self, host: str = '0.0.0.0', port: int = None, basedir: str = "."):
+    def __init__(self, host: str = '0.0.0.0', port: int = None, basedir: str = ".", tracer: Tracer = None,
+                 metrics: MetricsRegistry = None, max_queue_size: int = 0,
+                 retry_after: float = transport.DEFAULT_RETRY_AFTER):
         """
         Initialize the Flask communication server.
+
+        :param tracer: Tracer recording the per-session spans, disabled if not provided.
+        :param metrics: Registry of the Evaluation System metrics, exposed on /metrics (a new one if not provided).
+        :param max_queue_size: Maximum number of queued labels (0 for unbounded), then senders get a 503.
+        :param retry_after: Seconds the senders are asked to wait when the queue is full.
         """
         #if the port is not provided, we get it from the global parameters
         if port is None:
@@ -30,9 +44,13 @@ class LabelReceiverAndConfigurationSender:
         self.app = Flask(__name__)
         self.host = host
         self.port = port
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self.metrics.mount(self.app)
+        self.tracer = tracer if tracer is not None else Tracer("Evaluation System", metrics=self.metrics)
         
         #Queue for thread-safe communication with the Orchestrator
-        self.label_queue = queue.Queue()
+        self.label_queue = MeteredQueue(self.metrics, "labels", max_queue_size)
+        self.retry_after = retry_after
 
         # Path to the JSON schema 
         self.label_schema_path = f"{basedir}/schema/label_schema.json"
@@ -65,7 +83,12 @@ class LabelReceiverAndConfigurationSender:
 
             
             #Schema Validation
-            if self._validate_json_label(json_label):
+            validation_start = time.time()
+            is_valid = self._validate_json_label(json_label)
+            if isinstance(json_label, dict):
+                self.tracer.record(json_label.get('uuid'), "validate", validation_start, time.time())
+
+            if is_valid:
             
                 expert = False
                 
@@ -74,7 +97,7 @@ class LabelReceiverAndConfigurationSender:
                 elif sender_ip == production_ip:
                     expert = False
                 else:
-                    print(f"Warning: Unknown sender IP {sender_ip}")
+                    logger.warning("Unknown sender IP %s", sender_ip)
                     return jsonify({"status": "error", "message": "Unauthorized Sender IP"}), 403
 
                 
@@ -85,26 +108,31 @@ class LabelReceiverAndConfigurationSender:
                     expert=expert
                 )
                 
-                #Insert into Queue
-                self.label_queue.put(label)
+                #Insert into Queue, the sender is asked to retry later if it is full
+                if not self.label_queue.offer(label):
+                    return transport.busy_response(self.retry_after)
                 
                 return jsonify({"status": "received"}), 200
             else:
+                self.metrics.counter("validation_failures_total", type="label").inc()
                 return jsonify({"status": "error", "message": "Invalid JSON label schema"}), 400
         
         except Exception as e:
-            print(f"Error processing request: {e}")
+            logger.exception("Error processing request: %s", e)
             return jsonify({"status": "error", "message": str(e)}), 500
         
     def start_server(self):
         """
         Start the Flask server in a separate thread.
         This allows the Orchestrator to run concurrently without blocking.
+        In pipeline mode the messages are delivered in-process instead.
         """
+        if transport.serve_locally(self.app, self.port):
+            return
         # daemon=True ensures the thread dies when the main program exits
         thread = threading.Thread(target=self.app.run, kwargs={'host': self.host, 'port': self.port}, daemon=True)
         thread.start()
-        print(f"Server started on {self.host}:{self.port}")
+        logger.info("Server started on %s:%s", self.host, self.port)
 
     def _validate_json_label(self, json_label: Dict) -> bool:
         """
@@ -117,10 +145,10 @@ class LabelReceiverAndConfigurationSender:
             jsonschema.validate(json_label, label_schema)
             return True
         except FileNotFoundError:
-            print(f"CRITICAL: Schema file not found at {self.label_schema_path}")
+            logger.critical("Schema file not found at %s", self.label_schema_path)
             return False
         except jsonschema.ValidationError as e:
-            print(f"Validation Error: {e.message}")
+            logger.warning("Validation Error: %s", e.message)
             return False
 
     def send_configuration(self, config_data: Dict = None) -> bool:
@@ -135,7 +163,7 @@ class LabelReceiverAndConfigurationSender:
             target_ip = EvaluationSystemParameters.GLOBAL_PARAMETERS[target_system]['ip']
             target_port = EvaluationSystemParameters.GLOBAL_PARAMETERS[target_system]['port']
         except KeyError:
-            print(f"Error: Configuration for '{target_system}' not found in global parameters.")
+            logger.error("Configuration for '%s' not found in global parameters.", target_system)
             return False
         
         url = f"http://{target_ip}:{target_port}/Configuration"
@@ -151,18 +179,20 @@ class LabelReceiverAndConfigurationSender:
                 "message": json.dumps(config_data)
             }
 
-            print(f"Sending configuration to {url}...")
+            logger.info("Sending configuration to %s...", url)
             response = requests.post(url, json=packet)
             
             if response.status_code == 200:
-                print(f"Configuration sent successfully.")
+                logger.info("Configuration sent successfully.")
                 return True
             else:
-                print(f"Failed to send configuration. Remote Status: {response.status_code}")
+                self.metrics.counter("send_failures_total", type="configuration").inc()
+                logger.error("Failed to send configuration. Remote Status: %s", response.status_code)
                 return False
                 
         except requests.RequestException as e:
-            print(f"Network error sending configuration: {e}")
+            self.metrics.counter("send_failures_total", type="configuration").inc()
+            logger.error("Network error sending configuration: %s", e)
             return False
 
     def get_label(self) -> Optional[Label]:
@@ -173,4 +203,24 @@ class LabelReceiverAndConfigurationSender:
         :return: A Label object.
         """
         #block=True ensures the Orchestrator does not consume CPU in an empty loop
-        return self.label_queue.get(block=True)
\ No newline at end of file
+        return self.label_queue.get(block=True)
+
+    def get_labels(self, max_labels: int = 100, timeout: Optional[float] = None) -> List[Label]:
+        """
+        Retrieves the labels available in the queue, to be stored in a single batch.
+        This method is BLOCKING until at least one label arrives or the timeout expires.
+
+        :param max_labels: Maximum number of labels returned.
+        :param timeout: Maximum seconds to wait for the first label, None to wait forever.
+        :return: A list of Label objects, empty only if the timeout expired.
+        """
+        try:
+            labels = [self.label_queue.get(block=True, timeout=timeout)]
+        except queue.Empty:
+            return []
+        try:
+            while len(labels) < max_labels:
+                labels.append(self.label_queue.get_nowait())
+        except queue.Empty:
+            pass
+        return labels
\ No newline at end of file
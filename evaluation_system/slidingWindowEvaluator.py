@@ -0,0 +1,182 @@
+"""
+Author: Rossana Antonella Sacco
+"""
+
+from collections import OrderedDict, deque
+from typing import List, Optional
+
+from evaluation_system.label import Label
+
+
+class EvaluationWindow:
+    """
+    Data Object holding a completed evaluation window.
+    """
+
+    def __init__(self, classifier_labels: List[Label], expert_labels: List[Label], total_errors: int,
+                 max_consecutive_errors: int, evicted_uuids: List[str]):
+        """
+        :param classifier_labels: Classifier labels of the window, in pairing order.
+        :param expert_labels: Expert labels of the window, aligned by uuid with the classifier labels.
+        :param total_errors: Number of pairs of the window whose labels differ.
+        :param max_consecutive_errors: Longest run of consecutive errors in the window.
+        :param evicted_uuids: Uuids leaving the window after this report, no longer needed.
+        """
+        self.classifier_labels = classifier_labels
+        self.expert_labels = expert_labels
+        self.total_errors = total_errors
+        self.max_consecutive_errors = max_consecutive_errors
+        self.evicted_uuids = evicted_uuids
+
+
+class SlidingWindowEvaluator:
+    """
+    Incremental evaluation of the classifier labels against the expert labels.
+
+    The labels are joined by uuid as they arrive; each complete pair enters the
+    window, and the total errors and the longest run of consecutive errors of the
+    window are kept up to date in O(1) amortized per label, without sorting or
+    recomputing the window. A window is returned as soon as it is complete, then
+    it advances by 'step' pairs: step equal to the window size gives tumbling
+    windows, a smaller step sliding windows.
+    """
+
+    def __init__(self, window_size: int, step: Optional[int] = None, max_pending: Optional[int] = None):
+        """
+        :param window_size: Number of label pairs of a window.
+        :param step: Pairs between two windows, the window size (tumbling) if None.
+        :param max_pending: Maximum number of labels waiting for their pair, the oldest are dropped.
+                            Ten windows if None.
+        """
+        if window_size < 1:
+            raise ValueError("window_size must be at least 1")
+        self.window_size = window_size
+        self.step = min(step or window_size, window_size)
+        self.max_pending = max_pending or 10 * window_size
+
+        # uuid -> {expert: Label} for the labels still waiting for their pair
+        self._pending = OrderedDict()
+        # uuids of the unpaired labels dropped since the last take_dropped()
+        self._dropped = []
+
+        # pairs of the window; pair i of the stream has absolute index i
+        self._pairs = deque()
+        self._start = 0
+        self._end = 0
+        self._errors = 0
+        # error runs intersecting the window, as [start, end) absolute indices; the last may be open
+        self._runs = deque()
+        # lengths of the closed runs after the first one, decreasing, to read the maximum in O(1)
+        self._longest = deque()
+
+    @property
+    def total_errors(self) -> int:
+        return self._errors
+
+    @property
+    def max_consecutive_errors(self) -> int:
+        if not self._runs:
+            return 0
+        # only the first run can be cut by the start of the window
+        first_start, first_end = self._runs[0]
+        longest = first_end - max(first_start, self._start)
+        if self._longest:
+            longest = max(longest, self._longest[0][1])
+        if len(self._runs) > 1 and self._run_open():
+            longest = max(longest, self._runs[-1][1] - self._runs[-1][0])
+        return longest
+
+    @property
+    def size(self) -> int:
+        return len(self._pairs)
+
+    def take_dropped(self) -> List[str]:
+        """
+        Return the uuids whose unpaired labels were dropped since the last call.
+
+        :return: The dropped uuids, to be removed from the label buffer.
+        """
+        dropped, self._dropped = self._dropped, []
+        return dropped
+
+    def add(self, label: Label) -> Optional[EvaluationWindow]:
+        """
+        Add a label, pairing it with the label of the other source with the same uuid.
+
+        :param label: A classifier or expert label.
+        :return: The completed window if this label completed one, None otherwise.
+        """
+        expert = bool(label.expert)
+        sides = self._pending.get(label.uuid)
+        if sides is None or expert in sides:
+            # first label of this uuid, or a new label from the same source replacing the previous one
+            sides = self._pending.pop(label.uuid, {})
+            sides[expert] = label
+            self._pending[label.uuid] = sides
+            while len(self._pending) > self.max_pending:
+                uuid, _ = self._pending.popitem(last=False)
+                self._dropped.append(uuid)
+            return None
+
+        del self._pending[label.uuid]
+        sides[expert] = label
+        self._append(sides[False], sides[True])
+
+        if len(self._pairs) < self.window_size:
+            return None
+        return self._emit()
+
+    def _append(self, classifier_label: Label, expert_label: Label):
+        is_error = _normalize(classifier_label.label) != _normalize(expert_label.label)
+        self._pairs.append((classifier_label, expert_label, is_error))
+        run_open = self._run_open()
+        index = self._end
+        self._end += 1
+        if not is_error:
+            if run_open:
+                self._close_run()
+            return
+        self._errors += 1
+        if run_open:
+            self._runs[-1][1] = self._end
+        else:
+            self._runs.append([index, self._end])
+
+    def _run_open(self) -> bool:
+        # the last run is open while the last pair is an error
+        return bool(self._runs) and self._runs[-1][1] == self._end
+
+    def _close_run(self):
+        if len(self._runs) < 2:
+            return  # the first run is measured directly
+        start, end = self._runs[-1]
+        while self._longest and self._longest[-1][1] <= end - start:
+            self._longest.pop()
+        self._longest.append((start, end - start))
+
+    def _emit(self) -> EvaluationWindow:
+        window = EvaluationWindow(
+            classifier_labels=[pair[0] for pair in self._pairs],
+            expert_labels=[pair[1] for pair in self._pairs],
+            total_errors=self.total_errors,
+            max_consecutive_errors=self.max_consecutive_errors,
+            evicted_uuids=[pair[0].uuid for pair in list(self._pairs)[:self.step]])
+        for _ in range(self.step):
+            self._evict()
+        return window
+
+    def _evict(self):
+        _, _, is_error = self._pairs.popleft()
+        self._start += 1
+        if is_error:
+            self._errors -= 1
+        if self._runs and self._runs[0][1] <= self._start:
+            self._runs.popleft()
+            # the next run becomes the first one, measured directly
+            if self._runs and self._longest and self._longest[0][0] == self._runs[0][0]:
+                self._longest.popleft()
+
+
+def _normalize(value) -> str:
+    # labels are compared as in EvaluationReportModel
+    return str(value).strip().lower()
@@ -1,7 +1,8 @@
 import pytest
 import os
 import json
-from unittest.mock import patch, mock_open
+from collections import deque
+from unittest.mock import MagicMock, patch, mock_open
 
 
 from evaluation_system.label import Label
@@ -9,6 +10,7 @@ from evaluation_system.evaluationReport import EvaluationReport
 from evaluation_system.evaluationReportModel import EvaluationReportModel
 from evaluation_system.labelBuffer import LabelBuffer
 from evaluation_system.evaluationSystemParameters import EvaluationSystemParameters
+from evaluation_system.slidingWindowEvaluator import SlidingWindowEvaluator
 
 # ==========================================
 # 1. Data Models Tests (Label & Report)
@@ -86,6 +88,46 @@ def test_compute_consecutive_errors(report_model):
     max_cons = report_model.compute_actual_max_consecutive_errors(c_labels, e_labels)
     assert max_cons == 2
 
+def test_window_joins_labels_by_uuid():
+    """Labels arriving in any order are paired by uuid, not by position."""
+    evaluator = SlidingWindowEvaluator(window_size=3)
+
+    assert evaluator.add(Label("b", "Good", False)) is None
+    assert evaluator.add(Label("a", "Bad", True)) is None
+    assert evaluator.add(Label("a", "Good", False)) is None
+    assert evaluator.add(Label("b", "good ", True)) is None
+    assert evaluator.add(Label("c", "Good", True)) is None
+    window = evaluator.add(Label("c", "Bad", False))
+
+    assert [lbl.uuid for lbl in window.classifier_labels] == ["a", "b", "c"]
+    assert [lbl.uuid for lbl in window.expert_labels] == ["a", "b", "c"]
+    assert window.total_errors == 2
+    assert window.max_consecutive_errors == 1
+    # tumbling window: the next one starts empty
+    assert window.evicted_uuids == ["a", "b", "c"]
+    assert evaluator.size == 0
+
+def test_sliding_window_keeps_counters_updated():
+    """With a step smaller than the window, the counters follow the pairs leaving the window."""
+    evaluator = SlidingWindowEvaluator(window_size=4, step=1)
+    windows = []
+    for i, error in enumerate([True, True, False, True, False, False, False]):
+        evaluator.add(Label(str(i), "A", False))
+        window = evaluator.add(Label(str(i), "B" if error else "A", True))
+        if window is not None:
+            windows.append((window.total_errors, window.max_consecutive_errors))
+
+    assert windows == [(3, 2), (2, 1), (1, 1), (1, 1)]
+
+def test_window_reports_the_dropped_unpaired_labels():
+    """The labels dropped while waiting for their pair are reported once."""
+    evaluator = SlidingWindowEvaluator(window_size=2, max_pending=2)
+    for uuid in ["a", "b", "c"]:
+        evaluator.add(Label(uuid, "Good", False))
+
+    assert evaluator.take_dropped() == ["a"]
+    assert evaluator.take_dropped() == []
+
 # ==========================================
 # 3. Database Tests (LabelBuffer)
 # ==========================================
@@ -107,6 +149,7 @@ def buffer(temp_db_path):
     with patch("evaluation_system.labelBuffer.os.path.join", return_value=temp_db_path):
         buf = LabelBuffer("test_labels.db")
         yield buf
+        buf.close()
         # Pytest handles tmp_path cleanup automatically
 
 def test_save_and_retrieve_labels(buffer):
@@ -139,6 +182,90 @@ def test_delete_labels(buffer):
     assert buffer.get_num_classifier_labels() == 1
     assert buffer.get_num_expert_labels() == 1
 
+def test_delete_labels_by_uuid(buffer):
+    """Verifies that the labels leaving the evaluation window are deleted, and the others restored in order."""
+    for i in range(3):
+        buffer.save_label(Label(f"u{i}", "lbl", False))
+        buffer.save_label(Label(f"u{i}", "lbl", True))
+
+    buffer.delete_labels_by_uuid(["u0", "u2"])
+
+    assert [(lbl.uuid, lbl.expert) for lbl in buffer.get_all_labels()] == [("u1", False), ("u1", True)]
+
+def make_orchestrator(buffer, labels, window_size=2, max_pending=None, max_pending_windows=None):
+    """Orchestrator reading 'labels' in a single batch, without its server and parameters."""
+    from common.metrics import MetricsRegistry
+    from evaluation_system.evaluationSystemOrchestrator import DEFAULT_MAX_PENDING_WINDOWS, EvaluationSystemOrchestrator
+
+    orchestrator = EvaluationSystemOrchestrator.__new__(EvaluationSystemOrchestrator)
+    orchestrator.labels_buffer = buffer
+    orchestrator.evaluator = SlidingWindowEvaluator(window_size, max_pending=max_pending)
+    orchestrator.pending_windows = deque()
+    orchestrator.max_pending_windows = max_pending_windows or DEFAULT_MAX_PENDING_WINDOWS
+    orchestrator.metrics = MetricsRegistry()
+    orchestrator.tracer = MagicMock()
+    orchestrator.profiler = MagicMock()
+    orchestrator.communication_manager = MagicMock()
+    orchestrator.communication_manager.get_labels.return_value = labels
+    return orchestrator
+
+def test_dropped_unpaired_labels_leave_the_buffer(buffer):
+    """The labels the evaluator gives up on are deleted from the buffer too."""
+    labels = [Label(f"u{i}", "lbl", False) for i in range(3)]
+    orchestrator = make_orchestrator(buffer, labels, max_pending=2)
+
+    orchestrator._collect_labels()
+
+    assert [lbl.uuid for lbl in buffer.get_all_labels()] == ["u1", "u2"]
+    assert orchestrator.metrics.counter("unpaired_labels_dropped_total").value == 1
+
+def test_windows_wait_for_the_verdict(buffer):
+    """While the verdict is pending, the complete windows wait for their report."""
+    labels = [Label(f"u{i}", "lbl", expert) for i in range(6) for expert in (False, True)]
+    orchestrator = make_orchestrator(buffer, labels)
+
+    orchestrator._collect_labels()
+
+    assert len(orchestrator.pending_windows) == 3
+    assert orchestrator.metrics.counter("windows_skipped_total").value == 0
+    assert len(buffer.get_all_labels()) == 12
+
+def test_windows_beyond_the_bound_are_skipped(buffer):
+    """Beyond max_pending_windows the oldest windows are skipped and counted."""
+    labels = [Label(f"u{i}", "lbl", expert) for i in range(6) for expert in (False, True)]
+    orchestrator = make_orchestrator(buffer, labels, max_pending_windows=1)
+
+    orchestrator._collect_labels()
+
+    assert len(orchestrator.pending_windows) == 1
+    assert [lbl.uuid for lbl in orchestrator.pending_windows[0].classifier_labels] == ["u4", "u5"]
+    assert orchestrator.metrics.counter("windows_skipped_total").value == 2
+    # the labels of the skipped windows are not kept in the buffer
+    assert {lbl.uuid for lbl in buffer.get_all_labels()} == {"u4", "u5"}
+
+def test_save_labels_batch_and_counters(buffer, temp_db_path):
+    """Verifies batch saving, the cached counters and their reload from an existing DB."""
+    buffer.save_labels([Label(f"u{i}", "lbl", i % 2 == 1) for i in range(6)])
+    # A label replacing a previous one of the same source is counted once
+    buffer.save_labels([Label("u0", "other", False)])
+
+    assert buffer.get_num_classifier_labels() == 3
+    assert buffer.get_num_expert_labels() == 3
+
+    buffer.delete_labels_by_uuid(["u0", "u1"])
+    with patch("evaluation_system.labelBuffer.os.path.join", return_value=temp_db_path):
+        reopened = LabelBuffer("test_labels.db")
+    assert reopened.get_num_classifier_labels() == buffer.get_num_classifier_labels() == 2
+    assert reopened.get_num_expert_labels() == buffer.get_num_expert_labels() == 2
+    reopened.close()
+
+def test_label_queries_use_index(buffer):
+    """Verifies that the per-source queries do not scan the whole table."""
+    plan = buffer.fetch_query("EXPLAIN QUERY PLAN SELECT uuid FROM labels WHERE expert = 0 ORDER BY uuid LIMIT 10")
+    details = " ".join(row[-1] for row in plan)
+    assert "labels_expert_uuid" in details
+    assert "TEMP B-TREE" not in details
+
 # ==========================================
 # 4. Parameters Tests (Mocking)
 # ==========================================
@@ -13,6 +13,7 @@ def _get_data_file_absolute_path(relative_path: str) -> str:
     return os.path.join(os.path.dirname(os.path.abspath(__file__)), relative_path)
 
 # Ingestion system
+INGESTION_FOLDER_PATH = os.path.dirname(os.path.abspath(__file__))
 ING_MAN_CONFIG_FILE_PATH = _get_data_file_absolute_path("Ingestion_Configuration_schema/"
                                                         "IngestionSystemConfiguration.json")
 
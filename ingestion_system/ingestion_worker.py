@@ -0,0 +1,336 @@
+"""
+Module: ingestion_worker
+Assembles the raw sessions of a shard of the uuids.
+
+The orchestrator routes each record to the worker owning its uuid, so all the
+records of a session reach the same worker, in arrival order, and the workers
+never share a partial session: each one has its own record buffer.
+
+A session still incomplete after the "session_timeout" of the configuration is
+taken out of the buffer, oldest first: it is sent as a partial session, with its
+missing sources marked as missing samples, or dropped, and counted either way.
+Its uuid is then remembered for a while, so that the records arriving late do
+not start a new session that could only expire again: they are discarded.
+
+Author: Martina Fabiani
+
+"""
+from collections import OrderedDict
+from dataclasses import asdict
+import logging
+import queue
+import threading
+import time
+import zlib
+from typing import Any, Callable, Optional
+
+from ingestion_system.ingestion_configuration import Parameters
+from ingestion_system.json_handler import JsonHandler
+from ingestion_system.phase_counter import PhaseCounter
+from ingestion_system.raw_session_creator import RawSessionCreator
+from ingestion_system.record_and_session_channel import RecordAndSessionChannel
+from ingestion_system.record_buffer import RecordBufferController
+from ingestion_system.record_sufficiency_checker import RecordSufficiencyChecker
+from common.metrics import MeteredQueue, MetricsRegistry
+from common.tracing import Tracer
+
+logger = logging.getLogger(__name__)
+
+SESSION_TIMEOUT_ACTIONS = ("flush", "drop")
+# longest wait between two searches of the expired sessions, in seconds
+MAX_EXPIRY_CHECK_INTERVAL = 1.0
+# expired sessions taken out of the buffer per search
+EXPIRED_SESSIONS_BATCH = 100
+# uuids of the expired sessions remembered per worker, the oldest are forgotten first
+MAX_EXPIRED_UUIDS = 10000
+# session timeouts an expired uuid is remembered, when "late_records_seconds" is not configured
+LATE_RECORDS_TIMEOUTS = 10
+
+
+def shard_of(uuid: str, workers: int) -> int:
+    """
+    Return the worker owning a uuid.
+    crc32 is stable across restarts, unlike hash(), so the records kept in the
+    buffers of the previous run are completed by the same worker.
+
+    :param uuid: The uuid of the session.
+    :param workers: The number of workers.
+    :return: The index of the worker, between 0 and workers - 1.
+    """
+    return zlib.crc32(str(uuid).encode("utf-8")) % workers
+
+
+def session_uuid(record: Any) -> Optional[str]:
+    """
+    Return the uuid of a decoded record, None if the record has not the expected structure.
+
+    :param record: The decoded record, not validated yet.
+    """
+    value = record.get("value") if isinstance(record, dict) else None
+    return value.get("uuid") if isinstance(value, dict) else None
+
+
+class IngestionWorker:
+    """
+    Buffers the records of its uuids, creates the raw sessions and sends them.
+    """
+
+    def __init__(self, index: int, parameters: Parameters, json_io: RecordAndSessionChannel,
+                 phase_counter: PhaseCounter, tracer: Tracer, metrics: MetricsRegistry,
+                 keep_records: bool = False, database_path: Optional[str] = None, queue_size: int = 100,
+                 on_processed: Optional[Callable[[Optional[int]], None]] = None):
+        """
+        Initialize the worker and its record buffer.
+
+        :param index: The index of the worker, used in the names of its thread and queue.
+        :param parameters: The ingestion configuration.
+        :param json_io: The channel used to send labels and raw sessions.
+        :param phase_counter: The phase counter shared by all the workers.
+        :param tracer: Tracer recording the buffer and create_session spans.
+        :param metrics: Registry of the Ingestion System metrics.
+        :param keep_records: If True the records of the previous run are kept in the buffer.
+        :param database_path: Path of the buffer DB, the default one if None.
+        :param queue_size: Maximum number of records waiting for the worker, then the orchestrator waits.
+        :param on_processed: Called with the offset of each record handed with submit, once processed.
+        """
+        self.index = index
+        self.parameters = parameters
+        self.json_io = json_io
+        self.phase_counter = phase_counter
+        self.tracer = tracer
+        self.on_processed = on_processed
+
+        self.buffer_controller = RecordBufferController(keep_records=keep_records, database_path=database_path)
+        self.sufficiency_checker = RecordSufficiencyChecker(self.buffer_controller)
+        self.session_creator = RawSessionCreator(self.parameters)
+        self.sessions_created = 0
+
+        # incomplete sessions older than the timeout are flushed or dropped, never if None
+        self.session_timeout, self.timeout_action, self.late_records_seconds = self._timeout_settings(
+            self.parameters.configuration.get("session_timeout"))
+        self._expired_sessions = {action: metrics.counter("expired_sessions_total", action=action)
+                                  for action in ("flushed", "dropped")}
+        self._next_expiry_check = 0.0
+        # uuid -> monotonic time until which its late records are discarded, in expiry order
+        self._expired_uuids = OrderedDict()
+        self._late_records = metrics.counter("late_records_total")
+
+        self._records = MeteredQueue(metrics, f"worker_{index}", queue_size)
+        self._thread = None
+
+    @property
+    def expiry_check_interval(self) -> Optional[float]:
+        """Seconds between two searches of the expired sessions, None without a session timeout."""
+        if self.session_timeout is None:
+            return None
+        return min(MAX_EXPIRY_CHECK_INTERVAL, self.session_timeout / 2)
+
+    @staticmethod
+    def _timeout_settings(configuration) -> tuple:
+        # seconds after the first record of a session, action on the incomplete ones
+        # and seconds the late records of an expired session are discarded
+        if not isinstance(configuration, dict) or not configuration.get("seconds"):
+            return None, "flush", None
+        action = configuration.get("action", "flush")
+        if action not in SESSION_TIMEOUT_ACTIONS:
+            raise ValueError(f"Unknown session timeout action: {action}")
+        seconds = float(configuration["seconds"])
+        return seconds, action, float(configuration.get("late_records_seconds", LATE_RECORDS_TIMEOUTS * seconds))
+
+    def start(self):
+        """Start processing the submitted records in a daemon thread."""
+        self._thread = threading.Thread(target=self._run, name=f"ingestion-worker-{self.index}",
+                                        daemon=True)
+        self._thread.start()
+
+    def submit(self, record: Any, offset: Optional[int] = None):
+        """
+        Queue a record for the worker thread, waiting while its queue is full.
+        The worker validates it, so that the validation runs in parallel.
+
+        :param record: The decoded record.
+        :param offset: The offset of the record in the message log, passed back to on_processed.
+        """
+        self._records.put((record, offset))
+
+    def stop(self):
+        """Process the queued records and stop the worker thread."""
+        if self._thread is not None:
+            self._records.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                item = self._records.get(timeout=self.expiry_check_interval)
+            except queue.Empty:
+                item = ()
+            try:
+                self.flush_expired_sessions()
+            except Exception as e:
+                logger.exception("Error flushing the expired sessions (worker %d): %s", self.index, e)
+            if item is None:
+                return
+            if not item:
+                continue
+            record, offset = item
+            try:
+                if self.json_io.validate_record(record, session_uuid(record)):
+                    self.process(record)
+            except Exception as e:
+                logger.exception("Error during ingestion (worker %d): %s", self.index, e)
+            finally:
+                if self.on_processed is not None:
+                    self.on_processed(offset)
+
+    def process(self, new_record: dict):
+        """
+        Buffer a record and, when its session is complete, create the raw session and send it.
+
+        :param new_record: The validated record.
+        """
+        uuid = new_record["value"]["uuid"]
+        if self._is_late(uuid):
+            self._late_records.inc()
+            logger.warning("Late %s record of the expired session %s, discarded", new_record.get("source"), uuid)
+            return
+
+        # process AUDIO records: convert base64 to file and update record
+        if new_record.get("source") == "audio":
+
+            # Extract the internal "value" dictionary
+            value_data = new_record.get("value", {})
+            base64_audio = value_data.get("audio")
+
+            if base64_audio:
+                # A. TRANSFORMATION: Base64 -> File
+                audio_path = JsonHandler.save_base64_audio_to_file(base64_audio)
+
+                # B. RECORD UPDATE
+                # Note: We need to update inside "value", not at the root!
+                # This way store_record will save the path in the DB.
+                new_record["value"]["file_path"] = audio_path
+
+                # Remove the heavy field
+                if "audio" in new_record["value"]:
+                    del new_record["value"]["audio"]
+
+        with self.tracer.span(uuid, "buffer"):
+            # stores record
+            self.buffer_controller.store_record(new_record)
+
+            # checks if records are sufficient to create a raw session
+            # if we are in development mode, label is required
+            # in production, label is not required
+            records_sufficient = self.sufficiency_checker.are_records_sufficient(
+                uuid, self.phase_counter.current_phase)
+
+        if not records_sufficient:
+            return
+
+        logger.debug("Creating RawSession %s", uuid)
+        with self.tracer.span(uuid, "create_session"):
+            # retrieves stored records
+            stored_records = self.buffer_controller.get_records(uuid)
+
+            # creates raw session
+            raw_session = self.session_creator.create_raw_session(stored_records)
+            self.sessions_created += 1
+            logger.debug("RAW SESSION created count (worker %d): %d", self.index, self.sessions_created)
+
+            # removes records from buffer
+            self.buffer_controller.remove_records(uuid)
+
+            # marks missing samples with "None" and checks if the session is valid
+            session_valid, marked_raw_session = self.session_creator.mark_missing_samples(raw_session, None)
+
+        if not session_valid:
+            return  # do not send anything
+
+        self._send(marked_raw_session)
+
+    def flush_expired_sessions(self, now: Optional[float] = None) -> int:
+        """
+        Take out of the buffer the sessions still incomplete after the session timeout,
+        at most once per expiry_check_interval, and send them as partial sessions or drop them.
+
+        :param now: Current wall-clock time, time.time() if None.
+        :return: The number of expired sessions.
+        """
+        if self.session_timeout is None or time.monotonic() < self._next_expiry_check:
+            return 0
+        self._next_expiry_check = time.monotonic() + self.expiry_check_interval
+
+        deadline = (time.time() if now is None else now) - self.session_timeout
+        expired = 0
+        while True:
+            uuids = self.buffer_controller.get_expired_uuids(deadline, EXPIRED_SESSIONS_BATCH)
+            for uuid in uuids:
+                self._expire(uuid)
+            expired += len(uuids)
+            if len(uuids) < EXPIRED_SESSIONS_BATCH:
+                return expired
+
+    def _is_late(self, uuid: str) -> bool:
+        # the uuids are remembered for the same time, so the oldest are the first to forget
+        now = time.monotonic()
+        while self._expired_uuids and next(iter(self._expired_uuids.values())) <= now:
+            self._expired_uuids.popitem(last=False)
+        return uuid in self._expired_uuids
+
+    def _remember_expired(self, uuid: str):
+        self._expired_uuids.pop(uuid, None)
+        self._expired_uuids[uuid] = time.monotonic() + self.late_records_seconds
+        while len(self._expired_uuids) > MAX_EXPIRED_UUIDS:
+            self._expired_uuids.popitem(last=False)
+
+    def _expire(self, uuid: str):
+        stored_records = self.buffer_controller.get_records(uuid)
+        self.buffer_controller.remove_records(uuid)
+        self._remember_expired(uuid)
+
+        # the label is needed in every phase but production
+        if self.timeout_action == "drop" or (stored_records[4] is None
+                                             and self.phase_counter.current_phase != "production"):
+            self._expired_sessions["dropped"].inc()
+            logger.warning("Incomplete session %s expired, dropped", uuid)
+            return
+
+        with self.tracer.span(uuid, "create_session"):
+            raw_session = self.session_creator.create_raw_session(stored_records)
+            session_valid, marked_raw_session = self.session_creator.mark_missing_samples(raw_session, None,
+                                                                                          partial=True)
+        if not session_valid:
+            self._expired_sessions["dropped"].inc()
+            logger.warning("Incomplete session %s expired with too many missing samples, dropped", uuid)
+            return
+
+        self.sessions_created += 1
+        self._expired_sessions["flushed"].inc()
+        logger.info("Incomplete session %s expired, sent as a partial session", uuid)
+        self._send(marked_raw_session)
+
+    def _send(self, marked_raw_session):
+        uuid = marked_raw_session.uuid
+
+        # counts the session in the current phase, the phase may change for the next one
+        phase = self.phase_counter.claim_session()
+
+        # if in evaluation phase, sends label to evaluation system
+        if phase == "evaluation":
+            label = {
+                "uuid": marked_raw_session.uuid,
+                "label": marked_raw_session.label
+            }
+            logger.debug("Send Label %s to EVALUATION System", marked_raw_session.uuid)
+
+            self.json_io.send_label(target_ip=self.parameters.configuration["ip_evaluation"],
+                                    target_port=self.parameters.configuration["port_evaluation"], label_data=label)
+
+        # sends raw session to preparation system
+        session_dict = asdict(marked_raw_session)
+        if self.json_io.send_raw_session(target_ip=self.parameters.configuration["ip_preparation"],
+                                         target_port=self.parameters.configuration["port_preparation"],
+                                         session_data=session_dict):
+            logger.debug("Raw Session %s sent", uuid)
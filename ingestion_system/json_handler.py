@@ -5,11 +5,27 @@ import base64
 import os
 import uuid
 
+logger = logging.getLogger(__name__)
+
 class JsonHandler:
     """
     A class to read and save json files.
     """
 
+    # compiled validators by schema path: each schema file is read once per process
+    _validators = {}
+
+    @classmethod
+    def _validator(cls, schema_path: str):
+        validator = cls._validators.get(schema_path)
+        if validator is None:
+            with open(schema_path, "r", encoding="UTF-8") as file:
+                json_schema = json.load(file)
+            validator_class = jsonschema.validators.validator_for(json_schema)
+            validator_class.check_schema(json_schema)
+            validator = cls._validators[schema_path] = validator_class(json_schema)
+        return validator
+
     def read_json_file(self, filepath):
         """
         Read a json file.
@@ -23,7 +39,7 @@ class JsonHandler:
             return filecontent
 
         except Exception as e:
-            print(f"Error reading file at path {filepath}: {e}")
+            logger.error("Error reading file at path %s: %s", filepath, e)
             return None
 
     def validate_json(self, json_data: dict, schema_path: str) -> bool:
@@ -34,26 +50,26 @@ class JsonHandler:
         :return: True if json object is valid, False otherwise
         """
         try:
-            with open(schema_path, "r", encoding="UTF-8") as file:
-                json_schema = json.load(file)
-            
-            jsonschema.validate(instance=json_data, schema=json_schema)
+            # the most relevant error, as reported by jsonschema.validate
+            error = jsonschema.exceptions.best_match(self._validator(schema_path).iter_errors(json_data))
+            if error is not None:
+                raise error
             return True
 
         except FileNotFoundError:
-            logging.error(f"Schema file not found at: {schema_path}")
+            logger.error("Schema file not found at: %s", schema_path)
             return False
             
         except json.JSONDecodeError:
-            logging.error(f"Schema file at {schema_path} is not valid JSON.")
+            logger.error("Schema file at %s is not valid JSON.", schema_path)
             return False
 
         except jsonschema.exceptions.ValidationError as ex:
-            logging.error(f"JSON Validation Error: {ex.message}")
+            logger.error("JSON Validation Error: %s", ex.message)
             return False
             
         except Exception as e:
-            logging.error(f"Unexpected error during validation: {e}")
+            logger.error("Unexpected error during validation: %s", e)
             return False
         
 
@@ -77,7 +93,7 @@ class JsonHandler:
         try:
             audio_bytes = base64.b64decode(base64_string)
         except Exception as e:
-            print(f"Error decoding Base64: {e}")
+            logger.error("Error decoding Base64: %s", e)
             return ""
 
         # Generate a unique filename
@@ -2,21 +2,33 @@
 Author: Martina Fabiani
 
 """
-from dataclasses import asdict
-import json
+import logging
+import os
 import time
 
+from ingestion_system import DATABASE_FOLDER_PATH, INGESTION_FOLDER_PATH, ING_MAN_CONFIG_FILE_PATH
 from ingestion_system.ingestion_configuration import Parameters
-from ingestion_system.record_buffer import RecordBufferController
-from ingestion_system.raw_session_creator import RawSessionCreator
+from ingestion_system.ingestion_worker import IngestionWorker, session_uuid, shard_of
+from ingestion_system.phase_counter import PhaseCounter
 from ingestion_system.record_and_session_channel import RecordAndSessionChannel
-from ingestion_system.record_sufficiency_checker import RecordSufficiencyChecker
-from ingestion_system.json_handler import JsonHandler
+from common import transport
+from common.logger import configure_logging
+from common.metrics import MetricsRegistry
+from common.profiler import LoopProfiler
+from common.tracing import Tracer
+
+logger = logging.getLogger(__name__)
 
 class IngestionSystemOrchestrator:
     """
     Orchestrator for the ingestion system workflow.
     Manages instances of system components.
+
+    The records are routed by uuid to a pool of workers (the "workers" configuration),
+    each one validating the records and assembling the sessions of its uuids with its own
+    record buffer: the main loop only decodes the records to route them. With a
+    single worker the records are processed in the main loop, as they are received,
+    and the main loop also flushes its expired sessions.
     """
 
     def __init__(self):
@@ -24,50 +36,76 @@ class IngestionSystemOrchestrator:
         Initializes the IngestionSystemOrchestrator object.
         """
 
-        print("INGESTION ORCHESTRATOR INITIALIZATION")
-
         # parameters class configuration
         self.parameters = Parameters()
 
+        # structured logging, written in background
+        configure_logging("ingestion_system", self.parameters.configuration.get("logging"))
+        logger.info("INGESTION ORCHESTRATOR INITIALIZATION")
 
-        # buffer class configuration
-        self.buffer_controller = RecordBufferController()
-        
-        # record sufficiency checker configuration
-        self.sufficiency_checker = RecordSufficiencyChecker(self.buffer_controller)
 
-        # raw session configuration
-        self.session_creator = RawSessionCreator(self.parameters)
+        # durable log of the received records: the partial sessions of the previous run are kept
+        message_log = self.parameters.configuration.get("message_log")
+        keep_records = isinstance(message_log, dict) and message_log.get("enabled", False)
 
-        # IO configuration
-        self.json_io = RecordAndSessionChannel(host= self.parameters.configuration["ip_ingestion"]
-                                                 , port=self.parameters.configuration["port_ingestion"])  # parameters of Ingestion server
-        self.json_io.start_server()
+        # runtime metrics, exposed on /metrics by the channel
+        self.metrics = MetricsRegistry()
 
-        self.current_sessions = 0  # number of sessions received in the current phase
-        self.current_phase = self.parameters.configuration["current_phase"]  # current phase
+        # per-session spans, sent in batches to the Service Class
+        self.tracer = Tracer.from_configuration("Ingestion System", self.parameters.configuration.get("tracing"),
+                                                metrics=self.metrics)
 
-        print("INGESTION ORCHESTRATOR INITIALIZED")
+        # IO configuration, with the bounded queue of the received records
+        max_queue_size, retry_after = transport.queue_limits(self.parameters.configuration.get("receive_queue"))
+        self.json_io = RecordAndSessionChannel(host= self.parameters.configuration["ip_ingestion"]
+                                                 , port=self.parameters.configuration["port_ingestion"]
+                                                 , tracer=self.tracer
+                                                 , metrics=self.metrics
+                                                 , max_queue_size=max_queue_size
+                                                 , retry_after=retry_after
+                                                 , message_log=message_log)  # parameters of Ingestion server
+
+        # current phase and sessions sent in it, shared by the workers
+        self.phase_counter = PhaseCounter(self.parameters.configuration)
+
+        # session assembly workers, one buffer each
+        worker_count, worker_queue_size = self._worker_settings(self.parameters.configuration.get("workers"))
+        self.workers = []
+        for index in range(worker_count):
+            # a single worker keeps the original buffer DB
+            database_path = os.path.join(DATABASE_FOLDER_PATH, f"IngestionSystem_{index}.db") \
+                if worker_count > 1 else None
+            self.workers.append(IngestionWorker(index, self.parameters, self.json_io, self.phase_counter,
+                                                self.tracer, self.metrics, keep_records=keep_records,
+                                                database_path=database_path, queue_size=worker_queue_size,
+                                                on_processed=self.json_io.acknowledge))
+
+        if worker_count > 1:
+            # the records are processed out of order: the log is committed when the workers are done
+            self.json_io.enable_acknowledgements()
+            for worker in self.workers:
+                worker.start()
+
+        # on-demand profiling of the main loop, from the configuration or on /profile
+        self.profiler = LoopProfiler("Ingestion System", os.path.join(INGESTION_FOLDER_PATH, "data", "profiles"),
+                                     ING_MAN_CONFIG_FILE_PATH)
+        self.profiler.mount(self.json_io.app)
+
+        self.json_io.start_server()
 
-    def _update_session(self):
-        # updates the number of session received and eventually changes the current phase
-        self.current_sessions += 1
+        logger.info("INGESTION ORCHESTRATOR INITIALIZED (%d workers)", worker_count)
 
-        #if we are in production and the number of sessions sent is reached, change to evaluation
-        if self.current_phase == "production" and self.current_sessions == self.parameters.configuration["production_sessions"]:
-            self.current_phase = "evaluation"
-            self.current_sessions = 0
-            print("CHANGED TO EVALUATION")
-        # if we are in evaluation and the number of sessions sent is reached, change to production
-        elif self.current_phase == "evaluation" and self.current_sessions == self.parameters.configuration["evaluation_sessions"]:
-            self.current_phase = "production"
-            self.current_sessions = 0
-            print("CHANGED TO PRODUCTION")
-        elif self.current_phase == "development" and self.current_sessions == self.parameters.configuration["development_sessions"]:
-            self.current_phase = "production"
-            self.current_sessions = 0
-            print("CHANGED TO PRODUCTION")
+    @property
+    def current_phase(self) -> str:
+        return self.phase_counter.current_phase
 
+    @staticmethod
+    def _worker_settings(configuration) -> tuple:
+        # number of workers (0 for one per core) and size of their queues
+        if not isinstance(configuration, dict):
+            return 1, 100
+        count = int(configuration.get("count", 1)) or os.cpu_count() or 1
+        return count, int(configuration.get("queue_size", 100))
 
     def process_record(self):
         """
@@ -75,112 +113,49 @@ class IngestionSystemOrchestrator:
         Main Loop of the Ingestion System.
         """
         total_record_count = 0
-        sessions_created = 0
         
-        print("Starting processing loop...")
+        logger.info("Starting processing loop...")
+
+        # the other workers flush their expired sessions in their own thread
+        single_worker = self.workers[0] if len(self.workers) == 1 else None
+        receive_timeout = single_worker.expiry_check_interval if single_worker is not None else None
 
         while True:  # receive records iteratively
+            self.profiler.tick()
+            offset = None
             try:
-                # receives new record
-                incoming_result = self.json_io.get_record()  
+                if single_worker is not None:
+                    single_worker.flush_expired_sessions()
+
+                # receives new record, waking up to flush the expired sessions;
+                # with several workers the record is only decoded here, each worker validates its own
+                incoming_result = self.json_io.get_record(timeout=receive_timeout,
+                                                          validate=single_worker is not None)
 
                 if incoming_result is None:
                     continue  # no record received, continue the loop
 
+                offset = self.json_io.last_offset
                 is_valid, new_record = incoming_result
                 if not is_valid or new_record is None:
-                    print("Received invalid record, skipping...")
+                    logger.warning("Received invalid record, skipping...")
+                    self.json_io.acknowledge(offset)
                     continue  # skip invalid records
                 
                 total_record_count += 1
-                print(f"Processed records count: {total_record_count}")
-
-                # process AUDIO records: convert base64 to file and update record
-                if new_record.get("source") == "audio":
-                    
-                    # Extract the internal "value" dictionary
-                    value_data = new_record.get("value", {})
-                    base64_audio = value_data.get("audio")
-
-                    if base64_audio:
-                        # A. TRANSFORMATION: Base64 -> File
-                        audio_path = JsonHandler.save_base64_audio_to_file(base64_audio)
-                        
-                        # B. RECORD UPDATE
-                        # Note: We need to update inside "value", not at the root!
-                        # This way store_record will save the path in the DB.
-                        new_record["value"]["file_path"] = audio_path 
-                        
-                        # Remove the heavy field
-                        if "audio" in new_record["value"]:
-                            del new_record["value"]["audio"]
-
-
-                # stores record
-                self.buffer_controller.store_record(new_record)
-
-                uuid = new_record["value"]["uuid"]
-
-                # checks if records are sufficient to create a raw session
-                # if we are in development mode, label is required
-                # in production, label is not required
-                if not self.sufficiency_checker.are_records_sufficient(uuid, self.current_phase):
-                    continue
-                
-                print(f"Creating RawSession")
-                # retrieves stored records
-                stored_records = self.buffer_controller.get_records(uuid)
-
-                # creates raw session
-                raw_session = self.session_creator.create_raw_session(stored_records)
-                sessions_created += 1
-                print(f"RAW SESSION created count: {sessions_created}")
-
-                # removes records from buffer
-                self.buffer_controller.remove_records(new_record["value"]["uuid"])
-
-                # marks missing samples with "None" and checks if the session is valid
-                session_valid, marked_raw_session = self.session_creator.mark_missing_samples(raw_session, None)
-    
-                
-                if not session_valid:
-                  continue  # do not send anything
-
-                # if in evaluation phase, sends label to evaluation system
-                if self.current_phase == "evaluation":
-                    label = {
-                        "uuid": marked_raw_session.uuid,
-                        "label": marked_raw_session.label
-                    }
-                    # print(label)
-                    print("Send Label to EVALUATION System")
-
-                    self.json_io.send_label(target_ip=self.parameters.configuration["ip_evaluation"],
-                                              target_port=self.parameters.configuration["port_evaluation"], label_data=label)
-
-                # sends raw session to preparation system
-                session_dict = asdict(raw_session)
-                # print(session_dict)
-                if self.json_io.send_raw_session(target_ip=self.parameters.configuration["ip_preparation"],
-                                          target_port=self.parameters.configuration["port_preparation"], session_data=session_dict):
-
-                    print(f"Raw Session sent ")
-
-
-                #update the session sent counter only it is production/evaluation
-                #because development is changed by the human
-                # if self.current_phase != "development":
-                    #if it is testing phase, count sessions to change then phase
-                    #otherwise, if it is not testing phase, stop counting, no phase change needed
-                    # if self.parameters.configuration["service"]:
-                    #     self._update_session()
-
-                if self.parameters.configuration["service"]:
-                    self._update_session()
+                logger.debug("Processed records count: %d", total_record_count)
 
+                if len(self.workers) == 1:
+                    self.workers[0].process(new_record)
+                else:
+                    # all the records of a session go to the same worker, waiting if it is busy
+                    worker = self.workers[shard_of(session_uuid(new_record), len(self.workers))]
+                    worker.submit(new_record, offset)
+                    offset = None  # acknowledged by the worker
 
             except Exception as e:
-                print(f"Error during ingestion: {e}")
+                logger.exception("Error during ingestion: %s", e)
+                self.json_io.acknowledge(offset)
                 time.sleep(1)  # brief pause before retrying
 
 
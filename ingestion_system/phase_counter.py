@@ -0,0 +1,63 @@
+"""
+Module: phase_counter
+Counts the sessions sent in the current phase and changes the phase, shared by the ingestion workers.
+
+Author: Martina Fabiani
+
+"""
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class PhaseCounter:
+    """
+    Current phase of the ingestion system and number of sessions sent in it.
+    The workers send sessions concurrently, so every session is counted in exactly one phase under a lock.
+    """
+
+    def __init__(self, configuration: dict):
+        """
+        Initialize the counter from the ingestion configuration.
+
+        :param configuration: The configuration, with "current_phase", "service" and the number of
+                              sessions of each phase.
+        """
+        self.configuration = configuration
+        self.current_phase = configuration["current_phase"]  # current phase
+        self.current_sessions = 0  # number of sessions received in the current phase
+        self._lock = threading.Lock()
+
+    def claim_session(self) -> str:
+        """
+        Assign a session about to be sent to the current phase and count it, changing phase when
+        the number of sessions of the phase is reached.
+        Sessions are counted only in service mode, otherwise the phase is changed by the human.
+
+        :return: The phase the session belongs to, e.g. "evaluation" if its label must be sent.
+        """
+        with self._lock:
+            phase = self.current_phase
+            if self.configuration["service"]:
+                self._update_session()
+            return phase
+
+    def _update_session(self):
+        # updates the number of session received and eventually changes the current phase
+        self.current_sessions += 1
+
+        #if we are in production and the number of sessions sent is reached, change to evaluation
+        if self.current_phase == "production" and self.current_sessions == self.configuration["production_sessions"]:
+            self.current_phase = "evaluation"
+            self.current_sessions = 0
+            logger.info("CHANGED TO EVALUATION")
+        # if we are in evaluation and the number of sessions sent is reached, change to production
+        elif self.current_phase == "evaluation" and self.current_sessions == self.configuration["evaluation_sessions"]:
+            self.current_phase = "production"
+            self.current_sessions = 0
+            logger.info("CHANGED TO PRODUCTION")
+        elif self.current_phase == "development" and self.current_sessions == self.configuration["development_sessions"]:
+            self.current_phase = "production"
+            self.current_sessions = 0
+            logger.info("CHANGED TO PRODUCTION")
@@ -33,12 +33,22 @@ class RawSessionCreator:
 
    
 
-    def mark_missing_samples(self, raw_session: RawSession, placeholder: Any) -> Tuple[bool, RawSession]:
+    def mark_missing_samples(self, raw_session: RawSession, placeholder: Any,
+                             partial: bool = False) -> Tuple[bool, RawSession]:
         """
         Mark missing/invalid sources.
         - Events: Checks if the strings in the list belong to the allowed vocabulary.
+        - Partial sessions (flushed before all their records arrived): each missing
+          tweet, audio or events source counts as a missing sample and is replaced
+          by an empty value, so the session keeps the raw session format.
         """
         missing_count = 0
+
+        if partial:
+            for source, empty in (("tweet", ""), ("audio", ""), ("events", [])):
+                if getattr(raw_session, source) is None:
+                    missing_count += 1
+                    setattr(raw_session, source, empty)
         
         EVENT_MAPPING = {
             "score": 0, "sending-off": 1, "caution": 2, 
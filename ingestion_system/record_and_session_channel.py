@@ -5,32 +5,57 @@ Handles JSON-based input and output operations for the ingestion system.
 Author: Martina Fabiani
 
 """
-from ingestion_system import RECORD_SCHEMA_FILE_PATH
+from ingestion_system import RECORD_SCHEMA_FILE_PATH, INGESTION_FOLDER_PATH
 from ingestion_system.json_handler import JsonHandler
+from common import transport
+from common.message_log import DurableQueue, open_channel_queue
+from common.metrics import MetricsRegistry
+from common.tracing import Tracer
 
 
+import logging
 import threading
+import time
 import requests
 import json
 from flask import Flask, request, jsonify
-from queue import Queue, Empty
+from queue import Empty
 from typing import Optional, Dict, Tuple, Any, Union
 
+logger = logging.getLogger(__name__)
+
 
 class RecordAndSessionChannel:
     """
     A channel for sending/receiving records, sessions, and labels using Flask.
     """
-    def __init__(self, host: str = '0.0.0.0', port: int = 5001):
+    def __init__(self, host: str = '0.0.0.0', port: int = 5001, tracer: Optional[Tracer] = None,
+                 metrics: Optional[MetricsRegistry] = None, max_queue_size: int = 0,
+                 retry_after: float = transport.DEFAULT_RETRY_AFTER, message_log: Optional[dict] = None):
         """
         Initialize the attributes defined in the UML.
+
+        :param tracer: Tracer recording the receive, validate and send spans (disabled if None).
+        :param metrics: Registry of the Ingestion System metrics, exposed on /metrics (a new one if None).
+        :param max_queue_size: Maximum number of queued records (0 for unbounded), then senders get a 503.
+        :param retry_after: Seconds the senders are asked to wait when the queue is full.
+        :param message_log: The "message_log" configuration, if enabled the received records are logged on
+                            disk and the ones not yet processed are received again after a restart.
         """
         self.app = Flask(__name__)  # -app
         self.host = host            # -host
         self.port = port            # -port
+        self.metrics = metrics or MetricsRegistry()
+        self.metrics.mount(self.app)
+        self.tracer = tracer or Tracer("Ingestion System", metrics=self.metrics)
         
         # Internal components needed for functionality
-        self._message_queue = Queue()
+        self._message_queue = open_channel_queue(self.metrics, "records", max_queue_size, message_log,
+                                                 INGESTION_FOLDER_PATH)
+        self.retry_after = retry_after
+        self._json_handler = JsonHandler()
+        # offset in the message log of the last record returned by get_record (None without the log)
+        self.last_offset = None
 
         # Internal Route definition
         @self.app.route('/send', methods=['POST'])
@@ -48,19 +73,24 @@ class RecordAndSessionChannel:
             if not payload:
                 return jsonify({"error": "Invalid format, 'payload' missing"}), 400
 
-            # Add to queue
-            self._message_queue.put({
+            # Add to queue, the sender is asked to retry later if the queue is full
+            if not self._message_queue.offer({
                 'ip': sender_ip,
                 'port': sender_port,
                 'type': data_type,
-                'data': payload
-            })
+                'data': payload,
+                'trace_id': data.get('trace_id'),
+                'received_at': time.time()
+            }):
+                return transport.busy_response(self.retry_after)
 
             return jsonify({"status": "received"}), 200
 
     # Start the Flask server in a separate thread
     def start_server(self):
-        """Start Flask in a daemon thread."""
+        """Start Flask in a daemon thread, unless the subsystems run in a single interpreter."""
+        if transport.serve_locally(self.app, self.port):
+            return
         thread = threading.Thread(
             target=self.app.run, 
             kwargs={'host': self.host, 'port': self.port, 'use_reloader': False}, 
@@ -77,25 +107,47 @@ class RecordAndSessionChannel:
         # Convert to dict if it's an object
         # if hasattr(session_data, '__dict__'): session_data = session_data.__dict__
         
-        return self._send_generic(target_ip, target_port, 'raw_session', session_data)
+        trace_id = session_data.get('uuid') if isinstance(session_data, dict) else getattr(session_data, 'uuid', None)
+        return self._send_generic(target_ip, target_port, 'raw_session', session_data, trace_id)
 
     def send_label(self, target_ip: str, target_port: int, label_data: Dict[str, Any]) -> bool:
         """
         + send_label(): Sends label data to a target.
         Returns True if successful.
         """
-        return self._send_generic(target_ip, target_port, 'label', label_data)
+        return self._send_generic(target_ip, target_port, 'label', label_data, label_data.get('uuid'))
+
+    def enable_acknowledgements(self):
+        """
+        Commit the logged records only when acknowledged, so that they can be processed in parallel.
+        Without the message log there is nothing to acknowledge.
+        """
+        if isinstance(self._message_queue, DurableQueue):
+            self._message_queue.manual_ack = True
 
-    def get_record(self, timeout: Optional[float] = None) -> Optional[Tuple[bool, Any]]:
+    def acknowledge(self, offset: Optional[int]):
+        """
+        Mark a record as processed, after enable_acknowledgements.
+
+        :param offset: The last_offset read after the get_record of the record.
+        """
+        if offset is not None and isinstance(self._message_queue, DurableQueue):
+            self._message_queue.ack(offset)
+
+    def get_record(self, timeout: Optional[float] = None, validate: bool = True) -> Optional[Tuple[bool, Any]]:
 
         """
         Retrieve a message from the queue, blocking if necessary.
 
         :param timeout: Maximum time to wait. None means wait indefinitely.
+        :param validate: If False the record is only decoded, to be checked later with validate_record
+                         (by the worker owning its uuid).
         :return: A tuple (is_valid, record_data) or None if timed out.
         """
         try:
             queue_item = self._message_queue.get(timeout=timeout, block=True)
+            dequeued_at = time.time()
+            self.last_offset = getattr(self._message_queue, 'last_offset', None)
             
             # extract raw data
             raw_data = queue_item.get('data') 
@@ -106,28 +158,44 @@ class RecordAndSessionChannel:
             else:
                 record = raw_data
 
-            # Validation
-            handler = JsonHandler()
-            is_valid = handler.validate_json(record, RECORD_SCHEMA_FILE_PATH)
+            # the trace id is the session uuid, taken from the record if the sender did not set it
+            trace_id = queue_item.get('trace_id')
+            if trace_id is None and isinstance(record, dict) and isinstance(record.get('value'), dict):
+                trace_id = record['value'].get('uuid')
+            self.tracer.record(trace_id, "receive", queue_item.get('received_at', dequeued_at), dequeued_at)
 
-            if is_valid:
+            if not validate:
                 return True, record
-            else:
-                print(f"Warning: Invalid record received from {queue_item.get('ip')}")
-                return False, record
+            return self.validate_record(record, trace_id), record
 
         except Empty:
             # Timeout occurred
-            # print("No messages received.") 
             return None
             
         except Exception as e:
-            print(f"Error processing record in get_record: {e}")
+            logger.exception("Error processing record in get_record: %s", e)
             return False, None
             
+    def validate_record(self, record: Any, trace_id: Optional[str] = None) -> bool:
+        """
+        Validate a decoded record against the record schema, counting the invalid ones.
+        Safe to call from several threads.
+
+        :param record: The decoded record.
+        :param trace_id: The session uuid, for the validate span.
+        :return: True if the record is valid.
+        """
+        with self.tracer.span(trace_id, "validate"):
+            is_valid = self._json_handler.validate_json(record, RECORD_SCHEMA_FILE_PATH)
+        if not is_valid:
+            self.metrics.counter("validation_failures_total", type="record").inc()
+            logger.warning("Invalid record received for session %s", trace_id)
+        return is_valid
+
     # --- Private Helper Method ---
 
-    def _send_generic(self, target_ip: str, target_port: int, msg_type: str, content: Any) -> bool:
+    def _send_generic(self, target_ip: str, target_port: int, msg_type: str, content: Any,
+                      trace_id: Optional[str] = None) -> bool:
         """Internal helper to handle the HTTP POST logic."""
         url = f"http://{target_ip}:{target_port}/send"
         
@@ -135,13 +203,16 @@ class RecordAndSessionChannel:
         payload = {
             "port": self.port,
             "type": msg_type,
-            "payload": content
+            "payload": content,
+            "trace_id": trace_id
         }
-        try:
-            # Use a timeout to avoid hanging indefinitely
-            response = requests.post(url, json=payload, timeout=10)
-            if response.status_code == 200:
-                return True
-        except requests.RequestException as e:
-            print(f"Error sending {msg_type} to {target_ip}:{target_port} - {e}")
+        with self.tracer.span(trace_id, f"send_{msg_type}"):
+            try:
+                # Use a timeout to avoid hanging indefinitely, wait while the receiver is busy
+                response = transport.post(url, json=payload, timeout=10)
+                if response.status_code == 200:
+                    return True
+            except requests.RequestException as e:
+                logger.error("Error sending %s to %s:%s - %s", msg_type, target_ip, target_port, e)
+        self.metrics.counter("send_failures_total", type=msg_type).inc()
         return False
\ No newline at end of file
@@ -1,25 +1,35 @@
 import sqlite3
 import json
+import logging
+import time
 from typing import List, Any
 
 from ingestion_system import DATABASE_FILE_PATH
 
+logger = logging.getLogger(__name__)
+
 class RecordBufferController:
     """
     Controller for managing the record buffer using sqlite3 directly.
     Manages storage for: tweet, audio, events, label.
+    Each uuid keeps the time its first record was stored, indexed to find the sessions left incomplete.
     """
 
-    def __init__(self):
+    def __init__(self, keep_records: bool = False, database_path: str = None):
         """
         Initialize the connection and the table.
+
+        :param keep_records: If True the records of the previous run are kept, to complete their sessions
+                             (used with the message log, which does not deliver them again).
+        :param database_path: Path of the SQLite DB, DATABASE_FILE_PATH if None (each worker has its own).
         """
         # Connection to SQLite DB
-        self.conn = sqlite3.connect(DATABASE_FILE_PATH, check_same_thread=False)
+        self.conn = sqlite3.connect(database_path or DATABASE_FILE_PATH, check_same_thread=False)
         self.cursor = self.conn.cursor()
 
         # Clear the DB on startup 
-        self._drop_table()
+        if not keep_records:
+            self._drop_table()
 
         # Create Table
         self._create_table()
@@ -36,8 +46,18 @@ class RecordBufferController:
                  "tweet TEXT, "
                  "audio TEXT, "
                  "events TEXT, "
-                 "label TEXT);")
+                 "label TEXT, "
+                 "first_seen REAL);")
         self.cursor.execute(query)
+
+        # a buffer kept from a version without first_seen: its records are timed from now
+        columns = [row[1] for row in self.cursor.execute("PRAGMA table_info(records)")]
+        if "first_seen" not in columns:
+            self.cursor.execute("ALTER TABLE records ADD COLUMN first_seen REAL")
+            self.cursor.execute("UPDATE records SET first_seen = ?", (time.time(),))
+
+        # expiry index of the incomplete sessions
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS records_first_seen ON records (first_seen)")
         self.conn.commit()
 
     def store_record(self, record: dict) -> None:
@@ -50,9 +70,10 @@ class RecordBufferController:
         source_type = record["source"] 
 
         # 1. INSERT OR IGNORE: create a new row if UUID does not exist
-        insert_query = ("INSERT OR IGNORE INTO records (uuid, tweet, audio, events, label) "
-                        "VALUES (?, NULL, NULL, NULL, NULL);")
-        self.cursor.execute(insert_query, (uuid,))
+        # wall-clock time, so that the records kept across a restart still expire
+        insert_query = ("INSERT OR IGNORE INTO records (uuid, tweet, audio, events, label, first_seen) "
+                        "VALUES (?, NULL, NULL, NULL, NULL, ?);")
+        self.cursor.execute(insert_query, (uuid, time.time()))
 
         # 2. EXTRACT & PREPARE: Extract ONLY the data we need
         content_to_save = None
@@ -72,7 +93,7 @@ class RecordBufferController:
 
         # If no valid data found, exit or log warning
         if content_to_save is None:
-            print(f"Warning: No valid data found for source '{source_type}' in record {uuid}")
+            logger.warning("No valid data found for source '%s' in record %s", source_type, uuid)
             return
 
         # Convert the SINGLE VALUE to a JSON string
@@ -85,9 +106,9 @@ class RecordBufferController:
             self.cursor.execute(update_query, (json_content, uuid))
             
             self.conn.commit()
-            # print(f"Stored {source_type} for {uuid}") 
+            logger.debug("Stored %s for %s", source_type, uuid)
         else:
-            print(f"Warning: Unknown source type '{source_type}' for uuid {uuid}")
+            logger.warning("Unknown source type '%s' for uuid %s", source_type, uuid)
 
     def get_records(self, uuid: str) -> List[Any]:
         """
@@ -115,6 +136,17 @@ class RecordBufferController:
 
         return result
 
+    def get_expired_uuids(self, first_seen_before: float, limit: int = 100) -> List[str]:
+        """
+        Returns the uuids whose first record was stored before a time, oldest first.
+
+        :param first_seen_before: Wall-clock time (time.time()) of the deadline.
+        :param limit: Maximum number of uuids returned.
+        """
+        query = "SELECT uuid FROM records WHERE first_seen < ? ORDER BY first_seen LIMIT ?;"
+        self.cursor.execute(query, (first_seen_before, limit))
+        return [row[0] for row in self.cursor.fetchall()]
+
     def remove_records(self, uuid: str) -> None:
         """
         Deletes a record from the db.
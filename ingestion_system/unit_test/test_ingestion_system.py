@@ -71,12 +71,12 @@ def test_read_json_file_error(json_handler):
 
 def test_validate_json_valid(json_handler):
     mock_schema = '{"type": "object"}'
-    with patch("builtins.open", mock_open(read_data=mock_schema)), \
-         patch("ingestion_system.json_handler.jsonschema.validate") as mock_validate:
-        
+    with patch("builtins.open", mock_open(read_data=mock_schema)) as mock_file, \
+         patch.dict(JsonHandler._validators, clear=True):
+
         result = json_handler.validate_json({"a": 1}, "schema.json")
         assert result is True
-        mock_validate.assert_called()
+        mock_file.assert_called_once()
 
 def test_save_base64_audio_to_file(tmp_path):
     # Simuliamo una stringa base64 (header + dati)
@@ -147,6 +147,18 @@ def test_remove_records(buffer_controller):
     result = buffer_controller.get_records(uuid)
     assert result == []
 
+def test_sessioni_scadute_dalla_piu_vecchia(buffer_controller):
+    with patch("ingestion_system.record_buffer.time.time", side_effect=[100.0, 200.0, 300.0]):
+        for uuid in ["vecchia", "media", "recente"]:
+            buffer_controller.store_record({"source": "tweet", "value": {"uuid": uuid, "tweet": "ciao"}})
+
+    # il primo record fissa l'istante della sessione, quelli successivi no
+    buffer_controller.store_record({"source": "label", "value": {"uuid": "vecchia", "label": "1"}})
+
+    assert buffer_controller.get_expired_uuids(250.0) == ["vecchia", "media"]
+    assert buffer_controller.get_expired_uuids(250.0, limit=1) == ["vecchia"]
+    assert buffer_controller.get_expired_uuids(50.0) == []
+
 
 # ==========================================
 # 4. TEST: RecordSufficiencyChecker
@@ -235,4 +247,234 @@ def test_mark_missing_samples_invalid_too_many_errors(raw_session_creator, mock_
     is_valid, _ = raw_session_creator.mark_missing_samples(session, "None")
     
     # 1 errore > 0 permessi -> False
-    assert is_valid is False
\ No newline at end of file
+    assert is_valid is False
+
+def test_mark_missing_samples_sessione_parziale(raw_session_creator):
+    # sessione scaduta senza audio ne' eventi
+    session = RawSession(uuid="1", tweet="ciao", label="1")
+
+    is_valid, processed_session = raw_session_creator.mark_missing_samples(session, None, partial=True)
+
+    # le sorgenti mancanti diventano vuote, ognuna conta come un campione mancante (2 <= 2)
+    assert processed_session.audio == ""
+    assert processed_session.events == []
+    assert processed_session.tweet == "ciao"
+    assert is_valid is True
+
+    session = RawSession(uuid="2", label="1")
+    is_valid, _ = raw_session_creator.mark_missing_samples(session, None, partial=True)
+    assert is_valid is False
+# ==========================================
+# MESSAGE LOG
+# ==========================================
+
+def test_record_non_elaborato_sopravvive_al_riavvio(tmp_path):
+    from ingestion_system.record_and_session_channel import RecordAndSessionChannel
+
+    message_log = {"enabled": True, "directory": str(tmp_path), "checkpoint_interval": 0}
+    record = {"source": "tweet", "value": {"uuid": "abc", "tweet": "hello"}}
+
+    channel = RecordAndSessionChannel(port=5001, message_log=message_log)
+    response = channel.app.test_client().post("/send", json={"port": 5000, "payload": record})
+    assert response.status_code == 200
+
+    # riavvio prima che il record venga elaborato: il nuovo canale lo riceve dal log
+    restarted = RecordAndSessionChannel(port=5001, message_log=message_log)
+    is_valid, restored = restarted.get_record(timeout=1)
+    assert is_valid is True
+    assert restored == record
+
+
+# ==========================================
+# WORKER E SHARDING
+# ==========================================
+
+def test_shard_stabile_e_nei_limiti():
+    from ingestion_system.ingestion_worker import shard_of
+
+    # lo stesso uuid va sempre allo stesso worker, anche dopo un riavvio
+    assert shard_of("abc", 4) == shard_of("abc", 4)
+    assert {shard_of(f"uuid-{n}", 4) for n in range(100)} == {0, 1, 2, 3}
+
+
+def test_conteggio_sessioni_tra_worker_concorrenti():
+    import threading
+    from ingestion_system.phase_counter import PhaseCounter
+
+    counter = PhaseCounter({"current_phase": "production", "service": True, "production_sessions": 10,
+                            "evaluation_sessions": 5, "development_sessions": 30})
+    phases = []
+
+    def send_sessions():
+        for _ in range(30):
+            phases.append(counter.claim_session())
+
+    threads = [threading.Thread(target=send_sessions) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 120 sessioni = 8 cicli completi di 10 in produzione e 5 in valutazione
+    assert phases.count("production") == 80
+    assert phases.count("evaluation") == 40
+    assert counter.current_phase == "production" and counter.current_sessions == 0
+
+
+def test_worker_invia_la_sessione_completa():
+    from ingestion_system.ingestion_worker import IngestionWorker
+    from ingestion_system.phase_counter import PhaseCounter
+    from common.metrics import MetricsRegistry
+    from common.tracing import Tracer
+
+    config = MagicMock(spec=Parameters)
+    config.configuration = {"current_phase": "evaluation", "service": True, "evaluation_sessions": 5,
+                            "maxNumMissingSamples": 2, "ip_evaluation": "127.0.0.1", "port_evaluation": 5210,
+                            "ip_preparation": "127.0.0.1", "port_preparation": 5002}
+    json_io = MagicMock()
+    processed = []
+    worker = IngestionWorker(0, config, json_io, PhaseCounter(config.configuration), Tracer("Ingestion System"),
+                             MetricsRegistry(), database_path=":memory:", on_processed=processed.append)
+    worker.start()
+
+    records = [{"source": "tweet", "value": {"uuid": "abc", "tweet": "hello"}},
+               {"source": "audio", "value": {"uuid": "abc", "file_path": "a.wav"}},
+               {"source": "events", "value": {"uuid": "abc", "events": ["score"]}},
+               {"source": "label", "value": {"uuid": "abc", "label": "1"}}]
+    for offset, record in enumerate(records):
+        worker.submit(record, offset)
+    worker.stop()
+
+    assert processed == [0, 1, 2, 3]
+    json_io.send_label.assert_called_once()
+    json_io.send_raw_session.assert_called_once()
+    assert json_io.send_raw_session.call_args.kwargs["session_data"]["uuid"] == "abc"
+
+
+def test_worker_valida_i_record_ricevuti():
+    from ingestion_system.ingestion_worker import IngestionWorker
+    from ingestion_system.phase_counter import PhaseCounter
+    from ingestion_system.record_and_session_channel import RecordAndSessionChannel
+    from common.metrics import MetricsRegistry
+    from common.tracing import Tracer
+
+    config = MagicMock(spec=Parameters)
+    config.configuration = {"current_phase": "production", "service": False, "maxNumMissingSamples": 2}
+    metrics = MetricsRegistry()
+    channel = RecordAndSessionChannel(port=5001, metrics=metrics)
+    processed = []
+    worker = IngestionWorker(0, config, channel, PhaseCounter(config.configuration), Tracer("Ingestion System"),
+                             metrics, database_path=":memory:", on_processed=processed.append)
+    worker.start()
+
+    # il thread principale decodifica soltanto: il record non valido viene scartato dal worker
+    worker.submit({"source": "video", "value": {"uuid": "abc"}}, 0)
+    worker.submit({"source": "tweet", "value": {"uuid": "abc", "tweet": "ciao"}}, 1)
+    worker.stop()
+
+    assert processed == [0, 1]
+    assert metrics.counter("validation_failures_total", type="record").value == 1
+    assert worker.buffer_controller.get_records("abc")[1] == "ciao"
+
+
+def test_schema_letto_una_sola_volta(json_handler, tmp_path):
+    schema_path = tmp_path / "schema.json"
+    schema_path.write_text('{"type": "object", "required": ["uuid"]}')
+
+    assert json_handler.validate_json({"uuid": "a"}, str(schema_path)) is True
+    # il validatore compilato resta in memoria anche se il file cambia
+    schema_path.write_text("non e' json")
+    assert json_handler.validate_json({}, str(schema_path)) is False
+    assert json_handler.validate_json({"uuid": "b"}, str(schema_path)) is True
+
+
+# ==========================================
+# TIMEOUT DELLE SESSIONI INCOMPLETE
+# ==========================================
+
+def make_worker(phase, session_timeout):
+    from ingestion_system.ingestion_worker import IngestionWorker
+    from ingestion_system.phase_counter import PhaseCounter
+    from common.metrics import MetricsRegistry
+    from common.tracing import Tracer
+
+    config = MagicMock(spec=Parameters)
+    config.configuration = {"current_phase": phase, "service": False, "maxNumMissingSamples": 1,
+                            "ip_evaluation": "127.0.0.1", "port_evaluation": 5210,
+                            "ip_preparation": "127.0.0.1", "port_preparation": 5002,
+                            "session_timeout": session_timeout}
+    metrics = MetricsRegistry()
+    worker = IngestionWorker(0, config, MagicMock(), PhaseCounter(config.configuration), Tracer("Ingestion System"),
+                             metrics, database_path=":memory:")
+    return worker, metrics
+
+
+def test_worker_invia_la_sessione_parziale_scaduta():
+    import time
+
+    worker, metrics = make_worker("production", {"seconds": 30, "action": "flush"})
+    worker.process({"source": "tweet", "value": {"uuid": "abc", "tweet": "ciao"}})
+    worker.process({"source": "audio", "value": {"uuid": "abc", "file_path": "a.wav"}})
+
+    # prima del timeout la sessione resta nel buffer
+    assert worker.flush_expired_sessions() == 0
+    worker._next_expiry_check = 0.0
+    assert worker.flush_expired_sessions(now=time.time() + 60) == 1
+
+    session = worker.json_io.send_raw_session.call_args.kwargs["session_data"]
+    assert session["uuid"] == "abc" and session["events"] == []
+    assert worker.buffer_controller.get_records("abc") == []
+    assert metrics.counter("expired_sessions_total", action="flushed").value == 1
+
+
+def test_worker_scarta_le_sessioni_scadute():
+    import time
+
+    # in sviluppo una sessione senza etichetta non e' utilizzabile
+    worker, metrics = make_worker("development", {"seconds": 30})
+    worker.process({"source": "tweet", "value": {"uuid": "abc", "tweet": "ciao"}})
+    worker.process({"source": "audio", "value": {"uuid": "abc", "file_path": "a.wav"}})
+    worker.process({"source": "events", "value": {"uuid": "abc", "events": ["score"]}})
+    assert worker.flush_expired_sessions(now=time.time() + 60) == 1
+
+    # con l'azione "drop" anche quelle complete a meno di un campione
+    dropping, dropped = make_worker("production", {"seconds": 30, "action": "drop"})
+    dropping.process({"source": "tweet", "value": {"uuid": "def", "tweet": "ciao"}})
+    dropping.process({"source": "audio", "value": {"uuid": "def", "file_path": "a.wav"}})
+    assert dropping.flush_expired_sessions(now=time.time() + 60) == 1
+
+    for current, registry in [(worker, metrics), (dropping, dropped)]:
+        current.json_io.send_raw_session.assert_not_called()
+        assert registry.counter("expired_sessions_total", action="dropped").value == 1
+
+
+def test_worker_scarta_i_record_arrivati_dopo_la_scadenza():
+    import time
+
+    worker, metrics = make_worker("production", {"seconds": 30, "action": "flush"})
+    worker.process({"source": "tweet", "value": {"uuid": "abc", "tweet": "ciao"}})
+    worker.process({"source": "audio", "value": {"uuid": "abc", "file_path": "a.wav"}})
+    assert worker.flush_expired_sessions(now=time.time() + 60) == 1
+
+    # il record ritardatario non apre una nuova sessione
+    worker.process({"source": "events", "value": {"uuid": "abc", "events": ["score"]}})
+    assert worker.buffer_controller.get_records("abc") == []
+    assert metrics.counter("late_records_total").value == 1
+    assert worker.json_io.send_raw_session.call_count == 1
+
+    # passato il tempo configurato l'uuid viene dimenticato
+    worker._expired_uuids["abc"] = time.monotonic()
+    worker.process({"source": "events", "value": {"uuid": "abc", "events": ["score"]}})
+    assert worker.buffer_controller.get_records("abc") != []
+    assert metrics.counter("late_records_total").value == 1
+
+
+def test_worker_ricorda_un_numero_limitato_di_uuid_scaduti():
+    from ingestion_system import ingestion_worker
+
+    worker, _ = make_worker("production", {"seconds": 30, "late_records_seconds": 60})
+    with patch.object(ingestion_worker, "MAX_EXPIRED_UUIDS", 2):
+        for uuid in ["a", "b", "c"]:
+            worker._remember_expired(uuid)
+    assert list(worker._expired_uuids) == ["b", "c"]
+    assert not worker._is_late("a") and worker._is_late("c")
@@ -1 +1,160 @@
-print("Hello, World!")
\ No newline at end of file
+"""
+Pipeline mode: runs the subsystems of the Cyberbullying Detection System from a single entry point.
+
+By default every subsystem runs on its own thread of this interpreter and the
+messages between them are delivered in-process (common.transport.LocalNetwork):
+no HTTP server is started and no socket is opened, each message goes straight
+to the receiving queue of its target. The subsystems listed with --process run
+in their own process instead, and talk to the others over HTTP.
+
+Usage (from the repository root):
+    python main.py [SUBSYSTEM ...] [--process SUBSYSTEM ...]
+    python main.py --all-processes
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+
+from common import transport
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_ingestion():
+    from ingestion_system.orchestrator import IngestionSystemOrchestrator
+    IngestionSystemOrchestrator().process_record()
+
+
+def run_preparation():
+    from preparation_system.orchestrator import PreparationSystemOrchestrator
+    PreparationSystemOrchestrator().prepare_session()
+
+
+def run_segregation():
+    from segregation_system.segregation_database import PreparedSessionDatabaseController
+    from segregation_system.segregation_orchestrator import SegregationSystemOrchestrator
+
+    orchestrator = SegregationSystemOrchestrator(True)
+    if orchestrator.get_testing():
+        orchestrator.reset_execution_state()
+        PreparedSessionDatabaseController().remove_all_prepared_sessions()
+        while orchestrator.get_testing():
+            orchestrator.run()
+    else:
+        orchestrator.run()
+        orchestrator.report_renderer.close()
+
+
+def run_development():
+    from development_system.development_system_orchestrator import DevelopmentSystemOrchestrator
+    DevelopmentSystemOrchestrator().develop()
+
+
+def run_production():
+    from production_system.production_orchestrator import ProductionOrchestrator
+    ProductionOrchestrator(service=True, unit_test=False).production()
+
+
+def run_evaluation():
+    from evaluation_system.evaluationSystemOrchestrator import EvaluationSystemOrchestrator
+    EvaluationSystemOrchestrator(basedir=os.path.join(ROOT_DIR, "evaluation_system")).evaluate()
+
+
+# the subsystems in pipeline order, with the function running their main loop
+SUBSYSTEMS = {
+    "ingestion": run_ingestion,
+    "preparation": run_preparation,
+    "segregation": run_segregation,
+    "development": run_development,
+    "production": run_production,
+    "evaluation": run_evaluation,
+}
+
+
+def sender_addresses() -> dict:
+    """
+    Return the ip of the subsystem listening on each port, as written in the Production System netconf.
+    The receivers see it as the sender ip of the messages delivered in-process.
+    """
+    path = os.path.join(ROOT_DIR, "production_system", "configuration", "global_netconf.json")
+    with open(path, "r", encoding="utf-8") as file:
+        netconf = json.load(file)
+    return {binding["port"]: binding["ip"] for binding in netconf.values()}
+
+
+class Pipeline:
+    """
+    Runs a set of subsystems, on threads connected in-process and on separate processes.
+    """
+
+    def __init__(self, subsystems=None, processes=()):
+        """
+        :param subsystems: Names of the subsystems to run, all of them if None.
+        :param processes: Names of the subsystems to run in their own process.
+        """
+        subsystems = list(subsystems or SUBSYSTEMS)
+        unknown = [name for name in list(subsystems) + list(processes) if name not in SUBSYSTEMS]
+        if unknown:
+            raise ValueError(f"Unknown subsystems: {', '.join(unknown)}")
+        self.processes = [name for name in subsystems if name in processes]
+        self.threads = [name for name in subsystems if name not in processes]
+        self._runners = []
+
+    def start(self):
+        """Start every subsystem, without waiting for them."""
+        if self.threads:
+            # the subsystems in other processes still need the HTTP servers of the ones on threads
+            transport.use_local_network(transport.LocalNetwork(sender_addresses(), serve_http=bool(self.processes)))
+        for name in self.processes:
+            process = multiprocessing.Process(target=_run_in_process, args=(name,), name=name, daemon=True)
+            process.start()
+            self._runners.append(process)
+        for name in self.threads:
+            thread = threading.Thread(target=SUBSYSTEMS[name], name=name, daemon=True)
+            thread.start()
+            self._runners.append(thread)
+
+    def join(self):
+        """Wait until every subsystem stops."""
+        for runner in self._runners:
+            runner.join()
+
+
+def _run_in_process(name):
+    # a process of its own talks to the other subsystems over HTTP
+    transport.use_local_network(None)
+    SUBSYSTEMS[name]()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the subsystems of the Cyberbullying Detection System.")
+    parser.add_argument("subsystems", nargs="*", metavar="SUBSYSTEM",
+                        help=f"Subsystems to run, all of them by default: {', '.join(SUBSYSTEMS)}.")
+    parser.add_argument("--process", action="append", default=[], choices=list(SUBSYSTEMS),
+                        help="Run this subsystem in its own process, connected over HTTP (repeatable).")
+    parser.add_argument("--all-processes", action="store_true",
+                        help="Run every subsystem in its own process, as separate deployments do.")
+    args = parser.parse_args()
+
+    # the subsystems read some of their files relative to the repository root
+    os.chdir(ROOT_DIR)
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+
+    subsystems = args.subsystems or list(SUBSYSTEMS)
+    try:
+        pipeline = Pipeline(subsystems, processes=subsystems if args.all_processes else args.process)
+    except ValueError as error:
+        parser.error(str(error))
+    pipeline.start()
+    try:
+        pipeline.join()
+    except KeyboardInterrupt:
+        print("\nStopping the pipeline...")
+
+
+if __name__ == "__main__":
+    main()
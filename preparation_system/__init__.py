@@ -13,6 +13,7 @@ def _get_data_file_absolute_path(relative_path: str) -> str:
     return os.path.join(os.path.dirname(os.path.abspath(__file__)), relative_path)
 
 
+PREPARATION_FOLDER_PATH = os.path.dirname(os.path.abspath(__file__))
 PREP_CONFIG_FILE_PATH = _get_data_file_absolute_path("Preparation_configuration_schema/"
                                                         "preparationSystemConfiguration.json")
 PREP_CONFIG_SCHEMA_FILE_PATH = _get_data_file_absolute_path(
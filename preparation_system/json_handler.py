@@ -2,6 +2,8 @@ import json
 import logging
 import jsonschema
 
+logger = logging.getLogger(__name__)
+
 class JsonHandler:
     """
     A class to read and save json files.
@@ -20,7 +22,7 @@ class JsonHandler:
             return filecontent
 
         except Exception as e:
-            print(f"Error reading file at path {filepath}: {e}")
+            logger.error("Error reading file at path %s: %s", filepath, e)
             return None
 
     def validate_json(self, json_data: dict, schema_path: str) -> bool:
@@ -38,17 +40,17 @@ class JsonHandler:
             return True
 
         except FileNotFoundError:
-            logging.error(f"Schema file not found at: {schema_path}")
+            logger.error("Schema file not found at: %s", schema_path)
             return False
             
         except json.JSONDecodeError:
-            logging.error(f"Schema file at {schema_path} is not valid JSON.")
+            logger.error("Schema file at %s is not valid JSON.", schema_path)
             return False
 
         except jsonschema.exceptions.ValidationError as ex:
-            logging.error(f"JSON Validation Error: {ex.message}")
+            logger.error("JSON Validation Error: %s", ex.message)
             return False
             
         except Exception as e:
-            logging.error(f"Unexpected error during validation: {e}")
+            logger.error("Unexpected error during validation: %s", e)
             return False
\ No newline at end of file
@@ -3,12 +3,22 @@ import sys
 import logging
 from dataclasses import asdict
 import json
+import os
 
 # Import dei moduli interni del Preparation System
+from preparation_system import PREPARATION_FOLDER_PATH, PREP_CONFIG_FILE_PATH
 from preparation_system.preparation_configuration import PreparationSystemParameters
 from preparation_system.preparation_session_channel import PreparationSessionChannel
 from preparation_system.session_corrector import SessionCorrector
 from preparation_system.prepared_session_creator import PreparedSessionCreator
+from common import transport
+from common.logger import configure_logging
+from common.metrics import MetricsRegistry
+from common.profiler import LoopProfiler
+from common.shared_ring import DEFAULT_RING_NAME
+from common.tracing import Tracer
+
+logger = logging.getLogger(__name__)
 
 
 class PreparationSystemOrchestrator:
@@ -21,16 +31,32 @@ class PreparationSystemOrchestrator:
         """
         Initializes the Orchestrator and all its sub-components.
         """
-        print("PREPARATION ORCHESTRATOR INITIALIZATION")
-        
-        # 1. Load Configuration
+        # 1. Load Configuration, then start the structured logging, written in background
         self.parameters = PreparationSystemParameters()
+        configure_logging("preparation_system", self.parameters.configuration.get("logging"))
+        logger.info("PREPARATION ORCHESTRATOR INITIALIZATION")
         
-        # 2. Setup Communication Channel
+        # 2. Setup Communication Channel (per-session spans are sent to the Service Class,
+        #    runtime metrics are exposed on /metrics)
+        self.metrics = MetricsRegistry()
+        self.tracer = Tracer.from_configuration("Preparation System", self.parameters.configuration.get("tracing"),
+                                                metrics=self.metrics)
+        max_queue_size, retry_after = transport.queue_limits(self.parameters.configuration.get("receive_queue"))
         self.json_io = PreparationSessionChannel(
             host=self.parameters.ip_preparation,
-            port=self.parameters.port_preparation
+            port=self.parameters.port_preparation,
+            tracer=self.tracer,
+            metrics=self.metrics,
+            max_queue_size=max_queue_size,
+            retry_after=retry_after,
+            message_log=self.parameters.configuration.get("message_log"),
+            shared_memory_routes=self._shared_memory_routes()
         )
+        # on-demand profiling of the main loop, from the configuration or on /profile
+        self.profiler = LoopProfiler("Preparation System",
+                                     os.path.join(PREPARATION_FOLDER_PATH, "data", "profiles"),
+                                     PREP_CONFIG_FILE_PATH)
+        self.profiler.mount(self.json_io.app)
         self.json_io.start_server()
 
         # 3. Setup Logic Components
@@ -40,18 +66,26 @@ class PreparationSystemOrchestrator:
         self.current_phase = self.parameters.configuration["current_phase"]  # current phase
         self.current_sessions = 0  # number of sessions processed in the current phase
 
-        print(f"PREPARATION ORCHESTRATOR INITIALIZED ")
+        logger.info("PREPARATION ORCHESTRATOR INITIALIZED")
     
+    def _shared_memory_routes(self):
+        # the Production System is reached through its shared memory ring when co-located
+        production_transport = self.parameters.configuration.get("production_transport", {})
+        if production_transport.get("type") != "shared_memory":
+            return {}
+        target = (self.parameters.configuration["ip_production"], self.parameters.configuration["port_production"])
+        return {target: production_transport.get("name", DEFAULT_RING_NAME)}
+
     def _update_session(self):
         # updates the number of session received and eventually changes the current phase
         self.current_sessions += 1
-        print(f"Sessions Processed: {self.current_sessions}")
+        logger.info("Sessions Processed: %d", self.current_sessions)
 
         # if we are in development phase and we reached the max number of sessions, change to production
         if self.current_phase == "development" and self.current_sessions == self.parameters.configuration["development_sessions"]:
             self.current_phase = "production"
             self.current_sessions = 0
-            print("DEVELOPMENT PHASE COMPLETED.")
+            logger.info("DEVELOPMENT PHASE COMPLETED.")
 
         
     def prepare_session(self):
@@ -59,9 +93,10 @@ class PreparationSystemOrchestrator:
         Main Loop: Process sessions iteratively.
         Corresponds to the main flow in the BPMN.
         """
-        print("Starting preparation loop...")
+        logger.info("Starting preparation loop...")
 
         while True:
+            self.profiler.tick()
             try:
                 # --- RECEIVE RAW SESSION ---
                 raw_session= self.json_io.get_raw_session()
@@ -73,16 +108,17 @@ class PreparationSystemOrchestrator:
                 # print(f"Processing UUID: {raw_session.get('uuid')}")
                 # print(json.dumps(raw_session, indent=4, default=str))
 
-                # --- CORRECT MISSING SAMPLES (events) ---
-                corrected_raw_session = self.corrector.correct_missing_samples(raw_session, None)
+                with self.tracer.span(raw_session.get("uuid"), "feature_extract"):
+                    # --- CORRECT MISSING SAMPLES (events) ---
+                    corrected_raw_session = self.corrector.correct_missing_samples(raw_session, None)
 
-                # Create prepared session from raw session, extracting features
-                prepared_session = self.creator.create_prepared_session(corrected_raw_session)
+                    # Create prepared session from raw session, extracting features
+                    prepared_session = self.creator.create_prepared_session(corrected_raw_session)
 
-                print("Prepared Session Created")
+                    logger.debug("Prepared Session %s Created", prepared_session.uuid)
 
-                # Correct absolute outliers
-                correct_prepared_session = self.corrector.correct_absolute_outliers(prepared_session)
+                    # Correct absolute outliers
+                    correct_prepared_session = self.corrector.correct_absolute_outliers(prepared_session)
                 # print(json.dumps(asdict(correct_prepared_session), indent=4, default=str))
                 
                 # print("Absolute Outliers Corrected")
@@ -104,16 +140,16 @@ class PreparationSystemOrchestrator:
                 success = self.json_io.send_prepared_session(target_ip, target_port, correct_prepared_session)
 
                 if success:
-                    print(f"Prepared Session sent to {dest_name}.")
+                    logger.debug("Prepared Session %s sent to %s.", correct_prepared_session.uuid, dest_name)
                 else:
-                    print(f"ERROR: Failed to send session {correct_prepared_session.uuid} to {dest_name}.")
+                    logger.error("Failed to send session %s to %s.", correct_prepared_session.uuid, dest_name)
 
                 if self.parameters.configuration["service"]:
                     self._update_session()
 
 
             except Exception as e:
-                print(f"CRITICAL ERROR in Preparation Loop: {e}")
+                logger.critical("CRITICAL ERROR in Preparation Loop: %s", e, exc_info=True)
                 time.sleep(1)
 
 
@@ -10,6 +10,8 @@ import logging
 from preparation_system.json_handler import JsonHandler
 from preparation_system import PREP_CONFIG_FILE_PATH, PREP_CONFIG_SCHEMA_FILE_PATH
 
+logger = logging.getLogger(__name__)
+
 class PreparationSystemParameters:
     """
     Loads and stores configuration parameters for the preparation system.
@@ -26,14 +28,14 @@ class PreparationSystemParameters:
         self.configuration = handler.read_json_file(PREP_CONFIG_FILE_PATH)
         
         if self.configuration is None:
-            logging.critical("Configuration file not found or unreadable.")
+            logger.critical("Configuration file not found or unreadable.")
             sys.exit(1) # Exit with error code
 
         # Validate configuration file schema
         is_valid = handler.validate_json(self.configuration, PREP_CONFIG_SCHEMA_FILE_PATH)
         
         if not is_valid:
-            logging.critical("Configuration file does not match the schema.")
+            logger.critical("Configuration file does not match the schema.")
             sys.exit(1) # Exit with error code
 
         # Map dictionary to class attributes
@@ -54,7 +56,7 @@ class PreparationSystemParameters:
             self.port_preparation = self.configuration.get("port_preparation")
             
         except Exception as e:
-            logging.error(f"Error mapping configuration parameters: {e}")
+            logger.error("Error mapping configuration parameters: %s", e)
             sys.exit(1)
 
     def load_config(self):
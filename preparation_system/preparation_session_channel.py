@@ -1,14 +1,28 @@
+import logging
 import threading
+import time
 import requests
 import json
 from flask import Flask, request, jsonify
-from queue import Queue, Empty
+from queue import Empty
 from typing import Optional, Dict, Any, Tuple
 import dataclasses
 from dataclasses import asdict
 
 from preparation_system.json_handler import JsonHandler 
-from preparation_system import RAW_SESSION_SCHEMA_PATH
+from preparation_system import RAW_SESSION_SCHEMA_PATH, PREPARATION_FOLDER_PATH
+from common import transport
+from common.message_log import open_channel_queue
+from common.metrics import MetricsRegistry
+from common.shared_ring import RingClosedError, RingFullError, SharedSessionRing
+from common.tracing import Tracer
+
+# Seconds between two attempts to attach to a shared memory ring not created yet
+SHARED_MEMORY_ATTACH_INTERVAL = 1.0
+# Maximum seconds a session waits for a free slot of a full ring
+SHARED_MEMORY_MAX_WAIT = 5.0
+
+logger = logging.getLogger(__name__)
 
 
 class PreparationSessionChannel:
@@ -18,22 +32,44 @@ class PreparationSessionChannel:
     Responsibilities:
     1. Receive RawSessions from the Ingestion System (via Flask server).
     2. Buffer received sessions in a thread-safe Queue.
-    3. Send PreparedSessions to the Classification or Segregation System.
+    3. Send PreparedSessions to the Classification or Segregation System,
+       over HTTP or, for co-located targets, through a shared memory ring.
     """
 
-    def __init__(self, host: str = '0.0.0.0', port: int = 5001):
+    def __init__(self, host: str = '0.0.0.0', port: int = 5001, tracer: Optional[Tracer] = None,
+                 metrics: Optional[MetricsRegistry] = None, max_queue_size: int = 0,
+                 retry_after: float = transport.DEFAULT_RETRY_AFTER, message_log: Optional[dict] = None,
+                 shared_memory_routes: Optional[Dict[Tuple[str, int], str]] = None):
         """
         Initialize the Flask server and the message queue.
 
         :param host: Host IP address to bind the server.
         :param port: Port number to listen on.
+        :param tracer: Tracer recording the receive, validate and send spans (disabled if None).
+        :param metrics: Registry of the Preparation System metrics, exposed on /metrics (a new one if None).
+        :param max_queue_size: Maximum number of queued RawSessions (0 for unbounded), then senders get a 503.
+        :param retry_after: Seconds the senders are asked to wait when the queue is full.
+        :param message_log: The "message_log" configuration, if enabled the queued RawSessions are logged
+                            on disk and survive a restart.
+        :param shared_memory_routes: The targets reached through shared memory, (ip, port) -> ring name.
+                                     The other targets, and these ones while their ring is missing, use HTTP.
         """
         self.app = Flask(__name__)
         self.host = host
         self.port = port
+        self.metrics = metrics or MetricsRegistry()
+        self.metrics.mount(self.app)
+        self.tracer = tracer or Tracer("Preparation System", metrics=self.metrics)
         
         # Thread-safe queue to store incoming RawSessions
-        self._input_queue = Queue()
+        self._input_queue = open_channel_queue(self.metrics, "raw_sessions", max_queue_size, message_log,
+                                               PREPARATION_FOLDER_PATH)
+        self.retry_after = retry_after
+
+        # rings attached so far, and time of the last failed attach of each route
+        self._shared_memory_routes = dict(shared_memory_routes or {})
+        self._rings: Dict[str, SharedSessionRing] = {}
+        self._attach_failed_at: Dict[str, float] = {}
 
         # Define the route to receive messages (RawSessions)
         @self.app.route('/send', methods=['POST'])
@@ -53,15 +89,19 @@ class PreparationSessionChannel:
             payload = data.get('payload') # This should be the RawSession dict
 
             if not payload:
-                print("Received message without payload.")
+                logger.warning("Received message without payload.")
                 return jsonify({"error": "Invalid format, 'payload' missing"}), 400
 
             # We only care about raw_sessions in this input channel
             if msg_type == 'raw_session':
-                self._input_queue.put({
+                # when the audio decoding falls behind, the Ingestion System is asked to wait
+                if not self._input_queue.offer({
                     'ip': sender_ip,
-                    'data': payload
-                })
+                    'data': payload,
+                    'trace_id': data.get('trace_id'),
+                    'received_at': time.time()
+                }):
+                    return transport.busy_response(self.retry_after)
                 return jsonify({"status": "received"}), 200
             else:
                 return jsonify({"warning": f"Ignored message type: {msg_type}"}), 200
@@ -70,14 +110,17 @@ class PreparationSessionChannel:
         """
         Start the Flask server in a separate daemon thread.
         This allows the main orchestration loop to run concurrently.
+        In pipeline mode the messages are delivered in-process instead.
         """
+        if transport.serve_locally(self.app, self.port):
+            return
         server_thread = threading.Thread(
             target=self.app.run, 
             kwargs={'host': self.host, 'port': self.port, 'use_reloader': False}, 
             daemon=True
         )
         server_thread.start()
-        print(f"Preparation Session Channel listening on {self.host}:{self.port}")
+        logger.info("Preparation Session Channel listening on %s:%s", self.host, self.port)
 
     def get_raw_session(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
         """
@@ -85,15 +128,23 @@ class PreparationSessionChannel:
         """
         try:
             queue_item = self._input_queue.get(timeout=timeout, block=True)
+            dequeued_at = time.time()
             raw_session_data = queue_item.get('data')
 
+            # the trace id is the session uuid, taken from the session if the sender did not set it
+            trace_id = queue_item.get('trace_id')
+            if trace_id is None and isinstance(raw_session_data, dict):
+                trace_id = raw_session_data.get('uuid')
+            self.tracer.record(trace_id, "receive", queue_item.get('received_at', dequeued_at), dequeued_at)
+            validate_start = time.time()
+
             if raw_session_data:
                 # Correction EVENTS: from string '["a", "b"]' to list ["a", "b"]
                 if "events" in raw_session_data and isinstance(raw_session_data["events"], str):
                     try:
                         raw_session_data["events"] = json.loads(raw_session_data["events"])
                     except Exception as e:
-                        print(f"Warning: Failed to parse events string: {e}")
+                        logger.warning("Failed to parse events string: %s", e)
 
                 # Correction TWEET (optional, if it arrives as a JSON string)
                 if "tweet" in raw_session_data and isinstance(raw_session_data["tweet"], str):
@@ -111,8 +162,11 @@ class PreparationSessionChannel:
 
             # Now validate the RawSession schema
             handler = JsonHandler()
-            if not handler.validate_json(raw_session_data, RAW_SESSION_SCHEMA_PATH):
-                print("Invalid RawSession schema received.")
+            is_valid = handler.validate_json(raw_session_data, RAW_SESSION_SCHEMA_PATH)
+            self.tracer.record(trace_id, "validate", validate_start, time.time())
+            if not is_valid:
+                self.metrics.counter("validation_failures_total", type="raw_session").inc()
+                logger.warning("Invalid RawSession schema received.")
                 return None
 
             return raw_session_data
@@ -120,7 +174,7 @@ class PreparationSessionChannel:
         except Empty:
             return None
         except Exception as e:
-            print(f"Error retrieving raw session: {e}")
+            logger.exception("Error retrieving raw session: %s", e)
             return None
 
     def send_prepared_session(self, target_ip: str, target_port: int, prepared_session: Any) -> bool:
@@ -133,8 +187,6 @@ class PreparationSessionChannel:
         :param prepared_session: The PreparedSession object (or dict) to send.
         :return: True if sent successfully, False otherwise.
         """
-        url = f"http://{target_ip}:{target_port}/send"
-        
         # If the input is a dataclass object, convert it to a dict
         if hasattr(prepared_session, 'to_dict'):
             payload_data = prepared_session.to_dict()
@@ -144,20 +196,94 @@ class PreparationSessionChannel:
             payload_data = prepared_session
 
         # Construct the standard message envelope
+        trace_id = payload_data.get("uuid") if isinstance(payload_data, dict) else None
         message = {
             "port": self.port,
             "type": "prepared_session", # Tagging the message type
-            "payload": payload_data
+            "payload": payload_data,
+            "trace_id": trace_id
         }
 
-        try:
-            response = requests.post(url, json=message, timeout=5)
-            if response.status_code == 200:
-                # print(f"PreparedSession sent successfully to {target_ip}:{target_port}")
+        ring = self._ring((target_ip, target_port))
+        url = f"http://{target_ip}:{target_port}/send"
+        with self.tracer.span(trace_id, "send"):
+            if ring is not None and isinstance(payload_data, dict):
+                if self._send_shared((target_ip, target_port), ring, payload_data):
+                    return True
+                # the ring is missing or still full: the session goes through HTTP
+            try:
+                response = transport.post(url, json=message, timeout=5)
+                if response.status_code == 200:
+                    return True
+                else:
+                    logger.error("Failed to send PreparedSession. Status: %s", response.status_code)
+            except requests.RequestException as e:
+                logger.error("Connection error sending PreparedSession to %s:%s - %s", target_ip, target_port, e)
+
+        self.metrics.counter("send_failures_total", type="prepared_session").inc()
+        return False
+
+    def _ring(self, target: Tuple[str, int]) -> Optional[SharedSessionRing]:
+        """
+        Return the ring of a target reached through shared memory, attaching to it when needed.
+        None if the target uses HTTP or its receiver has not created the ring yet.
+        """
+        name = self._shared_memory_routes.get(target)
+        if name is None:
+            return None
+        ring = self._rings.get(name)
+        if ring is None and time.monotonic() - self._attach_failed_at.get(name, float('-inf')) >= SHARED_MEMORY_ATTACH_INTERVAL:
+            try:
+                ring = self._rings[name] = SharedSessionRing.attach(name)
+                logger.info("Sending PreparedSessions to %s:%s through shared memory '%s'", target[0], target[1], name)
+            except (FileNotFoundError, ValueError) as e:
+                self._attach_failed_at[name] = time.monotonic()
+                logger.warning("Shared memory '%s' not available, using HTTP - %s", name, e)
+        return ring
+
+    def _reattach(self, target: Tuple[str, int], ring: SharedSessionRing) -> Optional[SharedSessionRing]:
+        """
+        Drop a ring its receiver closed or replaced, and attach to the current one if any.
+        """
+        logger.warning("Shared memory '%s' was replaced by its receiver, attaching again", ring.name)
+        self.metrics.counter("ring_reattach_total").inc()
+        self._rings.pop(ring.name, None)
+        self._attach_failed_at.pop(ring.name, None)
+        ring.close()
+        return self._ring(target)
+
+    def _send_shared(self, target: Tuple[str, int], ring: SharedSessionRing, payload_data: Dict[str, Any]) -> bool:
+        """
+        Write a PreparedSession in a ring, waiting for a free slot while the receiver is behind.
+        A ring replaced by a restarted receiver is dropped, and the session written in the new one.
+
+        :return: False if the session was not written: the ring is missing, stayed full or has another layout.
+        """
+        deadline = time.monotonic() + SHARED_MEMORY_MAX_WAIT
+        delay = 0.001
+        checked = False
+        while True:
+            try:
+                ring.write(payload_data.get("uuid"), payload_data.get("label"), payload_data, time.time())
                 return True
-            else:
-                print(f"Failed to send PreparedSession. Status: {response.status_code}")
-        except requests.RequestException as e:
-            print(f"Connection error sending PreparedSession to {target_ip}:{target_port} - {e}")
-        
-        return False
\ No newline at end of file
+            except (RingClosedError, RingFullError) as e:
+                # a full ring may also have been unlinked by a receiver restarted meanwhile, checked once
+                stale = isinstance(e, RingClosedError) or (not checked and not ring.is_current())
+                checked = checked or isinstance(e, RingFullError)
+                if stale:
+                    ring = self._reattach(target, ring)
+                    if ring is None:
+                        logger.warning("Shared memory of %s:%s closed, PreparedSession %s sent through HTTP",
+                                       target[0], target[1], payload_data.get('uuid'))
+                        return False
+                    continue
+                if time.monotonic() >= deadline:
+                    logger.warning("Shared memory '%s' full, PreparedSession %s sent through HTTP", ring.name,
+                                   payload_data.get('uuid'))
+                    return False
+                time.sleep(delay)
+                delay = min(delay * 2, 0.1)
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning("PreparedSession %s does not match the shared memory layout, sent through HTTP - %s",
+                               payload_data.get('uuid'), e)
+                return False
@@ -1,11 +1,13 @@
+import logging
 import numpy as np
-import re
 import os
 from typing import List, Dict, Any, Union
 from dataclasses import dataclass, field
-from collections import Counter 
-import librosa 
 from preparation_system.preparation_configuration import PreparationSystemParameters
+from preparation_system.text_feature_extractor import TextFeatureExtractor
+from common.lexicon import load_lexicon
+
+logger = logging.getLogger(__name__)
 
 @dataclass
 class PreparedSession:
@@ -26,30 +28,23 @@ class PreparedSessionCreator:
         "substitution": 3, "foul": 4
     }
 
-    BOW_VOCABULARY = ["fuck", "bulli", "muslim", "gay", "nigger", "rape"]
-
     MAX_AUDIO_SAMPLES = 20
 
     def __init__(self, config: PreparationSystemParameters):
         self.config = config
+        # tokenizer, stopwords and vocabulary matcher are built once for all the sessions
+        self.text_extractor = TextFeatureExtractor(load_lexicon(), self.config.stopword_list)
 
     def create_prepared_session(self, raw_session: Any) -> PreparedSession:
         
         enabled_features = self.config.features
         flat_features = {}
 
-        clean_tokens = []
+        # 1. TWEET LENGTH and 2. BAG OF WORDS (FREQUENCY)
         if "tweetLength" in enabled_features or "badWords" in enabled_features:
-            clean_tokens = self._preprocess_text(raw_session.get("tweet"))
-
-        # 1. TWEET LENGTH
-        if "tweetLength" in enabled_features:
-            flat_features["tweet_length"] = len(clean_tokens)
-
-        # 2. BAG OF WORDS (FREQUENCY)
-        if "badWords" in enabled_features:
-            bow_dict = self._create_flat_bow(clean_tokens)
-            flat_features.update(bow_dict)
+            flat_features.update(self.text_extractor.extract(raw_session.get("tweet"),
+                                                             tweet_length="tweetLength" in enabled_features,
+                                                             bad_words="badWords" in enabled_features))
         
         # 3. AUDIO (FLATTENED & PADDED)
         if "audioDecibels" in enabled_features:
@@ -76,17 +71,7 @@ class PreparedSessionCreator:
         """
         Counts occurrences of target words in the token list.
         """
-        features = {}
-        
-        # Counter creates occurrences of each token
-        token_counts = Counter(tokens)
-
-        for target_word in self.BOW_VOCABULARY:
-            key_name = f"word_{target_word}"
-            # Set count or 0 if not present
-            features[key_name] = token_counts[target_word]
-        
-        return features
+        return self.text_extractor.count_words(tokens)
 
     def _create_flat_events(self, events: List[Dict]) -> Dict[str, int]:
         """
@@ -124,12 +109,7 @@ class PreparedSessionCreator:
 
     def _preprocess_text(self, text: str) -> List[str]:
         # Simple text preprocessing: lowercase, remove punctuation, tokenize, remove stopwords.
-        if not text: return []
-        text = text.lower()
-        text = re.sub(r'[^\w\s]', '', text)
-        tokens = text.split()
-        stop_words = set(self.config.stopword_list)
-        return [t for t in tokens if t not in stop_words]
+        return self.text_extractor.tokens(text)
 
     def _extract_audio_features(self, file_path_dict: Union[Dict, str]) -> List[float]:
         # Extract decibel values from audio file.
@@ -143,6 +123,12 @@ class PreparedSessionCreator:
         if not file_path or not os.path.exists(file_path):
             return [] 
 
+        # librosa pulls in numba/scipy: import it only when audio is actually processed
+        try:
+            import librosa
+        except ImportError:
+            librosa = None
+
         if librosa:
             try:
                 y, sr = librosa.load(file_path, sr=None)
@@ -150,6 +136,6 @@ class PreparedSessionCreator:
                 db_values = librosa.amplitude_to_db(rms, ref=0.00001, amin=0.00001)
                 return db_values.tolist()
             except Exception as e:
-                print(f"Error processing audio: {e}")
+                logger.error("Error processing audio %s: %s", file_path, e)
                 return []
         return []
\ No newline at end of file
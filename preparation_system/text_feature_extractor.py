@@ -0,0 +1,85 @@
+"""
+Module: text_feature_extractor
+Computes the text features of the tweets (tweet length and bag of words).
+
+The punctuation regex, the stopword set and the vocabulary matcher are built
+once, and only the vocabulary hits are counted, since these features are
+computed for every session in development and in production.
+
+Author: Martina Fabiani
+"""
+import re
+from typing import Dict, Iterable, List, Optional
+
+from common.lexicon import Lexicon
+
+# everything that is neither a word character nor a whitespace
+PUNCTUATION = re.compile(r'[^\w\s]')
+
+
+class TextFeatureExtractor:
+    """
+    Extracts "tweet_length" and the "word_<term>" counts of a vocabulary from the tweets.
+    """
+
+    def __init__(self, lexicon: Lexicon, stopwords: Iterable[str] = ()):
+        """
+        Precompute the stopword set.
+
+        :param lexicon: The vocabulary counted by the bag of words.
+        :param stopwords: The words removed before counting, a phrase containing one never matches.
+        """
+        self.lexicon = lexicon
+        self.stopwords = frozenset(stopwords)
+
+    def tokens(self, text: Optional[str]) -> List[str]:
+        """
+        Lowercase, remove punctuation, tokenize and remove stopwords.
+
+        :param text: The tweet.
+        :return: The clean tokens, empty if there is no text.
+        """
+        if not text:
+            return []
+        tokens = PUNCTUATION.sub('', text.lower()).split()
+        if not self.stopwords:
+            return tokens
+        return [token for token in tokens if token not in self.stopwords]
+
+    def extract(self, text: Optional[str], tweet_length: bool = True, bad_words: bool = True) -> Dict[str, int]:
+        """
+        Compute the text features of a tweet.
+
+        :param text: The tweet.
+        :param tweet_length: If True "tweet_length" is computed.
+        :param bad_words: If True the "word_<term>" counts are computed.
+        :return: The features, "tweet_length" first and then the terms in vocabulary order.
+        """
+        tokens = self.tokens(text)
+        features = {}
+        if tweet_length:
+            features["tweet_length"] = len(tokens)
+        if bad_words:
+            features.update(self.count_words(tokens))
+        return features
+
+    def extract_batch(self, texts: Iterable[Optional[str]], tweet_length: bool = True,
+                      bad_words: bool = True) -> List[Dict[str, int]]:
+        """
+        Compute the text features of a list of tweets.
+
+        :param texts: The tweets.
+        :param tweet_length: If True "tweet_length" is computed.
+        :param bad_words: If True the "word_<term>" counts are computed.
+        :return: The features of each tweet, in the same order.
+        """
+        return [self.extract(text, tweet_length, bad_words) for text in texts]
+
+    def count_words(self, tokens: List[str]) -> Dict[str, int]:
+        """
+        Count the occurrences of the vocabulary terms in clean tokens.
+
+        :param tokens: The clean tokens.
+        :return: A "word_<term>" count for each vocabulary term found, the absent ones count 0.
+        """
+        return self.lexicon.count(tokens)
@@ -0,0 +1,140 @@
+"""Streaming detection of the drift of the prepared session features."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+
+from common import drift
+
+
+@dataclass
+class DriftReport:
+    """Comparison of a window of sessions with the reference distribution."""
+
+    phase: str
+    sessions: int
+    # PSI and KS score of each feature
+    psi: Dict[str, float] = field(default_factory=dict)
+    ks: Dict[str, float] = field(default_factory=dict)
+    # features whose score of the configured statistic exceeds the threshold
+    drifted: List[str] = field(default_factory=list)
+
+
+class DriftReference:
+    """Sketch of the training features, exported with the classifier."""
+
+    def __init__(self, feature_names: List[str], quantiles: np.ndarray, proportions: np.ndarray) -> None:
+        self.feature_names = list(feature_names)
+        self.quantiles = np.asarray(quantiles, dtype=float)
+        self.proportions = np.asarray(proportions, dtype=float)
+        # upper bounds of the bins of each feature, features x (NUM_BINS - 1)
+        self.cuts = np.stack([drift.bin_cuts(q) for q in self.quantiles])
+
+    @classmethod
+    def load(cls, path: str | Path) -> Optional["DriftReference"]:
+        """Read the reference from a classifier artefact, None if it was exported without one."""
+        with np.load(path, allow_pickle=False) as artefact:
+            if "drift_features" not in artefact.files:
+                return None
+            return cls(artefact["drift_features"].tolist(), artefact["drift_quantiles"],
+                       artefact["drift_proportions"])
+
+
+class _PhaseWindow:
+    """Running histograms and reservoir sample of the sessions of a phase."""
+
+    def __init__(self, num_features: int, reservoir_size: int) -> None:
+        self.sessions = 0
+        self.counts = np.zeros((num_features, drift.NUM_BINS), dtype=np.int64)
+        self.reservoir = np.empty((reservoir_size, num_features), dtype=float)
+
+
+class FeatureDriftMonitor:
+    """
+    Compare the incoming sessions with the reference distribution, over windows of sessions.
+
+    Each phase has its own window. Every session updates a histogram per feature and,
+    with reservoir sampling, a bounded uniform sample of the window; when the window is
+    full the PSI and KS scores of each feature are computed and the window restarts.
+    """
+
+    STATISTICS = ("psi", "ks")
+
+    def __init__(self, reference: DriftReference, statistic: str = "psi", threshold: float = 0.25,
+                 window_size: int = 500, reservoir_size: int = 200, min_drifted_features: int = 1,
+                 session_keys: Optional[Mapping[str, str]] = None, seed: Optional[int] = None) -> None:
+        if statistic not in self.STATISTICS:
+            raise ValueError(f"Unsupported drift statistic: {statistic}")
+        if window_size < 1 or reservoir_size < 1:
+            raise ValueError("window_size and reservoir_size must be >= 1")
+        self.reference = reference
+        self.statistic = statistic
+        self.threshold = threshold
+        self.window_size = window_size
+        self.reservoir_size = reservoir_size
+        self.min_drifted_features = min_drifted_features
+        # prepared session keys which differ from the feature names
+        self._keys = [(session_keys or {}).get(name, name) for name in reference.feature_names]
+        self._rng = np.random.default_rng(seed)
+        self._windows: Dict[str, _PhaseWindow] = {}
+
+    @classmethod
+    def from_configuration(cls, configuration: Optional[dict], reference: Optional[DriftReference],
+                           session_keys: Optional[Mapping[str, str]] = None) -> Optional["FeatureDriftMonitor"]:
+        """Build the monitor of the "drift_monitor" configuration, None if disabled or without reference."""
+        if reference is None or not isinstance(configuration, dict) or not configuration.get("enabled", False):
+            return None
+        return cls(reference,
+                   statistic=configuration.get("statistic", "psi"),
+                   threshold=configuration.get("threshold", 0.25),
+                   window_size=configuration.get("window_size", 500),
+                   reservoir_size=configuration.get("reservoir_size", 200),
+                   min_drifted_features=configuration.get("min_drifted_features", 1),
+                   session_keys=session_keys)
+
+    def observe(self, prepared_session: Dict[str, Any], phase: str) -> Optional[DriftReport]:
+        """
+        Add a session to the window of its phase.
+
+        :return: The report of the window if this session completed it, None otherwise.
+        """
+        # the terms of the bag of words not found in the tweet are absent
+        values = np.array([float(prepared_session.get(key, 0)) for key in self._keys])
+        window = self._windows.get(phase)
+        if window is None:
+            window = self._windows[phase] = _PhaseWindow(len(values), self.reservoir_size)
+
+        # bin of each feature: number of cuts below the value
+        bins = (self.reference.cuts < values[:, None]).sum(axis=1)
+        window.counts[np.arange(len(values)), bins] += 1
+
+        # Algorithm R: after n sessions each of them is in the reservoir with probability size / n
+        if window.sessions < self.reservoir_size:
+            window.reservoir[window.sessions] = values
+        else:
+            slot = self._rng.integers(0, window.sessions + 1)
+            if slot < self.reservoir_size:
+                window.reservoir[slot] = values
+        window.sessions += 1
+
+        if window.sessions < self.window_size:
+            return None
+        del self._windows[phase]
+        return self._report(phase, window)
+
+    def should_retrain(self, report: DriftReport) -> bool:
+        """Return True if enough features drifted to ask for a new classifier."""
+        return len(report.drifted) >= self.min_drifted_features
+
+    def _report(self, phase: str, window: _PhaseWindow) -> DriftReport:
+        sample = window.reservoir[:min(window.sessions, self.reservoir_size)]
+        report = DriftReport(phase=phase, sessions=window.sessions)
+        for i, name in enumerate(self.reference.feature_names):
+            report.psi[name] = drift.psi(self.reference.proportions[i], window.counts[i])
+            report.ks[name] = drift.ks_statistic(self.reference.quantiles[i], sample[:, i])
+        scores = report.psi if self.statistic == "psi" else report.ks
+        report.drifted = [name for name, score in scores.items() if score > self.threshold]
+        return report
@@ -8,6 +8,8 @@ from typing import Any, Dict
 
 import jsonschema
 
+logger = logging.getLogger(__name__)
+
 
 class JsonHandler:
     """Read, persist, and validate JSON payloads."""
@@ -19,7 +21,7 @@ class JsonHandler:
             with file_path.open("r", encoding="utf-8") as json_file:
                 return json.load(json_file)
         except Exception as exc: 
-            logging.error("Error reading JSON file %s: %s", file_path, exc)
+            logger.error("Error reading JSON file %s: %s", file_path, exc)
             return None
 
     def write_json_file(self, data: Dict[str, Any], filepath: str | Path) -> bool:
@@ -33,17 +35,19 @@ class JsonHandler:
                 json.dump(data, json_file, ensure_ascii=False, indent=4)
             return True
         except Exception as exc:
-            logging.error("Error saving JSON file %s: %s", file_path, exc)
+            logger.error("Error saving JSON file %s: %s", file_path, exc)
             return False
 
-    def validate_json(self, json_data: Dict[str, Any], schema_path: str | Path) -> bool:
-        """Validate *json_data* against the schema in *schema_path*."""
-        schema_file = Path(schema_path)
-        with schema_file.open("r", encoding="utf-8") as file:
-            json_schema = json.load(file)
+    def validate_json(self, json_data: Dict[str, Any], schema_path: str | Path | Dict[str, Any]) -> bool:
+        """Validate *json_data* against the schema in *schema_path*, or against the schema itself."""
+        if isinstance(schema_path, dict):
+            json_schema = schema_path
+        else:
+            with Path(schema_path).open("r", encoding="utf-8") as file:
+                json_schema = json.load(file)
         try:
             jsonschema.validate(instance=json_data, schema=json_schema)
         except jsonschema.exceptions.ValidationError as exc:
-            logging.error(exc)
+            logger.warning("Invalid JSON: %s", exc.message)
             return False
         return True
@@ -0,0 +1,90 @@
+"""NumPy-only forward pass for the deployed multi-layer perceptron."""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+
+def _identity(x: np.ndarray) -> np.ndarray:
+    return x
+
+
+def _logistic(x: np.ndarray) -> np.ndarray:
+    # numerically stable form of 1 / (1 + exp(-x))
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+def _tanh(x: np.ndarray) -> np.ndarray:
+    return np.tanh(x)
+
+
+def _relu(x: np.ndarray) -> np.ndarray:
+    return np.maximum(x, 0)
+
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+    exp = np.exp(x - x.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+ACTIVATIONS = {
+    "identity": _identity,
+    "logistic": _logistic,
+    "tanh": _tanh,
+    "relu": _relu,
+    "softmax": _softmax,
+}
+
+
+class MlpPredictor:
+    """Predict classes from the weights exported by the development system."""
+
+    def __init__(self, coefs: List[np.ndarray], intercepts: List[np.ndarray], activation: str,
+                 out_activation: str, classes: np.ndarray, feature_names: Optional[List[str]] = None) -> None:
+        if activation not in ACTIVATIONS or out_activation not in ACTIVATIONS:
+            raise ValueError(f"Unsupported activation: {activation}/{out_activation}")
+        self.coefs = coefs
+        self.intercepts = intercepts
+        self.activation = activation
+        self.out_activation = out_activation
+        self.classes = classes
+        self.feature_names = feature_names
+
+    @classmethod
+    def load(cls, path: str | Path) -> "MlpPredictor":
+        """Load the predictor from a .npz artefact without unpickling any object."""
+        with np.load(path, allow_pickle=False) as artefact:
+            num_layers = sum(1 for name in artefact.files if name.startswith("coef_"))
+            coefs = [artefact[f"coef_{i}"] for i in range(num_layers)]
+            intercepts = [artefact[f"intercept_{i}"] for i in range(num_layers)]
+            feature_names = artefact["feature_names"].tolist() if "feature_names" in artefact.files else None
+            return cls(
+                coefs=coefs,
+                intercepts=intercepts,
+                activation=str(artefact["activation"]),
+                out_activation=str(artefact["out_activation"]),
+                classes=artefact["classes"],
+                feature_names=feature_names,
+            )
+
+    def forward(self, features: np.ndarray) -> np.ndarray:
+        """Return the output layer activations for a 2D feature matrix."""
+        hidden = ACTIVATIONS[self.activation]
+        values = np.asarray(features, dtype=self.coefs[0].dtype)
+        last = len(self.coefs) - 1
+        for i, (coef, intercept) in enumerate(zip(self.coefs, self.intercepts)):
+            values = values @ coef + intercept
+            values = ACTIVATIONS[self.out_activation](values) if i == last else hidden(values)
+        return values
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Return the predicted class of each row of *features*."""
+        output = self.forward(features)
+        if output.shape[1] == 1:
+            # binary problems have a single logistic output unit
+            indices = (output[:, 0] > 0.5).astype(int)
+        else:
+            indices = output.argmax(axis=1)
+        return self.classes[indices]
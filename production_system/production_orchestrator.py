@@ -2,8 +2,10 @@
 from __future__ import annotations
 
 import json
+import logging
 import time
 from pathlib import Path
+from collections.abc import Mapping
 from typing import Any
 
 
@@ -11,8 +13,18 @@ from .classification import Classification
 from .production_phase_manager import ClassificationPhaseManager
 from .configuration_parameters import ConfigurationParameters
 from .deployment import Deployment
+from .drift_monitor import DriftReference, FeatureDriftMonitor
 from .json_validation import JsonHandler
 from .production_system_communication import ProductionSystemIO
+from common import transport
+from common.lexicon import load_lexicon
+from common.logger import configure_logging
+from common.metrics import MetricsRegistry
+from common.profiler import LoopProfiler
+from common.shared_ring import SessionRow
+from common.tracing import Tracer
+
+logger = logging.getLogger(__name__)
 
 
 class ProductionOrchestrator:
@@ -27,6 +39,8 @@ class ProductionOrchestrator:
 
 
         self._configuration = ConfigurationParameters()
+        # Structured logging, written in background
+        configure_logging("production_system", self._configuration.parameters.get("logging"))
 
         # Phase manager
         self._phase_manager = ClassificationPhaseManager(
@@ -35,21 +49,49 @@ class ProductionOrchestrator:
             eval_threshold=int(self._configuration.parameters["max_session_evaluation"]),
         )
 
+        # Runtime metrics (exposed on /metrics) and per-session spans, sent in batches to the Service Class
+        self._metrics = MetricsRegistry()
+        self._tracer = Tracer.from_configuration("Production System", self._configuration.parameters.get("tracing"),
+                                                 metrics=self._metrics)
+
         prod_binding = self._configuration.global_netconf["Production System"]
-        self._prod_sys_io = ProductionSystemIO(prod_binding["ip"], prod_binding["port"])
+        max_queue_size, retry_after = transport.queue_limits(self._configuration.parameters.get("receive_queue"))
+        self._prod_sys_io = ProductionSystemIO(prod_binding["ip"], prod_binding["port"], tracer=self._tracer,
+                                               metrics=self._metrics, max_queue_size=max_queue_size,
+                                               retry_after=retry_after,
+                                               message_log=self._configuration.parameters.get("message_log"),
+                                               preparation_binding=self._configuration.global_netconf.get(
+                                                   "Preparation System"),
+                                               feature_names=Classification.session_keys())
+
+        # On-demand profiling of the orchestrator loop, from the configuration or on /profile
+        package_root = Path(__file__).resolve().parent
+        self._profiler = LoopProfiler("Production System", str(package_root / "data" / "profiles"),
+                                      str(package_root / "configuration" / "prod_sys_conf.json"))
+        self._profiler.mount(self._prod_sys_io.app)
 
         # check if the classifier is already deployed
-        model_path = Path(__file__).resolve().parent / "model" / "cyberbullying_classifier.sav"
-        self._deployed = model_path.exists()
+        self._model_path = Path(__file__).resolve().parent / "model" / Deployment.MODEL_FILENAME
+        self._deployed = self._model_path.exists()
+        # a single classifier for every session, loaded on the first one and replaced on each deployment
+        self._classification = Classification()
+
+        # Drift of the session features with respect to the training set of the deployed classifier
+        self._drift_monitor = self._load_drift_monitor() if self._deployed else None
+        self._retrain_requested = False
 
         self._handler = JsonHandler()
         self._schema_path = Path(__file__).resolve().parent / "production_schema" / "PreparedSessionSchema.json"
+        # the word_<term> properties of the schema follow the configured vocabulary
+        with self._schema_path.open("r", encoding="utf-8") as file:
+            self._schema = load_lexicon().extend_schema(json.load(file))
 
     def production(self) -> None:
         """Start the orchestrator loop."""
-        print("Cyberbullying production process started")
+        logger.info("Cyberbullying production process started")
         self._prod_sys_io.start_server()
         while True:
+            self._profiler.tick()
             message = self._prod_sys_io.get_last_message()
             if not message:
                 continue
@@ -58,14 +100,6 @@ class ProductionOrchestrator:
             sender_port = message.get("port")
             content = message.get("message")
 
-            # set correct size based on content type
-            if isinstance(content, str):
-                size = len(content)
-            elif isinstance(content, dict):
-                size = len(json.dumps(content))
-            else:
-                size = 0
-
             if sender_ip == self._configuration.global_netconf["Development System"]["ip"] and sender_port == self._configuration.global_netconf["Development System"]["port"]:
                 msg_type = "classifier"
             elif sender_ip == self._configuration.global_netconf["Preparation System"]["ip"] and sender_port == self._configuration.global_netconf["Preparation System"]["port"]:
@@ -74,7 +108,16 @@ class ProductionOrchestrator:
                 msg_type = "unknown"
 
             self._rx_counter += 1
-            print(f"[RX] #{self._rx_counter} from={sender_ip}:{sender_port} type={msg_type} size={size}")
+            if logger.isEnabledFor(logging.DEBUG):
+                # set correct size based on content type, only when it is logged
+                if isinstance(content, str):
+                    size = len(content)
+                elif isinstance(content, dict):
+                    size = len(json.dumps(content))
+                else:
+                    size = 0
+                logger.debug("[RX] #%d from=%s:%s type=%s size=%d", self._rx_counter, sender_ip, sender_port,
+                             msg_type, size)
 
 
             #   Timestamp
@@ -89,12 +132,15 @@ class ProductionOrchestrator:
                 continue
 
             if sender_ip == self._configuration.global_netconf["Preparation System"]["ip"] and sender_port == self._configuration.global_netconf["Preparation System"]["port"]:
+                received_at = message.get("received_at")
+                if received_at is not None:
+                    self._tracer.record(message.get("trace_id"), "receive", received_at, time.time())
                 self._handle_classification(message["message"])
                 if self._unit_test:
                     return
                 continue
 
-            print(f"Unknown sender {sender_ip}; ignoring message")
+            logger.warning("Unknown sender %s; ignoring message", sender_ip)
             if self._unit_test:
                 return
 
@@ -108,6 +154,10 @@ class ProductionOrchestrator:
 
         # Update internal state
         self._deployed = True
+        self._classification = Classification()
+        # the new classifier comes with its own reference
+        self._drift_monitor = self._load_drift_monitor()
+        self._retrain_requested = False
 
         # Notify other systems (messaging / service)
         self._prod_sys_io.send_configuration()
@@ -117,48 +167,93 @@ class ProductionOrchestrator:
 
 
     def _handle_classification(self, prepared_session_raw: Any) -> None:
-        # 1. Input normalization (dict or JSON string)
-        if isinstance(prepared_session_raw, dict):
+        # 1. Input normalization (dict, shared memory row or JSON string)
+        if isinstance(prepared_session_raw, Mapping):
             prepared_session = prepared_session_raw
         else:
             try:
                 prepared_session = json.loads(prepared_session_raw)
             except (json.JSONDecodeError, TypeError):
-                print("Invalid prepared session received (not valid JSON)")
+                self._metrics.counter("validation_failures_total", type="prepared_session").inc()
+                logger.warning("Invalid prepared session received (not valid JSON)")
                 return
 
-        # 2. Schema validation
-        if not self._handler.validate_json(prepared_session, self._schema_path):
-            print("Prepared session rejected: schema validation failed")
+        trace_id = prepared_session.get("uuid") if isinstance(prepared_session, dict) else None
+
+        # 2. Schema validation (the shared memory rows have a fixed layout of numbers)
+        if not isinstance(prepared_session, SessionRow):
+            with self._tracer.span(trace_id, "validate"):
+                is_valid = self._handler.validate_json(prepared_session, self._schema)
+        else:
+            is_valid = True
+        if not is_valid:
+            self._metrics.counter("validation_failures_total", type="prepared_session").inc()
+            logger.warning("Prepared session rejected: schema validation failed")
             return
 
         # 3. Classification
-        classification = Classification()
-        label = classification.classify(prepared_session, self._deployed)
+        with self._tracer.span(trace_id, "classify"):
+            label = self._classification.classify(prepared_session, self._deployed)
 
         if label is None:
             # model not yet available
             return
 
-        # 4. Mandatory sending to Client Side
+        # 4. Drift of the features, without waiting for the expert labels
+        self._observe_drift(prepared_session)
+
+        # 5. Mandatory sending to Client Side
         self._send_label_to_target("Service Class", label, rule="client")
 
-        # 5. Optional sending to Evaluation System
+        # 6. Optional sending to Evaluation System
         if self._phase_manager.evaluation_phase:
             self._send_label_to_target("Evaluation System", label, rule="send")
 
-        # 6. Timestamp (best effort)
+        # 7. Timestamp (best effort)
         if self._service:
             try:
                 self._prod_sys_io.send_timestamp(time.time(), "Session Classified")
             except Exception:
                 pass  
 
-        # 7. Phase update
+        # 8. Phase update
         switched = self._phase_manager.on_session_completed()
         if switched:
-            print(f"[PHASE] switched to {self._phase_manager.current_phase}")
+            logger.info("[PHASE] switched to %s", self._phase_manager.current_phase)
+
+
+    def _load_drift_monitor(self) -> FeatureDriftMonitor | None:
+        configuration = self._configuration.parameters.get("drift_monitor")
+        if not isinstance(configuration, dict) or not configuration.get("enabled", False):
+            return None
+        try:
+            reference = DriftReference.load(self._model_path)
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning("[DRIFT] reference not available: %s", exc)
+            return None
+        if reference is None:
+            logger.warning("[DRIFT] the deployed classifier has no reference statistics")
+        return FeatureDriftMonitor.from_configuration(configuration, reference, Classification.SESSION_KEYS)
+
+    def _observe_drift(self, prepared_session: dict) -> None:
+        if self._drift_monitor is None:
+            return
+        phase = self._phase_manager.current_phase
+        report = self._drift_monitor.observe(prepared_session, phase)
+        if report is None:
+            return
+
+        for name in report.psi:
+            self._metrics.gauge("feature_drift_psi", feature=name, phase=phase).set(report.psi[name])
+            self._metrics.gauge("feature_drift_ks", feature=name, phase=phase).set(report.ks[name])
+        if not report.drifted:
+            return
+        logger.warning("[DRIFT] phase=%s sessions=%d drifted=%s", phase, report.sessions, report.drifted)
 
+        # a single request per deployed classifier
+        if self._drift_monitor.should_retrain(report) and not self._retrain_requested:
+            self._metrics.counter("drift_retrain_requests_total", phase=phase).inc()
+            self._retrain_requested = self._prod_sys_io.send_retrain_request()
 
     def _send_label_to_target(self, target_key: str, label, rule: str) -> None:
         try:
@@ -170,7 +265,7 @@ class ProductionOrchestrator:
                 rule
             )
         except KeyError:
-            print(f"[ERROR] Target '{target_key}' not configured properly")
+            logger.error("Target '%s' not configured properly", target_key)
 
 
 
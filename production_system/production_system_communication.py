@@ -2,29 +2,61 @@
 from __future__ import annotations
 
 import json
+import logging
+import os
 import queue
 import threading
-from typing import Dict, Optional
+import time
+from typing import Dict, List, Optional
 
 import requests
 from flask import Flask, jsonify, request
 
+from common import transport
+from common.message_log import open_channel_queue
+from common.metrics import MetricsRegistry
+from common.shared_ring import DEFAULT_RING_NAME, SharedSessionRing
+from common.timestamp_emitter import TimestampEmitter
+from common.tracing import Tracer
+
 from .configuration_parameters import ConfigurationParameters
 from .label import Label
 
+# Seconds the receiver waits for an HTTP message before looking at the shared memory ring again
+SHARED_MEMORY_POLL_INTERVAL = 0.005
+
+logger = logging.getLogger(__name__)
+
 
 class ProductionSystemIO:
     """Manage inbound and outbound HTTP messaging for the production system."""
 
-    def __init__(self, host: str = "0.0.0.0", port: int = 5007) -> None:
+    def __init__(self, host: str = "0.0.0.0", port: int = 5007, tracer: Optional[Tracer] = None,
+                 metrics: Optional[MetricsRegistry] = None, max_queue_size: int = 0,
+                 retry_after: float = transport.DEFAULT_RETRY_AFTER, message_log: Optional[dict] = None,
+                 preparation_binding: Optional[dict] = None, feature_names: Optional[List[str]] = None) -> None:
         self.app = Flask(__name__)
         self.host = host
         self.port = port
-        self.msg_queue: "queue.Queue[Dict[str, str]]" = queue.Queue()
-        
-        import logging
-        log = logging.getLogger('werkzeug')
-        log.setLevel(logging.ERROR)
+        self.metrics = metrics or MetricsRegistry()
+        self.metrics.mount(self.app)
+        self.tracer = tracer or Tracer("Production System", metrics=self.metrics)
+        self._timestamp_emitter: Optional[TimestampEmitter] = None
+        # bounded queue: when full the senders get a 503 with Retry-After;
+        # with the message log enabled the messages not yet handled survive a restart
+        self.msg_queue: "queue.Queue[Dict[str, str]]" = open_channel_queue(
+            self.metrics, "messages", max_queue_size, message_log, os.path.dirname(os.path.abspath(__file__)))
+        self.retry_after = retry_after
+
+        # co-located Preparation System: the prepared sessions are read in place from a shared memory ring
+        self._ring: Optional[SharedSessionRing] = None
+        self._ring_sender = preparation_binding or {}
+        self._row_pending = False
+        shared = self._ring_sender.get("shared_memory") or {}
+        if self._ring_sender.get("transport") == "shared_memory" and feature_names:
+            self._ring = SharedSessionRing.create(shared.get("name", DEFAULT_RING_NAME), feature_names,
+                                                  slots=shared.get("slots", 1024))
+            self.metrics.gauge("queue_depth", lambda: len(self._ring), queue="shared_memory")
 
         @self.app.route("/send", methods=["POST"])
         def receive_message():
@@ -32,13 +64,17 @@ class ProductionSystemIO:
             sender_ip = request.remote_addr
             sender_port = data.get("port")
             message_content = data.get("payload") or data.get("message")
-            message = {"ip": sender_ip, "port": sender_port, "message": message_content}
-            self.msg_queue.put(message)
+            message = {"ip": sender_ip, "port": sender_port, "message": message_content,
+                       "trace_id": data.get("trace_id"), "received_at": time.time()}
+            if not self.msg_queue.offer(message):
+                return transport.busy_response(self.retry_after)
             return jsonify({"status": "received"}), 200
 
     def start_server(self) -> None:
-        """Boot the Flask server on a background thread."""
-        print(f"Flask server listening on {self.host}:{self.port}")
+        """Boot the Flask server on a background thread, unless the messages are delivered in-process."""
+        if transport.serve_locally(self.app, self.port):
+            return
+        logger.info("Flask server listening on %s:%s", self.host, self.port)
         thread = threading.Thread(target=self.app.run, kwargs={"host": self.host, "port": self.port}, daemon=True)
         thread.start()
 
@@ -56,10 +92,27 @@ class ProductionSystemIO:
             if response.status_code == 200:
                 return response.json()
         except requests.RequestException as exc:
-            print(f"Error sending message: {exc}")
+            logger.error("Error sending message to %s: %s", url, exc)
         return None
 
-    
+
+    def send_retrain_request(self) -> bool:
+        """Ask the messaging system for a new classifier, as the evaluation system does on a bad verdict."""
+        configuration = ConfigurationParameters()
+        payload = {
+            "port": self.port,
+            "message": json.dumps({"configuration": "restart"})
+        }
+        msg_sys = configuration.global_netconf["Messaging System"]
+        url = f"http://{msg_sys['ip']}:{msg_sys['port']}/Configuration"
+        try:
+            response = transport.post(url, json=payload, timeout=2)
+            if response.status_code == 200:
+                return True
+            logger.error("[TX ERROR] RETRAIN http=%s to=%s", response.status_code, url)
+        except requests.RequestException as exc:
+            logger.error("Error sending retrain request: %s", exc)
+        return False
 
     def send_label(self, target_ip: str, target_port: int, label: Label, rule: str) -> Optional[Dict[str, str]]:
         """Dispatch labels to downstream services (with TX counters and safe logs)."""
@@ -81,21 +134,24 @@ class ProductionSystemIO:
             # The Client Side uses a JSON STRING
             label_content = label.to_json_string()
         else:
-            print(f"[TX ERROR] unsupported rule '{rule}'")
+            logger.error("[TX ERROR] unsupported rule '%s'", rule)
             return None
 
         url = f"http://{target_ip}:{target_port}{endpoint}"
         
         # Here label_content will be a dict for 'eval' and a str for 'client'
-        payload = {"port": self.port, "message": label_content}
+        payload = {"port": self.port, "message": label_content, "trace_id": label.uuid}
 
         try:
             # requests.post with 'json=' parameter automatically serializes
             # if label_content is a dict, it becomes a JSON object in the body.
-            response = requests.post(url, json=payload, timeout=10)
+            with self.tracer.span(label.uuid, f"send_{tag.lower()}"):
+                response = transport.post(url, json=payload, timeout=10)
 
             if response.status_code != 200:
-                print(f"[TX ERROR] {tag} http={response.status_code} to={target_ip}:{target_port}{endpoint} uuid={label.uuid}")
+                self.metrics.counter("send_failures_total", type=tag.lower()).inc()
+                logger.error("[TX ERROR] %s http=%s to=%s:%s%s uuid=%s", tag, response.status_code, target_ip,
+                             target_port, endpoint, label.uuid)
                 return None
 
             # increment only on success
@@ -106,39 +162,55 @@ class ProductionSystemIO:
                 self._tx_eval_counter += 1
                 n = self._tx_eval_counter
 
-            print(f"[TX {tag} #{n}] to={target_ip}:{target_port}{endpoint} uuid={label.uuid}")
+            logger.debug("[TX %s #%d] to=%s:%s%s uuid=%s", tag, n, target_ip, target_port, endpoint, label.uuid)
             return response.json()
 
         except requests.RequestException as exc:
-            print(f"[TX ERROR] {tag} exception to={target_ip}:{target_port}{endpoint} uuid={label.uuid} err={exc}")
+            self.metrics.counter("send_failures_total", type=tag.lower()).inc()
+            logger.error("[TX ERROR] %s exception to=%s:%s%s uuid=%s err=%s", tag, target_ip, target_port, endpoint,
+                         label.uuid, exc)
             return None
 
 
     def get_last_message(self) -> Optional[Dict[str, str]]:
-        """Block until a message is available in the queue."""
-        try: 
-            return self.msg_queue.get(block=True, timeout=1.0)
+        """
+        Block until a message is available in the queue or in the shared memory ring.
+        A prepared session read from the ring is a view of its slot, valid until the next call.
+        """
+        if self._ring is not None:
+            if self._row_pending:
+                self._ring.release()
+                self._row_pending = False
+            row = self._ring.read()
+            if row is not None:
+                self._row_pending = True
+                return {"ip": self._ring_sender.get("ip"), "port": self._ring_sender.get("port"), "message": row,
+                        "trace_id": row.uuid, "received_at": row.sent_at}
+        try:
+            timeout = SHARED_MEMORY_POLL_INTERVAL if self._ring is not None else 1.0
+            return self.msg_queue.get(block=True, timeout=timeout)
         except queue.Empty:
             # If no message arrives after 1 second, return None
             return None
 
+    def close_shared_memory(self) -> None:
+        """Remove the shared memory ring, if any."""
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+
     def send_timestamp(self, timestamp: float, status: str) -> bool:
-        """Report production timestamps to the service class."""
-        configuration = ConfigurationParameters()
-        service_conf = configuration.global_netconf["Service Class"]
-        prod_conf = configuration.global_netconf["Production System"]
-        url = f"http://{service_conf['ip']}:{service_conf['port']}/Timestamp"
-        packet = {
-            "port": prod_conf["port"],
-            "message": json.dumps({
-                "timestamp": timestamp,
-                "system": "Cyberbullying Production System",
-                "status": status
-            })
-        }
-        try:
-            response = requests.post(url, json=packet, timeout=10)
-            return response.status_code == 200
-        except requests.RequestException as exc:
-            print(f"Error sending timestamp: {exc}")
-            return False
\ No newline at end of file
+        """Queue a production timestamp for the service class, without waiting for the send."""
+        return self.timestamp_emitter().emit(timestamp, status)
+
+    def timestamp_emitter(self) -> TimestampEmitter:
+        """Return the background timestamp emitter, reading the configuration only on first use."""
+        if self._timestamp_emitter is None:
+            configuration = ConfigurationParameters()
+            service_conf = configuration.global_netconf["Service Class"]
+            prod_conf = configuration.global_netconf["Production System"]
+            self._timestamp_emitter = TimestampEmitter(
+                "Cyberbullying Production System",
+                f"http://{service_conf['ip']}:{service_conf['port']}/Timestamp",
+                prod_conf["port"])
+        return self._timestamp_emitter
\ No newline at end of file
@@ -1,21 +1,21 @@
 import pytest
-import pandas as pd
 from unittest.mock import patch, MagicMock
 from production_system.classification import Classification
 
 class TestClassification:
 
-    @patch("joblib.load")
+    @patch("production_system.classification.MlpPredictor.load")
     @patch("pathlib.Path.exists", return_value=True)
-    def test_classify_success(self, mock_exists, mock_joblib_load):
+    def test_classify_success(self, mock_exists, mock_predictor_load):
         """Testa una classificazione corretta."""
         clf = Classification()
         
-        # Mock del modello sklearn
+        # Mock del modello esportato
         mock_model = MagicMock()
+        mock_model.feature_names = None
         # predict ritorna un array numpy, es. [1] per cyberbullying
         mock_model.predict.return_value = [1] 
-        mock_joblib_load.return_value = mock_model
+        mock_predictor_load.return_value = mock_model
 
         # Sessione input fittizia
         session = {
@@ -36,6 +36,11 @@ class TestClassification:
         assert label.uuid == "test-uuid"
         assert label.label == "cyberbullying" # Poiché predict ha tornato 1
 
+        # Il vettore segue l'ordine delle feature di training
+        features = mock_model.predict.call_args[0][0]
+        assert features.shape == (1, len(Classification.FEATURE_NAMES))
+        assert features[0][0] == 10
+
     def test_classify_not_deployed(self):
         """Se il flag deployed è False, deve tornare None subito."""
         clf = Classification()
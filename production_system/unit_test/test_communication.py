@@ -70,4 +70,125 @@ class TestCommunication:
         
         msg = io_system.msg_queue.get()
         assert msg['port'] == 9090
-        assert msg['message'] == "some_content"
\ No newline at end of file
+        assert msg['message'] == "some_content"
+    def test_metrics_riportano_la_coda(self, io_system):
+        """Verifica che /metrics esponga profondità e contatori della coda."""
+        client = io_system.app.test_client()
+        client.post("/send", json={"port": 9090, "message": "a"})
+        client.post("/send", json={"port": 9090, "message": "b"})
+        io_system.msg_queue.get()
+
+        metrics = client.get("/metrics?format=json").get_json()
+        assert metrics['queue_depth{queue="messages"}']['value'] == 1
+        assert metrics['queue_enqueued_total{queue="messages"}']['value'] == 2
+        assert metrics['queue_dequeued_total{queue="messages"}']['value'] == 1
+
+        # formato testuale di Prometheus
+        text = client.get("/metrics").get_data(as_text=True)
+        assert 'queue_depth{queue="messages"} 1' in text
+
+    def test_coda_piena_risponde_503(self):
+        """Con la coda piena il messaggio viene rifiutato con Retry-After."""
+        io_system = ProductionSystemIO(port=5000, max_queue_size=1, retry_after=2)
+        client = io_system.app.test_client()
+
+        assert client.post("/send", json={"port": 9090, "message": "a"}).status_code == 200
+        response = client.post("/send", json={"port": 9090, "message": "b"})
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "2"
+        assert io_system.msg_queue.qsize() == 1
+        metrics = client.get("/metrics?format=json").get_json()
+        assert metrics['queue_rejected_total{queue="messages"}']['value'] == 1
+
+
+def test_prepared_session_through_shared_memory():
+    """Sessione preparata consegnata tramite memoria condivisa, senza HTTP."""
+    import os
+    from production_system.classification import Classification
+    from preparation_system.preparation_session_channel import PreparationSessionChannel
+
+    binding = {"ip": "127.0.0.1", "port": 5002, "transport": "shared_memory",
+               "shared_memory": {"name": f"test_prepared_{os.getpid()}", "slots": 4}}
+    io_system = ProductionSystemIO(port=5000, preparation_binding=binding,
+                                   feature_names=Classification.session_keys())
+    channel = PreparationSessionChannel(port=5002,
+                                        shared_memory_routes={("127.0.0.1", 5105): binding["shared_memory"]["name"]})
+    session = {key: 1 for key in Classification.session_keys()}
+    session.update({"uuid": "u1", "label": "cyberbullying"})
+
+    with patch("requests.post") as mock_post:
+        assert channel.send_prepared_session("127.0.0.1", 5105, session) is True
+        mock_post.assert_not_called()
+
+    message = io_system.get_last_message()
+    assert (message["ip"], message["port"], message["trace_id"]) == ("127.0.0.1", 5002, "u1")
+    features = Classification()._build_feature_vector(message["message"], Classification.FEATURE_NAMES)
+    assert features.shape == (1, len(Classification.FEATURE_NAMES))
+    del message, features
+
+    # la riga viene rilasciata alla richiesta successiva
+    assert io_system.get_last_message() is None
+    io_system.close_shared_memory()
+
+
+def test_prepared_session_after_production_restart():
+    """Il Production System riavviato ricrea la memoria condivisa: il mittente si ricollega."""
+    import os
+    from production_system.classification import Classification
+    from preparation_system.preparation_session_channel import PreparationSessionChannel
+
+    binding = {"ip": "127.0.0.1", "port": 5002, "transport": "shared_memory",
+               "shared_memory": {"name": f"test_restart_{os.getpid()}", "slots": 4}}
+    io_system = ProductionSystemIO(port=5000, preparation_binding=binding,
+                                   feature_names=Classification.session_keys())
+    channel = PreparationSessionChannel(port=5002,
+                                        shared_memory_routes={("127.0.0.1", 5105): binding["shared_memory"]["name"]})
+    session = {key: 1 for key in Classification.session_keys()}
+    session.update({"uuid": "u1", "label": "cyberbullying"})
+    assert channel.send_prepared_session("127.0.0.1", 5105, session) is True
+
+    # riavvio senza chiusura, come dopo un crash
+    restarted = ProductionSystemIO(port=5000, preparation_binding=binding,
+                                   feature_names=Classification.session_keys())
+    session["uuid"] = "u2"
+    with patch("requests.post") as mock_post:
+        assert channel.send_prepared_session("127.0.0.1", 5105, session) is True
+        mock_post.assert_not_called()
+
+    assert restarted.get_last_message()["message"]["uuid"] == "u2"
+    assert channel.metrics.counter("ring_reattach_total").value == 1
+    restarted.get_last_message()
+    restarted.close_shared_memory()
+    io_system.close_shared_memory()
+
+
+def test_prepared_session_through_http_without_the_ring():
+    """Con la memoria condivisa chiusa o piena la sessione preparata passa per HTTP."""
+    import os
+    from production_system.classification import Classification
+    from preparation_system import preparation_session_channel
+    from preparation_system.preparation_session_channel import PreparationSessionChannel
+
+    binding = {"ip": "127.0.0.1", "port": 5002, "transport": "shared_memory",
+               "shared_memory": {"name": f"test_fallback_{os.getpid()}", "slots": 1}}
+    io_system = ProductionSystemIO(port=5000, preparation_binding=binding,
+                                   feature_names=Classification.session_keys())
+    channel = PreparationSessionChannel(port=5002,
+                                        shared_memory_routes={("127.0.0.1", 5105): binding["shared_memory"]["name"]})
+    session = {key: 1 for key in Classification.session_keys()}
+    session.update({"uuid": "u1", "label": "cyberbullying"})
+
+    with patch("common.transport.post", return_value=MagicMock(status_code=200)) as mock_post, \
+            patch.object(preparation_session_channel, "SHARED_MEMORY_MAX_WAIT", 0):
+        # l'unico slot viene occupato, la sessione successiva non aspetta oltre il limite
+        assert channel.send_prepared_session("127.0.0.1", 5105, session) is True
+        mock_post.assert_not_called()
+        assert channel.send_prepared_session("127.0.0.1", 5105, {**session, "uuid": "u2"}) is True
+        assert mock_post.call_args.kwargs["json"]["payload"]["uuid"] == "u2"
+
+        # il Production System si ferma mentre il mittente e' collegato
+        io_system.close_shared_memory()
+        assert channel.send_prepared_session("127.0.0.1", 5105, {**session, "uuid": "u3"}) is True
+        assert mock_post.call_args.kwargs["json"]["payload"]["uuid"] == "u3"
+    assert channel.metrics.counter("send_failures_total", type="prepared_session").value == 0
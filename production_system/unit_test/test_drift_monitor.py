@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+
+from common import drift
+from production_system.drift_monitor import DriftReference, FeatureDriftMonitor
+
+
+def make_reference(seed=0):
+    """Riferimento di due feature: lunghezza del tweet e conteggio di una parola."""
+    rng = np.random.default_rng(seed)
+    features = np.column_stack([rng.normal(20, 5, 2000), rng.poisson(0.2, 2000)])
+    quantiles, proportions = drift.reference_statistics(features)
+    return DriftReference(["tweet_length", "event_sending_off"], quantiles, proportions)
+
+
+def sessions(rng, n, length_mean=20.0, words_rate=0.2):
+    for _ in range(n):
+        yield {"tweet_length": rng.normal(length_mean, 5), "event_sending-off": rng.poisson(words_rate)}
+
+
+class TestFeatureDriftMonitor:
+
+    @pytest.mark.parametrize("statistic", ["psi", "ks"])
+    def test_stable_sessions_do_not_drift(self, statistic):
+        """Sessioni con la stessa distribuzione del training: nessuna deriva."""
+        monitor = FeatureDriftMonitor(make_reference(), statistic=statistic, threshold=0.25, window_size=300,
+                                      session_keys={"event_sending_off": "event_sending-off"}, seed=1)
+        reports = [monitor.observe(s, "production") for s in sessions(np.random.default_rng(2), 300)]
+
+        # solo l'ultima sessione completa la finestra
+        assert reports[:-1] == [None] * 299
+        assert reports[-1].sessions == 300
+        assert reports[-1].drifted == []
+        assert not monitor.should_retrain(reports[-1])
+
+    @pytest.mark.parametrize("statistic", ["psi", "ks"])
+    def test_shifted_feature_is_detected(self, statistic):
+        """Tweet più lunghi e parole più frequenti: entrambe le feature derivano."""
+        monitor = FeatureDriftMonitor(make_reference(), statistic=statistic, threshold=0.25, window_size=300,
+                                      session_keys={"event_sending_off": "event_sending-off"}, seed=1)
+        rng = np.random.default_rng(3)
+        report = None
+        for session in sessions(rng, 300, length_mean=30.0, words_rate=2.0):
+            report = monitor.observe(session, "production")
+
+        assert report.drifted == ["tweet_length", "event_sending_off"]
+        assert monitor.should_retrain(report)
+
+    def test_phases_have_separate_windows(self):
+        """Ogni fase ha la propria finestra di sessioni."""
+        monitor = FeatureDriftMonitor(make_reference(), window_size=2,
+                                      session_keys={"event_sending_off": "event_sending-off"})
+        session = {"tweet_length": 20, "event_sending-off": 0}
+
+        assert monitor.observe(session, "production") is None
+        assert monitor.observe(session, "evaluation") is None
+        assert monitor.observe(session, "production").phase == "production"
+
+    def test_disabled_or_missing_reference(self):
+        """Senza riferimento o con il monitor disabilitato non viene creato nulla."""
+        assert FeatureDriftMonitor.from_configuration({"enabled": True}, None) is None
+        assert FeatureDriftMonitor.from_configuration({"enabled": False}, make_reference()) is None
+        monitor = FeatureDriftMonitor.from_configuration({"enabled": True, "statistic": "ks"}, make_reference())
+        assert monitor.statistic == "ks"
+
+
+def test_orchestrator_requests_retrain_once(mocker):
+    """La deriva genera una sola richiesta di riaddestramento per classificatore."""
+    mocker.patch("production_system.production_orchestrator.ConfigurationParameters")
+    mocker.patch("production_system.production_orchestrator.ProductionSystemIO")
+    mocker.patch("production_system.production_orchestrator.JsonHandler")
+    from production_system.production_orchestrator import ProductionOrchestrator
+
+    orch = ProductionOrchestrator(service=False, unit_test=True)
+    orch._drift_monitor = MagicMock()
+    orch._drift_monitor.observe.return_value = MagicMock(psi={"tweet_length": 1.0}, ks={"tweet_length": 0.5},
+                                                         drifted=["tweet_length"], sessions=10)
+    orch._drift_monitor.should_retrain.return_value = True
+    orch._prod_sys_io.send_retrain_request.return_value = True
+
+    orch._observe_drift({"uuid": "u1", "tweet_length": 100})
+    orch._observe_drift({"uuid": "u2", "tweet_length": 100})
+
+    orch._prod_sys_io.send_retrain_request.assert_called_once()
+    assert orch._metrics.gauge("feature_drift_psi", feature="tweet_length",
+                               phase=orch._phase_manager.current_phase).value == 1.0
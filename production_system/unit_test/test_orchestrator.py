@@ -38,17 +38,17 @@ class TestOrchestrator:
         Testa il flusso completo:
         Ricezione sessione -> Validazione -> Classificazione -> Invio Label -> Aggiornamento Fase
         """
-        orch = ProductionOrchestrator(service=False, unit_test=True)
-        orch._deployed = True # Simuliamo classificatore presente
-        orch._phase_manager = MagicMock()
-        orch._phase_manager.evaluation_phase = True # Siamo in fase eval
-        
-        # Setup validazione JSON OK
-        orch._handler.validate_json.return_value = True
-        
         # Setup Classificazione che ritorna una Label
         # Patchiamo la classe usata dall'orchestrator
         with patch("production_system.production_orchestrator.Classification") as MockClf:
+            orch = ProductionOrchestrator(service=False, unit_test=True)
+            orch._deployed = True # Simuliamo classificatore presente
+            orch._phase_manager = MagicMock()
+            orch._phase_manager.evaluation_phase = True # Siamo in fase eval
+
+            # Setup validazione JSON OK
+            orch._handler.validate_json.return_value = True
+
             fake_label = Label(uuid="u1", label="safe")
             MockClf.return_value.classify.return_value = fake_label
 
@@ -71,6 +71,22 @@ class TestOrchestrator:
             # 3. Deve aver aggiornato il phase manager
             orch._phase_manager.on_session_completed.assert_called_once()
 
+    def test_classificatore_riusato_fino_al_deployment(self, mock_deps):
+        """Il classificatore viene caricato una volta sola, e sostituito a ogni nuovo deployment."""
+        with patch("production_system.production_orchestrator.Classification") as MockClf:
+            orch = ProductionOrchestrator(service=False, unit_test=True)
+            orch._handler.validate_json.return_value = True
+            MockClf.return_value.classify.return_value = None
+            for uuid in ("u1", "u2"):
+                orch._handle_classification({"uuid": uuid, "tweet_length": 10})
+            assert MockClf.call_count == 1
+            assert MockClf.return_value.classify.call_count == 2
+
+            with patch("production_system.production_orchestrator.Deployment") as MockDep:
+                MockDep.return_value.deploy.return_value = True
+                orch._handle_deployment("fake_payload_string")
+            assert MockClf.call_count == 2
+
     def test_handle_classification_invalid_json(self, mock_deps):
         """Testa il rifiuto di sessioni non valide."""
         orch = ProductionOrchestrator(service=False, unit_test=True)
@@ -82,4 +98,14 @@ class TestOrchestrator:
         # Caso 2: Schema non valido
         orch._handler.validate_json.return_value = False
         orch._handle_classification({"valid": "json", "but": "wrong_schema"})
-        orch._prod_sys_io.send_label.assert_not_called()
\ No newline at end of file
+        orch._prod_sys_io.send_label.assert_not_called()
+
+def test_import_non_carica_librerie_pesanti():
+    """L'avvio del Production System non deve importare pandas, sklearn o joblib."""
+    import subprocess, sys
+    from pathlib import Path
+    root = Path(__file__).resolve().parents[2]
+    code = ("import sys, production_system.production_orchestrator; "
+            "print(sorted(m for m in ('pandas', 'sklearn', 'joblib') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True)
+    assert result.stdout.strip() == "[]"
@@ -1,5 +1,4 @@
 import os
-import matplotlib.pyplot as plt
 from segregation_system.balancing_report.balancing_report import BalancingReportData
 
 class BalancingReportView:
@@ -13,15 +12,21 @@ class BalancingReportView:
         print(f"Classes Meet Minimum Coverage: {'Yes' if balancing_report_model.is_minimum else 'No'}")
         print(f"Classes Are Balanced: {'Yes' if balancing_report_model.is_balanced else 'No'}")
 
+        # a standalone Figure (not pyplot) is safe to draw off the main thread and is
+        # released as soon as it goes out of scope; imported lazily, only needed here
+        from matplotlib.figure import Figure
+
         labels = list(balancing_report_model.class_distribution.keys())
         counts = list(balancing_report_model.class_distribution.values())
 
-        plt.bar(labels, counts, color='skyblue')
-        plt.xlabel('Class Labels')
-        plt.ylabel('Number of Sessions')
-        plt.title('Class Distribution in Prepared Sessions')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
+        fig = Figure()
+        ax = fig.add_subplot()
+        ax.bar(labels, counts, color='skyblue')
+        ax.set_xlabel('Class Labels')
+        ax.set_ylabel('Number of Sessions')
+        ax.set_title('Class Distribution in Prepared Sessions')
+        ax.tick_params(axis='x', labelrotation=45)
+        fig.tight_layout()
         plt_path = "segregation_system/" + workspace_dir + '/balancing_report.png'
-        plt.savefig(plt_path)
+        fig.savefig(plt_path)
         return
@@ -3,11 +3,12 @@ from collections import Counter, defaultdict
 
 from segregation_system.coverage_report.coverage_report import CoverageReportData
 from segregation_system.prepared_session import PreparedSession
+from common.lexicon import FEATURE_PREFIX, load_lexicon
 
 class CoverageReportModel:
     def generate_coverage_report(sessions: List[PreparedSession]) -> dict:
 
-        bow_vocabulary = ["fuck", "bulli", "muslim", "gay", "nigger", "rape"]
+        word_features = load_lexicon().feature_names
         
         # --------- Tweet length: {lenght -> count} ---------
         tweet_length_counter: Counter[int] = Counter()
@@ -20,15 +21,15 @@ class CoverageReportModel:
 
 
         # --------- Bad words: {word -> occurrences} ---------
-        bad_words_map = {}
-        for word in bow_vocabulary:
-            attr_name = f"word_{word}"
-            total_for_word = 0
-            for s in sessions:
-                if type(s) is dict:
-                    s = PreparedSession(s)
-                total_for_word += int(getattr(s, attr_name, 0))
-            bad_words_map[word] = total_for_word
+        # one pass over the sparse counts of the sessions, the vocabulary may have thousands of terms
+        word_totals = dict.fromkeys(word_features, 0)
+        for s in sessions:
+            if type(s) is dict:
+                s = PreparedSession(s)
+            for attr_name, count in s.words.items():
+                if attr_name in word_totals:
+                    word_totals[attr_name] += int(count)
+        bad_words_map = {attr_name[len(FEATURE_PREFIX):]: total for attr_name, total in word_totals.items()}
 
 
         # --------- Audio dB: {decibel value -> count} ---------
@@ -2,15 +2,20 @@ import os
 import math
 import numpy as np
 from typing import Optional
-import matplotlib.pyplot as plt
 
 from segregation_system.coverage_report.coverage_report import CoverageReportData
 
 class CoverageReportView:
+    MAX_PLOTTED_WORDS = 10
+
     @staticmethod
     def show_coverage_report(report: CoverageReportData, workspace_dir, title: Optional[str] = "Coverage Report"):
-        fig = plt.figure(figsize=(10, 10))
-        ax = plt.subplot(111, polar=True)
+        # a standalone Figure (not pyplot) is safe to draw off the main thread and is
+        # released as soon as it goes out of scope; imported lazily, only needed here
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=(10, 10))
+        ax = fig.add_subplot(111, polar=True)
 
         ax.set_theta_zero_location("N")
         ax.set_theta_direction(-1)
@@ -66,15 +71,17 @@ class CoverageReportView:
         # ---------------- Bad words ----------------
         bw_map = report.bad_words_map or {}
         if bw_map:
-            word_names = ["Fuck", "Bulli", "Muslim", "Gay", "Nigger", "Rape"]
-            max_bw_count = max(bw_map.values()) if bw_map else 1
+            # the vocabulary may be large: only the most frequent words are drawn, in vocabulary order
+            top_words = set(sorted(bw_map, key=bw_map.get, reverse=True)[:CoverageReportView.MAX_PLOTTED_WORDS])
+            word_names = [word for word in bw_map if word in top_words]
+            max_bw_count = max(bw_map.values()) or 1
             
             for i, word in enumerate(word_names):
-                count = bw_map.get(word.lower(), 0)
-                normalized_r = 0.3 + (i / (len(word_names) - 1)) * 0.6
+                count = bw_map.get(word, 0)
+                normalized_r = 0.3 + (i / max(1, len(word_names) - 1)) * 0.6
                 bubble_size = 100 + (count / max_bw_count) * 1500
                 ax.scatter(angle_badwords, normalized_r, s=bubble_size, alpha=0.6, color='lightcoral', edgecolors='black', linewidth=1.5)
-                display_word = word if word.lower() != "nigger" else "Ni****"
+                display_word = word.capitalize() if word.lower() != "nigger" else "Ni****"
                 ax.text(angle_badwords - 0.1, normalized_r, display_word, ha='right', va='center', fontsize=9)
 
         ax.text(angle_badwords, r_max + 0.15, 'Bad Words', ha='center', va='center', fontsize=12, fontweight='bold')
@@ -103,8 +110,8 @@ class CoverageReportView:
         total = report.total_sessions
         ax.text(0, 0, f'{total}\nSessions', ha='center', va='center', fontsize=14, fontweight='bold', bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
 
-        plt.title(title, fontsize=16, fontweight='bold', pad=20)
-        plt.tight_layout()
+        ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
+        fig.tight_layout()
         plt_path = "segregation_system/" + workspace_dir + '/coverage_report.png'
-        plt.savefig(plt_path)
+        fig.savefig(plt_path)
         return
\ No newline at end of file
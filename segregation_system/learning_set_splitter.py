@@ -1,3 +1,4 @@
+import logging
 import random
 from typing import List
 
@@ -5,6 +6,8 @@ from segregation_system.learning_set import LearningSet
 from segregation_system.prepared_session import PreparedSession
 from segregation_system.segregation_configuration import SegregationSystemConfiguration
 
+logger = logging.getLogger(__name__)
+
 class LearningSetSplitter:
 
     def __init__(self):
@@ -25,7 +28,8 @@ class LearningSetSplitter:
         validation_set = prepared_sessions[training_count:training_count + validation_count]
         test_set = prepared_sessions[training_count + validation_count:]
 
-        print(f"Generated learning sets: {len(training_set)} training, {len(validation_set)} validation, {len(test_set)} test.")
+        logger.info("Generated learning sets: %d training, %d validation, %d test.",
+                    len(training_set), len(validation_set), len(test_set))
 
         return LearningSet(training_set, validation_set, test_set)
 
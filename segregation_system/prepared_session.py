@@ -1,6 +1,8 @@
 from dataclasses import dataclass, asdict
 from typing import List, Tuple
 
+from common.lexicon import FEATURE_PREFIX
+
 @dataclass
 class PreparedSession:
     def __init__(self, data: dict):
@@ -8,12 +10,8 @@ class PreparedSession:
         self.label = data['label']
         self.tweet_length = data['tweet_length']
 
-        self.word_fuck = data['word_fuck']
-        self.word_bulli = data['word_bulli']
-        self.word_muslim = data['word_muslim']
-        self.word_gay = data['word_gay']
-        self.word_nigger = data['word_nigger']
-        self.word_rape = data['word_rape']
+        # sparse word_<term> counts, only the terms found in the tweet
+        self.words = {key: value for key, value in data.items() if key.startswith(FEATURE_PREFIX) and value}
 
         self.event_score = data['event_score']
         if 'event_sending-off' in data.keys():
@@ -45,5 +43,11 @@ class PreparedSession:
         self.audio_18 = data['audio_18']
         self.audio_19 = data['audio_19']
 
+    def __getattr__(self, name):
+        # the word_<term> features not found in the tweet count 0
+        if name.startswith(FEATURE_PREFIX):
+            return self.__dict__.get("words", {}).get(name, 0)
+        raise AttributeError(name)
+
     def to_dict(self):
         return asdict(self)
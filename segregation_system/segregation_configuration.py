@@ -1,8 +1,11 @@
 import json
+import logging
 import os
 
 from segregation_system.segregation_json_handler import SegregationSystemJsonHandler
 
+logger = logging.getLogger(__name__)
+
 class SegregationSystemConfiguration:
     GLOBAL_PARAMETERS = {}
     LOCAL_PARAMETERS = {}
@@ -17,7 +20,7 @@ class SegregationSystemConfiguration:
                 if SegregationSystemJsonHandler.validate_json_from_path(GLOBAL_PATH, GLOBAL_SCHEMA_PATH):
                     SegregationSystemConfiguration.GLOBAL_PARAMETERS = json.load(f)
         except FileNotFoundError:
-            print("[Config] netconf.json not found.")
+            logger.error("[Config] netconf.json not found.")
 
         # Load local parameters
         LOCAL_PATH = base_dir + "/configuration/segregation_parameters.json"
@@ -27,4 +30,4 @@ class SegregationSystemConfiguration:
                 if SegregationSystemJsonHandler.validate_json_from_path(LOCAL_PATH, LOCAL_SCHEMA_PATH):
                     SegregationSystemConfiguration.LOCAL_PARAMETERS = json.load(f)
         except FileNotFoundError:
-            print("[Config] segregation_parameters.json not found.")
\ No newline at end of file
+            logger.error("[Config] segregation_parameters.json not found.")
\ No newline at end of file
@@ -1,58 +1,40 @@
 import sqlite3
 import json
+import logging
 import os
 from typing import List, Dict
 from segregation_system.prepared_session import PreparedSession
 
+logger = logging.getLogger(__name__)
+
+EVENT_COLUMNS = ["event_score", "event_sending_off", "event_caution", "event_substitution", "event_foul"]
+AUDIO_COLUMNS = [f"audio_{i}" for i in range(20)]
+
+
 class PreparedSessionDatabaseController:
     def __init__(self, db_path="segregation_system/segregation_system.db"):
         self.db_path = db_path
+        # the bag of words is stored sparse, as a JSON object of the terms found, in the "words" column:
+        # one column per term would not fit a vocabulary of thousands of terms
+        self.columns = ["uuid", "label", "tweet_length"] + EVENT_COLUMNS + AUDIO_COLUMNS
+        quoted_columns = ", ".join(f'"{column}"' for column in self.columns + ["words"])
+        self._insert_query = (f"INSERT OR REPLACE INTO prepared_sessions ({quoted_columns}) "
+                              f"VALUES ({', '.join('?' for _ in self.columns + ['words'])})")
         self._init_db()
 
     def _init_db(self):
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS prepared_sessions (
-                uuid TEXT PRIMARY KEY,
-                label TEXT,
-                tweet_length INTEGER,
-                       
-                word_fuck INTEGER,
-                word_bulli INTEGER,
-                word_muslim INTEGER,
-                word_gay INTEGER,
-                word_nigger INTEGER,
-                word_rape INTEGER,
-                       
-                event_score INTEGER,
-                event_sending_off INTEGER,
-                event_caution INTEGER,
-                event_substitution INTEGER,
-                event_foul INTEGER,
-                       
-                audio_0 DOUBLE,
-                audio_1 DOUBLE,
-                audio_2 DOUBLE,
-                audio_3 DOUBLE,
-                audio_4 DOUBLE,
-                audio_5 DOUBLE,
-                audio_6 DOUBLE,
-                audio_7 DOUBLE,
-                audio_8 DOUBLE,
-                audio_9 DOUBLE,
-                audio_10 DOUBLE,
-                audio_11 DOUBLE,
-                audio_12 DOUBLE,
-                audio_13 DOUBLE,
-                audio_14 DOUBLE,
-                audio_15 DOUBLE,
-                audio_16 DOUBLE,
-                audio_17 DOUBLE,
-                audio_18 DOUBLE,
-                audio_19 DOUBLE
-            )
-        ''')
+        definitions = (["uuid TEXT PRIMARY KEY", "label TEXT", "tweet_length INTEGER"]
+                       + [f"{column} INTEGER" for column in EVENT_COLUMNS]
+                       + [f"{column} DOUBLE" for column in AUDIO_COLUMNS]
+                       + ["words TEXT"])
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS prepared_sessions ({', '.join(definitions)})")
+
+        # a table of the previous format, with a column per term, gets the words column
+        existing = {row[1] for row in cursor.execute("PRAGMA table_info(prepared_sessions)")}
+        if "words" not in existing:
+            cursor.execute("ALTER TABLE prepared_sessions ADD COLUMN words TEXT")
         conn.commit()
         conn.close()
 
@@ -61,49 +43,12 @@ class PreparedSessionDatabaseController:
         cursor = conn.cursor()
         
         try:
-            cursor.execute('''
-                INSERT OR REPLACE INTO prepared_sessions (uuid, label, tweet_length, word_fuck, word_bulli, word_muslim, word_gay, word_nigger, word_rape, event_score, event_sending_off, event_caution, event_substitution, event_foul, audio_0, audio_1, audio_2, audio_3, audio_4, audio_5, audio_6, audio_7, audio_8, audio_9, audio_10, audio_11, audio_12, audio_13, audio_14, audio_15, audio_16, audio_17, audio_18, audio_19)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                session_data.uuid,
-                session_data.label,
-                session_data.tweet_length,
-                session_data.word_fuck,
-                session_data.word_bulli,
-                session_data.word_muslim,
-                session_data.word_gay,
-                session_data.word_nigger,
-                session_data.word_rape,
-                session_data.event_score,
-                session_data.event_sending_off,
-                session_data.event_caution,
-                session_data.event_substitution,
-                session_data.event_foul,
-                session_data.audio_0,
-                session_data.audio_1,
-                session_data.audio_2,
-                session_data.audio_3,
-                session_data.audio_4,
-                session_data.audio_5,
-                session_data.audio_6,
-                session_data.audio_7,
-                session_data.audio_8,
-                session_data.audio_9,
-                session_data.audio_10,
-                session_data.audio_11,
-                session_data.audio_12,
-                session_data.audio_13,
-                session_data.audio_14,
-                session_data.audio_15,
-                session_data.audio_16,
-                session_data.audio_17,
-                session_data.audio_18,
-                session_data.audio_19
-            ))
+            values = [getattr(session_data, column) for column in self.columns] + [json.dumps(session_data.words)]
+            cursor.execute(self._insert_query, tuple(values))
             conn.commit()
-            print(f"[Database] Session {session_data.uuid} stored.")
+            logger.debug("[Database] Session %s stored.", session_data.uuid)
         except sqlite3.Error as e:
-            print(f"[Database] Error storing session: {e}")
+            logger.error("[Database] Error storing session: %s", e)
         finally:
             conn.close()
 
@@ -115,44 +60,12 @@ class PreparedSessionDatabaseController:
         rows = cursor.fetchall()
         conn.close()
 
+        # the sessions keep their sparse word_<term> counts, made dense only in the learning set matrix
         sessions = []
         for row in rows:
-            sessions.append({
-                "uuid": row["uuid"],
-                "label": row["label"],
-                "tweet_length": row["tweet_length"],
-                "word_fuck": row["word_fuck"],
-                "word_bulli": row["word_bulli"],
-                "word_muslim": row["word_muslim"],
-                "word_gay": row["word_gay"],
-                "word_nigger": row["word_nigger"],
-                "word_rape": row["word_rape"],
-                "event_score": row["event_score"],
-                "event_sending_off": row["event_sending_off"],
-                "event_caution": row["event_caution"],
-                "event_substitution": row["event_substitution"],
-                "event_foul": row["event_foul"],
-                "audio_0": row["audio_0"],
-                "audio_1": row["audio_1"],
-                "audio_2": row["audio_2"],
-                "audio_3": row["audio_3"], 
-                "audio_4": row["audio_4"],
-                "audio_5": row["audio_5"],
-                "audio_6": row["audio_6"],
-                "audio_7": row["audio_7"],
-                "audio_8": row["audio_8"],
-                "audio_9": row["audio_9"],
-                "audio_10": row["audio_10"],
-                "audio_11": row["audio_11"],
-                "audio_12": row["audio_12"],
-                "audio_13": row["audio_13"],
-                "audio_14": row["audio_14"],
-                "audio_15": row["audio_15"],
-                "audio_16": row["audio_16"],
-                "audio_17": row["audio_17"],
-                "audio_18": row["audio_18"],
-                "audio_19": row["audio_19"]
-            })
+            session = {column: row[column] for column in self.columns}
+            session.update(json.loads(row["words"] or "{}"))
+            sessions.append(session)
         return sessions
 
     def get_number_of_sessions_stored(self) -> int:
@@ -169,4 +82,4 @@ class PreparedSessionDatabaseController:
         cursor.execute('DELETE FROM prepared_sessions')
         conn.commit()
         conn.close()
-        print("[Database] All sessions removed.")
\ No newline at end of file
+        logger.info("[Database] All sessions removed.")
\ No newline at end of file
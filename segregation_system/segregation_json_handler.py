@@ -1,9 +1,11 @@
 import json
 import logging
-from typing import Any, Optional
+from typing import Any, Optional, Union
 
 import jsonschema
 
+logger = logging.getLogger(__name__)
+
 class SegregationSystemJsonHandler:
     @staticmethod
     def read_json_file(filepath):
@@ -12,7 +14,7 @@ class SegregationSystemJsonHandler:
                 return json.load(f)
 
         except Exception as e:
-            print("Error to read file at path " + filepath + ": " + e)
+            logger.error("Error to read file at path %s: %s", filepath, e)
             return None
 
     @staticmethod
@@ -22,7 +24,7 @@ class SegregationSystemJsonHandler:
                 json.dump(data, f, ensure_ascii=False, indent=4)
                 return True
         except Exception as e:
-            print("Error to save file at path " + filepath + ": " + e)
+            logger.error("Error to save file at path %s: %s", filepath, e)
             return False
 
     @staticmethod
@@ -32,10 +34,10 @@ class SegregationSystemJsonHandler:
             data[field_name] = value
             return SegregationSystemJsonHandler.write_json_file(data, file_path)
         except FileNotFoundError:
-            print(f"File not found: {file_path}")
+            logger.error("File not found: %s", file_path)
             return False
         except json.JSONDecodeError:
-            print(f"Error decoding JSON in file: {file_path}")
+            logger.error("Error decoding JSON in file: %s", file_path)
             return False
 
     @staticmethod
@@ -50,27 +52,31 @@ class SegregationSystemJsonHandler:
             if system_info:
                 return system_info
             else:
-                print(f"System '{system_name}' not found in the configuration file.")
+                logger.error("System '%s' not found in the configuration file.", system_name)
                 return None
 
         except FileNotFoundError:
-            print(f"Error: File '{json_filepath}' not found.")
+            logger.error("File '%s' not found.", json_filepath)
             return None
         except json.JSONDecodeError:
-            print("Error: Failed to parse JSON file.")
+            logger.error("Failed to parse JSON file.")
             return None
         except Exception as e:
-            print(f"An unexpected error occurred: {e}")
+            logger.exception("An unexpected error occurred: %s", e)
             return None
 
     @staticmethod
-    def validate_json(json_data: dict, schema_path: str) -> bool:
-        with open(schema_path, "r", encoding="UTF-8") as file:
-            json_schema = json.load(file)
+    def validate_json(json_data: dict, schema_path: Union[str, dict]) -> bool:
+        # the schema itself can be passed instead of its path, when it is generated or loaded once
+        if isinstance(schema_path, dict):
+            json_schema = schema_path
+        else:
+            with open(schema_path, "r", encoding="UTF-8") as file:
+                json_schema = json.load(file)
         try:
             jsonschema.validate(instance=json_data, schema=json_schema)
         except jsonschema.exceptions.ValidationError as ex:
-            logging.error(ex)
+            logger.warning("Invalid JSON: %s", ex.message)
             return False
         return True
 
@@ -1,3 +1,4 @@
+import logging
 import os
 import time
 from random import randrange
@@ -12,24 +13,58 @@ from segregation_system.learning_set_splitter import LearningSetSplitter
 from segregation_system.segregation_database import PreparedSessionDatabaseController
 from segregation_system.segregation_configuration import SegregationSystemConfiguration
 from segregation_system.prepared_session import PreparedSession
+from common.lexicon import load_lexicon
+from common.logger import configure_logging
+from common.metrics import MetricsRegistry
+from common.profiler import LoopProfiler
+from common.report_renderer import ReportRenderer
+from common.tracing import Tracer
 
 execution_state_file_path = "./segregation_system/data/execution_state.json"
+prepared_session_schema_path = "segregation_system/schemas/prepared_session_schema.json"
+parameters_file_path = "segregation_system/configuration/segregation_parameters.json"
+profiles_dir_path = "segregation_system/data/profiles"
+
+logger = logging.getLogger(__name__)
 
 class SegregationSystemOrchestrator:
 
     def __init__(self, testing: bool=True):
 
         self.set_testing(testing)
+        # the parameters are needed by the message broker (message log), they are loaded again by run
+        SegregationSystemConfiguration.load_parameters()
+        # structured logging, written in background
+        configure_logging("segregation_system", SegregationSystemConfiguration.LOCAL_PARAMETERS.get("logging"))
         self.db = PreparedSessionDatabaseController()
-        self.message_broker = SessionReceiverAndConfigurationSender()
+        # the word_<term> properties of the schema follow the configured vocabulary
+        self.prepared_session_schema = load_lexicon().extend_schema(
+            SegregationSystemJsonHandler.read_json_file(prepared_session_schema_path))
+        # runtime metrics, exposed on /metrics by the message broker
+        self.metrics = MetricsRegistry()
+        self.message_broker = SessionReceiverAndConfigurationSender(metrics=self.metrics)
+        # on-demand profiling of the message loop, from the parameters or on /profile
+        self.profiler = LoopProfiler("Segregation System", profiles_dir_path, parameters_file_path)
+        self.profiler.mount(self.message_broker.app)
         self.message_broker.start_server()
+        # reports are drawn in background, so that plotting does not block the message handling
+        self.report_renderer = ReportRenderer()
+        # per-session spans, enabled once the parameters are loaded
+        self.tracer = Tracer("Segregation System", metrics=self.metrics)
 
     def run(self):
 
+        self.profiler.tick()
         SegregationSystemConfiguration.load_parameters() # Load the current Segregation System's parameters.
+        if not self.tracer.enabled:
+            self.tracer = Tracer.from_configuration("Segregation System",
+                                                    SegregationSystemConfiguration.LOCAL_PARAMETERS.get("tracing"),
+                                                    metrics=self.metrics)
 
         self.set_testing(SegregationSystemJsonHandler.read_field_from_json(execution_state_file_path,
                                                                                    "service_flag")) 
+        self.report_renderer.enabled = not (self.get_testing() and
+                                            SegregationSystemConfiguration.LOCAL_PARAMETERS.get("skip_reports_in_service_mode", False))
         enough_collected_sessions = SegregationSystemJsonHandler.read_field_from_json(execution_state_file_path,
                                                                                    "enough_collected_sessions")
         balancing_report_status = SegregationSystemJsonHandler.read_field_from_json(execution_state_file_path,
@@ -38,44 +73,53 @@ class SegregationSystemOrchestrator:
                                                                                    "coverage_report")
 
         if (coverage_report_status == "-" and balancing_report_status == "-" and enough_collected_sessions == "-") or self.get_testing():
-            print("Waiting for a message...")
+            logger.info("Waiting for a message...")
 
             min_num = SegregationSystemConfiguration.LOCAL_PARAMETERS['min_sessions_for_processing']
 
             while True:
-                message = self.message_broker.get_last_message()
-                message = message['message']
+                self.profiler.tick()
+                envelope = self.get_envelope()
+                message = envelope['message']
+
+                trace_id = envelope.get('trace_id') or (message.get('uuid') if isinstance(message, dict) else None)
+                with self.tracer.span(trace_id, "validate"):
+                    is_valid = SegregationSystemJsonHandler.validate_json(message, self.prepared_session_schema)
 
-                if SegregationSystemJsonHandler.validate_json(message, "segregation_system/schemas/prepared_session_schema.json"):
-                    print("Prepared Session Valid!")
+                if is_valid:
+                    logger.debug("Prepared Session %s Valid!", trace_id)
                     try:
                         new_prepared_session = PreparedSession(message)
-                        self.db.store_prepared_session(new_prepared_session)
+                        with self.tracer.span(trace_id, "buffer"):
+                            self.db.store_prepared_session(new_prepared_session)
                         number_of_collected_sessions = self.db.get_number_of_sessions_stored()
-                        print("Prepared Session STORED! [", number_of_collected_sessions, "].")
+                        logger.info("Prepared Session STORED! [%d].", number_of_collected_sessions)
                         if(new_prepared_session.uuid == ("Test")):
                             self.db.remove_all_prepared_sessions() 
                             self.reset_execution_state() 
                             return
 
                         if number_of_collected_sessions >= min_num:
-                            print(number_of_collected_sessions, min_num)
+                            logger.info("%d prepared sessions stored, %d needed", number_of_collected_sessions, min_num)
                             break
 
                     except Exception:
-                        print("Prepared Session Invalid! Can't store it.")      # Ignore invalid prepared sessions
+                        self.metrics.counter("validation_failures_total", type="prepared_session").inc()
+                        logger.warning("Prepared Session Invalid! Can't store it.")      # Ignore invalid prepared sessions
                         continue
+                else:
+                    self.metrics.counter("validation_failures_total", type="prepared_session").inc()
 
-            print("Enough prepared session stored!")
+            logger.info("Enough prepared session stored!")
             enough_collected_sessions = "OK"
             SegregationSystemJsonHandler.write_field_to_json(execution_state_file_path, "enough_collected_sessions", "OK")
 
             all_prepared_sessions = self.db.get_all_prepared_sessions()
 
-            print("Generating the balancing report...")
+            logger.info("Generating the balancing report...")
             balancing_report_model = BalancingReportModel.generate_balancing_report(all_prepared_sessions) 
-            BalancingReportView.show_balancing_report(balancing_report_model, "plots")  
-            print("Balancing report generated!")
+            self.report_renderer.submit(BalancingReportView.show_balancing_report, balancing_report_model, "plots")
+            logger.info("Balancing report generated!")
 
 
             if self.get_testing():      # Simulating the user response
@@ -89,10 +133,10 @@ class SegregationSystemOrchestrator:
                     self.reset_execution_state() 
                     return
                 
-                print("Generating the coverage report...")
+                logger.info("Generating the coverage report...")
                 coverage_report_model = CoverageReportModel.generate_coverage_report(all_prepared_sessions) 
-                CoverageReportView.show_coverage_report(coverage_report_model, "plots")  
-                print("Coverage report generated!")
+                self.report_renderer.submit(CoverageReportView.show_coverage_report, coverage_report_model, "plots")
+                logger.info("Coverage report generated!")
 
                 if randrange(1) == 0:
                     SegregationSystemJsonHandler.write_field_to_json(execution_state_file_path, "coverage_report", "OK")
@@ -113,10 +157,10 @@ class SegregationSystemOrchestrator:
         if (coverage_report_status == "-" and balancing_report_status == "OK" and enough_collected_sessions == "OK"):
             all_prepared_sessions = self.db.get_all_prepared_sessions()
 
-            print("Generating the input coverage report...")
+            logger.info("Generating the input coverage report...")
             coverage_report_model = CoverageReportModel.generate_coverage_report(all_prepared_sessions) 
-            CoverageReportView.show_coverage_report(coverage_report_model, "plots")  
-            print("Coverage report generated!")
+            self.report_renderer.submit(CoverageReportView.show_coverage_report, coverage_report_model, "plots")
+            logger.info("Coverage report generated!")
             return
 
         if not self.get_testing():
@@ -128,19 +172,31 @@ class SegregationSystemOrchestrator:
         if (coverage_report_status == "OK" and balancing_report_status == "OK" and enough_collected_sessions == "OK"):
             all_prepared_sessions = self.db.get_all_prepared_sessions()
 
-            print("Generating the learning sets...")
+            logger.info("Generating the learning sets...")
             report_model = LearningSetSplitter()
             learning_sets = report_model.generateLearningSets(all_prepared_sessions)
-            print("Learning sets generated!")
+            logger.info("Learning sets generated!")
 
             network_info = SegregationSystemConfiguration.GLOBAL_PARAMETERS["Development System"]
 
             self.message_broker.send_message(network_info['ip'], network_info['port'],
                                              SegregationSystemJsonHandler.dict_to_string(learning_sets.to_dict()))
-            print("Learning sets sent to the Development System!")
+            logger.info("Learning sets sent to the Development System!")
             self.db.remove_all_prepared_sessions() 
             self.reset_execution_state() 
 
+    def get_envelope(self) -> dict:
+        """
+        Wait for the next message and record the time it spent queued.
+        """
+        envelope = self.message_broker.get_last_message()
+        received_at = envelope.get('received_at')
+        if received_at is not None:
+            message = envelope.get('message')
+            trace_id = envelope.get('trace_id') or (message.get('uuid') if isinstance(message, dict) else None)
+            self.tracer.record(trace_id, "receive", received_at, time.time())
+        return envelope
+
     def get_testing(self) -> bool:
         return self.testing
 
@@ -166,3 +222,5 @@ if __name__ == "__main__":
             orchestrator.run()
     else:
         orchestrator.run()
+        # the human operator needs the reports on disk before the process exits
+        orchestrator.report_renderer.close()
@@ -1,5 +1,6 @@
 import json
-import queue
+import logging
+import os
 import time
 import threading
 from typing import Optional, Dict
@@ -8,6 +9,11 @@ import requests
 from flask import Flask, request, jsonify
 
 from segregation_system.segregation_configuration import SegregationSystemConfiguration
+from common import transport
+from common.message_log import open_channel_queue
+from common.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
 
 
 class SessionReceiverAndConfigurationSender:
@@ -15,12 +21,18 @@ class SessionReceiverAndConfigurationSender:
     A utility class to enable inter-module communication using Flask.
     This class supports sending and receiving messages in a blocking manner.
     """
-    def __init__(self, host: str = '0.0.0.0', port: int = 5003):
+    def __init__(self, host: str = '0.0.0.0', port: int = 5003, metrics: Optional[MetricsRegistry] = None):
         self.app = Flask(__name__)
         self.host = host
         self.port = port
         self.last_message = None
-        self.queue = queue.Queue()
+        # runtime metrics, exposed on /metrics
+        self.metrics = metrics or MetricsRegistry()
+        self.metrics.mount(self.app)
+        # durable if the message log is enabled in the parameters, loaded by the orchestrator
+        self.queue = open_channel_queue(self.metrics, "prepared_sessions",
+                                        configuration=SegregationSystemConfiguration.LOCAL_PARAMETERS.get("message_log"),
+                                        basedir=os.path.dirname(os.path.abspath(__file__)))
 
         # Lock and condition for blocking behavior
         self.message_condition = threading.Condition()
@@ -37,17 +49,30 @@ class SessionReceiverAndConfigurationSender:
             message = data.get('payload')
 
             with self.message_condition:
+                # the bound is read from the parameters loaded by the orchestrator; puts are
+                # serialized by the condition, so the size check cannot race with another put
+                max_size, retry_after = transport.queue_limits(
+                    SegregationSystemConfiguration.LOCAL_PARAMETERS.get("receive_queue"))
+                if max_size and self.queue.qsize() >= max_size:
+                    self.metrics.counter("queue_rejected_total", queue="prepared_sessions").inc()
+                    return transport.busy_response(retry_after)
+
                 self.last_message = {
                     'ip': sender_ip,
                     'port': sender_port,
-                    'message': message
+                    'message': message,
+                    'trace_id': data.get('trace_id'),
+                    'received_at': time.time()
                 }
-                self.queue.put(self.last_message)
+                self.queue.offer(self.last_message)
                 self.message_condition.notify_all()
 
             return jsonify({"status": "received"}), 200
 
     def start_server(self):
+        # in pipeline mode the messages are delivered in-process
+        if transport.serve_locally(self.app, self.port):
+            return
         thread = threading.Thread(target=self.app.run, kwargs={'host': self.host, 'port': self.port}, daemon=True)
         thread.start()
 
@@ -58,11 +83,12 @@ class SessionReceiverAndConfigurationSender:
             "message": message
         }
         try:
-            response = requests.post(url, json=payload)
+            response = transport.post(url, json=payload)
             if response.status_code == 200:
                 return response.json()
         except requests.RequestException as e:
-            print(f"Error sending message: {e}")
+            logger.error("Error sending message to %s: %s", url, e)
+        self.metrics.counter("send_failures_total", type=dest).inc()
         return None
 
     def get_last_message(self) -> Optional[Dict]:
@@ -85,7 +111,7 @@ if __name__ == "__main__":
     module_a.start_server()
 
     response = module_a.send_message(target_ip="87.19.204.54", target_port=5004, message='{"action": "test"}')
-    print("Response from Module B:", response)
+    logger.info("Response from Module B: %s", response)
 
     while True:
         sleep(1)
\ No newline at end of file
@@ -42,3 +42,42 @@ def test_database_store_and_retrieve(tmp_path, sample_session_data):
 
     db.remove_all_prepared_sessions()
     assert db.get_number_of_sessions_stored() == 0
+
+def test_database_stores_the_sparse_word_counts(tmp_path, sample_session_data):
+    """The counts are stored in one column, whatever the size of the vocabulary."""
+    import sqlite3
+
+    db_path = str(tmp_path / "test_segregation.db")
+    db = PreparedSessionDatabaseController(db_path=db_path)
+
+    # a term of a vocabulary larger than the column limit of SQLite
+    session = PreparedSession(dict(sample_session_data, word_kill_yourself=3, word_term2999=2))
+    assert session.words == {"word_fuck": 1, "word_kill_yourself": 3, "word_term2999": 2}
+    assert session.word_bulli == 0
+    db.store_prepared_session(session)
+
+    stored = db.get_all_prepared_sessions()[0]
+    assert stored["word_kill_yourself"] == 3 and stored["word_term2999"] == 2
+    assert "word_bulli" not in stored
+
+    conn = sqlite3.connect(db_path)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(prepared_sessions)")]
+    conn.close()
+    assert "words" in columns and not any(column.startswith("word_") for column in columns)
+
+
+def test_database_of_the_previous_format_gets_the_words_column(tmp_path, sample_session_data):
+    """A table with a column per term keeps its rows and gets the words column."""
+    import sqlite3
+
+    db_path = str(tmp_path / "test_segregation.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE prepared_sessions (uuid TEXT PRIMARY KEY, label TEXT, tweet_length INTEGER, '
+                 '"word_fuck" INTEGER)')
+    conn.close()
+
+    db = PreparedSessionDatabaseController(db_path=db_path)
+    conn = sqlite3.connect(db_path)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(prepared_sessions)")]
+    conn.close()
+    assert "words" in columns
@@ -63,4 +63,30 @@ def test_coverage_report_counters():
     
     assert report.bad_words_map["fuck"] == 3  
     assert report.events_map["Foul"] == 1
-    assert report.total_sessions == 2
\ No newline at end of file
+    assert report.total_sessions == 2
+def test_report_views_render_off_thread_without_leaking_figures(monkeypatch, tmp_path):
+    import matplotlib.pyplot as plt
+    from common.report_renderer import ReportRenderer
+    from segregation_system.balancing_report.balancing_report_view import BalancingReportView
+    from segregation_system.coverage_report.coverage_report_view import CoverageReportView
+
+    SegregationSystemConfiguration.LOCAL_PARAMETERS = {
+        "balancing_report_threshold": 0.1,
+        "minimum_coverage_report_threshold": 2
+    }
+    sessions = [make_session("cyberbullying", word_fuck=1), make_session("not_cyberbullying")]
+    balancing = BalancingReportModel.generate_balancing_report(sessions)
+    coverage = CoverageReportModel.generate_coverage_report(sessions)
+    coverage.tweet_length_map = {}      # the view stops early when there are no tweet lengths
+
+    (tmp_path / "segregation_system" / "plots").mkdir(parents=True)
+    monkeypatch.chdir(tmp_path)
+    open_figures = plt.get_fignums()
+
+    renderer = ReportRenderer()
+    renderer.submit(BalancingReportView.show_balancing_report, balancing, "plots")
+    renderer.submit(CoverageReportView.show_coverage_report, coverage, "plots")
+    renderer.close()
+
+    assert (tmp_path / "segregation_system" / "plots" / "balancing_report.png").exists()
+    assert plt.get_fignums() == open_figures
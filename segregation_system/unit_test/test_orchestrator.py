@@ -1,13 +1,15 @@
 import pytest
+from flask import Flask
 from segregation_system.segregation_orchestrator import SegregationSystemOrchestrator
 from segregation_system.segregation_configuration import SegregationSystemConfiguration
 
 # Fake classes to mock messaging system and database handler
 class FakeBroker:
-    def __init__(self):
+    def __init__(self, metrics=None):
         self.sent_messages = []
         self.config_sent = []
         self._incoming_messages = []
+        self.app = Flask(__name__)
     
     def start_server(self): pass
     
@@ -96,3 +98,12 @@ def test_orchestrator_flow(monkeypatch):
     
     # The state must have been reset
     assert state["enough_collected_sessions"] == "-"
+
+
+def test_orchestrator_import_does_not_load_matplotlib():
+    # a fresh interpreter is needed: other tests may already have imported matplotlib
+    import subprocess, sys, os
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    code = "import sys, segregation_system.segregation_orchestrator; print('matplotlib' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True)
+    assert result.stdout.strip() == "False"
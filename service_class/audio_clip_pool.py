@@ -0,0 +1,118 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import random
+import wave
+from io import BytesIO
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class AudioClipPool:
+    """
+    Pool of pre-rendered audio clips used by the Record Sender.
+
+    The MP3 file is decoded only once into a PCM array, from which a fixed number of
+    random clips is encoded as base64 WAV. The encoded clips are cached on disk, so that
+    following runs do not even need to decode the MP3 file.
+    """
+
+    def __init__(self, audio_path: str, clip_duration_ms: int = 20 * 1000, pool_size: int = 64,
+                 cache_dir: str = None):
+        """
+        Initialize the pool, loading the clips from the cache or rendering them.
+
+        :param audio_path: Path of the source MP3 file.
+        :param clip_duration_ms: Duration of each clip in milliseconds.
+        :param pool_size: Number of distinct clips in the pool.
+        :param cache_dir: Directory where the rendered clips are cached, None to disable the cache.
+        """
+        self.audio_path = audio_path
+        self.clip_duration_ms = clip_duration_ms
+        self.pool_size = pool_size
+        self.cache_dir = cache_dir
+
+        self.clips = self._load_cached_clips()
+        if self.clips is None:
+            samples, frame_rate, sample_width = self._decode(audio_path)
+            self.clips = self.render_clips(samples, frame_rate, sample_width, clip_duration_ms, pool_size)
+            self._store_cached_clips()
+
+    def random_clip(self) -> str:
+        """
+        Return one of the clips of the pool, chosen at random.
+
+        :return: The base64 encoded WAV clip.
+        """
+        return random.choice(self.clips)
+
+    @staticmethod
+    def render_clips(samples: np.ndarray, frame_rate: int, sample_width: int, clip_duration_ms: int,
+                     pool_size: int) -> list:
+        """
+        Slice random clips out of a PCM array and encode them as base64 WAV.
+
+        :param samples: The PCM samples, with shape (frames, channels).
+        :param frame_rate: The sample rate of the audio.
+        :param sample_width: The size in bytes of each sample.
+        :param clip_duration_ms: Duration of each clip in milliseconds.
+        :param pool_size: Number of clips to render.
+        :return: The list of base64 encoded WAV clips.
+        """
+        clip_frames = frame_rate * clip_duration_ms // 1000
+        max_start = max(0, len(samples) - clip_frames)
+
+        clips = []
+        for _ in range(pool_size):
+            start = random.randint(0, max_start)
+            buffer = BytesIO()
+            with wave.open(buffer, "wb") as wav:
+                wav.setnchannels(samples.shape[1])
+                wav.setsampwidth(sample_width)
+                wav.setframerate(frame_rate)
+                wav.writeframes(samples[start:start + clip_frames].tobytes())
+            clips.append(base64.b64encode(buffer.getvalue()).decode("ascii"))
+        return clips
+
+    @staticmethod
+    def _decode(audio_path: str):
+        """
+        Decode the MP3 file into a PCM array.
+
+        :param audio_path: Path of the source MP3 file.
+        :return: The samples with shape (frames, channels), the frame rate and the sample width.
+        """
+        from pydub import AudioSegment
+
+        audio = AudioSegment.from_mp3(audio_path)
+        samples = np.array(audio.get_array_of_samples()).reshape(-1, audio.channels)
+        return samples, audio.frame_rate, audio.sample_width
+
+    def _cache_path(self) -> str:
+        # the key changes whenever the source file or the pool settings change
+        stat = os.stat(self.audio_path)
+        key = f"{os.path.abspath(self.audio_path)}:{stat.st_size}:{stat.st_mtime_ns}:{self.clip_duration_ms}:{self.pool_size}"
+        return os.path.join(self.cache_dir, f"clips_{hashlib.sha256(key.encode()).hexdigest()[:16]}.json")
+
+    def _load_cached_clips(self):
+        if self.cache_dir is None or not os.path.exists(self._cache_path()):
+            return None
+        try:
+            with open(self._cache_path(), "r") as file:
+                return json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("Audio clip cache unreadable, clips will be rendered again: %s", e)
+            return None
+
+    def _store_cached_clips(self):
+        if self.cache_dir is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self._cache_path() + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self.clips, file)
+        os.replace(tmp_path, self._cache_path())
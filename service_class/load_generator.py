@@ -0,0 +1,169 @@
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+
+import requests
+
+from common import transport
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LoadReport:
+    """
+    Summary of an open-loop run.
+    """
+    offered: int = 0
+    sent: int = 0
+    failed: int = 0
+    duration: float = 0.0
+    # seconds between the scheduled arrival of a record and the end of its request
+    latencies: list = field(default_factory=list)
+
+    @property
+    def achieved_rate(self) -> float:
+        return self.sent / self.duration if self.duration > 0 else 0.0
+
+    def latency_percentile(self, percentile: float) -> float:
+        """
+        Return a percentile of the latencies of the records sent.
+
+        :param percentile: The percentile, between 0 and 100.
+        :return: The latency in seconds, 0 if no record was sent.
+        """
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+
+class LoadGenerator:
+    """
+    Open-loop load generator for the elasticity tests.
+
+    Records are released at a target rate (constant or Poisson arrivals), following an
+    optional ramp-up schedule, independently from the response time of the Ingestion
+    System: N concurrent senders deliver them, so the offered load is not capped by
+    the round trip latency as with the closed-loop sender.
+    """
+
+    def __init__(self, url: str, port: int, rate: float, arrival: str = "constant", senders: int = 4,
+                 ramp_up: list = None, timeout: float = 10.0):
+        """
+        Initialize the load generator.
+
+        :param url: The url of the Ingestion System endpoint.
+        :param port: The port written in each packet.
+        :param rate: The target rate in records per second, used after the ramp-up.
+        :param arrival: The arrival process, "constant" or "poisson".
+        :param senders: The number of concurrent senders.
+        :param ramp_up: List of stages {"duration": seconds, "rate": records/s} executed before the target rate.
+        :param timeout: Timeout of each request, in seconds.
+        """
+        if arrival not in ("constant", "poisson"):
+            raise ValueError(f"Unknown arrival process: {arrival}")
+        if rate <= 0 or senders < 1:
+            raise ValueError("The rate must be positive and at least one sender is needed.")
+
+        self.url = url
+        self.port = port
+        self.rate = rate
+        self.arrival = arrival
+        self.senders = senders
+        self.ramp_up = ramp_up or []
+        self.timeout = timeout
+
+    def rate_at(self, elapsed: float) -> float:
+        """
+        Return the target rate after the given time from the start of the run.
+
+        :param elapsed: Seconds from the start of the run.
+        :return: The rate in records per second.
+        """
+        for stage in self.ramp_up:
+            if elapsed < stage["duration"]:
+                return stage["rate"]
+            elapsed -= stage["duration"]
+        return self.rate
+
+    def interarrival(self, rate: float) -> float:
+        """
+        Return the time to the next arrival.
+
+        :param rate: The current rate in records per second.
+        :return: The interarrival time in seconds.
+        """
+        if self.arrival == "poisson":
+            return random.expovariate(rate)
+        return 1.0 / rate
+
+    def run(self, bucket: list) -> LoadReport:
+        """
+        Send all the records of the bucket, interleaving their sources at random.
+
+        :param bucket: The list of records to send.
+        :return: The report of the run.
+        """
+        # a single O(n) shuffle replaces picking and removing random records
+        records = list(bucket)
+        random.shuffle(records)
+
+        report = LoadReport(offered=len(records))
+        report_lock = threading.Lock()
+        arrivals = queue.Queue()
+
+        workers = [threading.Thread(target=self._sender, args=(arrivals, report, report_lock), daemon=True)
+                   for _ in range(self.senders)]
+        for worker in workers:
+            worker.start()
+
+        start = time.perf_counter()
+        next_arrival = start
+        for record in records:
+            # the schedule never waits for the responses: late senders only increase the latency
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            arrivals.put((next_arrival, record))
+            next_arrival += self.interarrival(self.rate_at(next_arrival - start))
+
+        for _ in workers:
+            arrivals.put(None)
+        for worker in workers:
+            worker.join()
+
+        report.duration = time.perf_counter() - start
+        return report
+
+    def _sender(self, arrivals: queue.Queue, report: LoadReport, report_lock: threading.Lock):
+        # each sender keeps its own connection alive
+        with requests.Session() as session:
+            while True:
+                item = arrivals.get()
+                if item is None:
+                    return
+                scheduled, record = item
+                packet = {
+                    "port": self.port,
+                    "payload": json.dumps(record),
+                    "trace_id": record["value"].get("uuid")
+                }
+                try:
+                    # a busy receiver delays this sender only, its wait counts in the latency
+                    response = transport.post(self.url, json=packet, timeout=self.timeout, session=session)
+                    success = response.status_code == 200
+                except requests.RequestException as e:
+                    logger.error("Error sending record: %s", e)
+                    success = False
+
+                with report_lock:
+                    if success:
+                        report.sent += 1
+                        report.latencies.append(time.perf_counter() - scheduled)
+                    else:
+                        report.failed += 1
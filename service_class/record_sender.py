@@ -1,12 +1,17 @@
 import json
-import pandas as pd
+import logging
+import os
 import requests
 import random
-from pydub import AudioSegment
-from io import BytesIO
-import base64
+from collections import deque
 
+from common import transport
 from service_class.service_class_parameters import ServiceClassParameters
+from service_class.audio_clip_pool import AudioClipPool
+from service_class.load_generator import LoadGenerator
+
+logger = logging.getLogger(__name__)
+
 
 class RecordSender:
 
@@ -16,14 +21,22 @@ class RecordSender:
 
         :param basedir: Base directory of Record Sender.
         """
-        # Read the records data from the CSV files
-        print(basedir)
-        self.tweets = pd.read_csv(f"{basedir}/data/tweets.csv")
-        self.events = pd.read_csv(f"{basedir}/data/events.csv")
-        self.audio = AudioSegment.from_mp3(f"{basedir}/data/audio.mp3")
-        self.audio_duration_ms = len(self.audio)
-        self.clip_duration_ms = 20 * 1000 # 20 seconds in milliseconds
-        self.labels = pd.read_csv(f"{basedir}/data/labels.csv")
+        # pandas is only needed to load the data, so it is imported here
+        import pandas as pd
+
+        # Read the records data from the CSV files, as lists of rows to avoid per-row DataFrame lookups
+        logger.debug("Loading the records from %s", basedir)
+        self.tweets = pd.read_csv(f"{basedir}/data/tweets.csv").to_dict("records")
+        self.events = pd.read_csv(f"{basedir}/data/events.csv").to_dict("records")
+        self.labels = pd.read_csv(f"{basedir}/data/labels.csv").to_dict("records")
+
+        # The audio file is decoded once and sliced into a pool of ready to send clips
+        self.audio_clips = AudioClipPool(
+            f"{basedir}/data/audio.mp3",
+            clip_duration_ms=20 * 1000, # 20 seconds in milliseconds
+            pool_size=ServiceClassParameters.LOCAL_PARAMETERS.get("audio_clip_pool_size", 64),
+            cache_dir=os.path.join(basedir, "data", "clip_cache"),
+        )
 
         self.min_len = min(len(self.tweets), len(self.events), len(self.labels))
 
@@ -37,38 +50,26 @@ class RecordSender:
         """
         indexes = random.sample(range(self.min_len), session_count)
         bucket = []
-        for _ in range(session_count):
-            index = indexes.pop()
+        for index in indexes:
+            tweet = dict(self.tweets[index])
 
             bucket.append({
                 "source": "tweet",
-                "value": self.tweets.iloc[index].to_dict()
+                "value": tweet
             })
             bucket.append({
                 "source": "events",
-                "value": self.events.iloc[index].to_dict()
+                "value": dict(self.events[index])
             })
-
-            max_start = max(0, self.audio_duration_ms - self.clip_duration_ms)
-            start_ms = random.randint(0, max_start)
-            end_ms = start_ms + self.clip_duration_ms
-            # extract the audio slice
-            audio_slice = self.audio[start_ms:end_ms]
-            # Convert to bytes (WAV for simplicity)
-            buffer = BytesIO()
-            audio_slice.export(buffer, format="wav")
-            audio_bytes = buffer.getvalue()
-            audio_b64 = base64.b64encode(audio_bytes).decode("ascii")
-
             bucket.append({
                 "source": "audio",
-                "value": {"audio": audio_b64, "uuid": self.tweets.iloc[index].to_dict()["uuid"]}
+                "value": {"audio": self.audio_clips.random_clip(), "uuid": tweet["uuid"]}
             })
 
             if include_labels:
                 bucket.append({
                     "source": "label",
-                    "value": self.labels.iloc[index].to_dict()
+                    "value": dict(self.labels[index])
                 })
 
         return bucket
@@ -76,6 +77,8 @@ class RecordSender:
     def send_bucket(self, bucket: list):
         """
         Send records from the bucket to the Ingestion System randomly.
+        With an "open_loop" load generator configured, the records are sent at the configured rate
+        by concurrent senders; otherwise they are sent one at a time, retrying the failed ones.
 
         :param bucket: The list of records to send.
         """
@@ -84,19 +87,39 @@ class RecordSender:
 
         url = f"http://{ip}:{port}/send"
 
-        while bucket:
-            record = random.choice(bucket)
+        load_generator = ServiceClassParameters.LOCAL_PARAMETERS.get("load_generator", {})
+        if load_generator.get("mode") == "open_loop":
+            generator = LoadGenerator(url, port, rate=load_generator["rate"],
+                                      arrival=load_generator.get("arrival", "constant"),
+                                      senders=load_generator.get("senders", 4),
+                                      ramp_up=load_generator.get("ramp_up"))
+            report = generator.run(bucket)
+            bucket.clear()
+            logger.info("Open-loop run: %d/%d records sent, %d failed, %.1f records/s, p99 latency %.3f s",
+                        report.sent, report.offered, report.failed, report.achieved_rate,
+                        report.latency_percentile(99))
+            return report
+
+        # shuffle once, failed records are sent again after the others
+        random.shuffle(bucket)
+        pending = deque(bucket)
+        bucket.clear()
+
+        while pending:
+            record = pending.popleft()
             try:
 
                 packet = {
                     "port": port,
-                    "payload": json.dumps(record)
+                    "payload": json.dumps(record),
+                    "trace_id": record["value"].get("uuid")
                 }
 
-                response = requests.post(url, json=packet)
+                # a busy Ingestion System is waited for, as it asks in Retry-After
+                response = transport.post(url, json=packet)
                 if response.status_code == 200:
-                    bucket.remove(record)
-                else:
-                    print(f"Failed to send record: {record}")
+                    continue
+                logger.warning("Failed to send record: %s", record)
             except requests.RequestException as e:
-                print(f"Error sending record: {e}")
+                logger.error("Error sending record: %s", e)
+            pending.append(record)
@@ -1,3 +1,4 @@
+import logging
 import time
 import os
 
@@ -5,6 +6,10 @@ from service_class.service_class_parameters import ServiceClassParameters
 from service_class.service_receiver import ServiceReceiver
 from service_class.record_sender import RecordSender
 from service_class.logger import Logger
+from common.logger import configure_logging
+
+logger = logging.getLogger(__name__)
+
 
 class ServiceClassOrchestrator:
     """
@@ -21,6 +26,7 @@ class ServiceClassOrchestrator:
 
         basedir = os.path.dirname(os.path.abspath(__file__))
         ServiceClassParameters.loadParameters(basedir) # Load the parameters of the Service Class
+        configure_logging("service_class", ServiceClassParameters.LOCAL_PARAMETERS.get("logging"))
         self.logger = Logger(basedir, ServiceClassParameters.LOCAL_PARAMETERS["phase"])
         self.serviceReceiver = ServiceReceiver(basedir=basedir, logger=self.logger)
         self.recordSender = RecordSender(basedir=basedir)
@@ -30,17 +36,16 @@ class ServiceClassOrchestrator:
         """
         Start the Service Class Orchestrator.
         """
-        print("Service Class started.")
+        logger.info("Service Class started.")
 
         # Start the Service Receiver server
         self.serviceReceiver.start_receiver()
 
         if ServiceClassParameters.LOCAL_PARAMETERS["phase"] == "all_phases":
-            print("All phases will be tested.")
-            print("For each phase, the following sessions will be sent:")
-            print(" Development: " + str(ServiceClassParameters.LOCAL_PARAMETERS["development_sessions"]))
-            print(" Production: " + str(ServiceClassParameters.LOCAL_PARAMETERS["production_sessions"]))
-            print(" Evaluation: " + str(ServiceClassParameters.LOCAL_PARAMETERS["evaluation_sessions"]))
+            logger.info("All phases will be tested, sessions sent: development %d, production %d, evaluation %d",
+                        ServiceClassParameters.LOCAL_PARAMETERS["development_sessions"],
+                        ServiceClassParameters.LOCAL_PARAMETERS["production_sessions"],
+                        ServiceClassParameters.LOCAL_PARAMETERS["evaluation_sessions"])
 
             # Writing headers to the CSV file
             self.logger.write_header("phase,timestamp,status")
@@ -55,10 +60,10 @@ class ServiceClassOrchestrator:
             for phase, include_labels in phases_and_labels.items():
 
                 if ServiceClassParameters.LOCAL_PARAMETERS[f"{phase}_sessions"] == 0:
-                    print(f"Skipping {phase} phase.")
+                    logger.info("Skipping %s phase.", phase)
                     continue
 
-                print("Starting " + phase + " phase.")
+                logger.info("Starting %s phase.", phase)
 
                 # Preparing the bucket for the phase
                 bucket = self.recordSender.prepare_bucket(ServiceClassParameters.LOCAL_PARAMETERS[f"{phase}_sessions"], include_labels)
@@ -73,7 +78,7 @@ class ServiceClassOrchestrator:
                 self.logger.log(f"{phase},{time.time()},records_sent")
 
                 if phase == "development":
-                    print("Waiting for the production configuration message.")
+                    logger.info("Waiting for the production configuration message.")
 
                     # Waiting for the production configuration message
                     configuration = self.serviceReceiver.rcv_configuration()
@@ -83,11 +88,11 @@ class ServiceClassOrchestrator:
 
                     if configuration["configuration"] != "production":
                         # Restart the development phase
-                        print("Production configuration not received. Received " + configuration["configuration"] + " configuration.")
+                        logger.error("Production configuration not received. Received %s configuration.", configuration["configuration"])
                         return
 
                 else:
-                    print(f"Waiting for {ServiceClassParameters.LOCAL_PARAMETERS[f'{phase}_sessions']} labels.")
+                    logger.info("Waiting for %d labels.", ServiceClassParameters.LOCAL_PARAMETERS[f"{phase}_sessions"])
 
                     # Waiting for the labels
                     for _ in range(ServiceClassParameters.LOCAL_PARAMETERS[f"{phase}_sessions"]):
@@ -96,12 +101,13 @@ class ServiceClassOrchestrator:
                     # Updating CSV file
                     self.logger.log(f"{phase},{time.time()},labels_received")
 
-                print(f"{phase.capitalize()} phase completed.")
+                logger.info("%s phase completed.", phase.capitalize())
 
-            print("All phases completed.")
+            logger.info("All phases completed.")
 
         elif ServiceClassParameters.LOCAL_PARAMETERS["phase"] == "development":
-            print("Development phase will be tested, by developing " + str(ServiceClassParameters.LOCAL_PARAMETERS["classifiers_to_develop"]) + " classifiers.")
+            logger.info("Development phase will be tested, by developing %d classifiers.",
+                        ServiceClassParameters.LOCAL_PARAMETERS["classifiers_to_develop"])
 
             # Writing headers to the CSV file
             self.logger.write_header("timestamp,message")
@@ -114,7 +120,8 @@ class ServiceClassOrchestrator:
             self.logger.log(f"{time.time()},records_sent")
 
         elif ServiceClassParameters.LOCAL_PARAMETERS["phase"] == "production":
-            print("Production phase will be tested, by considering " + str(ServiceClassParameters.LOCAL_PARAMETERS["production_sessions"]) + " sessions.")
+            logger.info("Production phase will be tested, by considering %d sessions.",
+                        ServiceClassParameters.LOCAL_PARAMETERS["production_sessions"])
 
             # Writing headers to the CSV file
             self.logger.write_header("timestamp,message")
@@ -126,8 +133,7 @@ class ServiceClassOrchestrator:
             self.logger.log(f"{time.time()},records_sent")
 
         else:
-            print("Phase parameter value invalid.")
-            print("Choose between 'all_phases', 'development' or 'production'.")
+            logger.error("Phase parameter value invalid. Choose between 'all_phases', 'development' or 'production'.")
             return
 
 
@@ -1,6 +1,10 @@
 import json
+import logging
 import jsonschema
 
+logger = logging.getLogger(__name__)
+
+
 class ServiceClassParameters:
     """
     This class is used to store the parameters of the Service Class.
@@ -29,16 +33,16 @@ class ServiceClassParameters:
                 ServiceClassParameters.LOCAL_PARAMETERS = json.load(local_params)
 
                 if not ServiceClassParameters._validate_json(ServiceClassParameters.LOCAL_PARAMETERS, "local", basedir):
-                    print("Invalid local parameters.")
+                    logger.error("Invalid local parameters.")
 
                 with open(f"{basedir}/{ServiceClassParameters.GLOBAL_PARAMETERS_PATH}", "r") as global_params:
                     ServiceClassParameters.GLOBAL_PARAMETERS = json.load(global_params)
 
                     if not ServiceClassParameters._validate_json(ServiceClassParameters.GLOBAL_PARAMETERS, "global", basedir):
-                        print("Invalid global parameters.")
+                        logger.error("Invalid global parameters.")
 
         except Exception as e:
-            print(f"Error loading parameters: {e}")
+            logger.error("Error loading parameters: %s", e)
 
     @staticmethod
     def _validate_json(json_parameters: dict, param_type: str, basedir: str = ".") -> bool:
@@ -66,7 +70,7 @@ class ServiceClassParameters:
             return True
         except jsonschema.ValidationError as e:
             if param_type == "local":
-                print(f"Invalid JSON local parameters: {e}")
+                logger.error("Invalid JSON local parameters: %s", e.message)
             elif param_type == "global":
-                print(f"Invalid JSON global parameters: {e}")
+                logger.error("Invalid JSON global parameters: %s", e.message)
             return False
\ No newline at end of file
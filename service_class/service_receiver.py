@@ -1,3 +1,4 @@
+import logging
 import time
 import json
 import queue
@@ -7,6 +8,10 @@ from flask import Flask, request, jsonify
 
 from service_class.service_class_parameters import ServiceClassParameters
 from service_class.logger import Logger
+from service_class.trace_collector import TraceCollector
+
+# "logger" is the CSV logger of the timestamps
+log = logging.getLogger(__name__)
 
 
 class ServiceReceiver:
@@ -43,6 +48,9 @@ class ServiceReceiver:
         # Path of the JSON schema for the timestamp
         self.timestamp_schema_path = f"{basedir}/schemas/timestamp_schema.json"
 
+        # Path of the JSON schema for the batches of timestamps
+        self.timestamp_batch_schema_path = f"{basedir}/schemas/timestamp_batch_schema.json"
+
         # Path of the JSON schema for the configuration
         self.configuration_schema_path = f"{basedir}/schemas/configuration_schema.json"
 
@@ -52,6 +60,12 @@ class ServiceReceiver:
         # Path of the timestamp log
         self.timestamp_log_path = f"{basedir}/logs/timestamp_log.txt"
 
+        # Path of the JSON schema for the batches of spans
+        self.spans_schema_path = f"{basedir}/schemas/spans_schema.json"
+
+        # Collector of the per-session spans sent by the subsystems
+        self.trace_collector = TraceCollector(f"{basedir}/logs/span_log.csv")
+
         # Sessions tracker and labels counter are used only when the phase is "production"
         self.labels_counter = 0
 
@@ -61,18 +75,26 @@ class ServiceReceiver:
 
             packet = request.get_json()
 
-            # Get the json timestamp from the packet
+            # Get the json timestamp, or the batch of timestamps, from the packet
             json_timestamp = json.loads(packet["message"])
 
+            if isinstance(json_timestamp, list):
+                is_valid = self._validate_json(json_timestamp, self.timestamp_batch_schema_path)
+                timestamps = json_timestamp
+            else:
+                is_valid = self._validate_json(json_timestamp, self.timestamp_schema_path)
+                timestamps = [json_timestamp]
+
             # Validate the timestamp
-            if self._validate_json(json_timestamp, self.timestamp_schema_path):
+            if is_valid:
                 # JSON timestamp is valid
 
-                print(f"Received timestamp: {json_timestamp}")
+                log.debug("Received %d timestamp(s): %s", len(timestamps), timestamps)
 
-                # Write the timestamp to the log
+                # Write the whole batch to the log with a single write
                 with open(self.timestamp_log_path, "a") as log_file:
-                    log_file.write(f"{json_timestamp['timestamp']},{json_timestamp['system']},{json_timestamp['status']}\n")
+                    log_file.write("".join(f"{timestamp['timestamp']},{timestamp['system']},{timestamp['status']}\n"
+                                           for timestamp in timestamps))
 
                 return jsonify({"status": "received"}), 200
 
@@ -88,7 +110,7 @@ class ServiceReceiver:
             # Get the json configuration from the packet
             json_configuration = json.loads(packet["message"])
 
-            print(f"Received configuration: {json_configuration}")
+            log.info("Received configuration: %s", json_configuration)
             
             # Validate the configuration
             if self._validate_json(json_configuration, self.configuration_schema_path):
@@ -122,14 +144,14 @@ class ServiceReceiver:
             if self._validate_json(json_label, self.label_schema_path):
                 # JSON label is valid
 
-                print(f"Received label: {json_label}")
+                log.debug("Received label: %s", json_label)
 
                 if ServiceClassParameters.LOCAL_PARAMETERS["phase"] == "production":
 
                     self.labels_counter += 1
 
                     if self.labels_counter == ServiceClassParameters.LOCAL_PARAMETERS["production_sessions"]:
-                        print (f"Production phase completed. Received {self.labels_counter} labels.")
+                        log.info("Production phase completed. Received %d labels.", self.labels_counter)
 
                         self.labels_counter = 0
 
@@ -147,6 +169,28 @@ class ServiceReceiver:
                 # JSON label is invalid
                 return jsonify({"status": "error", "message": "Invalid JSON label"}), 400
 
+        # Define a route to receive batches of spans from the subsystems
+        @self.app.route('/Spans', methods=['POST'])
+        def receive_spans():
+
+            packet = request.get_json()
+
+            if self._validate_json(packet, self.spans_schema_path):
+                self.trace_collector.add_spans(packet["spans"])
+                return jsonify({"status": "received"}), 200
+
+            return jsonify({"status": "error", "message": "Invalid JSON spans"}), 400
+
+        # Define a route to read the latency percentiles of each stage
+        @self.app.route('/Spans', methods=['GET'])
+        def stage_latencies():
+            return jsonify(self.trace_collector.stage_percentiles()), 200
+
+        # Define a route to read the waterfall of a session
+        @self.app.route('/Spans/<trace_id>', methods=['GET'])
+        def session_waterfall(trace_id):
+            return jsonify(self.trace_collector.waterfall(trace_id)), 200
+
     def start_receiver(self):
         """
         Start the Flask server in a separate thread.
@@ -193,6 +237,6 @@ class ServiceReceiver:
             jsonschema.validate(json_data, schema)
             return True
         except jsonschema.ValidationError as e:
-            print(f"Invalid JSON data: {e}")
+            log.warning("Invalid JSON data: %s", e.message)
             return
         
\ No newline at end of file
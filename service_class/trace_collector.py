@@ -0,0 +1,106 @@
+import os
+import threading
+from collections import OrderedDict, deque
+
+from common.metrics import Histogram
+
+# sessions whose spans are kept for the waterfall, the least recently updated are forgotten
+MAX_TRACES = 10000
+# spans kept per session, the oldest are forgotten
+MAX_SPANS_PER_TRACE = 256
+
+
+class TraceCollector:
+    """
+    Collects the spans sent by the subsystems and assembles them per session.
+    The memory is bounded: the spans of the last sessions are kept for their waterfall,
+    the durations of each stage only as a latency histogram.
+    """
+
+    def __init__(self, log_path: str = None, max_traces: int = MAX_TRACES,
+                 max_spans_per_trace: int = MAX_SPANS_PER_TRACE):
+        """
+        Initialize the collector.
+
+        :param log_path: CSV file where every received span is appended, None to keep them only in memory.
+        :param max_traces: Number of sessions whose spans are kept.
+        :param max_spans_per_trace: Number of spans kept per session.
+        """
+        self.log_path = log_path
+        self.max_traces = max_traces
+        self.max_spans_per_trace = max_spans_per_trace
+        # trace id -> its last spans, in least recently updated order
+        self.traces = OrderedDict()
+        # (system, stage) -> histogram of the span durations
+        self.durations = {}
+        self._lock = threading.Lock()
+
+        if self.log_path is not None and not os.path.exists(self.log_path):
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            with open(self.log_path, "w") as log_file:
+                log_file.write("trace_id,system,stage,start,end\n")
+
+    def add_spans(self, spans: list):
+        """
+        Add a batch of spans.
+
+        :param spans: List of spans, each with trace_id, system, stage, start and end.
+        """
+        with self._lock:
+            for span in spans:
+                trace = self.traces.get(span["trace_id"])
+                if trace is None:
+                    trace = self.traces[span["trace_id"]] = deque(maxlen=self.max_spans_per_trace)
+                    if len(self.traces) > self.max_traces:
+                        self.traces.popitem(last=False)
+                else:
+                    self.traces.move_to_end(span["trace_id"])
+                trace.append(span)
+
+                key = (span["system"], span["stage"])
+                histogram = self.durations.get(key)
+                if histogram is None:
+                    histogram = self.durations[key] = Histogram()
+                histogram.observe(span["end"] - span["start"])
+
+            if self.log_path is not None:
+                with open(self.log_path, "a") as log_file:
+                    for span in spans:
+                        log_file.write(f"{span['trace_id']},{span['system']},{span['stage']},{span['start']},{span['end']}\n")
+
+    def waterfall(self, trace_id: str) -> list:
+        """
+        Return the spans of a session in start order, with times relative to the first span.
+
+        :param trace_id: The trace id, i.e. the session uuid.
+        :return: A list of dictionaries with system, stage, offset and duration in seconds.
+        """
+        with self._lock:
+            spans = sorted(self.traces.get(trace_id, []), key=lambda span: span["start"])
+        if not spans:
+            return []
+        origin = spans[0]["start"]
+        return [{
+            "system": span["system"],
+            "stage": span["stage"],
+            "offset": span["start"] - origin,
+            "duration": span["end"] - span["start"]
+        } for span in spans]
+
+    def stage_percentiles(self, percentiles: tuple = (50, 90, 99)) -> dict:
+        """
+        Compute the latency percentiles of every stage of every subsystem.
+
+        :param percentiles: The percentiles to compute.
+        :return: A dictionary "system/stage" -> {"count": n, "p50": seconds, ...}.
+        """
+        with self._lock:
+            durations = sorted(self.durations.items())
+
+        summary = {}
+        for (system, stage), histogram in durations:
+            stats = {"count": histogram.count}
+            for percentile in percentiles:
+                stats[f"p{percentile}"] = histogram.percentile(percentile)
+            summary[f"{system}/{stage}"] = stats
+        return summary
@@ -0,0 +1,99 @@
+import random
+import threading
+import time
+
+import pytest
+import requests
+
+from service_class.load_generator import LoadGenerator
+from service_class.record_sender import RecordSender
+from service_class.service_class_parameters import ServiceClassParameters
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def test_rate_follows_the_ramp_up_schedule():
+    generator = LoadGenerator("http://ingestion/send", 5001, rate=100,
+                              ramp_up=[{"duration": 5, "rate": 10}, {"duration": 5, "rate": 50}])
+
+    assert generator.rate_at(0) == 10
+    assert generator.rate_at(7) == 50
+    assert generator.rate_at(12) == 100
+
+    with pytest.raises(ValueError):
+        LoadGenerator("http://ingestion/send", 5001, rate=100, arrival="bursty")
+
+
+def test_poisson_arrivals_have_the_target_mean():
+    random.seed(0)
+    generator = LoadGenerator("http://ingestion/send", 5001, rate=200, arrival="poisson")
+
+    gaps = [generator.interarrival(200) for _ in range(5000)]
+
+    assert sum(gaps) / len(gaps) == pytest.approx(1 / 200, rel=0.1)
+    assert len(set(gaps)) > 1
+
+
+def test_open_loop_rate_is_not_capped_by_latency(monkeypatch):
+    concurrent = []
+    in_flight = [0]
+    lock = threading.Lock()
+
+    def slow_post(self, url, json, timeout):
+        with lock:
+            in_flight[0] += 1
+            concurrent.append(in_flight[0])
+        time.sleep(0.1)
+        with lock:
+            in_flight[0] -= 1
+        return FakeResponse(200)
+
+    monkeypatch.setattr(requests.Session, "post", slow_post)
+    generator = LoadGenerator("http://ingestion/send", 5001, rate=100, senders=10)
+
+    report = generator.run([{"source": "tweet", "value": {"uuid": str(i)}} for i in range(30)])
+
+    assert report.sent == 30 and report.failed == 0
+    # a closed-loop sender would need 30 * 0.1 s
+    assert report.duration < 1.5
+    assert max(concurrent) > 1
+    assert report.latency_percentile(50) >= 0.1
+
+
+def test_closed_loop_sender_retries_failed_records(monkeypatch):
+    ServiceClassParameters.GLOBAL_PARAMETERS = {"Ingestion System": {"ip": "127.0.0.1", "port": 5001}}
+    ServiceClassParameters.LOCAL_PARAMETERS = {"load_generator": {"mode": "closed_loop"}}
+    attempts = []
+
+    def flaky_post(url, json):
+        attempts.append(json["payload"])
+        # the first attempt of every record fails
+        return FakeResponse(200 if attempts.count(json["payload"]) > 1 else 500)
+
+    monkeypatch.setattr(requests, "post", flaky_post)
+    bucket = [{"source": "tweet", "value": {"uuid": str(i)}} for i in range(5)]
+
+    RecordSender.send_bucket(RecordSender.__new__(RecordSender), bucket)
+
+    assert bucket == []
+    assert len(attempts) == 10
+
+
+def test_open_loop_configuration_requires_the_rate():
+    import json
+    import os
+
+    import jsonschema
+
+    schema_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "schemas",
+                               "service_class_parameters_schema.json")
+    with open(schema_path, "r") as schema_file:
+        load_generator_schema = json.load(schema_file)["properties"]["load_generator"]
+
+    jsonschema.validate({"mode": "closed_loop"}, load_generator_schema)
+    jsonschema.validate({"mode": "open_loop", "rate": 50}, load_generator_schema)
+    with pytest.raises(jsonschema.ValidationError):
+        jsonschema.validate({"mode": "open_loop"}, load_generator_schema)
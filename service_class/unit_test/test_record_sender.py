@@ -0,0 +1,65 @@
+import base64
+import wave
+from io import BytesIO
+
+import numpy as np
+
+from service_class.audio_clip_pool import AudioClipPool
+from service_class.record_sender import RecordSender
+
+
+class FakeClipPool:
+    def random_clip(self):
+        return "clip"
+
+
+def make_sender(sessions: int) -> RecordSender:
+    sender = RecordSender.__new__(RecordSender)
+    sender.tweets = [{"uuid": str(i), "tweet": f"tweet {i}"} for i in range(sessions)]
+    sender.events = [{"uuid": str(i), "events": "[]"} for i in range(sessions)]
+    sender.labels = [{"uuid": str(i), "label": "cyberbullying"} for i in range(sessions)]
+    sender.audio_clips = FakeClipPool()
+    sender.min_len = sessions
+    return sender
+
+
+def test_render_clips_produces_wav_of_clip_duration():
+    samples = np.zeros((8000 * 3, 2), dtype=np.int16)
+
+    clips = AudioClipPool.render_clips(samples, frame_rate=8000, sample_width=2, clip_duration_ms=1000, pool_size=3)
+
+    assert len(clips) == 3
+    with wave.open(BytesIO(base64.b64decode(clips[0])), "rb") as wav:
+        assert wav.getnchannels() == 2
+        assert wav.getframerate() == 8000
+        assert wav.getnframes() == 8000
+
+
+def test_clip_pool_is_cached_on_disk(monkeypatch, tmp_path):
+    audio_path = tmp_path / "audio.mp3"
+    audio_path.write_bytes(b"fake mp3")
+    decoded = []
+
+    def fake_decode(path):
+        decoded.append(path)
+        return np.zeros((8000 * 2, 1), dtype=np.int16), 8000, 2
+
+    monkeypatch.setattr(AudioClipPool, "_decode", staticmethod(fake_decode))
+
+    first = AudioClipPool(str(audio_path), clip_duration_ms=500, pool_size=4, cache_dir=str(tmp_path / "cache"))
+    second = AudioClipPool(str(audio_path), clip_duration_ms=500, pool_size=4, cache_dir=str(tmp_path / "cache"))
+
+    assert len(decoded) == 1
+    assert second.clips == first.clips
+
+
+def test_bucket_contains_every_session():
+    sender = make_sender(sessions=40)
+
+    bucket = sender.prepare_bucket(20, include_labels=True)
+
+    assert len(bucket) == 20 * 4
+    tweet_uuids = [record["value"]["uuid"] for record in bucket if record["source"] == "tweet"]
+    audio_uuids = [record["value"]["uuid"] for record in bucket if record["source"] == "audio"]
+    assert len(set(tweet_uuids)) == 20
+    assert sorted(audio_uuids) == sorted(tweet_uuids)
@@ -0,0 +1,42 @@
+import json
+import os
+import shutil
+
+from service_class.service_receiver import ServiceReceiver
+
+SCHEMAS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "schemas")
+
+
+def make_receiver(tmp_path):
+    shutil.copytree(SCHEMAS_DIR, tmp_path / "schemas")
+    (tmp_path / "logs").mkdir()
+    return ServiceReceiver(port=5010, basedir=str(tmp_path))
+
+
+def test_batch_of_timestamps_is_logged(tmp_path):
+    receiver = make_receiver(tmp_path)
+    client = receiver.app.test_client()
+
+    batch = [{"timestamp": 1.0, "system": "Production System", "status": "start"},
+             {"timestamp": 2.0, "system": "Production System", "status": "end"}]
+    response = client.post("/Timestamp", json={"port": 5005, "message": json.dumps(batch)})
+    assert response.status_code == 200
+
+    # a single timestamp is still accepted
+    single = {"timestamp": 3.0, "system": "Development System", "status": "start"}
+    response = client.post("/Timestamp", json={"port": 5004, "message": json.dumps(single)})
+    assert response.status_code == 200
+
+    lines = (tmp_path / "logs" / "timestamp_log.txt").read_text().splitlines()
+    assert lines == ["1.0,Production System,start", "2.0,Production System,end", "3.0,Development System,start"]
+
+
+def test_invalid_batch_is_rejected(tmp_path):
+    receiver = make_receiver(tmp_path)
+    client = receiver.app.test_client()
+
+    batch = [{"timestamp": 1.0, "system": "Production System"}]
+    response = client.post("/Timestamp", json={"port": 5005, "message": json.dumps(batch)})
+
+    assert response.status_code == 400
+    assert not (tmp_path / "logs" / "timestamp_log.txt").exists()
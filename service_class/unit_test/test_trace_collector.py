@@ -0,0 +1,52 @@
+import pytest
+
+from service_class.trace_collector import TraceCollector
+
+
+def span(trace_id, system, stage, start, end):
+    return {"trace_id": trace_id, "system": system, "stage": stage, "start": start, "end": end}
+
+
+def test_waterfall_is_ordered_by_start_time(tmp_path):
+    log_path = tmp_path / "logs" / "span_log.csv"
+    collector = TraceCollector(str(log_path))
+
+    collector.add_spans([span("a", "Preparation System", "feature_extract", 10.5, 10.9)])
+    collector.add_spans([span("a", "Ingestion System", "receive", 10.0, 10.1),
+                         span("b", "Ingestion System", "receive", 20.0, 20.2)])
+
+    waterfall = collector.waterfall("a")
+    assert [(step["system"], step["stage"]) for step in waterfall] == [
+        ("Ingestion System", "receive"), ("Preparation System", "feature_extract")]
+    assert waterfall[1]["offset"] == 0.5
+    assert round(waterfall[1]["duration"], 6) == 0.4
+    assert collector.waterfall("missing") == []
+
+    lines = log_path.read_text().splitlines()
+    assert lines[0] == "trace_id,system,stage,start,end"
+    assert len(lines) == 4
+
+
+def test_stage_percentiles():
+    collector = TraceCollector()
+    collector.add_spans([span(str(i), "Production System", "classify", 0, i / 100) for i in range(1, 101)])
+
+    summary = collector.stage_percentiles()
+    assert summary["Production System/classify"]["count"] == 100
+    # the histogram reports the percentiles within 1%
+    assert summary["Production System/classify"]["p50"] == pytest.approx(0.50, rel=0.01)
+    assert summary["Production System/classify"]["p99"] == pytest.approx(0.99, rel=0.01)
+
+
+def test_memory_is_bounded():
+    collector = TraceCollector(max_traces=2, max_spans_per_trace=3)
+    collector.add_spans([span("a", "Ingestion System", "receive", i, i + 1) for i in range(5)])
+    collector.add_spans([span("b", "Ingestion System", "receive", 0, 1)])
+    # "a" is the most recently updated, "b" is forgotten first
+    collector.add_spans([span("a", "Ingestion System", "validate", 9, 10)])
+    collector.add_spans([span("c", "Ingestion System", "receive", 0, 1)])
+
+    assert list(collector.traces) == ["a", "c"]
+    assert [step["stage"] for step in collector.waterfall("a")] == ["receive", "receive", "validate"]
+    assert collector.waterfall("b") == []
+    assert collector.stage_percentiles()["Ingestion System/receive"]["count"] == 7